@@ -7,18 +7,64 @@ Uses full blueprint config for enhanced AI generation
 import requests
 import json
 import re
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List, Tuple
+
+from base import config_digest
+from llm_cache import ResponseCache, default_cache
+from llm_client import CompletionRequest
+from stream_validator import PhpStreamValidator, StreamRejected
+
+FUNCTION_TEMPERATURE = 0.7
+
+# Batch mode wraps each machine's code in these markers
+BATCH_BLOCK = re.compile(r'^###\s*BEGIN\s+(\d+)\s*$(.*?)^###\s*END\s+\1\s*$', re.MULTILINE | re.DOTALL)
+
+BATCH_RULES = """
+BATCH MODE:
+- You will receive several numbered specifications
+- Answer every one, in order, each wrapped exactly like this:
+### BEGIN <number>
+<PHP code for that specification>
+### END <number>
+- Every rule above applies to each block separately
+- Output NOTHING outside the blocks
+"""
+
+_session = None
+
+
+def http_session() -> requests.Session:
+    """Shared session so blocking completions reuse keep-alive connections"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
 
 
 class AICodeGenerator:
     """Calls AI API to generate vulnerable code components"""
 
-    def __init__(self, api_url: str = "http://localhost:8080/v1/chat/completions"):
+    def __init__(self, api_url: str = "http://localhost:8080/v1/chat/completions",
+                 cache: Optional[ResponseCache] = None):
         self.api_url = api_url
         self.timeout = 60
+        # Completions are shared across machines with identical prompts
+        self.cache = cache if cache is not None else default_cache()
+
+    def _call_api(self, system_prompt: str, user_prompt: str, temperature: float = 0.7,
+                  accept: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        Call AI API and return response, served from the cache when possible
+
+        Only responses accept() approves (all, without it) are cached.
+        """
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.key(system_prompt, user_prompt, temperature, self.api_url)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-    def _call_api(self, system_prompt: str, user_prompt: str, temperature: float = 0.7) -> Optional[str]:
-        """Call AI API and return response"""
         payload = {
             "messages": [
                 {"role": "system", "content": system_prompt},
@@ -28,7 +74,7 @@ class AICodeGenerator:
         }
 
         try:
-            response = requests.post(
+            response = http_session().post(
                 self.api_url,
                 headers={"Content-Type": "application/json"},
                 json=payload,
@@ -39,6 +85,8 @@ class AICodeGenerator:
             data = response.json()
             content = data['choices'][0]['message']['content']
             content = self._strip_markdown(content)
+            if cache_key and (accept is None or accept(content)):
+                self.cache.put(cache_key, content)
             return content
 
         except Exception as e:
@@ -58,6 +106,32 @@ class AICodeGenerator:
                                      context: Dict,
                                      filters: List[Dict]) -> Optional[str]:
         """Generate vulnerable function using FULL blueprint config"""
+        system_prompt, user_prompt = self.build_function_prompts(
+            blueprint_config, variant, difficulty, context, filters)
+        return self._call_api(system_prompt, user_prompt, temperature=FUNCTION_TEMPERATURE,
+                              accept=self.acceptable_function)
+
+    def function_request(self,
+                         blueprint_config: Dict,
+                         variant: Dict,
+                         difficulty: int,
+                         context: Dict,
+                         filters: List[Dict]) -> CompletionRequest:
+        """The generate_vulnerable_function completion, for AsyncLLMClient.generate_many"""
+        system_prompt, user_prompt = self.build_function_prompts(
+            blueprint_config, variant, difficulty, context, filters)
+        # The validator enforces the prompt's rules while streaming (30 lines, no HTML)
+        return CompletionRequest(system_prompt, user_prompt, FUNCTION_TEMPERATURE,
+                                 postprocess=self._strip_markdown, validator=PhpStreamValidator,
+                                 accept=self.acceptable_function)
+
+    def build_function_prompts(self,
+                               blueprint_config: Dict,
+                               variant: Dict,
+                               difficulty: int,
+                               context: Dict,
+                               filters: List[Dict]) -> Tuple[str, str]:
+        """(system prompt, user prompt) for a vulnerable function"""
 
         # Extract info from enhanced config
         vuln_name = blueprint_config.get('name', 'Unknown')
@@ -138,7 +212,120 @@ $result = vulnerable_function($input);
 echo $result;
 """
 
-        return self._call_api(system_prompt, user_prompt, temperature=0.7)
+        return system_prompt, user_prompt
+
+    def batch_request(self, specs: List[Dict]) -> CompletionRequest:
+        """
+        One completion covering several machines of the same blueprint
+
+        specs are generate_vulnerable_function keyword arguments. The shared
+        system prompt is sent once and each spec contributes only the part of
+        its user prompt that differs.
+        """
+        system_prompt = None
+        sections = []
+        for number, spec in enumerate(specs, 1):
+            spec_system, spec_user = self.build_function_prompts(**spec)
+            system_prompt = system_prompt or spec_system
+            # The shared output example is given once at the end
+            spec_user = spec_user.split("\nOutput format example:", 1)[0].strip()
+            sections.append(f"### SPEC {number}\n{spec_user}")
+
+        user_prompt = (f"Generate {len(specs)} independent code blocks.\n\n" + "\n\n".join(sections) +
+                       "\n\nEach block reads $_GET['input'], applies its filters, runs the vulnerable "
+                       "operation and echoes the result.\n")
+        # Cached only when every block is there and validates, so a retry round re-asks
+        return CompletionRequest(system_prompt + BATCH_RULES, user_prompt, FUNCTION_TEMPERATURE,
+                                 accept=lambda text: self.acceptable_batch(text, len(specs)))
+
+    @staticmethod
+    def parse_batch_response(text: str, count: int) -> Dict[int, str]:
+        """Per-spec code blocks (0-based) from a batch completion; missing ones are left out"""
+        blocks = {}
+        for match in BATCH_BLOCK.finditer(text or ''):
+            index = int(match.group(1)) - 1
+            if 0 <= index < count and index not in blocks:
+                blocks[index] = match.group(2)
+        return blocks
+
+    def acceptable_batch(self, text: str, count: int) -> bool:
+        """Whether a batch completion has all count blocks and each passes validation"""
+        blocks = self.parse_batch_response(text, count)
+        return len(blocks) == count and all(self._validated(code) for code in blocks.values())
+
+    def acceptable_function(self, code: str) -> bool:
+        """Whether a vulnerable-function completion passes validation (and may be cached)"""
+        return self._validated(code) is not None
+
+    def _validated(self, code: str) -> Optional[str]:
+        validator = PhpStreamValidator()
+        try:
+            validator.feed(self._strip_markdown(code))
+            return validator.finish()
+        except StreamRejected:
+            return None
+
+    async def generate_functions_batched(self, client, specs: List[Dict], batch_size: int = 8,
+                                         rounds: int = 2) -> List[Optional[str]]:
+        """
+        Generate many vulnerable functions with batched requests
+
+        Identical specs are generated once. Specs are packed batch_size at a
+        time per blueprint; blocks that are missing or fail validation are
+        re-batched for up to `rounds` rounds and then fall back to one request
+        each; specs with no valid code by then are left None. Results are stored in the client's cache under the
+        single-machine key, so later one-off generation reuses them.
+        """
+        results: List[Optional[str]] = [None] * len(specs)
+        singles = [self.function_request(**spec) for spec in specs]
+        keys = [ResponseCache.key(r.system_prompt, r.user_prompt, r.temperature, client.api_url) for r in singles]
+
+        # key -> indices of the specs that share it
+        pending: Dict[str, List[int]] = {}
+        for index, key in enumerate(keys):
+            cached = client.cache.get(key) if client.cache else None
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.setdefault(key, []).append(index)
+
+        def resolve(key: str, code: str):
+            for index in pending.pop(key):
+                results[index] = code
+            if client.cache:
+                client.cache.put(key, code)
+
+        for _ in range(rounds):
+            if not pending:
+                break
+
+            by_blueprint: Dict[str, List[str]] = {}
+            for key, indices in pending.items():
+                digest = config_digest(specs[indices[0]]['blueprint_config'])
+                by_blueprint.setdefault(digest, []).append(key)
+
+            batches = [group[i:i + batch_size]
+                       for group in by_blueprint.values()
+                       for i in range(0, len(group), batch_size)]
+            requests = [self.batch_request([specs[pending[key][0]] for key in batch]) for batch in batches]
+            responses = await client.generate_many(requests)
+
+            for batch, response in zip(batches, responses):
+                blocks = self.parse_batch_response(response, len(batch))
+                for position, key in enumerate(batch):
+                    code = self._validated(blocks[position]) if position in blocks else None
+                    if code:
+                        resolve(key, code)
+
+        if pending:
+            leftovers = list(pending)
+            codes = await client.generate_many(singles[pending[key][0]] for key in leftovers)
+            for key, code in zip(leftovers, codes):
+                code = self._validated(code) if code else None
+                if code:
+                    resolve(key, code)
+
+        return results
 
     def generate_dockerfile_additions(self, blueprint_config: Dict) -> str:
         """Generate Dockerfile additions from infrastructure config"""
@@ -5,23 +5,34 @@ Properly generates database services in docker-compose
 AND strips markdown code fences from AI responses
 """
 
-import requests
 import json
 import re
 from typing import Dict, Optional, Tuple
 
+from llm_cache import ResponseCache, default_cache
+from ai_code_generator import http_session
+
 
 class AIDockerGenerator:
     """Generates Docker infrastructure using enhanced config"""
 
-    def __init__(self, api_url: str = "http://localhost:8080/v1/chat/completions"):
+    def __init__(self, api_url: str = "http://localhost:8080/v1/chat/completions",
+                 cache: Optional[ResponseCache] = None):
         self.api_url = api_url
         self.timeout = 60
+        self.cache = cache if cache is not None else default_cache()
 
     def _call_api(self, system_prompt: str, user_prompt: str) -> Optional[str]:
-        """Call AI API"""
+        """Call AI API, served from the response cache when possible"""
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.key(system_prompt, user_prompt, 0.5, self.api_url)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
-            response = requests.post(
+            response = http_session().post(
                 self.api_url,
                 headers={"Content-Type": "application/json"},
                 json={
@@ -34,8 +45,10 @@ class AIDockerGenerator:
                 timeout=self.timeout
             )
             response.raise_for_status()
-            content = response.json()['choices'][0]['message']['content']
-            return self._strip_markdown(content)
+            content = self._strip_markdown(response.json()['choices'][0]['message']['content'])
+            if cache_key:
+                self.cache.put(cache_key, content)
+            return content
         except Exception as e:
             print(f"AI API Error: {e}")
             return None
@@ -48,8 +61,13 @@ class AIDockerGenerator:
         text = re.sub(r'^[Dd]ockerfile\s*\n', '', text, flags=re.MULTILINE)
         return text.strip()
 
-    def generate_dockerfile_from_config(self, blueprint_config: Dict) -> str:
-        """Generate Dockerfile from enhanced config"""
+    def generate_dockerfile_from_config(self, blueprint_config: Dict, fallback: bool = True) -> Optional[str]:
+        """
+        Generate Dockerfile from enhanced config
+
+        With fallback=False a failed AI call returns None instead of the
+        static fallback, so callers can tell the two apart (and not cache it).
+        """
 
         infrastructure = blueprint_config.get('infrastructure', {})
         docker_reqs = infrastructure.get('docker_requirements', {})
@@ -90,7 +108,9 @@ CMD ["apache2-foreground"]
 """
 
         result = self._call_api(system_prompt, user_prompt)
-        return result if result else self._fallback_dockerfile(infrastructure)
+        if result or not fallback:
+            return result
+        return self._fallback_dockerfile(infrastructure)
 
     def _fallback_dockerfile(self, infrastructure: Dict) -> str:
         """Fallback Dockerfile from infrastructure config"""
@@ -6,11 +6,32 @@ Core abstractions for blueprints and mutation engines
 from abc import ABC, abstractmethod
 import random
 import hashlib
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, field
+import json
+import threading
+from typing import Dict, List, Any, Optional, Union
+from dataclasses import dataclass, field, InitVar
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-@dataclass
+
+def dumps_json(data: Any) -> bytes:
+    """Compact JSON bytes, via orjson when it's installed"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def loads_json(raw: Union[bytes, str]) -> Any:
+    """Parse JSON, via orjson when it's installed"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+@dataclass(slots=True, frozen=True)
 class VulnerabilityBlueprint:
     """
     Immutable blueprint defining a vulnerability class
@@ -24,6 +45,9 @@ class VulnerabilityBlueprint:
     mutation_axes: Dict[str, List[Any]]
     description: str = ""
 
+    # Serialised form, built on first to_json() call
+    _json: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+
     def to_dict(self) -> Dict:
         return {
             'blueprint_id': self.blueprint_id,
@@ -36,12 +60,76 @@ class VulnerabilityBlueprint:
             'description': self.description
         }
 
+    def to_json(self) -> bytes:
+        """Compact JSON of to_dict(), cached - the blueprint never changes"""
+        if self._json is None:
+            object.__setattr__(self, '_json', dumps_json(self.to_dict()))
+        return self._json
+
+    @classmethod
+    def from_json(cls, raw: Union[bytes, str]) -> 'VulnerabilityBlueprint':
+        data = loads_json(raw)
+        data['difficulty_range'] = tuple(data['difficulty_range'])
+        return cls(**data)
+
+
+def config_digest(config: Dict[str, Any]) -> str:
+    """Content hash of a blueprint config (stable across key order)"""
+    canonical = json.dumps(config, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+class BlueprintConfigStore:
+    """
+    Content-addressed store of blueprint configs
+
+    Configs are interned by config_digest() so every machine built from the
+    same category JSON shares one dict. Stored configs are treated as
+    immutable - mutate a copy and intern that instead.
+    """
+
+    def __init__(self):
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        # id(config) -> (config, digest): re-interning the same object skips hashing
+        self._by_id: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def intern(self, config: Dict[str, Any], digest: str = None) -> str:
+        """Store a config (if new) and return its digest"""
+        cached = self._by_id.get(id(config))
+        if cached is not None and cached[0] is config:
+            return cached[1]
+
+        digest = digest or config_digest(config)
+        with self._lock:
+            config = self._configs.setdefault(digest, config)
+            self._by_id[id(config)] = (config, digest)
+        return digest
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Config for a digest, or None if it was never interned"""
+        return self._configs.get(digest)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._configs
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+
+# Process-wide store shared by every MachineConfig
+blueprint_store = BlueprintConfigStore()
 
-@dataclass
+
+@dataclass(slots=True)
 class MachineConfig:
     """
     Complete configuration for a generated vulnerable machine
-    NOW INCLUDES: Full blueprint JSON for AI generation
+
+    The full blueprint config (database_schema, infrastructure, etc.) is kept
+    in blueprint_store; the machine only holds its digest. blueprint_config
+    still reads and writes like a plain attribute, and the constructor accepts
+    either blueprint_config= (interned) or blueprint_config_ref=.
     """
     machine_id: str
     blueprint_id: str
@@ -63,12 +151,25 @@ class MachineConfig:
 
     # Metadata
     metadata: Dict[str, Any] = field(default_factory=dict)
-    
-    # NEW: Full blueprint config for AI (includes database_schema, infrastructure, etc.)
-    blueprint_config: Dict[str, Any] = field(default_factory=dict)
 
-    def to_dict(self) -> Dict:
-        return {
+    # Full blueprint config for AI, interned in blueprint_store
+    blueprint_config: InitVar[Optional[Dict[str, Any]]] = None
+    blueprint_config_ref: Optional[str] = None
+
+    def __post_init__(self, blueprint_config: Optional[Dict[str, Any]]):
+        if blueprint_config:
+            self.blueprint_config_ref = blueprint_store.intern(blueprint_config)
+
+    def _get_blueprint_config(self) -> Dict[str, Any]:
+        if self.blueprint_config_ref is None:
+            return {}
+        return blueprint_store.get(self.blueprint_config_ref) or {}
+
+    def _set_blueprint_config(self, config: Optional[Dict[str, Any]]):
+        self.blueprint_config_ref = blueprint_store.intern(config) if config else None
+
+    def to_dict(self, inline_config: bool = True) -> Dict:
+        data = {
             'machine_id': self.machine_id,
             'blueprint_id': self.blueprint_id,
             'variant': self.variant,
@@ -79,8 +180,20 @@ class MachineConfig:
             'flag': self.flag,
             'behavior': self.behavior,
             'metadata': self.metadata,
-            'blueprint_config': self.blueprint_config
         }
+        if inline_config:
+            data['blueprint_config'] = self.blueprint_config
+        else:
+            data['blueprint_config_ref'] = self.blueprint_config_ref
+        return data
+
+    def to_json(self, inline_config: bool = False) -> bytes:
+        """Compact JSON bytes (reference form unless inline_config)"""
+        return dumps_json(self.to_dict(inline_config))
+
+
+MachineConfig.blueprint_config = property(MachineConfig._get_blueprint_config,
+                                          MachineConfig._set_blueprint_config)
 
 
 class MutationEngine(ABC):
@@ -89,9 +202,51 @@ class MutationEngine(ABC):
     Each vulnerability type implements its own mutation logic
     """
 
-    def __init__(self, seed: str):
+    def __init__(self, seed: str, derived: Optional[Dict[str, Any]] = None):
         self.seed = seed
-        self.rng = random.Random(seed)
+        self._derived = derived
+
+        if derived and derived.get('rng_state') is not None:
+            self.rng = random.Random()
+            self.rng.setstate(derived['rng_state'])
+        else:
+            self.rng = random.Random(seed)
+
+    @staticmethod
+    def derive_many(seeds: List[str], prefix: str = "HACKFORGE",
+                    include_rng_state: bool = False) -> List[Dict[str, Any]]:
+        """
+        Derive machine IDs and flags for many seeds in one pass
+
+        Produces exactly what generate_machine_id() / generate_flag() return for
+        each seed: the seed is hashed once and the flag digest continues from a
+        copy of that hash state instead of re-hashing "<seed>_flag" from scratch.
+        With include_rng_state, each entry also carries the Random state the
+        engine would start from, so it can be handed to __init__(derived=...).
+        """
+        sha256 = hashlib.sha256
+        rng = random.Random() if include_rng_state else None
+        results = []
+
+        for seed in seeds:
+            seed_hash = sha256(seed.encode())
+            flag_hash = seed_hash.copy()
+            flag_hash.update(b"_flag")
+
+            entry = {
+                'seed': seed,
+                'machine_id': seed_hash.digest()[:8].hex(),
+                'flag': f"{prefix}{{{flag_hash.digest()[:16].hex()}}}",
+                'flag_prefix': prefix,
+            }
+
+            if rng is not None:
+                rng.seed(seed)
+                entry['rng_state'] = rng.getstate()
+
+            results.append(entry)
+
+        return results
 
     @abstractmethod
     def mutate(self, blueprint: VulnerabilityBlueprint, difficulty: int) -> MachineConfig:
@@ -109,10 +264,14 @@ class MutationEngine(ABC):
 
     def generate_machine_id(self) -> str:
         """Generate unique machine ID from seed"""
+        if self._derived:
+            return self._derived['machine_id']
         return hashlib.sha256(self.seed.encode()).hexdigest()[:16]
 
     def generate_flag(self, prefix: str = "HACKFORGE") -> str:
         """Generate unique flag content"""
+        if self._derived and self._derived.get('flag_prefix') == prefix:
+            return self._derived['flag']
         hash_val = hashlib.sha256(f"{self.seed}_flag".encode()).hexdigest()
         return f"{prefix}{{{hash_val[:32]}}}"
 
@@ -154,8 +313,8 @@ class BlueprintLoader:
         """Validate blueprint has all required fields"""
         required_fields = ['blueprint_id', 'name', 'category', 'variants', 'entry_points', 'mutation_axes']
 
-        for field in required_fields:
-            if not getattr(blueprint, field):
+        for field_name in required_fields:
+            if not getattr(blueprint, field_name):
                 return False
 
         if not blueprint.variants:
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Base Images
+One shared hackforge-base image per docker_requirements fingerprint
+
+Machine images used to repeat the same apt-get / docker-php-ext-install
+layers in every Dockerfile. Those layers now live in a base image tagged
+hackforge-base:<fingerprint>, built once per distinct (base_image, packages,
+extensions), and machine Dockerfiles reduce to FROM the base plus the app.
+
+The docker client is injectable: anything with image_exists(tag) and
+build(context_dir, tag) works, so the builder can be exercised without a
+docker daemon. Clients raise DockerUnavailable when the daemon can't be
+reached; the builder then stops trying for the rest of the process.
+"""
+
+import os
+import time
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+from base import config_digest
+
+BASE_IMAGE_REPOSITORY = "hackforge-base"
+
+# Bump when render_base_dockerfile changes
+BASE_IMAGE_VERSION = 1
+
+DEFAULT_BUILD_DIR = Path(__file__).parent / ".cache" / "base_images"
+
+STANDARD_PACKAGES = ["iputils-ping", "whois", "dnsutils", "net-tools", "curl", "wget"]
+
+
+class DockerUnavailable(RuntimeError):
+    """The docker daemon can't be reached (not running, no socket access, ...)"""
+
+
+def _requirements(docker_requirements: Dict) -> Dict:
+    """Normalised view of the fields that shape the base image"""
+    docker_requirements = docker_requirements or {}
+    return {
+        'base_image': docker_requirements.get('base_image', 'php:8.0-apache'),
+        'packages': list(docker_requirements.get('packages', [])),
+        'extensions': list(docker_requirements.get('extensions', [])),
+    }
+
+
+def base_fingerprint(docker_requirements: Dict) -> str:
+    """Fingerprint of infrastructure.docker_requirements (package order doesn't matter)"""
+    requirements = _requirements(docker_requirements)
+    return config_digest({
+        'version': BASE_IMAGE_VERSION,
+        'base_image': requirements['base_image'],
+        'packages': sorted(set(requirements['packages'])),
+        'extensions': sorted(set(requirements['extensions'])),
+    })
+
+
+def base_image_tag(docker_requirements: Dict) -> str:
+    return f"{BASE_IMAGE_REPOSITORY}:{base_fingerprint(docker_requirements)}"
+
+
+def render_base_dockerfile(docker_requirements: Dict) -> str:
+    """Dockerfile with the shared system layers for a set of requirements"""
+    requirements = _requirements(docker_requirements)
+
+    dockerfile = f'''FROM {requirements['base_image']}
+
+RUN apt-get update && apt-get install -y \\
+    {' '.join(STANDARD_PACKAGES)} \\
+'''
+
+    for pkg in requirements['packages']:
+        dockerfile += f'    {pkg} \\\n'
+
+    dockerfile += '    && rm -rf /var/lib/apt/lists/*\n\n'
+
+    if requirements['extensions']:
+        ext_list = ' '.join(requirements['extensions'])
+        dockerfile += f'RUN docker-php-ext-install {ext_list}\n\n'
+
+    dockerfile += '''RUN a2enmod rewrite
+
+EXPOSE 80
+
+CMD ["apache2-foreground"]
+'''
+    return dockerfile
+
+
+def machine_dockerfile(tag: str) -> str:
+    """Per-machine Dockerfile on top of a base image"""
+    return f'''FROM {tag}
+
+COPY app/ /var/www/html/
+'''
+
+
+class DockerCLI:
+    """Minimal docker client over the docker CLI"""
+
+    DAEMON_ERRORS = ("cannot connect to the docker daemon", "is the docker daemon running",
+                     "error during connect", "permission denied while trying to connect")
+
+    def __init__(self, timeout: float = 1800):
+        self.timeout = timeout
+
+    def _check_daemon(self, stderr: str):
+        if any(marker in stderr.lower() for marker in self.DAEMON_ERRORS):
+            raise DockerUnavailable(stderr.strip())
+
+    def image_exists(self, tag: str) -> bool:
+        result = subprocess.run(["docker", "image", "inspect", tag],
+                                capture_output=True, text=True, timeout=60)
+        if result.returncode != 0:
+            self._check_daemon(result.stderr)
+        return result.returncode == 0
+
+    def build(self, context_dir: Path, tag: str):
+        result = subprocess.run(["docker", "build", "-t", tag, str(context_dir)],
+                                capture_output=True, text=True, timeout=self.timeout)
+        if result.returncode != 0:
+            self._check_daemon(result.stderr)
+            raise RuntimeError(result.stderr.strip() or f"docker build failed for {tag}")
+
+
+class BaseImageBuilder:
+    """
+    Builds and remembers hackforge-base images
+
+    Args:
+        client: Docker client (image_exists/build); defaults to the docker CLI
+        build_dir: Where base Dockerfiles (build contexts) are written
+    """
+
+    def __init__(self, client=None, build_dir: Path = DEFAULT_BUILD_DIR):
+        self.client = client or DockerCLI()
+        self.build_dir = Path(build_dir)
+
+        # tag -> built (True) or failed (False); failed tags aren't rebuilt
+        self._known: Dict[str, bool] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.available = True
+
+        self.builds = 0
+        self.hits = 0
+        self.build_seconds = 0.0
+
+    def _lock(self, tag: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(tag, threading.Lock())
+
+    def ensure(self, docker_requirements: Dict) -> Optional[str]:
+        """
+        Tag of the base image for these requirements, building it if needed
+
+        Returns None when the image can't be built (no docker, build error);
+        callers then fall back to a self-contained Dockerfile. A tag whose
+        build failed isn't attempted again by this builder.
+        """
+        if not self.available:
+            return None
+
+        tag = base_image_tag(docker_requirements)
+        known = self._known.get(tag)
+        if known is not None:
+            self.hits += known
+            return tag if known else None
+
+        with self._lock(tag):
+            known = self._known.get(tag)
+            if known is not None:
+                self.hits += known
+                return tag if known else None
+            if not self.available:
+                return None
+
+            try:
+                if self.client.image_exists(tag):
+                    self._known[tag] = True
+                    self.hits += 1
+                    return tag
+
+                context_dir = self.build_dir / tag.split(':', 1)[1]
+                context_dir.mkdir(parents=True, exist_ok=True)
+                (context_dir / "Dockerfile").write_text(render_base_dockerfile(docker_requirements))
+
+                start = time.perf_counter()
+                self.client.build(context_dir, tag)
+                self.build_seconds += time.perf_counter() - start
+                self.builds += 1
+            except FileNotFoundError:
+                # No docker CLI on this host - stop trying
+                print("⚠️ docker not found - base images disabled")
+                self.available = False
+                return None
+            except DockerUnavailable as e:
+                # Every other build would fail the same way
+                print(f"⚠️ docker daemon unreachable - base images disabled: {e}")
+                self.available = False
+                return None
+            except Exception as e:
+                print(f"⚠️ Base image build failed for {tag}: {e}")
+                self._known[tag] = False
+                return None
+
+            self._known[tag] = True
+            return tag
+
+    def stats(self) -> Dict:
+        return {
+            'builds': self.builds,
+            'hits': self.hits,
+            'build_seconds': round(self.build_seconds, 3),
+            'images': sorted(tag for tag, ok in self._known.items() if ok),
+            'failed': sorted(tag for tag, ok in self._known.items() if not ok),
+            'available': self.available,
+        }
+
+
+_default_builder = None
+_default_builder_lock = threading.Lock()
+
+
+def default_base_image_builder() -> Optional[BaseImageBuilder]:
+    """Process-wide builder; HACKFORGE_BASE_IMAGES=0 turns base images off"""
+    global _default_builder
+
+    if os.getenv('HACKFORGE_BASE_IMAGES', '1') == '0':
+        return None
+
+    if _default_builder is None:
+        with _default_builder_lock:
+            if _default_builder is None:
+                _default_builder = BaseImageBuilder()
+    return _default_builder
+
+
+def main():
+    import json
+
+    parser = argparse.ArgumentParser(description='Build hackforge-base images for blueprint configs')
+    parser.add_argument('configs', nargs='*', help='Blueprint config JSON files (default: configs/*.json)')
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in args.configs] or sorted((Path(__file__).parent / "configs").glob("*.json"))
+    builder = BaseImageBuilder()
+    for path in paths:
+        with open(path, 'r') as f:
+            config = json.load(f)
+        requirements = config.get('infrastructure', {}).get('docker_requirements', {})
+        tag = builder.ensure(requirements)
+        print(f"  {'✓' if tag else '✗'} {path.name}: {tag or 'build failed'}")
+
+    print(json.dumps(builder.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2412 @@
+#!/usr/bin/env python3
+"""
+Hackforge Benchmarks
+Timing harness for the generation pipeline
+
+Usage:
+    python3 benchmark.py campaign --sizes 10 100 1000 --workers 4
+    python3 benchmark.py registry --blueprints 500
+    python3 benchmark.py derive --seeds 100000
+    python3 benchmark.py index --machines 1000000
+    python3 benchmark.py export --machines 500
+    python3 benchmark.py memory --machines 10000
+    python3 benchmark.py models --configs 100000
+    python3 benchmark.py mutate --machines 100000
+    python3 benchmark.py pool --campaigns 20 --size 5 --prepare-ms 200
+    python3 benchmark.py llm-cache --machines 100 --llm-ms 50
+    python3 benchmark.py llm-client --requests 64 --llm-ms 2000 --concurrency 8 32
+    python3 benchmark.py llm-stream --requests 32 --token-ms 20
+    python3 benchmark.py llm-batch --machines 48 --batch-size 8
+    python3 benchmark.py dockerfile --machines 100 --categories 3 --llm-ms 2000
+    python3 benchmark.py base-images --machines 100 --categories 3
+    python3 benchmark.py jobs --jobs 8 --llm-ms 1500 --docker-ms 1500
+    python3 benchmark.py compose --starts 16 --up-ms 1000
+    python3 benchmark.py control-plane --machines 20 --api-ms 2
+    python3 benchmark.py campaign-lifecycle --machines 30 --up-ms 1000 --concurrency 8 32
+    python3 benchmark.py flags --machines 100000 --rate 1000 --seconds 5
+    python3 benchmark.py flag-submit --users 50 --rtt-ms 1 --racers 8
+    python3 benchmark.py db-async --clients 200 --seconds 5 --rtt-ms 2 --pool-sizes 10 200
+    python3 benchmark.py campaign-progress --campaigns 500 --machines 5 --rtt-ms 1
+"""
+
+import os
+import sys
+import time
+import argparse
+import collections
+import contextlib
+import io
+import json
+import shutil
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _timed(func: Callable, repeat: int = 3) -> float:
+    """Return the best wall time of several runs in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _quiet_generator(core_dir: str = None):
+    """Build a generator without its startup banner"""
+    from generator import DynamicHackforgeGenerator
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DynamicHackforgeGenerator(core_dir=core_dir)
+
+
+def bench_campaign(sizes: List[int], workers: int, repeat: int):
+    """Sequential vs parallel campaign generation"""
+
+    generator = _quiet_generator()
+    if not generator.blueprints:
+        print("✗ No blueprints found - nothing to benchmark")
+        return
+
+    print(f"\n{'='*60}")
+    print("CAMPAIGN GENERATION")
+    print(f"{'='*60}")
+    print(f"Workers: {workers}")
+    print(f"{'machines':>10} {'sequential':>12} {'threads':>12} {'processes':>12}")
+
+    for size in sizes:
+        def run(worker_count: int, use_processes: bool = False):
+            with contextlib.redirect_stdout(io.StringIO()):
+                machines = generator.generate_campaign(
+                    user_id="bench", difficulty=3, count=size,
+                    workers=worker_count, use_processes=use_processes
+                )
+            assert len(machines) == size
+
+        sequential = _timed(lambda: run(1), repeat)
+        threaded = _timed(lambda: run(workers), repeat)
+        processes = _timed(lambda: run(workers, True), repeat)
+
+        print(f"{size:>10} {sequential * 1000:>10.1f}ms {threaded * 1000:>10.1f}ms {processes * 1000:>10.1f}ms")
+
+
+def bench_registry(blueprint_count: int, repeat: int):
+    """Generator start-up: no cache vs cold cache vs warm cache"""
+
+    core_dir = Path(os.path.dirname(os.path.abspath(__file__)))
+    template_yaml = (core_dir / "blueprints" / "sql_injection_blueprint.yaml").read_text()
+    template_config = json.loads((core_dir / "configs" / "sql_injection.json").read_text())
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+    try:
+        (work_dir / "blueprints").mkdir()
+        (work_dir / "configs").mkdir()
+        (work_dir / "mutations").mkdir()
+
+        for i in range(blueprint_count):
+            category = f"bench_category_{i}"
+            blueprint_yaml = template_yaml.replace("blueprint_id: sqli_001", f"blueprint_id: bench_{i:04d}")
+            blueprint_yaml = blueprint_yaml.replace("category: sql_injection", f"category: {category}")
+            (work_dir / "blueprints" / f"{category}_blueprint.yaml").write_text(blueprint_yaml)
+
+            config = dict(template_config, vulnerability_id=f"bench_{i:04d}", category=category)
+            (work_dir / "configs" / f"{category}.json").write_text(json.dumps(config, indent=2))
+
+        cache_dir = work_dir / ".cache"
+
+        def uncached():
+            from generator import DynamicHackforgeGenerator
+            with contextlib.redirect_stdout(io.StringIO()):
+                generator = DynamicHackforgeGenerator(core_dir=str(work_dir), use_cache=False)
+            assert len(generator.blueprints) == blueprint_count
+
+        def cold():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            generator = _quiet_generator(str(work_dir))
+            assert generator.registry.misses == blueprint_count * 2
+
+        def warm():
+            generator = _quiet_generator(str(work_dir))
+            assert generator.registry.misses == 0
+
+        print(f"\n{'='*60}")
+        print("GENERATOR START-UP")
+        print(f"{'='*60}")
+        print(f"Blueprints: {blueprint_count} (+ {blueprint_count} JSON configs)")
+
+        no_cache_time = _timed(uncached, repeat)
+        cold_time = _timed(cold, repeat)
+        warm_time = _timed(warm, repeat)
+
+        print(f"  no cache:   {no_cache_time * 1000:>9.1f}ms")
+        print(f"  cold cache: {cold_time * 1000:>9.1f}ms")
+        print(f"  warm cache: {warm_time * 1000:>9.1f}ms  ({no_cache_time / warm_time:.1f}x faster)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_derive(seed_count: int, repeat: int):
+    """Per-engine seed derivation vs MutationEngine.derive_many"""
+    from base import MutationEngine
+
+    class _Engine(MutationEngine):
+        def mutate(self, blueprint, difficulty):
+            raise NotImplementedError
+
+    seeds = [f"bench_user_sqli_001_1700000000_{i}" for i in range(seed_count)]
+
+    def single():
+        for seed in seeds:
+            engine = _Engine(seed)
+            engine.generate_machine_id()
+            engine.generate_flag()
+
+    def batch_ids():
+        MutationEngine.derive_many(seeds)
+
+    def batch_ids_with_engines():
+        for entry in MutationEngine.derive_many(seeds):
+            engine = _Engine(entry['seed'], derived=entry)
+            engine.generate_machine_id()
+            engine.generate_flag()
+
+    def batch_with_rng():
+        MutationEngine.derive_many(seeds, include_rng_state=True)
+
+    # Byte-identical check before timing anything
+    for entry in MutationEngine.derive_many(seeds[:1000], include_rng_state=True):
+        engine = _Engine(entry['seed'])
+        assert entry['machine_id'] == engine.generate_machine_id()
+        assert entry['flag'] == engine.generate_flag()
+        assert entry['rng_state'] == engine.rng.getstate()
+
+    print(f"\n{'='*60}")
+    print("SEED DERIVATION")
+    print(f"{'='*60}")
+    print(f"Seeds: {seed_count}")
+
+    for label, func in (("per-engine (ID + flag + RNG)", single),
+                        ("derive_many (ID + flag)", batch_ids),
+                        ("derive_many + engines", batch_ids_with_engines),
+                        ("derive_many (ID + flag + RNG state)", batch_with_rng)):
+        elapsed = _timed(func, repeat)
+        print(f"  {label:<38} {elapsed * 1000:>9.1f}ms  ({seed_count / elapsed:>10,.0f} seeds/s)")
+
+
+def bench_index(machine_count: int, repeat: int):
+    """MachineIndex insert, membership, locate and reload at scale"""
+    import hashlib
+    from machine_index import MachineIndex
+
+    ids = [hashlib.sha256(f"bench_{i}".encode()).hexdigest()[:16] for i in range(machine_count)]
+    misses = [hashlib.sha256(f"miss_{i}".encode()).hexdigest()[:16] for i in range(machine_count)]
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+    try:
+        log_file = work_dir / "machine_index.log"
+
+        campaign_dir = str(work_dir / "campaigns")
+
+        def insert():
+            log_file.unlink(missing_ok=True)
+            index = MachineIndex(log_file, base_dir=work_dir)
+            for start in range(0, machine_count, 1000):
+                index.add_many((machine_id, os.path.join(campaign_dir, machine_id))
+                               for machine_id in ids[start:start + 1000])
+            index.close()
+
+        insert_time = _timed(insert, repeat)
+
+        reload_time = _timed(lambda: MachineIndex(log_file, base_dir=work_dir)._ensure_loaded(), repeat)
+
+        tracemalloc.start()
+        index = MachineIndex(log_file, base_dir=work_dir)
+        index._ensure_loaded()
+        resident, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        hit_time = _timed(lambda: all(machine_id in index for machine_id in ids), repeat)
+        miss_time = _timed(lambda: any(machine_id in index for machine_id in misses), repeat)
+
+        sample = ids[::max(1, machine_count // 10000)]
+        assert all(index.locate(machine_id) == work_dir / "campaigns" / machine_id for machine_id in sample)
+        locate_time = _timed(lambda: [index.locate(machine_id) for machine_id in sample], repeat)
+
+        print(f"\n{'='*60}")
+        print("MACHINE INDEX")
+        print(f"{'='*60}")
+        print(f"Machines: {machine_count:,}  (log {log_file.stat().st_size / 1e6:.1f} MB)")
+        print(f"  insert (batches of 1000): {insert_time * 1000:>9.1f}ms  ({machine_count / insert_time:>12,.0f} ids/s)")
+        print(f"  reload from log:          {reload_time * 1000:>9.1f}ms  (resident {resident / 1e6:.1f} MB)")
+        print(f"  lookup (hit):             {hit_time * 1000:>9.1f}ms  ({machine_count / hit_time:>12,.0f} ids/s)")
+        print(f"  lookup (miss):            {miss_time * 1000:>9.1f}ms  ({machine_count / miss_time:>12,.0f} ids/s)")
+        print(f"  locate:                   {locate_time * 1000:>9.1f}ms  ({len(sample) / locate_time:>12,.0f} ids/s)")
+        index.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _disk_usage(path: Path) -> tuple:
+    """(content bytes, allocated bytes) under a directory"""
+    content = allocated = 0
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            stat = os.lstat(os.path.join(root, name))
+            allocated += stat.st_blocks * 512
+            if name in files:
+                content += stat.st_size
+    return content, allocated
+
+
+def bench_export(machine_count: int, workers: int, repeat: int):
+    """Legacy per-file export vs streaming CampaignWriter export"""
+    from machine_index import MachineIndex
+
+    generator = _quiet_generator()
+    if not generator.blueprints:
+        print("✗ No blueprints found - nothing to benchmark")
+        return
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        machines = generator.generate_campaign(user_id="bench", difficulty=3, count=machine_count)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+    try:
+        generator.machine_index = MachineIndex(work_dir / "machine_index.log", base_dir=work_dir)
+
+        runs = iter(range(2 * repeat))
+
+        def export(name: str, streaming: bool):
+            # A fresh directory per run so clean-up stays out of the timing
+            with contextlib.redirect_stdout(io.StringIO()):
+                generator.export_campaign(machines, output_dir=str(work_dir / f"{name}_{next(runs)}"),
+                                          streaming=streaming, workers=workers)
+
+        legacy_time = _timed(lambda: export("legacy", False), repeat)
+        streaming_time = _timed(lambda: export("streaming", True), repeat)
+        os.rename(work_dir / "legacy_0", work_dir / "legacy")
+        os.rename(work_dir / f"streaming_{repeat}", work_dir / "streaming")
+
+        legacy_bytes, legacy_blocks = _disk_usage(work_dir / "legacy")
+        streaming_bytes, streaming_blocks = _disk_usage(work_dir / "streaming")
+
+        print(f"\n{'='*60}")
+        print("CAMPAIGN EXPORT")
+        print(f"{'='*60}")
+        print(f"Machines: {machine_count}  Writer threads: {workers}")
+        print(f"{'':>11} {'time':>11} {'content':>11} {'allocated':>11}")
+        print(f"  legacy:    {legacy_time * 1000:>9.1f}ms {legacy_bytes / 1e6:>8.2f} MB {legacy_blocks / 1e6:>8.2f} MB")
+        print(f"  streaming: {streaming_time * 1000:>9.1f}ms {streaming_bytes / 1e6:>8.2f} MB {streaming_blocks / 1e6:>8.2f} MB")
+        print(f"  {legacy_time / streaming_time:.1f}x faster, {legacy_bytes / streaming_bytes:.1f}x less content "
+              f"({legacy_blocks / streaming_blocks:.1f}x allocated - small files round up to a block)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_memory(machine_count: int):
+    """Resident memory of loaded machines: inlined vs interned blueprint configs"""
+    from base import MachineConfig
+
+    generator = _quiet_generator()
+    if not generator.blueprints:
+        print("✗ No blueprints found - nothing to benchmark")
+        return
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        machines = generator.generate_campaign(user_id="bench", difficulty=3, count=machine_count)
+
+    # What each config.json / API response looked like with the config inlined
+    documents = [json.dumps(machine.to_dict()) for machine in machines]
+
+    def resident(build: Callable) -> float:
+        tracemalloc.start()
+        loaded = build()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(loaded) == machine_count
+        return current / machine_count
+
+    inlined = resident(lambda: [json.loads(doc) for doc in documents])
+    interned = resident(lambda: [MachineConfig(**json.loads(doc)) for doc in documents])
+
+    inline_response = sum(len(doc) for doc in documents) / machine_count
+    ref_response = sum(len(json.dumps(m.to_dict(inline_config=False))) for m in machines) / machine_count
+
+    print(f"\n{'='*60}")
+    print("MACHINE MEMORY")
+    print(f"{'='*60}")
+    print(f"Machines: {machine_count}")
+    print(f"  loaded, config inlined:  {inlined / 1024:>7.1f} KB/machine  ({inlined * machine_count / 1e6:>7.1f} MB)")
+    print(f"  loaded, config interned: {interned / 1024:>7.1f} KB/machine  ({interned * machine_count / 1e6:>7.1f} MB)")
+    print(f"  API response, inlined:   {inline_response / 1024:>7.1f} KB/machine")
+    print(f"  API response, by ref:    {ref_response / 1024:>7.1f} KB/machine")
+
+
+def bench_models(config_count: int, repeat: int):
+    """Create / serialise / parse throughput and allocation of machine configs"""
+    from dataclasses import dataclass, field
+    from base import MachineConfig, loads_json, orjson
+
+    @dataclass
+    class LegacyMachineConfig:
+        """The pre-slots MachineConfig (config by reference, as since the store), for comparison"""
+        machine_id: str
+        blueprint_id: str
+        variant: str
+        difficulty: int
+        seed: str
+        application: dict
+        constraints: dict
+        flag: dict
+        behavior: dict
+        metadata: dict = field(default_factory=dict)
+        blueprint_config_ref: str = None
+
+        def to_dict(self):
+            return {
+                'machine_id': self.machine_id, 'blueprint_id': self.blueprint_id,
+                'variant': self.variant, 'difficulty': self.difficulty, 'seed': self.seed,
+                'application': self.application, 'constraints': self.constraints,
+                'flag': self.flag, 'behavior': self.behavior, 'metadata': self.metadata,
+                'blueprint_config_ref': self.blueprint_config_ref,
+            }
+
+    generator = _quiet_generator()
+    if not generator.blueprints:
+        print("✗ No blueprints found - nothing to benchmark")
+        return
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sample = generator.generate_campaign(user_id="bench", difficulty=3, count=100)
+    templates = [machine.to_dict(inline_config=False) for machine in sample]
+    kwargs = [dict(templates[i % len(templates)], machine_id=f"{i:016x}") for i in range(config_count)]
+
+    def allocation(build: Callable) -> float:
+        tracemalloc.start()
+        built = build()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del built
+        return current / config_count
+
+    create = {
+        'legacy dataclass': lambda: [LegacyMachineConfig(**k) for k in kwargs],
+        'slots': lambda: [MachineConfig(**k) for k in kwargs],
+    }
+
+    legacy = create['legacy dataclass']()
+    slotted = create['slots']()
+
+    serialise = {
+        'legacy json.dumps(to_dict())': lambda: [json.dumps(m.to_dict()).encode() for m in legacy],
+        'slots to_json()': lambda: [m.to_json() for m in slotted],
+    }
+
+    legacy_docs = [json.dumps(m.to_dict()) for m in legacy]
+    docs = [m.to_json() for m in slotted]
+    parse = {
+        'legacy json.loads + __init__': lambda: [LegacyMachineConfig(**json.loads(d)) for d in legacy_docs],
+        'slots loads_json + __init__': lambda: [MachineConfig(**loads_json(d)) for d in docs],
+    }
+
+    print(f"\n{'='*60}")
+    print("MACHINE CONFIG MODELS")
+    print(f"{'='*60}")
+    print(f"Configs: {config_count:,}  JSON backend: {'orjson' if orjson else 'json'}")
+
+    for title, cases, measure_allocation in (("create", create, True),
+                                             ("serialise", serialise, False),
+                                             ("parse", parse, True)):
+        print(f"  {title}")
+        for label, func in cases.items():
+            elapsed = _timed(func, repeat)
+            line = f"    {label:<36} {elapsed * 1000:>8.1f}ms  ({config_count / elapsed:>10,.0f}/s)"
+            if measure_allocation:
+                line += f"  {allocation(func):>7.0f} B/config"
+            print(line)
+
+
+
+def bench_mutate(machine_count: int, workers: int, repeat: int):
+    """Mutation throughput in machines per second per core"""
+    generator = _quiet_generator()
+    if not generator.blueprints:
+        print("✗ No blueprints found - nothing to benchmark")
+        return
+
+    blueprint_id, blueprint = next(iter(generator.blueprints.items()))
+    engine_class = generator.mutation_engines[blueprint.category]
+    seeds = [f"bench_{blueprint_id}_{i}" for i in range(machine_count)]
+    jobs = [(blueprint_id, seed, 1 + i % 5) for i, seed in enumerate(seeds)]
+
+    def engines():
+        for i, seed in enumerate(seeds):
+            engine_class(seed).mutate(blueprint, 1 + i % 5)
+
+    def batch(worker_count: int, use_processes: bool = False):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = generator.generate_batch(jobs, workers=worker_count, use_processes=use_processes)
+        assert all(result['machine'] for result in results)
+
+    print(f"\n{'='*60}")
+    print("MUTATION THROUGHPUT")
+    print(f"{'='*60}")
+    print(f"Engine: {engine_class.__name__}  Machines: {machine_count:,}")
+
+    for label, func, cores in (("engine.mutate()", engines, 1),
+                               ("generate_batch, inline", lambda: batch(1), 1),
+                               (f"generate_batch, {workers} processes", lambda: batch(workers, True), workers)):
+        elapsed = _timed(func, repeat)
+        rate = machine_count / elapsed
+        print(f"  {label:<32} {elapsed * 1000:>9.1f}ms  {rate:>10,.0f}/s  {rate / cores:>10,.0f}/s/core")
+
+
+def bench_pool(campaign_count: int, campaign_size: int, prepare_ms: float):
+    """Campaign creation latency: cold generation vs claiming from a warm pool"""
+    from machine_index import MachineIndex
+    from machine_pool import MachinePool
+    from campaign_writer import write_manifest
+
+    generator = _quiet_generator()
+    if not generator.blueprints:
+        print("✗ No blueprints found - nothing to benchmark")
+        return
+
+    def prepare(machine, machine_dir):
+        # Stand-in for app rendering / image builds
+        time.sleep(prepare_ms / 1000)
+        return {'port': 0}
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+    try:
+        generator.machine_index = MachineIndex(work_dir / "machine_index.log", base_dir=work_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, plan = generator.plan_campaign(campaign_size)
+
+        def cold(i: int) -> float:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                machines = generator.generate_campaign(user_id=f"user{i}", count=campaign_size)
+                path = Path(generator.export_campaign(machines, output_dir=str(work_dir / f"cold_{i}"), streaming=True))
+            for machine in machines:
+                prepare(machine, path / machine.machine_id)
+            return time.perf_counter() - start
+
+        pool = MachinePool(generator, work_dir / "pool", prepare=prepare,
+                           min_size=campaign_count * campaign_size, fill_batch=campaign_count * campaign_size)
+        keys = sorted(set((blueprint_id, 2) for blueprint_id in plan))
+        pool.warm(keys)
+        fill_start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            pool.refill_once()
+        fill_time = time.perf_counter() - fill_start
+
+        def warm(i: int) -> float:
+            start = time.perf_counter()
+            campaign_path = work_dir / f"warm_{i}"
+            entries = [pool.acquire(f"user{i}", blueprint_id, 2, campaign_path)[0] for blueprint_id in plan]
+            write_manifest(campaign_path, [entry.machine for entry in entries])
+            return time.perf_counter() - start
+
+        cold_times = sorted(cold(i) for i in range(campaign_count))
+        warm_times = sorted(warm(i) for i in range(campaign_count))
+        stats = pool.stats()
+
+        def pct(times: List[float], p: float) -> float:
+            return times[min(len(times) - 1, int(len(times) * p))] * 1000
+
+        print(f"\n{'='*60}")
+        print("CAMPAIGN CREATION")
+        print(f"{'='*60}")
+        print(f"Campaigns: {campaign_count}  Machines each: {campaign_size}  Prepare cost: {prepare_ms:.0f}ms/machine")
+        print(f"Pool fill (off the request path): {fill_time:.2f}s")
+        print(f"{'':>8} {'p50':>10} {'p95':>10}")
+        print(f"  cold:  {pct(cold_times, 0.5):>8.1f}ms {pct(cold_times, 0.95):>8.1f}ms")
+        print(f"  pool:  {pct(warm_times, 0.5):>8.1f}ms {pct(warm_times, 0.95):>8.1f}ms")
+        print(f"  {pct(cold_times, 0.5) / pct(warm_times, 0.5):.0f}x faster at p50, "
+              f"hit rate {stats['hit_rate']:.0%}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_llm_cache(machine_count: int, llm_ms: float, diversity: int):
+    """LLM calls and wall time for a campaign's code generation, with and without the response cache"""
+    from llm_cache import ResponseCache
+
+    generator = _quiet_generator()
+    if not generator.blueprints:
+        print("✗ No blueprints found - nothing to benchmark")
+        return
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        machines = generator.generate_campaign(user_id="bench", difficulty=3, count=machine_count)
+
+    # The code prompt depends on exactly these machine fields
+    prompts = [(f"system:{m.blueprint_id}",
+                f"{m.variant}|{m.application.get('context')}|{m.difficulty}|"
+                f"{[f['type'] for f in m.constraints.get('filters', [])]}")
+               for m in machines]
+
+    def run(cache) -> tuple:
+        calls = 0
+        start = time.perf_counter()
+        for system_prompt, user_prompt in prompts:
+            key = cache.key(system_prompt, user_prompt, 0.7) if cache else None
+            if cache and cache.get(key) is not None:
+                continue
+            time.sleep(llm_ms / 1000)  # Stand-in for the completion request
+            calls += 1
+            if cache:
+                cache.put(key, f"<?php // {user_prompt} #{calls}")
+        return calls, time.perf_counter() - start
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+    try:
+        cache_file = work_dir / "llm.sqlite3"
+        rows = [("no cache", run(None))]
+        rows.append(("cold cache", run(ResponseCache(cache_file))))
+        rows.append(("restart (disk tier)", run(ResponseCache(cache_file))))
+        rows.append((f"diversity={diversity}", run(ResponseCache(work_dir / "diverse.sqlite3", diversity=diversity))))
+
+        print(f"\n{'='*60}")
+        print("LLM RESPONSE CACHE")
+        print(f"{'='*60}")
+        print(f"Machines: {machine_count}  Distinct prompts: {len(set(prompts))}  "
+              f"Completion latency: {llm_ms:.0f}ms")
+        for label, (calls, elapsed) in rows:
+            print(f"  {label:<20} {calls:>5} LLM calls  {elapsed * 1000:>9.1f}ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _stub_tokens(content: str) -> List[str]:
+    """Roughly word-sized pieces of a completion, whitespace kept attached"""
+    import re
+    return re.findall(r'\s*\S+|\s+', content)
+
+
+def _stub_llm_server(latency: float, completion: Callable = None, token_latency: float = 0.0):
+    """
+    Local chat-completions stub; returns (server, stats) with request/connection counts
+
+    completion(prompt, attempt) -> text overrides the canned reply. Streaming
+    requests get one server-sent event per line-piece, token_latency apart.
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    stats = {'requests': 0, 'connections': 0, 'tokens_sent': 0, 'prompt_tokens': 0}
+    attempts = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            with lock:
+                stats['connections'] += 1
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            prompt = body['messages'][1]['content']
+            with lock:
+                stats['requests'] += 1
+                stats['prompt_tokens'] += sum(len(_stub_tokens(m['content'])) for m in body['messages'])
+                attempt = attempts[prompt] = attempts.get(prompt, 0) + 1
+            if completion:
+                content = completion(prompt, attempt)
+            else:
+                content = "```php\necho 'ok'; // " + prompt[:16] + "\n```"
+
+            if body.get('stream'):
+                self._stream(content)
+                return
+
+            time.sleep(latency + token_latency * len(self._tokens(content)))
+            with lock:
+                stats['tokens_sent'] += len(self._tokens(content))
+            reply = json.dumps({'choices': [{'message': {'content': content}}]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        @staticmethod
+        def _tokens(content: str) -> List[str]:
+            return _stub_tokens(content)
+
+        def _stream(self, content: str):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+
+            def chunk(data: bytes):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            time.sleep(latency)
+            try:
+                for token in self._tokens(content):
+                    time.sleep(token_latency)
+                    event = {'choices': [{'delta': {'content': token}}]}
+                    chunk(b"data: " + json.dumps(event).encode() + b"\n\n")
+                    with lock:
+                        stats['tokens_sent'] += 1
+                chunk(b"data: [DONE]\n\n")
+                chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def bench_llm_client(request_count: int, llm_ms: float, concurrency: List[int], serial_sample: int):
+    """Blocking per-request completions vs the pooled async client against a stub server"""
+    import asyncio
+    import http.client
+    from llm_cache import ResponseCache
+    from llm_client import AsyncLLMClient, CompletionRequest
+
+    server, stats = _stub_llm_server(llm_ms / 1000)
+    api_url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    try:
+        def blocking(i: int):
+            # What requests.post without a session does: a new connection per completion
+            connection = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=60)
+            body = json.dumps({'messages': [{'role': 'system', 'content': 's'},
+                                            {'role': 'user', 'content': f"serial {i}"}]})
+            connection.request('POST', '/v1/chat/completions', body=body,
+                               headers={'Content-Type': 'application/json'})
+            connection.getresponse().read()
+            connection.close()
+
+        start = time.perf_counter()
+        for i in range(serial_sample):
+            blocking(i)
+        serial_time = (time.perf_counter() - start) / serial_sample * request_count
+
+        print(f"\n{'='*60}")
+        print("LLM CLIENT")
+        print(f"{'='*60}")
+        print(f"Completions: {request_count}  Stub latency: {llm_ms:.0f}ms")
+        print(f"  {'blocking, serial':<24} {serial_time:>8.2f}s  {request_count:>4} connections "
+              f"(extrapolated from {serial_sample})")
+
+        for limit in concurrency:
+            stats.update(requests=0, connections=0)
+            requests = [CompletionRequest("s", f"prompt {limit} {i}") for i in range(request_count)]
+
+            async def run():
+                # Empty memory-only cache: every prompt is distinct, so nothing is served from it
+                async with AsyncLLMClient(api_url, max_concurrency=limit, cache=ResponseCache(None)) as client:
+                    return await client.generate_many(requests)
+
+            start = time.perf_counter()
+            results = asyncio.run(run())
+            elapsed = time.perf_counter() - start
+            assert all(results)
+            print(f"  {f'async, concurrency {limit}':<24} {elapsed:>8.2f}s  {stats['connections']:>4} connections "
+                  f"({serial_time / elapsed:.1f}x)")
+    finally:
+        server.shutdown()
+
+
+def bench_llm_stream(request_count: int, token_ms: float, bad_ratio: float):
+    """Buffered vs streamed+validated completions when some generations are unusable"""
+    import asyncio
+    import hashlib
+    import statistics
+    from llm_client import AsyncLLMClient, CompletionRequest, CompletionError
+    from stream_validator import PhpStreamValidator, StreamRejected
+
+    good = "\n".join(["$input = $_GET['input'];"] +
+                     [f"$step{i} = str_replace('x{i}', '', $input); // pass {i}" for i in range(18)] +
+                     ["echo $input;"])
+    bad = {
+        'html': "$input = $_GET['input'];\n<html>\n<body>\n" + good,
+        'too long': good + "\n" + "\n".join(f"$extra{i} = {i};" for i in range(30)),
+        'prose': "Here is the vulnerable code you asked for:\n" + good,
+    }
+    kinds = list(bad)
+
+    def completion(prompt: str, attempt: int) -> str:
+        digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        if attempt == 1 and (digest % 1000) / 1000 < bad_ratio:
+            return bad[kinds[digest % len(kinds)]]
+        return "```php\n" + good + "\n```"
+
+    server, stats = _stub_llm_server(0.05, completion, token_ms / 1000)
+    api_url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+
+    def validate(text: str) -> str:
+        validator = PhpStreamValidator()
+        validator.feed(text)
+        return validator.finish()
+
+    async def buffered(client, request) -> tuple:
+        # Wait for the whole completion, then validate, then retry
+        start = time.perf_counter()
+        wasted = 0
+        for _ in range(4):
+            text = await client.complete(request)
+            try:
+                validate(text)
+                return time.perf_counter() - start, wasted
+            except StreamRejected:
+                wasted += len(_stub_tokens(text))
+        raise CompletionError("rejected")
+
+    try:
+        rows = []
+        for run in range(2):
+            stats['tokens_sent'] = 0
+            # Fresh prompts per run so every run sees the same failure pattern
+            requests = [CompletionRequest("s", f"run{run} prompt {i}", validator=PhpStreamValidator)
+                        for i in range(request_count)]
+
+            async def go():
+                async with AsyncLLMClient(api_url, max_concurrency=request_count, cache=False,
+                                          stream=(run == 1)) as client:
+                    start = time.perf_counter()
+                    if run == 0:
+                        results = await asyncio.gather(*(buffered(client, r) for r in requests))
+                        first_code = statistics.median(r[0] for r in results)
+                        wasted = sum(r[1] for r in results)
+                    else:
+                        await client.generate_many(requests)
+                        metrics = client.stream_metrics()
+                        first_code = metrics['time_to_first_code_p50_s']
+                        wasted = metrics['wasted_tokens']
+                    return time.perf_counter() - start, first_code, wasted
+
+            elapsed, first_code, wasted = asyncio.run(go())
+            rows.append(("buffered" if run == 0 else "streamed", elapsed, first_code, wasted, stats['tokens_sent']))
+
+        print(f"\n{'='*60}")
+        print("STREAMING VALIDATION")
+        print(f"{'='*60}")
+        print(f"Completions: {request_count}  Token latency: {token_ms:.0f}ms  "
+              f"First attempt unusable: {bad_ratio:.0%}")
+        print(f"{'':>10} {'wall':>8} {'first code p50':>15} {'wasted tok/machine':>19} {'tokens sent':>12}")
+        for label, elapsed, first_code, wasted, sent in rows:
+            print(f"  {label:<8} {elapsed:>7.2f}s {first_code:>14.2f}s {wasted / request_count:>19.1f} {sent:>12}")
+    finally:
+        server.shutdown()
+
+
+def bench_llm_batch(machine_count: int, batch_size: int, llm_ms: float, token_ms: float, bad_ratio: float):
+    """One request per machine vs batched requests, tokens and wall time per machine"""
+    import asyncio
+    import hashlib
+    import re
+
+    try:
+        from ai_code_generator import AICodeGenerator
+    except ImportError as e:
+        print(f"✗ AI code generator unavailable ({e}) - nothing to benchmark")
+        return
+    from llm_client import AsyncLLMClient
+    from template_engine import AIEnhancedTemplate
+
+    generator = _quiet_generator()
+    if not generator.blueprints:
+        print("✗ No blueprints found - nothing to benchmark")
+        return
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        machines = generator.generate_campaign(user_id="bench", difficulty=4, count=machine_count)
+        # Distinct seeds per machine in the prompt so nothing is deduplicated away
+        specs = []
+        for i, machine in enumerate(machines):
+            spec = AIEnhancedTemplate(machine, use_ai=False)._function_inputs()
+            spec['variant'] = dict(spec['variant'], description=f"{spec['variant'].get('description', '')} #{i}")
+            specs.append(spec)
+
+    code = "$input = $_GET['input'];\n$q = \"SELECT * FROM users WHERE id = '$input'\";\necho $q;"
+
+    def completion(prompt: str, attempt: int) -> str:
+        numbers = re.findall(r'^### SPEC (\d+)$', prompt, re.MULTILINE)
+        if not numbers:
+            return code
+        blocks = []
+        for number in numbers:
+            digest = int(hashlib.sha256(f"{prompt}{number}{attempt}".encode()).hexdigest(), 16)
+            body = "<html><body>oops</body></html>" if (digest % 1000) / 1000 < bad_ratio else code
+            blocks.append(f"### BEGIN {number}\n{body}\n### END {number}")
+        return "\n".join(blocks)
+
+    server, stats = _stub_llm_server(llm_ms / 1000, completion, token_ms / 1000)
+    api_url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    code_gen = AICodeGenerator(api_url=api_url, cache=False)
+
+    try:
+        rows = []
+        for label, batched in (("per machine", False), (f"batch of {batch_size}", True)):
+            stats.update(requests=0, tokens_sent=0, prompt_tokens=0)
+
+            async def run():
+                async with AsyncLLMClient(api_url, max_concurrency=8, cache=False) as client:
+                    if batched:
+                        return await code_gen.generate_functions_batched(client, specs, batch_size=batch_size)
+                    return await client.generate_many(code_gen.function_request(**spec) for spec in specs)
+
+            start = time.perf_counter()
+            results = asyncio.run(run())
+            elapsed = time.perf_counter() - start
+            rows.append((label, elapsed, sum(1 for r in results if r), dict(stats)))
+
+        print(f"\n{'='*60}")
+        print("BATCHED CODE GENERATION")
+        print(f"{'='*60}")
+        print(f"Machines: {machine_count}  Bad blocks: {bad_ratio:.0%}  "
+              f"Latency: {llm_ms:.0f}ms + {token_ms:.0f}ms/token  Concurrency: 8")
+        print(f"{'':>16} {'requests':>9} {'prompt tok/m':>13} {'output tok/m':>13} {'wall/m':>9} {'ok':>5}")
+        for label, elapsed, ok, run_stats in rows:
+            print(f"  {label:<14} {run_stats['requests']:>9} {run_stats['prompt_tokens'] / machine_count:>13.1f} "
+                  f"{run_stats['tokens_sent'] / machine_count:>13.1f} {elapsed / machine_count * 1000:>7.1f}ms "
+                  f"{ok:>5}")
+    finally:
+        server.shutdown()
+
+
+def bench_dockerfile(machine_count: int, category_count: int, llm_ms: float):
+    """Dockerfile LLM calls and disk use per campaign, per machine vs the fingerprint cache"""
+    from concurrent.futures import ThreadPoolExecutor
+    from dockerfile_cache import DockerfileCache
+
+    configs = [{'name': f"category {i}", 'infrastructure': {'docker_requirements': {'extensions': [f"ext{i}"]}}}
+               for i in range(category_count)]
+    calls = {'count': 0}
+
+    def build(config) -> str:
+        # Stand-in for the Dockerfile completion
+        time.sleep(llm_ms / 1000)
+        calls['count'] += 1
+        return "FROM php:8.0-apache\n" + "RUN echo layer\n" * 20 + f"# {config['name']}\n"
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+    try:
+        def campaign(name: str, cache) -> float:
+            calls['count'] = 0
+            start = time.perf_counter()
+
+            def machine(i: int):
+                config = configs[i % category_count]
+                machine_dir = work_dir / name / f"m{i}"
+                machine_dir.mkdir(parents=True)
+                if cache:
+                    cache.install(config, lambda: build(config), machine_dir / "Dockerfile")
+                else:
+                    (machine_dir / "Dockerfile").write_text(build(config))
+
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(machine, range(machine_count)))
+            return time.perf_counter() - start
+
+        cache_dir = work_dir / "cache"
+        rows = [
+            ("per machine", campaign("uncached", None), calls['count']),
+            ("cache, cold", campaign("cold", DockerfileCache(cache_dir)), calls['count']),
+            ("cache, restart", campaign("warm", DockerfileCache(cache_dir)), calls['count']),
+        ]
+        unique_inodes = len({os.stat(p).st_ino for p in (work_dir / "warm").glob("*/Dockerfile")})
+
+        print(f"\n{'='*60}")
+        print("DOCKERFILE CACHE")
+        print(f"{'='*60}")
+        print(f"Machines: {machine_count}  Categories: {category_count}  Completion latency: {llm_ms:.0f}ms  "
+              f"Threads: 8")
+        for label, elapsed, count in rows:
+            print(f"  {label:<16} {count:>4} LLM calls  {elapsed:>8.2f}s")
+        print(f"  Dockerfile artefacts on disk for {machine_count} machines: {unique_inodes}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class FakeDockerClient:
+    """
+    Docker stand-in for BaseImageBuilder and machine builds
+
+    A build costs system_ms and system_mb for every RUN layer it has to
+    execute itself, and app_ms / app_mb for its COPY layer. Images FROM a
+    hackforge-base tag reuse the base's layers.
+    """
+
+    def __init__(self, system_ms: float, system_mb: float, app_ms: float = 5, app_mb: float = 0.1):
+        import threading
+        self.system_ms = system_ms
+        self.system_mb = system_mb
+        self.app_ms = app_ms
+        self.app_mb = app_mb
+        self.images = {}
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    def image_exists(self, tag: str) -> bool:
+        return tag in self.images
+
+    def build(self, context_dir: Path, tag: str):
+        dockerfile = (Path(context_dir) / "Dockerfile").read_text()
+        run_layers = sum(1 for line in dockerfile.splitlines() if line.startswith('RUN '))
+        copy_layers = sum(1 for line in dockerfile.splitlines() if line.startswith('COPY '))
+
+        time.sleep((run_layers * self.system_ms + copy_layers * self.app_ms) / 1000)
+        with self._lock:
+            self.images[tag] = run_layers * self.system_mb + copy_layers * self.app_mb
+            self.builds += 1
+
+    def disk_mb(self) -> float:
+        return sum(self.images.values())
+
+
+def bench_base_images(machine_count: int, category_count: int, system_ms: float, system_mb: float):
+    """Build time and image disk use for a campaign: self-contained Dockerfiles vs shared base images"""
+    from base_images import BaseImageBuilder, machine_dockerfile, render_base_dockerfile
+
+    requirements = [{'base_image': 'php:8.0-apache', 'packages': [f"pkg{i}"], 'extensions': ['mysqli']}
+                    for i in range(category_count)]
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+    try:
+        def campaign(name: str, use_base: bool) -> tuple:
+            client = FakeDockerClient(system_ms, system_mb)
+            builder = BaseImageBuilder(client, build_dir=work_dir / name / "base")
+            start = time.perf_counter()
+            for i in range(machine_count):
+                reqs = requirements[i % category_count]
+                machine_dir = work_dir / name / f"m{i}"
+                machine_dir.mkdir(parents=True)
+                if use_base:
+                    dockerfile = machine_dockerfile(builder.ensure(reqs))
+                else:
+                    # Previous layout: the system layers in every machine's Dockerfile
+                    dockerfile = render_base_dockerfile(reqs) + "\nCOPY app/ /var/www/html/\n"
+                (machine_dir / "Dockerfile").write_text(dockerfile)
+                client.build(machine_dir, f"hackforge_{name}_{i}")
+            return time.perf_counter() - start, client.disk_mb(), builder.builds
+
+        rows = [("per-machine layers", *campaign("legacy", False)),
+                ("shared base images", *campaign("base", True))]
+
+        print(f"\n{'='*60}")
+        print("BASE IMAGES")
+        print(f"{'='*60}")
+        print(f"Machines: {machine_count}  Categories: {category_count}  "
+              f"System layer: {system_ms:.0f}ms / {system_mb:.0f}MB (fake docker client)")
+        for label, elapsed, disk, base_builds in rows:
+            print(f"  {label:<20} {elapsed:>8.2f}s build  {disk:>9.1f} MB images  {base_builds:>3} base builds")
+        print(f"  {rows[0][1] / rows[1][1]:.1f}x less build time, {rows[0][2] / rows[1][2]:.1f}x less disk")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _fake_llm_stage(context: dict) -> dict:
+    """Job stage that waits on a (stub) LLM like the blueprint/app stages do"""
+    import http.client
+    from urllib.parse import urlparse
+
+    url = urlparse(context['llm_url'])
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+    body = json.dumps({'messages': [{'role': 'system', 'content': 'bench'},
+                                    {'role': 'user', 'content': context['machine_id']}]})
+    conn.request('POST', url.path, body, {'Content-Type': 'application/json'})
+    conn.getresponse().read()
+    conn.close()
+
+    machine_dir = Path(context['core_dir']) / "generated_machines" / context['machine_id']
+    machine_dir.mkdir(parents=True, exist_ok=True)
+    return {'llm_done': True}
+
+
+def _fake_flaky_stage(context: dict) -> dict:
+    """Fails the first time it runs for a machine, so the job has to be retried"""
+    marker = Path(context['core_dir']) / f"{context['machine_id']}.attempted"
+    if not marker.exists():
+        marker.touch()
+        raise RuntimeError("transient failure")
+    return {}
+
+
+def bench_jobs(job_count: int, llm_ms: float, docker_ms: float, workers: int):
+    """Event loop responsiveness: pipeline inline in the handler vs the process-pool job queue"""
+    import asyncio
+    import statistics
+    from job_queue import JobQueue
+    from machine_pipeline import start_container
+
+    server, _ = _stub_llm_server(llm_ms / 1000)
+    llm_url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    # Fake docker-compose: a process that takes as long as a build + up
+    compose_command = [sys.executable, "-c", f"import time; time.sleep({docker_ms / 1000})"]
+    stages = [('blueprint', _fake_llm_stage), ('container', start_container)]
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+
+    def context(i: int, label: str) -> dict:
+        return {'core_dir': str(work_dir), 'machine_id': f"{label}_{i}", 'port': 8080 + i,
+                'llm_url': llm_url, 'compose_command': compose_command, 'settle_seconds': 0}
+
+    async def ticker(lags: List[float], stop: asyncio.Event):
+        # How late a 10ms timer fires = how long other requests would wait
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - start - 0.01)
+
+    async def inline():
+        lags, stop = [], asyncio.Event()
+        tick = asyncio.create_task(ticker(lags, stop))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+
+        async def handler(i):
+            # Previous endpoint: every stage run synchronously in the async handler
+            ctx = context(i, "inline")
+            for _, stage in stages:
+                ctx.update(stage(dict(ctx)) or {})
+
+        await asyncio.gather(*(handler(i) for i in range(job_count)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await tick
+        return elapsed, None, max(lags)
+
+    async def queued(queue: JobQueue):
+        lags, stop = [], asyncio.Event()
+        tick = asyncio.create_task(ticker(lags, stop))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+
+        submit_times = []
+        jobs = []
+        for i in range(job_count):
+            t0 = time.perf_counter()
+            jobs.append(queue.submit('bench', context(i, "queued")))
+            submit_times.append(time.perf_counter() - t0)
+        events = [0]
+
+        async def follow(job_id):
+            async for _ in queue.events(job_id):
+                events[0] += 1
+
+        await asyncio.gather(*(follow(job.job_id) for job in jobs))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await tick
+
+        stage_seconds = {}
+        for job in jobs:
+            for stage in job.stages:
+                stage_seconds.setdefault(stage.name, []).append(stage.seconds or 0)
+        return elapsed, statistics.median(submit_times), max(lags), events[0], stage_seconds, jobs
+
+    async def cancel_and_retry(queue: JobQueue):
+        job = queue.submit('bench', context(0, "cancel"))
+        await asyncio.sleep(llm_ms / 2000)
+        queue.cancel(job.job_id)
+        cancelled = await queue.wait(job.job_id)
+        cancelled_status = cancelled.status
+
+        flaky = queue.submit('flaky', context(0, "flaky"))
+        first = (await queue.wait(flaky.job_id)).status
+        first_started = flaky.stages[0].started
+        queue.retry(flaky.job_id)
+        retried = await queue.wait(flaky.job_id)
+        # The retry resumes at the failed stage; the LLM stage isn't run again
+        resumed = retried.stages[0].started == first_started
+        return cancelled_status, first, retried.status, retried.attempts, resumed
+
+    async def run():
+        queue = JobQueue(jobs_dir=work_dir / "jobs", max_workers=workers)
+        queue.register('bench', stages)
+        queue.register('flaky', [('blueprint', _fake_llm_stage), ('flaky', _fake_flaky_stage),
+                                 ('container', start_container)])
+        try:
+            # Spin the workers up outside the measurement
+            await asyncio.get_running_loop().run_in_executor(queue.executor, time.sleep, 0)
+            old = await inline()
+            new = await queued(queue)
+            checks = await cancel_and_retry(queue)
+        finally:
+            queue.shutdown()
+        return old, new, checks
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            old, new, checks = asyncio.run(run())
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    elapsed, submit, lag, events, stage_seconds, jobs = new
+    print(f"\n{'='*60}")
+    print("GENERATE-MACHINE JOBS")
+    print(f"{'='*60}")
+    print(f"Jobs: {job_count}  LLM: {llm_ms:.0f}ms  docker: {docker_ms:.0f}ms  "
+          f"Workers: {workers} (stub LLM server, fake docker-compose)")
+    print(f"  {'inline in handler':<20} {old[0]:>7.2f}s total  {'-':>10}      submit  {old[2] * 1000:>9.1f}ms max loop stall")
+    print(f"  {'job queue':<20} {elapsed:>7.2f}s total  {submit * 1000:>8.3f}ms p50 submit  "
+          f"{lag * 1000:>9.1f}ms max loop stall")
+    print(f"  {events} progress events streamed, "
+          f"{sum(1 for job in jobs if job.status == 'succeeded')}/{job_count} jobs succeeded")
+    for name, seconds in stage_seconds.items():
+        print(f"    stage {name:<10} mean {statistics.mean(seconds):.2f}s")
+    cancelled, first, retried, attempts, resumed = checks
+    print(f"  cancel -> {cancelled};  flaky job -> {first}, retry -> {retried} (attempt {attempts}, "
+          f"{'resumed at the failed stage' if resumed else 'restarted from scratch'})")
+
+
+FAKE_COMPOSE = """#!/usr/bin/env python3
+import os, sys, time
+start = time.time()
+command = sys.argv[1] if len(sys.argv) > 1 else ''
+delay_ms = os.environ.get('FAKE_COMPOSE_' + command.upper() + '_MS', '0')
+# Per-directory override for whole-project calls (no services named)
+if not [arg for arg in sys.argv[2:] if not arg.startswith('-')] and os.path.exists(command + '.ms'):
+    delay_ms = open(command + '.ms').read()
+time.sleep(float(delay_ms) / 1000)
+with open('compose.log', 'a') as log:
+    log.write(f"{start} {time.time()} {' '.join(sys.argv[1:])}\\n")
+print('[]' if command == 'ps' else 'ok')
+"""
+
+
+def bench_compose(start_count: int, up_ms: float, request_ms: float, concurrency: int):
+    """Light-request latency while machines start: blocking subprocess.run vs ComposeRunner"""
+    import asyncio
+    import statistics
+    import subprocess
+
+    sys.path.append(str(Path(__file__).parent.parent / "docker" / "orchestrator"))
+    from compose_runner import ComposeRunner
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+    fake = work_dir / "docker-compose"
+    fake.write_text(FAKE_COMPOSE)
+    fake.chmod(0o755)
+    os.environ['FAKE_COMPOSE_UP_MS'] = str(up_ms)
+    os.environ['FAKE_COMPOSE_DOWN_MS'] = str(up_ms / 4)
+
+    machine_dirs = []
+    for i in range(start_count):
+        machine_dir = work_dir / f"m{i}"
+        machine_dir.mkdir()
+        machine_dirs.append(machine_dir)
+
+    async def load(start_machine: Callable) -> tuple:
+        """start_count start requests while flag-validation-sized requests keep arriving"""
+        latencies = []
+        done = asyncio.Event()
+
+        async def light_requests():
+            # Requests arrive on a fixed schedule; latency is how long after
+            # its arrival the loop got round to serving each one
+            arrival = time.perf_counter() + request_ms / 1000
+            while not done.is_set():
+                await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+                now = time.perf_counter()
+                while arrival <= now:
+                    latencies.append(now - arrival)
+                    arrival += request_ms / 1000
+
+        client = asyncio.create_task(light_requests())
+        await asyncio.sleep(0.02)
+        start = time.perf_counter()
+        await asyncio.gather(*(start_machine(machine_dir) for machine_dir in machine_dirs))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await client
+        latencies.sort()
+        return elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1], latencies[-1]
+
+    async def blocking_start(machine_dir: Path):
+        # Previous handlers: subprocess.run straight in the async def
+        subprocess.run([str(fake), "up", "-d", "--build"], cwd=str(machine_dir),
+                       capture_output=True, text=True, timeout=300)
+
+    runner = ComposeRunner(compose_command=[str(fake)], max_concurrency=concurrency)
+
+    async def runner_start(machine_dir: Path):
+        await runner.up(machine_dir)
+
+    async def same_machine():
+        # Start, stop and restart one machine at once: the runner must serialise them
+        machine_dir = machine_dirs[0]
+        (machine_dir / "compose.log").unlink(missing_ok=True)
+        await asyncio.gather(runner.up(machine_dir), runner.down(machine_dir), runner.restart(machine_dir))
+        spans = sorted(tuple(map(float, line.split()[:2]))
+                       for line in (machine_dir / "compose.log").read_text().splitlines())
+        overlaps = sum(1 for a, b in zip(spans, spans[1:]) if b[0] < a[1])
+        return len(spans), overlaps
+
+    try:
+        rows = [("blocking subprocess.run", *asyncio.run(load(blocking_start))),
+                (f"ComposeRunner (cap {concurrency})", *asyncio.run(load(runner_start)))]
+        calls, overlaps = asyncio.run(same_machine())
+    finally:
+        runner.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{'='*60}")
+    print("COMPOSE EXECUTION")
+    print(f"{'='*60}")
+    print(f"Starts: {start_count}  up: {up_ms:.0f}ms  light request every {request_ms:.0f}ms (fake docker-compose)")
+    for label, elapsed, p50, p99, worst in rows:
+        print(f"  {label:<26} {elapsed:>6.2f}s for all starts  light requests p50 {p50 * 1000:>7.2f}ms  "
+              f"p99 {p99 * 1000:>8.2f}ms  max {worst * 1000:>8.1f}ms")
+    print(f"  same machine up/down/restart at once: {calls} compose calls, {overlaps} overlapping")
+
+
+class FakeDockerAPI:
+    """
+    In-memory stand-in for docker.APIClient (the calls DockerControlPlane makes)
+
+    Every daemon round-trip sleeps api_ms; the create_*_config helpers are
+    local in the real client too and cost nothing.
+    """
+
+    class NotFound(Exception):
+        pass
+
+    def __init__(self, api_ms: float = 2.0, build_ms: float = 0.0):
+        import threading
+        self.api_ms = api_ms
+        self.build_ms = build_ms
+        self.images = set()
+        self.networks_by_name = {}
+        self.volumes = set()
+        self.containers_by_id = {}
+        self.created = 0
+        self.calls = 0
+        self.started = []
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.api_ms / 1000)
+
+    def _container(self, ref: str) -> dict:
+        for container in self.containers_by_id.values():
+            if container['Id'] == ref or container['Names'][0] == f"/{ref}":
+                return container
+        raise self.NotFound(ref)
+
+    def networks(self, names=None):
+        self._call()
+        return [net for name, net in self.networks_by_name.items() if not names or name in names]
+
+    def create_network(self, name, driver=None, labels=None):
+        self._call()
+        self.networks_by_name[name] = {'Id': f"net_{name}", 'Name': name}
+
+    def remove_network(self, net_id):
+        self._call()
+        self.networks_by_name = {n: net for n, net in self.networks_by_name.items() if net['Id'] != net_id}
+
+    def create_volume(self, name, labels=None):
+        self._call()
+        self.volumes.add(name)
+
+    def inspect_image(self, tag):
+        self._call()
+        if tag not in self.images:
+            raise self.NotFound(tag)
+        return {'Id': tag}
+
+    def pull(self, tag):
+        self._call()
+        self.images.add(tag)
+
+    def build(self, path, tag, rm=True, decode=True):
+        self._call()
+        time.sleep(self.build_ms / 1000)
+        self.images.add(tag)
+        return iter([{'stream': f"Successfully tagged {tag}"}])
+
+    def inspect_container(self, name):
+        self._call()
+        container = self._container(name)
+        return {'Id': container['Id'], 'State': {'Running': container['State'] == 'running'}}
+
+    @staticmethod
+    def create_host_config(**kwargs):
+        return kwargs
+
+    @staticmethod
+    def create_networking_config(config):
+        return config
+
+    @staticmethod
+    def create_endpoint_config(**kwargs):
+        return kwargs
+
+    def create_container(self, image, name=None, labels=None, host_config=None, **kwargs):
+        self._call()
+        if image not in self.images:
+            raise self.NotFound(image)
+        self.created += 1
+        container_id = f"{self.created:064x}"
+        ports = [{'PrivatePort': private, 'PublicPort': public, 'Type': 'tcp'}
+                 for private, public in ((host_config or {}).get('port_bindings') or {}).items()]
+        self.containers_by_id[container_id] = {
+            'Id': container_id, 'Names': [f"/{name}"], 'Image': image, 'Labels': labels or {},
+            'State': 'created', 'Status': 'Created', 'Ports': ports,
+        }
+        return {'Id': container_id}
+
+    def start(self, container_id):
+        self._call()
+        container = self._container(container_id)
+        container['State'], container['Status'] = 'running', 'Up 1 second'
+        self.started.append(container['Labels'].get('com.docker.compose.service'))
+
+    def containers(self, all=True, filters=None):
+        self._call()
+        wanted = set(tuple(label.split('=', 1)) for label in (filters or {}).get('label', []))
+        return [c for c in self.containers_by_id.values()
+                if (all or c['State'] == 'running') and wanted <= set(c['Labels'].items())]
+
+    def stop(self, container_id, timeout=10):
+        self._call()
+        container = self._container(container_id)
+        container['State'], container['Status'] = 'exited', 'Exited (0)'
+
+    def remove_container(self, container_id, force=False):
+        self._call()
+        self.containers_by_id.pop(self._container(container_id)['Id'])
+
+    def logs(self, container_id, tail=100):
+        self._call()
+        return b"apache2 -D FOREGROUND\n"
+
+
+class FakeDockerSDK:
+    """docker.DockerClient stand-in: just the low-level api"""
+
+    def __init__(self, api_ms: float = 2.0, build_ms: float = 0.0):
+        self.api = FakeDockerAPI(api_ms, build_ms)
+
+
+def bench_control_plane(machine_count: int, api_ms: float):
+    """Per-operation latency: forking a compose process vs the Docker SDK control plane"""
+    import subprocess
+    import statistics
+    from machine_pipeline import render_compose
+
+    sys.path.append(str(Path(__file__).parent.parent / "docker" / "orchestrator"))
+    from control_plane import DockerControlPlane
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+    fake_compose = work_dir / "docker-compose"
+    fake_compose.write_text(FAKE_COMPOSE)
+    fake_compose.chmod(0o755)
+
+    machine_dirs = []
+    for i in range(machine_count):
+        machine_dir = work_dir / f"machine{i:04d}"
+        machine_dir.mkdir()
+        (machine_dir / "Dockerfile").write_text("FROM hackforge-base:bench\nCOPY app/ /var/www/html/\n")
+        (machine_dir / "docker-compose.yml").write_text(
+            render_compose(machine_dir.name, 8080 + i, "/var/www/html/flag.txt",
+                           {'needs_database': i % 2 == 0, 'database_type': 'mysql'}))
+        machine_dirs.append(machine_dir)
+
+    sdk = FakeDockerSDK(api_ms)
+    plane = DockerControlPlane(client=sdk)
+
+    def sdk_op(name: str, machine_dir: Path):
+        if name == 'up':
+            plane.up(machine_dir, build=False)
+        elif name == 'ps':
+            plane.status(machine_dir)
+        elif name == 'logs':
+            plane.logs(machine_dir, tail=100)
+        else:
+            plane.down(machine_dir)
+
+    cli_args = {'up': ["up", "-d"], 'ps': ["ps", "--format", "json"], 'logs': ["logs", "--tail=100"],
+                'down': ["down"]}
+
+    def cli_op(name: str, machine_dir: Path):
+        subprocess.run([str(fake_compose)] + cli_args[name], cwd=str(machine_dir),
+                       capture_output=True, text=True, timeout=60)
+
+    rows = []
+    try:
+        for label_name in ('up (first)', 'ps', 'logs', 'down', 'up (again)'):
+            name = label_name.split()[0]
+            timings = {}
+            for label, op in (('compose', cli_op), ('sdk', sdk_op)):
+                samples = []
+                for machine_dir in machine_dirs:
+                    start = time.perf_counter()
+                    op(name, machine_dir)
+                    samples.append(time.perf_counter() - start)
+                timings[label] = statistics.median(samples)
+            rows.append((label_name, timings['compose'], timings['sdk']))
+
+        # Dependency order and clean teardown on a database-backed machine
+        plane.down(machine_dirs[0])
+        sdk.api.started.clear()
+        plane.up(machine_dirs[0], build=True)
+        order = list(sdk.api.started)
+        running = len(plane.status(machine_dirs[0]))
+        plane.down(machine_dirs[0])
+        left = len(plane.status(machine_dirs[0]))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{'='*60}")
+    print("DOCKER CONTROL PLANE")
+    print(f"{'='*60}")
+    print(f"Machines: {machine_count}  Daemon round-trip: {api_ms:.1f}ms (fake SDK client); "
+          f"compose = a no-op fake docker-compose (a lower bound: the real CLI starts slower)")
+    for name, cli, sdk_seconds in rows:
+        print(f"  {name:<11} compose p50 {cli * 1000:>7.1f}ms   sdk p50 {sdk_seconds * 1000:>6.1f}ms   "
+              f"{cli / sdk_seconds:>5.1f}x")
+    print(f"  start order {order}, {running} containers up, {left} left after down; "
+          f"{sdk.api.calls} daemon calls in total")
+
+
+def bench_campaign_lifecycle(machine_count: int, up_ms: float, concurrency: List[int]):
+    """Starting a campaign machine by machine vs CampaignLifecycle"""
+    import asyncio
+    import random
+
+    sys.path.append(str(Path(__file__).parent.parent / "docker" / "orchestrator"))
+    from compose_runner import ComposeRunner
+    from campaign_lifecycle import CampaignLifecycle
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hackforge_bench_"))
+    fake = work_dir / "docker-compose"
+    fake.write_text(FAKE_COMPOSE)
+    fake.chmod(0o755)
+    os.environ['FAKE_COMPOSE_UP_MS'] = str(up_ms / 10)
+    os.environ['FAKE_COMPOSE_DOWN_MS'] = str(up_ms / 10)
+
+    # Web builds take 0.5-1.5x up_ms; the database start is a tenth of up_ms
+    rng = random.Random(7)
+    machine_dirs = []
+    for i in range(machine_count):
+        machine_dir = work_dir / f"m{i}"
+        machine_dir.mkdir()
+        (machine_dir / "docker-compose.yml").write_text(
+            f"services:\n  m{i}:\n    build: .\n    depends_on:\n      - db\n  db:\n    image: mysql:latest\n")
+        (machine_dir / "up.ms").write_text(str(up_ms * rng.uniform(0.5, 1.5)))
+        machine_dirs.append(machine_dir)
+    slowest = (max(float((d / "up.ms").read_text()) for d in machine_dirs) + up_ms / 10) / 1000
+
+    def spans(machine_dir: Path) -> List[tuple]:
+        lines = (machine_dir / "compose.log").read_text().splitlines()
+        return [(float(start), float(end), ' '.join(rest)) for start, end, *rest in map(str.split, lines)]
+
+    def reset():
+        for machine_dir in machine_dirs:
+            (machine_dir / "compose.log").unlink(missing_ok=True)
+
+    async def sequential(runner: ComposeRunner) -> float:
+        # Previous endpoint: one await compose.up() after another
+        start = time.perf_counter()
+        for machine_dir in machine_dirs:
+            await runner.up(machine_dir)
+        return time.perf_counter() - start
+
+    rows = []
+    try:
+        runner = ComposeRunner(compose_command=[str(fake)], max_concurrency=max(concurrency))
+        rows.append(("machine by machine", asyncio.run(sequential(runner)), None, None))
+        runner.shutdown()
+
+        for cap in concurrency:
+            reset()
+            runner = ComposeRunner(compose_command=[str(fake)], max_concurrency=cap)
+            lifecycle = CampaignLifecycle(runner, max_parallel=cap)
+            run = asyncio.run(lifecycle.start(machine_dirs))
+            stopped = asyncio.run(lifecycle.stop(machine_dirs))
+            runner.shutdown()
+
+            # The machine's database came up before its web service started
+            ordered = 0
+            for machine_dir in machine_dirs:
+                steps = {command: (start, end) for start, end, command in spans(machine_dir)}
+                if steps["up -d --build db"][1] <= steps["up -d --build"][0]:
+                    ordered += 1
+            rows.append((f"CampaignLifecycle (cap {cap})", run.seconds, run, (ordered, stopped)))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{'='*60}")
+    print("CAMPAIGN LIFECYCLE")
+    print(f"{'='*60}")
+    print(f"Machines: {machine_count}  web up: {up_ms * 0.5:.0f}-{up_ms * 1.5:.0f}ms  "
+          f"slowest machine: {slowest:.2f}s (fake docker-compose)")
+    for label, elapsed, run, checks in rows:
+        line = f"  {label:<30} start {elapsed:>6.2f}s"
+        if run:
+            ordered, stopped = checks
+            line += (f"  ({run.succeeded}/{len(run.machines)} ok, serial {run.serial_seconds:.1f}s, "
+                     f"db first {ordered}/{len(run.machines)}, stop {stopped.seconds:.2f}s)")
+        print(line)
+
+
+class FakeMongoCollection:
+    """
+    Just enough of a pymongo Collection for the flag lookup benchmarks
+
+    Documents are kept BSON-encoded and decoded on every read, so moving
+    documents costs what decoding them costs; every call costs rtt_ms.
+    Fields passed to create_index get a hash index; other filters scan.
+    """
+
+    def __init__(self, rtt_ms: float):
+        import bson
+        self._bson = bson
+        self.rtt = rtt_ms / 1000
+        self.docs: List[bytes] = []
+        self.indexes = {}
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        time.sleep(self.rtt)
+
+    @staticmethod
+    def _project(doc: dict, projection: dict) -> dict:
+        if not projection:
+            return doc
+        included = [key for key, value in projection.items() if value and key != '_id']
+        if included:
+            doc = {key: doc[key] for key in included + ['_id'] if key in doc}
+        if not projection.get('_id', 1):
+            doc.pop('_id', None)
+        return doc
+
+    def _matches(self, filter: dict):
+        if not filter:
+            return range(len(self.docs))
+        if len(filter) == 1:
+            (field, value), = filter.items()
+            if field in self.indexes:
+                return self.indexes[field].get(value, [])
+        return [i for i, raw in enumerate(self.docs)
+                if all(self._bson.decode(raw).get(k) == v for k, v in filter.items())]
+
+    def _insert(self, doc: dict):
+        doc.setdefault('_id', len(self.docs))
+        for field, index in self.indexes.items():
+            index.setdefault(doc.get(field), []).append(len(self.docs))
+        self.docs.append(self._bson.encode(doc))
+
+    def create_index(self, keys, unique: bool = False, **options):
+        field = keys if isinstance(keys, str) else keys[0][0]
+        if isinstance(keys, str) or len(keys) == 1:
+            index = {}
+            for i, raw in enumerate(list(self.docs)):
+                index.setdefault(self._bson.decode(raw).get(field), []).append(i)
+            # Swapped in whole: indexes may be built from another thread
+            self.indexes = {**self.indexes, field: index}
+
+    def estimated_document_count(self) -> int:
+        self._call()
+        return len(self.docs)
+
+    def insert_many(self, docs):
+        self._call()
+        for doc in docs:
+            self._insert(dict(doc))
+
+    def find(self, filter: dict = None, projection: dict = None):
+        self._call()
+        for i in self._matches(filter):
+            yield self._project(self._bson.decode(self.docs[i]), projection)
+
+    def find_one(self, filter: dict = None, projection: dict = None):
+        self._call()
+        for i in self._matches(filter):
+            return self._project(self._bson.decode(self.docs[i]), projection)
+        return None
+
+    def bulk_write(self, operations, ordered: bool = True):
+        self._call()
+        for operation in operations:
+            # pymongo.UpdateOne with a $set and a single-field filter
+            matches = self._matches(operation._filter)
+            if matches:
+                i = matches[0]
+                doc = self._bson.decode(self.docs[i])
+                doc.update(operation._doc['$set'])
+                self.docs[i] = self._bson.encode(doc)
+            elif operation._upsert:
+                self._insert({**operation._filter, **operation._doc['$set']})
+
+
+class FakeMongoClient:
+    """pymongo.MongoClient stand-in: client[database][collection] is a FakeMongoCollection"""
+
+    def __init__(self, rtt_ms: float = 0.2):
+        self.rtt_ms = rtt_ms
+        self.databases = {}
+
+    def __getitem__(self, name: str) -> Dict[str, FakeMongoCollection]:
+        if name not in self.databases:
+            self.databases[name] = collections.defaultdict(lambda: FakeMongoCollection(self.rtt_ms))
+        return self.databases[name]
+
+
+def bench_flags(machine_count: int, rate: float, seconds: float, rtt_ms: float, campaign_size: int):
+    """Flag validation lookups: scanning every campaign vs the indexed machines lookup"""
+    import random
+    import statistics
+
+    sys.path.append(str(Path(__file__).parent.parent / "web" / "database"))
+    from database import DatabaseManager, flag_matches
+
+    client = FakeMongoClient(rtt_ms)
+    rng = random.Random(7)
+    machine_ids = [f"{rng.getrandbits(64):016x}" for _ in range(machine_count)]
+    flags = {machine_id: f"HACKFORGE{{{rng.getrandbits(128):032x}}}" for machine_id in machine_ids}
+
+    campaigns = client['hackforge']['campaigns']
+    campaigns.insert_many({
+        'campaign_id': f"campaign_{start}",
+        'user_id': f"user_{start % 97}",
+        'machine_count': campaign_size,
+        'machines': [{'machine_id': machine_id, 'variant': 'Bench', 'difficulty': 2,
+                      'blueprint_id': 'sqli_bench', 'flag': flags[machine_id]}
+                     for machine_id in machine_ids[start:start + campaign_size]],
+    } for start in range(0, machine_count, campaign_size))
+
+    # Existing campaigns are backfilled into the lookup on first start
+    start = time.perf_counter()
+    db = DatabaseManager(client=client)
+    backfill = time.perf_counter() - start
+    db.indexes.wait()
+
+    def scan(machine_id: str):
+        # Previous validate_flag: walk every campaign's machines in Python
+        for campaign in db.campaigns.find():
+            for machine in campaign.get('machines', []):
+                if machine['machine_id'] == machine_id:
+                    return machine
+        return None
+
+    sample = rng.sample(machine_ids, 10)
+    start = time.perf_counter()
+    for machine_id in sample:
+        scan(machine_id)
+    scan_seconds = (time.perf_counter() - start) / len(sample)
+
+    def load(requests: int, hot: List[str]) -> tuple:
+        """requests submissions arriving at rate/s; latency counts from each one's arrival"""
+        latencies = []
+        correct = 0
+        calls = db.machines.calls
+        first = time.perf_counter()
+        for i in range(requests):
+            arrival = first + i / rate
+            time.sleep(max(0.0, arrival - time.perf_counter()))
+            machine_id = rng.choice(hot)
+            submitted = flags[machine_id] if i % 2 else "HACKFORGE{wrong}"
+            machine = db.get_machine_lookup(machine_id)
+            correct += flag_matches(submitted, machine['flag_hash'])
+            latencies.append(time.perf_counter() - arrival)
+        elapsed = time.perf_counter() - first
+        latencies.sort()
+        return (requests / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1],
+                db.machines.calls - calls, correct)
+
+    requests = int(rate * seconds)
+    # Every request for a different machine (cold cache), then a working set of live machines
+    cold = load(requests, machine_ids)
+    warm = load(requests, machine_ids[:1000])
+
+    print(f"\n{'='*60}")
+    print("FLAG VALIDATION")
+    print(f"{'='*60}")
+    print(f"Machines: {machine_count} in {len(campaigns.docs)} campaigns  round trip: {rtt_ms}ms (fake mongod)")
+    print(f"  lookup backfill from campaigns: {backfill:.2f}s")
+    print(f"  campaign scan:   {scan_seconds * 1000:>9.1f}ms per submission  (max {1 / scan_seconds:.1f}/s)")
+    for label, (achieved, p50, p99, reads, correct) in (("lookup, cold cache", cold), ("lookup, 1k live machines", warm)):
+        print(f"  {label:<26} {achieved:>6.0f}/s offered {rate:.0f}/s  p50 {p50 * 1000:.2f}ms  "
+              f"p99 {p99 * 1000:.2f}ms  {reads} Mongo reads for {requests} submissions  {correct} correct")
+
+
+class RoundTripCursor:
+    """find()/aggregate() cursor of a round-trip collection: one round trip when read"""
+
+    def __init__(self, owner, name: str, args, kwargs):
+        self._owner = owner
+        self._call = (name, args, kwargs)
+        self._chain = []
+
+    def sort(self, *args, **kwargs) -> 'RoundTripCursor':
+        self._chain.append(('sort', args, kwargs))
+        return self
+
+    def limit(self, *args, **kwargs) -> 'RoundTripCursor':
+        self._chain.append(('limit', args, kwargs))
+        return self
+
+    def _read(self) -> List:
+        name, args, kwargs = self._call
+        cursor = getattr(self._owner._collection, name)(*args, **kwargs)
+        for method, method_args, method_kwargs in self._chain:
+            cursor = getattr(cursor, method)(*method_args, **method_kwargs)
+        return list(cursor)
+
+    def __iter__(self):
+        return iter(self._owner._round_trip(self._read))
+
+
+class RoundTripCollection:
+    """
+    A collection (e.g. mongomock's) where every operation costs rtt_ms
+
+    Operations are counted and each runs under one lock, the way a server
+    applies a single operation atomically; cursors are read in one round trip.
+    """
+
+    CURSORS = {'find', 'aggregate'}
+
+    OPERATIONS = {'find', 'find_one', 'find_one_and_update', 'insert_one', 'insert_many', 'update_one',
+                  'update_many', 'delete_one', 'delete_many', 'count_documents', 'bulk_write', 'aggregate',
+                  'estimated_document_count', 'create_index', 'distinct'}
+
+    def __init__(self, collection, rtt_ms: float, stats: Dict, lock):
+        self._collection = collection
+        self._rtt = rtt_ms / 1000
+        self._stats = stats
+        self._lock = lock
+
+    def _round_trip(self, call: Callable):
+        time.sleep(self._rtt)
+        with self._lock:
+            self._stats['round_trips'] += 1
+            return call()
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._collection, name)
+        if name in self.CURSORS:
+            return lambda *args, **kwargs: RoundTripCursor(self, name, args, kwargs)
+        if name not in self.OPERATIONS:
+            return attribute
+
+        def operation(*args, **kwargs):
+            return self._round_trip(lambda: attribute(*args, **kwargs))
+        return operation
+
+
+class RoundTripClient:
+    """MongoClient wrapper whose collections are RoundTripCollections"""
+
+    def __init__(self, client, rtt_ms: float):
+        import threading
+
+        self.client = client
+        self.rtt_ms = rtt_ms
+        self.stats = {'round_trips': 0}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str):
+        database = self.client[name]
+        client = self
+
+        class Database:
+            def __getitem__(self, collection: str) -> RoundTripCollection:
+                return RoundTripCollection(database[collection], client.rtt_ms, client.stats, client._lock)
+        return Database()
+
+
+def bench_flag_submit(user_count: int, machines_per_campaign: int, rtt_ms: float, racers: int):
+    """Flag submission: the previous call sequence vs DatabaseManager.submit_flag"""
+    import statistics
+    import threading
+
+    try:
+        import mongomock
+    except ImportError:
+        print("✗ mongomock not installed (pip install mongomock)")
+        return
+
+    sys.path.append(str(Path(__file__).parent.parent / "web" / "database"))
+    from database import DatabaseManager, flag_matches
+
+    def legacy_submit(db: DatabaseManager, user_id: str, machine: dict, flag: str) -> int:
+        # Previous validate_flag, call for call
+        progress = db.get_progress(user_id, machine['machine_id'])
+        if not progress:
+            progress = db.create_progress({'user_id': user_id, 'machine_id': machine['machine_id'],
+                                           'campaign_id': machine.get('campaign_id') or 'unknown'})
+        db.increment_attempts(user_id, machine['machine_id'])
+        correct = flag_matches(flag, machine['flag_hash'])
+        awarded = 0
+        if correct and not progress.get('solved', False):
+            awarded = machine['difficulty'] * 100
+            solve_time = int(time.time() - progress['started_at'].timestamp())
+            db.mark_solved(user_id, machine['machine_id'], awarded, solve_time)
+            db.add_points(user_id, awarded)
+            db.increment_solved(user_id)
+            campaign_id = progress.get('campaign_id')
+            if campaign_id and campaign_id != 'unknown':
+                campaign_progress = db.get_campaign_progress(user_id, campaign_id)
+                solved_count = sum(1 for p in campaign_progress if p.get('solved', False))
+                db.update_campaign_progress(campaign_id, solved_count,
+                                            sum(p.get('points_earned', 0) for p in campaign_progress))
+                if solved_count == db.get_campaign(campaign_id)['machine_count']:
+                    db.complete_campaign(campaign_id)
+        db.record_submission({'user_id': user_id, 'machine_id': machine['machine_id'],
+                              'submitted_flag': flag, 'correct': correct, 'points_awarded': awarded})
+        return awarded
+
+    def atomic_submit(db: DatabaseManager, user_id: str, machine: dict, flag: str) -> int:
+        return db.submit_flag(user_id, machine, flag)['points']
+
+    def seeded(users: int):
+        client = RoundTripClient(mongomock.MongoClient(), rtt_ms)
+        db = DatabaseManager(client=client)
+        db.indexes.wait()
+        players = []
+        for u in range(users):
+            user_id = f"user_{u}"
+            db.create_user({'user_id': user_id, 'email': f"{user_id}@bench", 'total_points': 0,
+                            'machines_solved': 0, 'campaigns_completed': 0})
+            machines = [{'machine_id': f"{u:08x}{m:08x}", 'variant': 'Bench', 'difficulty': 2,
+                         'blueprint_id': 'sqli_bench', 'flag': f"HACKFORGE{{{u}-{m}}}"}
+                        for m in range(machines_per_campaign)]
+            campaign_id = f"campaign_{u}"
+            db.create_campaign({'campaign_id': campaign_id, 'user_id': user_id,
+                                'machine_count': len(machines), 'machines': machines})
+            for machine in machines:
+                db.create_progress({'user_id': user_id, 'machine_id': machine['machine_id'],
+                                    'campaign_id': campaign_id})
+            players.append((user_id, campaign_id, machines))
+        return db, client, players
+
+    def workload(submit: Callable) -> Dict:
+        """Per machine: a wrong flag, the right one, then the right one again"""
+        db, client, players = seeded(user_count)
+        latencies = {'wrong': [], 'first solve': [], 'repeat': []}
+        trips = {kind: 0 for kind in latencies}
+        for user_id, _, machines in players:
+            for machine in machines:
+                lookup = db.get_machine_lookup(machine['machine_id'])
+                for kind, flag in (('wrong', "HACKFORGE{wrong}"), ('first solve', machine['flag']),
+                                   ('repeat', machine['flag'])):
+                    before = client.stats['round_trips']
+                    start = time.perf_counter()
+                    submit(db, user_id, lookup, flag)
+                    latencies[kind].append(time.perf_counter() - start)
+                    trips[kind] += client.stats['round_trips'] - before
+
+        consistent = all(
+            (campaign.get('machines_solved'), campaign.get('status'), user['total_points'], user['campaigns_completed'])
+            == (machines_per_campaign, 'completed', machines_per_campaign * 200, 1)
+            for campaign, user in ((db.get_campaign(campaign_id), db.get_user(user_id))
+                                   for user_id, campaign_id, _ in players))
+
+        everything = sorted(sum(latencies.values(), []))
+        return {
+            'p50': statistics.median(everything),
+            'p99': everything[int(len(everything) * 0.99) - 1],
+            'solve_p99': sorted(latencies['first solve'])[int(len(latencies['first solve']) * 0.99) - 1],
+            'trips': {kind: trips[kind] / len(latencies[kind]) for kind in trips},
+            'consistent': consistent,
+        }
+
+    def race(submit: Callable) -> int:
+        """racers submit the same correct flag at once; points awarded in total"""
+        db, _, players = seeded(1)
+        user_id, _, machines = players[0]
+        lookup = db.get_machine_lookup(machines[0]['machine_id'])
+        barrier = threading.Barrier(racers)
+        awarded = []
+
+        def racer():
+            barrier.wait()
+            awarded.append(submit(db, user_id, lookup, machines[0]['flag']))
+
+        threads = [threading.Thread(target=racer) for _ in range(racers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(awarded)
+
+    rows = [(label, workload(submit), race(submit))
+            for label, submit in (("previous call sequence", legacy_submit), ("submit_flag", atomic_submit))]
+
+    print(f"\n{'='*60}")
+    print("FLAG SUBMISSION")
+    print(f"{'='*60}")
+    print(f"Users: {user_count} x {machines_per_campaign} machines, 3 submissions each  "
+          f"round trip: {rtt_ms}ms (mongomock)")
+    for label, stats, race_points in rows:
+        trips = stats['trips']
+        print(f"  {label:<24} p50 {stats['p50'] * 1000:>6.2f}ms  p99 {stats['p99'] * 1000:>6.2f}ms  "
+              f"first-solve p99 {stats['solve_p99'] * 1000:>6.2f}ms")
+        print(f"  {'':<24} round trips: wrong {trips['wrong']:.1f}  first solve {trips['first solve']:.1f}  "
+              f"repeat {trips['repeat']:.1f}  counters consistent: {'yes' if stats['consistent'] else 'NO'}")
+        print(f"  {'':<24} {racers} simultaneous correct submissions awarded {race_points} points (expected 200)")
+
+
+class AsyncRoundTripCursor(RoundTripCursor):
+    """Motor-style cursor: read with await to_list() or async for"""
+
+    def __iter__(self):
+        raise TypeError("Motor cursors are read with to_list() or async for")
+
+    async def to_list(self, length: int = None) -> List:
+        documents = await self._owner._round_trip(self._read)
+        return documents if length is None else documents[:length]
+
+    def __aiter__(self):
+        async def documents():
+            for document in await self.to_list():
+                yield document
+        return documents()
+
+
+class AsyncRoundTripCollection:
+    """
+    Motor-style collection over e.g. mongomock where every operation costs rtt_ms
+
+    A round trip holds one of the client's max_pool_size connections while it
+    waits, like a Motor connection pool, and awaits instead of sleeping.
+    """
+
+    def __init__(self, collection, client: 'AsyncRoundTripClient'):
+        self._collection = collection
+        self._client = client
+
+    async def _round_trip(self, call: Callable):
+        import asyncio
+
+        async with self._client.pool:
+            await asyncio.sleep(self._client.rtt_ms / 1000)
+            self._client.stats['round_trips'] += 1
+            return call()
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._collection, name)
+        if name in RoundTripCollection.CURSORS:
+            return lambda *args, **kwargs: AsyncRoundTripCursor(self, name, args, kwargs)
+        if name not in RoundTripCollection.OPERATIONS:
+            return attribute
+
+        async def operation(*args, **kwargs):
+            return await self._round_trip(lambda: attribute(*args, **kwargs))
+        return operation
+
+
+class AsyncRoundTripClient:
+    """AsyncIOMotorClient stand-in: async round-trip collections, .delegate for index builds"""
+
+    def __init__(self, client, rtt_ms: float, max_pool_size: int = 100):
+        import asyncio
+
+        self.delegate = client
+        self.rtt_ms = rtt_ms
+        self.stats = {'round_trips': 0}
+        self.pool = asyncio.Semaphore(max_pool_size)
+
+    def __getitem__(self, name: str):
+        database = self.delegate[name]
+        client = self
+
+        class Database:
+            def __getitem__(self, collection: str) -> AsyncRoundTripCollection:
+                return AsyncRoundTripCollection(database[collection], client)
+
+            async def command(self, *args, **kwargs):
+                return await AsyncRoundTripCollection(database, client)._round_trip(
+                    lambda: database.command(*args, **kwargs))
+        return Database()
+
+    def close(self):
+        pass
+
+
+def bench_db_async(client_count: int, seconds: float, rtt_ms: float, pool_sizes: List[int], user_count: int):
+    """API request throughput: blocking DatabaseManager vs AsyncDatabaseManager under concurrent clients"""
+    import asyncio
+    import random
+    import statistics
+
+    try:
+        import mongomock
+    except ImportError:
+        print("✗ mongomock not installed (pip install mongomock)")
+        return
+
+    sys.path.append(str(Path(__file__).parent.parent / "web" / "database"))
+    from database import DatabaseManager
+    from async_database import AsyncDatabaseManager
+
+    def seed(client):
+        db = DatabaseManager(client=client)
+        db.indexes.wait()
+        for u in range(user_count):
+            user_id = f"user_{u}"
+            db.create_user({'user_id': user_id, 'email': f"{user_id}@bench", 'total_points': u * 100,
+                            'machines_solved': u, 'campaigns_completed': 0})
+            campaign_id = f"campaign_{u}"
+            machines = [{'machine_id': f"{u:08x}{m:08x}", 'difficulty': 1, 'flag': f"HACKFORGE{{{u}-{m}}}"}
+                        for m in range(5)]
+            db.create_campaign({'campaign_id': campaign_id, 'user_id': user_id,
+                                'machine_count': len(machines), 'machines': machines})
+            for machine in machines:
+                db.create_progress({'user_id': user_id, 'machine_id': machine['machine_id'],
+                                    'campaign_id': campaign_id})
+
+    # The endpoints as main_with_db.py had them (sync manager called from async
+    # handlers) and as they are now (awaited, independent queries gathered)
+    async def blocking_user(db, user_id):
+        user = db.get_user(user_id)
+        user['rank'] = db.get_user_rank(user_id)
+
+    async def blocking_progress(db, user_id):
+        db.get_user(user_id)
+        db.get_user_campaigns(user_id)
+        db.get_user_submissions(user_id, limit=10)
+
+    async def blocking_stats(db, user_id):
+        db.get_platform_stats()
+
+    async def async_user(db, user_id):
+        user = await db.get_user(user_id)
+        user['rank'] = await db.get_user_rank(user_id, user=user)
+
+    async def async_progress(db, user_id):
+        await asyncio.gather(db.get_user(user_id), db.get_user_campaigns(user_id),
+                             db.get_user_submissions(user_id, limit=10))
+
+    async def async_stats(db, user_id):
+        await db.get_platform_stats()
+
+    async def load(db, endpoints) -> Dict:
+        latencies = []
+        deadline = time.perf_counter() + seconds
+
+        async def client(n: int):
+            rng = random.Random(n)
+            # Each client sends its next request as soon as the last one returns, so
+            # latency counts from then (including any wait for a blocked event loop)
+            sent = time.perf_counter()
+            while sent < deadline:
+                endpoint = rng.choice(endpoints)
+                await endpoint(db, f"user_{rng.randrange(user_count)}")
+                done = time.perf_counter()
+                latencies.append(done - sent)
+                sent = done
+                # The next request arrives over the network: other clients get the loop first
+                await asyncio.sleep(0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(n) for n in range(client_count)))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p99': latencies[int(len(latencies) * 0.99) - 1],
+        }
+
+    def blocking_run() -> Dict:
+        client = RoundTripClient(mongomock.MongoClient(), rtt_ms)
+        seed(client)
+        db = DatabaseManager(client=client)
+        return asyncio.run(load(db, [blocking_user, blocking_progress, blocking_stats]))
+
+    def async_run(pool_size: int) -> Dict:
+        async def run():
+            client = AsyncRoundTripClient(mongomock.MongoClient(), rtt_ms, max_pool_size=pool_size)
+            seed(client.delegate)
+            db = AsyncDatabaseManager(client=client, build_indexes=False)
+            return await load(db, [async_user, async_progress, async_stats])
+        return asyncio.run(run())
+
+    rows = [("DatabaseManager (blocking)", blocking_run())]
+    rows += [(f"AsyncDatabaseManager pool={size}", async_run(size)) for size in pool_sizes]
+
+    print(f"\n{'='*60}")
+    print("DATABASE CONCURRENCY")
+    print(f"{'='*60}")
+    print(f"Clients: {client_count}  users: {user_count}  round trip: {rtt_ms}ms  "
+          f"{seconds:.0f}s per run (mongomock)")
+    print("Endpoints: user + rank, user progress, platform stats  "
+          "(async rows are capped by mongomock's in-process CPU time)")
+    baseline = rows[0][1]['rps']
+    for label, stats in rows:
+        print(f"  {label:<34} {stats['rps']:>8.0f} req/s  p50 {stats['p50'] * 1000:>8.2f}ms  "
+              f"p99 {stats['p99'] * 1000:>8.2f}ms  ({stats['rps'] / baseline:.1f}x)")
+
+
+def bench_campaign_progress(campaign_count: int, machines_per_campaign: int, rtt_ms: float):
+    """Campaign listing/details: one progress query per campaign vs one aggregation"""
+    import random
+
+    try:
+        import mongomock
+    except ImportError:
+        print("✗ mongomock not installed (pip install mongomock)")
+        return
+
+    sys.path.append(str(Path(__file__).parent.parent / "web" / "database"))
+    from database import DatabaseManager
+
+    client = RoundTripClient(mongomock.MongoClient(), rtt_ms)
+    db = DatabaseManager(client=client)
+    db.indexes.wait()
+
+    # One user's campaigns, partly solved; a second player's progress on them must not count
+    rng = random.Random(7)
+    user_id = "user_bench"
+    campaigns, progress = [], []
+    for c in range(campaign_count):
+        campaign_id = f"campaign_{c}"
+        machines = [{'machine_id': f"{c:08x}{m:08x}"} for m in range(machines_per_campaign)]
+        campaigns.append({'campaign_id': campaign_id, 'user_id': user_id, 'campaign_name': f"Campaign {c}",
+                          'machine_count': len(machines), 'machines': machines, 'status': 'active',
+                          'created_at': c})
+        for machine in machines:
+            solved = rng.random() < 0.4
+            for player in (user_id, "user_other"):
+                record = {'user_id': player, 'machine_id': machine['machine_id'], 'campaign_id': campaign_id,
+                          'solved': solved, 'attempts': rng.randint(1, 5)}
+                if solved:
+                    record['points_earned'] = 200
+                progress.append(record)
+    raw = client.client['hackforge']
+    raw['campaigns'].insert_many(campaigns)
+    raw['progress'].insert_many(progress)
+
+    def n_plus_one() -> List[tuple]:
+        # Previous /api/users/{user_id}/campaigns
+        listed = db.get_user_campaigns(user_id)
+        for campaign in listed:
+            progress_list = db.get_campaign_progress(user_id, campaign['campaign_id'])
+            campaign['machines_solved'] = sum(1 for p in progress_list if p.get('solved', False))
+        return [(c['campaign_id'], c['machines_solved']) for c in listed]
+
+    def aggregated() -> List[tuple]:
+        return [(c['campaign_id'], c['machines_solved']) for c in db.get_user_campaigns_with_progress(user_id)]
+
+    def details_separate() -> tuple:
+        campaign = db.get_campaign("campaign_0")
+        progress_list = db.get_campaign_progress(campaign['user_id'], "campaign_0")
+        return sum(1 for p in progress_list if p.get('solved', False)), sum(p.get('points_earned', 0) for p in progress_list)
+
+    def details_aggregated() -> tuple:
+        campaign = db.get_campaign_with_progress("campaign_0")
+        return campaign['machines_solved'], campaign['progress_points']
+
+    def measure(func: Callable) -> tuple:
+        before = client.stats['round_trips']
+        start = time.perf_counter()
+        result = func()
+        return time.perf_counter() - start, client.stats['round_trips'] - before, result
+
+    print(f"\n{'='*60}")
+    print("CAMPAIGN PROGRESS")
+    print(f"{'='*60}")
+    print(f"Campaigns: {campaign_count} x {machines_per_campaign} machines  round trip: {rtt_ms}ms  "
+          f"(wall time is mostly mongomock's unindexed in-process scans)")
+    for title, pairs in (("listing", (("query per campaign", n_plus_one),
+                                      ("get_user_campaigns_with_progress", aggregated))),
+                         ("details", (("campaign + progress list", details_separate),
+                                      ("get_campaign_with_progress", details_aggregated)))):
+        rows = [(label, measure(func)) for label, func in pairs]
+        same = rows[0][1][2] == rows[1][1][2]
+        for label, (seconds, trips, _) in rows:
+            print(f"  {title:<8} {label:<34} {trips:>4} round trips = {trips * rtt_ms:>6.1f}ms network  "
+                  f"wall {seconds * 1000:>9.1f}ms")
+        print(f"  {'':<8} results match: {'yes' if same else 'NO'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hackforge Benchmarks')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    subparsers = parser.add_subparsers(dest='bench', required=True)
+
+    campaign = subparsers.add_parser('campaign', help='Sequential vs parallel campaign generation')
+    campaign.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    campaign.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    registry = subparsers.add_parser('registry', help='Cold vs warm blueprint registry start-up')
+    registry.add_argument('--blueprints', type=int, default=500)
+
+    derive = subparsers.add_parser('derive', help='Batched seed -> ID/flag/RNG derivation')
+    derive.add_argument('--seeds', type=int, default=100000)
+
+    index = subparsers.add_parser('index', help='Machine ID index insert/lookup/reload')
+    index.add_argument('--machines', type=int, default=1000000)
+
+    export = subparsers.add_parser('export', help='Legacy vs streaming campaign export')
+    export.add_argument('--machines', type=int, default=500)
+    export.add_argument('--workers', type=int, default=2)
+
+    memory = subparsers.add_parser('memory', help='Inlined vs interned blueprint config memory')
+    memory.add_argument('--machines', type=int, default=10000)
+
+    models = subparsers.add_parser('models', help='MachineConfig create/serialise/parse')
+    models.add_argument('--configs', type=int, default=100000)
+
+    mutate = subparsers.add_parser('mutate', help='Mutation throughput per core')
+    mutate.add_argument('--machines', type=int, default=100000)
+    mutate.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    pool = subparsers.add_parser('pool', help='Cold vs warm-pool campaign creation latency')
+    pool.add_argument('--campaigns', type=int, default=20)
+    pool.add_argument('--size', type=int, default=5)
+    pool.add_argument('--prepare-ms', type=float, default=200)
+
+    llm_cache = subparsers.add_parser('llm-cache', help='LLM calls per campaign with the response cache')
+    llm_cache.add_argument('--machines', type=int, default=100)
+    llm_cache.add_argument('--llm-ms', type=float, default=50)
+    llm_cache.add_argument('--diversity', type=int, default=3)
+
+    llm_client = subparsers.add_parser('llm-client', help='Blocking vs pooled async LLM completions')
+    llm_client.add_argument('--requests', type=int, default=64)
+    llm_client.add_argument('--llm-ms', type=float, default=2000)
+    llm_client.add_argument('--concurrency', type=int, nargs='+', default=[8, 32])
+    llm_client.add_argument('--serial-sample', type=int, default=3)
+
+    llm_stream = subparsers.add_parser('llm-stream', help='Buffered vs streamed, validated completions')
+    llm_stream.add_argument('--requests', type=int, default=32)
+    llm_stream.add_argument('--token-ms', type=float, default=20)
+    llm_stream.add_argument('--bad-ratio', type=float, default=0.3)
+
+    llm_batch = subparsers.add_parser('llm-batch', help='One request per machine vs batched requests')
+    llm_batch.add_argument('--machines', type=int, default=48)
+    llm_batch.add_argument('--batch-size', type=int, default=8)
+    llm_batch.add_argument('--llm-ms', type=float, default=500)
+    llm_batch.add_argument('--token-ms', type=float, default=5)
+    llm_batch.add_argument('--bad-ratio', type=float, default=0.1)
+
+    dockerfile = subparsers.add_parser('dockerfile', help='Per-machine vs cached Dockerfile generation')
+    dockerfile.add_argument('--machines', type=int, default=100)
+    dockerfile.add_argument('--categories', type=int, default=3)
+    dockerfile.add_argument('--llm-ms', type=float, default=2000)
+
+    base_images = subparsers.add_parser('base-images', help='Per-machine layers vs shared base images')
+    base_images.add_argument('--machines', type=int, default=100)
+    base_images.add_argument('--categories', type=int, default=3)
+    base_images.add_argument('--system-ms', type=float, default=100)
+    base_images.add_argument('--system-mb', type=float, default=120)
+
+    jobs = subparsers.add_parser('jobs', help='Inline vs queued generate-machine pipeline')
+    jobs.add_argument('--jobs', type=int, default=8)
+    jobs.add_argument('--llm-ms', type=float, default=1500)
+    jobs.add_argument('--docker-ms', type=float, default=1500)
+    jobs.add_argument('--workers', type=int, default=4)
+
+    compose = subparsers.add_parser('compose', help='Request latency while containers start')
+    compose.add_argument('--starts', type=int, default=16)
+    compose.add_argument('--up-ms', type=float, default=1000)
+    compose.add_argument('--request-ms', type=float, default=5)
+    compose.add_argument('--concurrency', type=int, default=4)
+
+    control_plane = subparsers.add_parser('control-plane', help='Compose CLI vs Docker SDK per-operation latency')
+    control_plane.add_argument('--machines', type=int, default=20)
+    control_plane.add_argument('--api-ms', type=float, default=2)
+
+    campaign_lifecycle = subparsers.add_parser('campaign-lifecycle', help='Sequential vs parallel campaign start/stop')
+    campaign_lifecycle.add_argument('--machines', type=int, default=30)
+    campaign_lifecycle.add_argument('--up-ms', type=float, default=1000)
+    campaign_lifecycle.add_argument('--concurrency', type=int, nargs='+', default=[8, 32])
+
+    flags = subparsers.add_parser('flags', help='Flag validation throughput against a large machine lookup')
+    flags.add_argument('--machines', type=int, default=100000)
+    flags.add_argument('--rate', type=float, default=1000)
+    flags.add_argument('--seconds', type=float, default=5)
+    flags.add_argument('--rtt-ms', type=float, default=0.2)
+    flags.add_argument('--campaign-size', type=int, default=10)
+
+    flag_submit = subparsers.add_parser('flag-submit', help='Flag submission latency and race safety (mongomock)')
+    flag_submit.add_argument('--users', type=int, default=50)
+    flag_submit.add_argument('--machines', type=int, default=10)
+    flag_submit.add_argument('--rtt-ms', type=float, default=1.0)
+    flag_submit.add_argument('--racers', type=int, default=8)
+
+    db_async = subparsers.add_parser('db-async', help='Blocking vs Motor database manager under concurrent clients')
+    db_async.add_argument('--clients', type=int, default=200)
+    db_async.add_argument('--seconds', type=float, default=5.0)
+    # Round trip plus server-side execution of a small indexed query
+    db_async.add_argument('--rtt-ms', type=float, default=2.0)
+    db_async.add_argument('--pool-sizes', type=int, nargs='+', default=[10, 200])
+    # mongomock runs queries in-process; more data mostly measures its scans
+    db_async.add_argument('--users', type=int, default=20)
+
+    campaign_progress = subparsers.add_parser('campaign-progress', help='Per-campaign progress queries vs one aggregation')
+    campaign_progress.add_argument('--campaigns', type=int, default=500)
+    campaign_progress.add_argument('--machines', type=int, default=5)
+    campaign_progress.add_argument('--rtt-ms', type=float, default=1.0)
+
+    args = parser.parse_args()
+
+    if args.bench == 'campaign':
+        bench_campaign(args.sizes, args.workers, args.repeat)
+    elif args.bench == 'registry':
+        bench_registry(args.blueprints, args.repeat)
+    elif args.bench == 'derive':
+        bench_derive(args.seeds, args.repeat)
+    elif args.bench == 'index':
+        bench_index(args.machines, args.repeat)
+    elif args.bench == 'export':
+        bench_export(args.machines, args.workers, args.repeat)
+    elif args.bench == 'memory':
+        bench_memory(args.machines)
+    elif args.bench == 'models':
+        bench_models(args.configs, args.repeat)
+    elif args.bench == 'mutate':
+        bench_mutate(args.machines, args.workers, args.repeat)
+    elif args.bench == 'pool':
+        bench_pool(args.campaigns, args.size, args.prepare_ms)
+    elif args.bench == 'llm-cache':
+        bench_llm_cache(args.machines, args.llm_ms, args.diversity)
+    elif args.bench == 'llm-client':
+        bench_llm_client(args.requests, args.llm_ms, args.concurrency, args.serial_sample)
+    elif args.bench == 'llm-stream':
+        bench_llm_stream(args.requests, args.token_ms, args.bad_ratio)
+    elif args.bench == 'llm-batch':
+        bench_llm_batch(args.machines, args.batch_size, args.llm_ms, args.token_ms, args.bad_ratio)
+    elif args.bench == 'dockerfile':
+        bench_dockerfile(args.machines, args.categories, args.llm_ms)
+    elif args.bench == 'base-images':
+        bench_base_images(args.machines, args.categories, args.system_ms, args.system_mb)
+    elif args.bench == 'jobs':
+        bench_jobs(args.jobs, args.llm_ms, args.docker_ms, args.workers)
+    elif args.bench == 'compose':
+        bench_compose(args.starts, args.up_ms, args.request_ms, args.concurrency)
+    elif args.bench == 'control-plane':
+        bench_control_plane(args.machines, args.api_ms)
+    elif args.bench == 'campaign-lifecycle':
+        bench_campaign_lifecycle(args.machines, args.up_ms, args.concurrency)
+    elif args.bench == 'flags':
+        bench_flags(args.machines, args.rate, args.seconds, args.rtt_ms, args.campaign_size)
+    elif args.bench == 'flag-submit':
+        bench_flag_submit(args.users, args.machines, args.rtt_ms, args.racers)
+    elif args.bench == 'db-async':
+        bench_db_async(args.clients, args.seconds, args.rtt_ms, args.pool_sizes, args.users)
+    elif args.bench == 'campaign-progress':
+        bench_campaign_progress(args.campaigns, args.machines, args.rtt_ms)
+
+
+if __name__ == "__main__":
+    main()
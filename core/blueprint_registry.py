@@ -0,0 +1,177 @@
+"""
+Blueprint Registry
+Persistent, pre-parsed snapshot of blueprint YAML and config JSON files
+Warm starts skip YAML/JSON parsing and only re-read files that changed
+"""
+
+import os
+import json
+import pickle
+import hashlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+
+
+class BlueprintRegistry:
+    """
+    On-disk cache of parsed blueprint and config files
+
+    Each entry is keyed by absolute file path and validated by mtime and size;
+    when those change the file is re-hashed and only re-parsed if its SHA-256
+    differs. The snapshot also keeps a category -> config path index and a
+    mutation file -> class name index so discovery doesn't have to probe.
+    """
+
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.cache_file = self.cache_dir / "blueprint_registry.pkl"
+
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.config_index: Dict[str, str] = {}
+        self.mutation_index: Dict[str, str] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+
+        self.load()
+
+    def load(self):
+        """Load the snapshot from disk, starting empty if it's missing or stale"""
+        if not self.cache_file.exists():
+            return
+
+        try:
+            with open(self.cache_file, 'rb') as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable registry cache: {e}")
+            return
+
+        if snapshot.get('version') != self.CACHE_VERSION:
+            return
+
+        self.files = snapshot.get('files', {})
+        self.config_index = snapshot.get('config_index', {})
+        self.mutation_index = snapshot.get('mutation_index', {})
+
+    def save(self):
+        """Write the snapshot atomically if anything changed"""
+        if not self._dirty:
+            return
+
+        snapshot = {
+            'version': self.CACHE_VERSION,
+            'files': self.files,
+            'config_index': self.config_index,
+            'mutation_index': self.mutation_index,
+        }
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Per-process temp file: the API, job workers and pool builders all save
+            tmp_file = self.cache_file.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.cache_file)
+            self._dirty = False
+        except OSError as e:
+            print(f"⚠️  Could not write registry cache: {e}")
+
+    def read_yaml(self, path: Path) -> Any:
+        """Parsed contents of a YAML file, from the snapshot when unchanged"""
+        return self._read(path, yaml.safe_load)
+
+    def read_json(self, path: Path) -> Any:
+        """Parsed contents of a JSON file, from the snapshot when unchanged"""
+        return self._read(path, json.loads)
+
+    def _read(self, path: Path, parser: Callable[[bytes], Any]) -> Any:
+        key = str(Path(path).resolve())
+        stat = os.stat(key)
+        entry = self.files.get(key)
+
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            self.hits += 1
+            return entry['data']
+
+        with open(key, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        if entry and entry['sha256'] == digest:
+            # Touched but not modified - keep the parsed data, refresh the stamp
+            self.hits += 1
+            data = entry['data']
+        else:
+            self.misses += 1
+            data = parser(raw)
+
+        self.files[key] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest,
+            'data': data,
+        }
+        self._dirty = True
+        return data
+
+    def resolve_config_path(self, category: str, candidates: List[Path]) -> Optional[Path]:
+        """
+        First existing candidate config JSON for a category
+
+        Candidates are in priority order and are probed up to the indexed
+        path, so a higher-priority file that appears later takes over.
+        """
+        indexed = self.config_index.get(category)
+
+        for path in candidates:
+            if str(path) == indexed:
+                if os.path.exists(indexed):
+                    return path
+                continue
+            if path.exists():
+                self.config_index[category] = str(path)
+                self._dirty = True
+                return path
+
+        if indexed:
+            del self.config_index[category]
+            self._dirty = True
+        return None
+
+    def get_mutation_class_name(self, py_file: Path) -> Optional[str]:
+        """Class name previously found in a mutation module, if the file is unchanged"""
+        key = str(Path(py_file).resolve())
+        entry = self.files.get(key)
+        if not entry:
+            return None
+
+        stat = os.stat(key)
+        if entry['mtime_ns'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+            return None
+        return self.mutation_index.get(key)
+
+    def set_mutation_class_name(self, py_file: Path, class_name: str):
+        """Remember which class a mutation module exports"""
+        key = str(Path(py_file).resolve())
+        stat = os.stat(key)
+        self.files[key] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': None,
+            'data': None,
+        }
+        self.mutation_index[key] = class_name
+        self._dirty = True
+
+    def prune(self):
+        """Drop entries for files that no longer exist"""
+        for key in [k for k in self.files if not os.path.exists(k)]:
+            del self.files[key]
+            self.mutation_index.pop(key, None)
+            self._dirty = True
@@ -0,0 +1,201 @@
+"""
+Campaign Writer
+Streaming exporter for generated machines
+
+Blueprint configs are stored once per campaign under blueprints/<digest>.json
+and machines point at them with 'blueprint_config_ref'. The manifest is
+streamed as machines arrive, and machine files are written by a small
+thread pool so export never holds more than the in-flight machines in memory.
+"""
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+from base import MachineConfig, blueprint_store
+
+
+def _compact(data: Any) -> str:
+    return json.dumps(data, separators=(',', ':'))
+
+
+def format_hints(machine: MachineConfig) -> str:
+    """hints.txt contents for a machine"""
+    lines = [
+        f"Machine: {machine.machine_id}",
+        f"Variant: {machine.variant}",
+        f"Difficulty: {machine.difficulty}/5",
+        "",
+        "Hints:",
+    ]
+    lines.extend(f"  • {hint}" for hint in machine.metadata.get('exploit_hints', []))
+    return "\n".join(lines) + "\n"
+
+
+def _write_machine_files(machine_dir: Path, files: Dict[str, bytes]):
+    machine_dir.mkdir(parents=True, exist_ok=True)
+    for name, content in files.items():
+        with open(machine_dir / name, 'wb') as f:
+            f.write(content)
+
+
+class CampaignWriter:
+    """
+    Streams machines into a campaign directory
+
+    Usage:
+        with CampaignWriter(output_path) as writer:
+            for machine in machines:
+                writer.add(machine)
+
+    Layout:
+        manifest.json              - machine index, written incrementally
+        blueprints/<digest>.json   - one file per distinct blueprint config
+        <machine_id>/config.json   - compact, with blueprint_config_ref
+        <machine_id>/flag.txt
+        <machine_id>/hints.txt
+    """
+
+    def __init__(self, output_path: Path, campaign_id: str = None, workers: int = 2,
+                 blueprint_dir: Path = None, manifest: bool = True):
+        self.output_path = Path(output_path)
+        self.campaign_id = campaign_id or self.output_path.name
+        self.blueprint_dir = Path(blueprint_dir) if blueprint_dir else self.output_path / "blueprints"
+
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        self.blueprint_dir.mkdir(parents=True, exist_ok=True)
+
+        self.machine_dirs: Dict[str, Path] = {}
+        self.blueprint_refs: List[str] = []
+
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="export")
+        self._futures = []
+        self._count = 0
+
+        self._manifest = None
+        if manifest:
+            self._manifest = open(self.output_path / "manifest.json", 'w', encoding='utf-8',
+                                  buffering=1 << 16)
+            self._manifest.write('{"campaign_id":%s,"created_at":%s,"machines":[' % (
+                _compact(self.campaign_id), _compact(time.strftime('%Y-%m-%d %H:%M:%S'))))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write_blueprint(self, digest: str):
+        if not digest or digest in self.blueprint_refs:
+            return
+
+        self.blueprint_refs.append(digest)
+        blueprint_file = self.blueprint_dir / f"{digest}.json"
+        if not blueprint_file.exists():
+            tmp_file = blueprint_file.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(blueprint_store.get(digest), f, indent=2)
+            os.replace(tmp_file, blueprint_file)
+
+    def add(self, machine: MachineConfig) -> Path:
+        """Queue a machine for writing and append it to the manifest"""
+        self._write_blueprint(machine.blueprint_config_ref)
+
+        if self._manifest:
+            # Full configs live in <machine_id>/config.json; the manifest only indexes them
+            entry = _compact({
+                'machine_id': machine.machine_id,
+                'blueprint_id': machine.blueprint_id,
+                'variant': machine.variant,
+                'difficulty': machine.difficulty,
+                'blueprint_config_ref': machine.blueprint_config_ref,
+                'config': f"{machine.machine_id}/config.json",
+            })
+            self._manifest.write((',' if self._count else '') + '\n' + entry)
+        self._count += 1
+
+        machine_dir = self.output_path / machine.machine_id
+        self.machine_dirs[machine.machine_id] = machine_dir
+        self._futures.append(self._executor.submit(_write_machine_files, machine_dir, {
+            'config.json': machine.to_json(),
+            'flag.txt': machine.flag['content'].encode(),
+            'hints.txt': format_hints(machine).encode(),
+        }))
+        return machine_dir
+
+    def close(self):
+        """Wait for pending writes and finish the manifest"""
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._futures = []
+
+            if self._manifest:
+                self._manifest.write('\n],"blueprints":%s,"total":%d}\n' % (
+                    _compact(self.blueprint_refs), self._count))
+                self._manifest.close()
+                self._manifest = None
+
+
+def write_manifest(output_path: Path, machines: List[MachineConfig], campaign_id: str = None) -> Path:
+    """Write a manifest.json in the CampaignWriter format for machines already on disk"""
+    output_path = Path(output_path)
+    manifest = {
+        'campaign_id': campaign_id or output_path.name,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'machines': [
+            {
+                'machine_id': machine.machine_id,
+                'blueprint_id': machine.blueprint_id,
+                'variant': machine.variant,
+                'difficulty': machine.difficulty,
+                'blueprint_config_ref': machine.blueprint_config_ref,
+                'config': f"{machine.machine_id}/config.json",
+            }
+            for machine in machines
+        ],
+        'blueprints': sorted({m.blueprint_config_ref for m in machines if m.blueprint_config_ref}),
+        'total': len(machines),
+    }
+
+    manifest_file = output_path / "manifest.json"
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        f.write(_compact(manifest))
+    return manifest_file
+
+
+def load_machine_config(machine_dir: Path, inline_config: bool = True) -> Dict[str, Any]:
+    """
+    Read a machine's config.json
+
+    Works for both layouts: legacy configs with an embedded
+    'blueprint_config' and streamed ones with 'blueprint_config_ref'.
+    Either way the blueprint config is interned in blueprint_store, so
+    loading many machines keeps one copy per distinct config. With
+    inline_config=False the result carries only the reference.
+    """
+    machine_dir = Path(machine_dir)
+    with open(machine_dir / "config.json", 'r') as f:
+        config = json.load(f)
+
+    embedded = config.pop('blueprint_config', None)
+    if embedded:
+        ref = blueprint_store.intern(embedded)
+    else:
+        ref = config.get('blueprint_config_ref')
+        if ref and ref not in blueprint_store:
+            blueprint_file = machine_dir.parent / "blueprints" / f"{ref}.json"
+            if blueprint_file.exists():
+                with open(blueprint_file, 'r') as f:
+                    blueprint_store.intern(json.load(f), digest=ref)
+
+    if inline_config:
+        config['blueprint_config'] = (blueprint_store.get(ref) if ref else None) or {}
+    else:
+        config['blueprint_config_ref'] = ref
+    return config
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Dockerfile Cache
+Generated Dockerfiles keyed by infrastructure fingerprint
+
+A blueprint's Dockerfile depends only on its infrastructure block (and the
+Dockerfile notes in its AI hints), so it is generated once per fingerprint
+and kept on disk across campaigns and restarts. Machines get a hard link to
+the shared artefact instead of their own copy.
+"""
+
+import os
+import json
+import time
+import shutil
+import argparse
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from base import config_digest
+
+# Bump when the Dockerfile prompt or post-processing changes
+DOCKERFILE_PROMPT_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".cache" / "dockerfiles"
+
+
+def infrastructure_fingerprint(blueprint_config: Dict) -> str:
+    """What a blueprint's Dockerfile depends on, hashed"""
+    return config_digest({
+        'version': DOCKERFILE_PROMPT_VERSION,
+        'infrastructure': blueprint_config.get('infrastructure', {}),
+        'dockerfile_notes': blueprint_config.get('ai_generation_hints', {}).get('dockerfile_notes', ''),
+    })
+
+
+class DockerfileCache:
+    """
+    Content-addressed Dockerfile store
+
+    Layout:
+        <fingerprint>.Dockerfile   - the artefact machines link to
+        <fingerprint>.json         - what it was generated for
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, fingerprint: str) -> Path:
+        return self.cache_dir / f"{fingerprint}.Dockerfile"
+
+    def _lock(self, fingerprint: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(fingerprint, threading.Lock())
+
+    def get(self, blueprint_config: Dict) -> Optional[Path]:
+        """Cached Dockerfile for a blueprint config, if there is one"""
+        path = self.path_for(infrastructure_fingerprint(blueprint_config))
+        return path if path.exists() else None
+
+    def get_or_create(self, blueprint_config: Dict, build: Callable[[], Optional[str]]) -> Optional[Path]:
+        """
+        Cached Dockerfile, generating it with build() on a miss
+
+        Concurrent callers with the same fingerprint wait for one build.
+        A build that returns nothing is not cached.
+        """
+        fingerprint = infrastructure_fingerprint(blueprint_config)
+        path = self.path_for(fingerprint)
+        if path.exists():
+            self.hits += 1
+            return path
+
+        with self._lock(fingerprint):
+            if path.exists():
+                self.hits += 1
+                return path
+
+            self.misses += 1
+            content = build()
+            if not content:
+                return None
+
+            tmp_file = path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp_file.write_text(content.rstrip('\n') + '\n')
+            os.replace(tmp_file, path)
+
+            with open(self.cache_dir / f"{fingerprint}.json", 'w') as f:
+                json.dump({
+                    'fingerprint': fingerprint,
+                    'blueprint': blueprint_config.get('name') or blueprint_config.get('category'),
+                    'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                }, f, indent=2)
+        return path
+
+    def install(self, blueprint_config: Dict, build: Callable[[], Optional[str]], dest: Path) -> bool:
+        """Put the shared Dockerfile at dest (hard link, or a copy across filesystems)"""
+        path = self.get_or_create(blueprint_config, build)
+        if path is None:
+            return False
+
+        dest = Path(dest)
+        # Never write through an existing link into the shared artefact
+        if dest.exists() or dest.is_symlink():
+            dest.unlink()
+        try:
+            os.link(path, dest)
+        except OSError:
+            shutil.copyfile(path, dest)
+        return True
+
+    def invalidate(self, blueprint_config: Dict = None, fingerprint: str = None) -> bool:
+        """Drop one cached Dockerfile so the next machine regenerates it"""
+        fingerprint = fingerprint or infrastructure_fingerprint(blueprint_config)
+        removed = False
+        for path in (self.path_for(fingerprint), self.cache_dir / f"{fingerprint}.json"):
+            if path.exists():
+                path.unlink()
+                removed = True
+        return removed
+
+    def entries(self) -> List[Dict]:
+        """Metadata of every cached Dockerfile"""
+        entries = []
+        for meta_file in sorted(self.cache_dir.glob("*.json")):
+            try:
+                with open(meta_file, 'r') as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def clear(self) -> int:
+        """Drop every cached Dockerfile; returns how many were removed"""
+        removed = 0
+        for path in self.cache_dir.glob("*.Dockerfile"):
+            self.invalidate(fingerprint=path.name[:-len(".Dockerfile")])
+            removed += 1
+        return removed
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_dockerfile_cache() -> Optional[DockerfileCache]:
+    """
+    Process-wide Dockerfile cache
+
+    HACKFORGE_DOCKERFILE_CACHE sets the directory; '0' disables caching.
+    """
+    global _default_cache
+
+    setting = os.getenv('HACKFORGE_DOCKERFILE_CACHE', str(DEFAULT_CACHE_DIR))
+    if setting == '0':
+        return None
+
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = DockerfileCache(Path(setting))
+    return _default_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hackforge Dockerfile cache')
+    parser.add_argument('--dir', default=os.getenv('HACKFORGE_DOCKERFILE_CACHE', str(DEFAULT_CACHE_DIR)))
+    parser.add_argument('--list', action='store_true', help='List cached Dockerfiles')
+    parser.add_argument('--invalidate', metavar='FINGERPRINT', help='Drop one cached Dockerfile')
+    parser.add_argument('--clear', action='store_true', help='Drop every cached Dockerfile')
+    args = parser.parse_args()
+
+    cache = DockerfileCache(Path(args.dir))
+
+    if args.invalidate:
+        print(f"{'✓ Invalidated' if cache.invalidate(fingerprint=args.invalidate) else '✗ Not cached:'} "
+              f"{args.invalidate}")
+    elif args.clear:
+        print(f"✓ Removed {cache.clear()} cached Dockerfile(s)")
+    else:
+        for entry in cache.entries():
+            print(f"  {entry['fingerprint']}  {entry.get('blueprint')}  {entry.get('created_at')}")
+
+
+if __name__ == "__main__":
+    main()
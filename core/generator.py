@@ -11,11 +11,34 @@ import yaml
 import json
 import time
 import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 # Import base classes
-from base import VulnerabilityBlueprint, MachineConfig, BlueprintLoader
+from base import VulnerabilityBlueprint, MachineConfig, BlueprintLoader, MutationEngine
+from blueprint_registry import BlueprintRegistry
+from machine_index import MachineIndex
+from campaign_writer import CampaignWriter
+
+
+def _mutate_worker(engine_class: type, blueprint: VulnerabilityBlueprint,
+                   seed: str, difficulty: int, derived: Dict = None) -> MachineConfig:
+    """Run one mutation in a pool worker (module-level so it can be pickled)"""
+    engine = engine_class(seed, derived=derived) if derived else engine_class(seed)
+    return engine.mutate(blueprint, difficulty)
+
+
+def _mutate_chunk(tasks: List[Tuple[type, VulnerabilityBlueprint, str, int, Dict]]) -> List[Tuple]:
+    """Run a chunk of mutations, capturing failures per task instead of raising"""
+    results = []
+    for engine_class, blueprint, seed, difficulty, derived in tasks:
+        try:
+            results.append((_mutate_worker(engine_class, blueprint, seed, difficulty, derived), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
 
 
 class DynamicHackforgeGenerator:
@@ -24,7 +47,7 @@ class DynamicHackforgeGenerator:
     No hardcoded imports needed!
     """
 
-    def __init__(self, core_dir: str = None):
+    def __init__(self, core_dir: str = None, use_cache: bool = True):
         import os
 
         if core_dir is None:
@@ -51,9 +74,25 @@ class DynamicHackforgeGenerator:
         self.blueprint_configs: Dict[str, Dict] = {}  # NEW: Store full JSON configs
         self.mutation_engines: Dict[str, type] = {}
 
+        # Hot reload: registries are swapped copy-on-write under this lock
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._watcher_stop = threading.Event()
+
+        # Every exported machine: machine_id -> directory (loaded lazily)
+        self.machine_index = MachineIndex(self.core_dir / "machine_index.log", base_dir=self.core_dir)
+
+        # Pre-parsed snapshot of blueprint/config files (None = always parse)
+        self.registry = BlueprintRegistry(self.core_dir / ".cache") if use_cache else None
+
         # Auto-discover everything
         self._discover_blueprints()
         self._discover_mutations()
+        self._compile_tables(self.blueprints.values(), self.mutation_engines)
+
+        if self.registry:
+            self.registry.prune()
+            self.registry.save()
 
         print(f"✓ Loaded {len(self.blueprints)} blueprints")
         print(f"✓ Loaded {len(self.mutation_engines)} mutation engines\n")
@@ -82,51 +121,74 @@ class DynamicHackforgeGenerator:
             return
 
         for yaml_file in self.blueprints_dir.glob("*_blueprint.yaml"):
-            try:
+            loaded = self._load_blueprint_file(yaml_file)
+            if loaded:
+                blueprint, config = loaded
+                self.blueprints[blueprint.blueprint_id] = blueprint
+                if config is not None:
+                    self.blueprint_configs[blueprint.category] = config
+
+    def _load_blueprint_file(self, yaml_file: Path) -> Optional[Tuple[VulnerabilityBlueprint, Optional[Dict]]]:
+        """Load one blueprint YAML and its JSON config without touching the live registries"""
+        try:
+            if self.registry:
+                data = self.registry.read_yaml(yaml_file)
+            else:
                 with open(yaml_file, 'r') as f:
                     data = yaml.safe_load(f)
 
-                blueprint = BlueprintLoader.load_from_dict(data)
-
-                if BlueprintLoader.validate_blueprint(blueprint):
-                    self.blueprints[blueprint.blueprint_id] = blueprint
-                    
-                    # NEW: Load full JSON config for AI
-                    # Try multiple possible filenames
-                    json_file = None
-                    possible_filenames = [
-                        f"{blueprint.category}.json",           # sql_injection.json
-                        f"{blueprint.blueprint_id}.json",       # sqli_001.json
-                        f"{'_'.join(blueprint.category.split('_')[:2])}.json",  # sql_injection.json
-                    ]
-                    
-                    # Also try short names like "sqli.json" from first part
-                    category_parts = blueprint.category.split('_')
-                    if len(category_parts) > 1:
-                        possible_filenames.append(f"{category_parts[0]}.json")  # sqli.json
-                    
-                    possible_paths = []
-                    for filename in possible_filenames:
-                        possible_paths.extend([
-                            self.configs_dir / filename,
-                            self.core_dir / "configs" / filename,
-                            self.blueprints_dir.parent / "configs" / filename,
-                        ])
-                    
-                    for path in possible_paths:
-                        if path.exists():
-                            json_file = path
-                            break
-                    
-                    if json_file and json_file.exists():
-                        with open(json_file, 'r') as f:
-                            self.blueprint_configs[blueprint.category] = json.load(f)
-                        print(f"  ✓ Loaded blueprint: {blueprint.name} (category: {blueprint.category}) + JSON config from {json_file.name}")
-                    else:
-                        print(f"  ✓ Loaded blueprint: {blueprint.name} (category: {blueprint.category}) [no JSON - tried: {', '.join([p.name for p in possible_paths[:3]])}]")
-
-            except Exception as e:
-                print(f"  ✗ Error loading {yaml_file.name}: {e}")
+            blueprint = BlueprintLoader.load_from_dict(data)
+
+            if not BlueprintLoader.validate_blueprint(blueprint):
+                print(f"  ✗ Invalid blueprint: {yaml_file.name}")
+                return None
+
+            # NEW: Load full JSON config for AI
+            # Try multiple possible filenames
+            json_file = None
+            possible_filenames = [
+                f"{blueprint.category}.json",           # sql_injection.json
+                f"{blueprint.blueprint_id}.json",       # sqli_001.json
+                f"{'_'.join(blueprint.category.split('_')[:2])}.json",  # sql_injection.json
+            ]
+
+            # Also try short names like "sqli.json" from first part
+            category_parts = blueprint.category.split('_')
+            if len(category_parts) > 1:
+                possible_filenames.append(f"{category_parts[0]}.json")  # sqli.json
+
+            possible_paths = []
+            for filename in possible_filenames:
+                possible_paths.extend([
+                    self.configs_dir / filename,
+                    self.core_dir / "configs" / filename,
+                    self.blueprints_dir.parent / "configs" / filename,
+                ])
+
+            if self.registry:
+                json_file = self.registry.resolve_config_path(blueprint.category, possible_paths)
+            else:
+                for path in possible_paths:
+                    if path.exists():
+                        json_file = path
+                        break
+
+            config = None
+            if json_file and json_file.exists():
+                if self.registry:
+                    config = self.registry.read_json(json_file)
+                else:
+                    with open(json_file, 'r') as f:
+                        config = json.load(f)
+                print(f"  ✓ Loaded blueprint: {blueprint.name} (category: {blueprint.category}) + JSON config from {json_file.name}")
+            else:
+                print(f"  ✓ Loaded blueprint: {blueprint.name} (category: {blueprint.category}) [no JSON - tried: {', '.join([p.name for p in possible_paths[:3]])}]")
+
+            return blueprint, config
+
+        except Exception as e:
+            print(f"  ✗ Error loading {yaml_file.name}: {e}")
+            return None
 
     def _discover_mutations(self):
         """Automatically discover all mutation engine Python files"""
@@ -139,32 +201,203 @@ class DynamicHackforgeGenerator:
         sys.path.insert(0, str(self.mutations_dir.parent))
 
         for py_file in self.mutations_dir.glob("*_mutation.py"):
-            try:
-                # Import the module dynamically
-                module_name = f"mutations.{py_file.stem}"
+            engine_class = self._load_mutation_file(py_file)
+            if engine_class:
+                # FIXED: Extract category from filename instead of class name
+                # Filename: cross_site_scripting_mutation.py -> cross_site_scripting
+                self.mutation_engines[py_file.stem.replace('_mutation', '')] = engine_class
+
+    def _compile_tables(self, blueprints, engines: Dict[str, type]):
+        """Precompile sampling tables for table-driven engines at registration time"""
+        for blueprint in blueprints:
+            engine_class = engines.get(blueprint.category)
+            if engine_class is not None and hasattr(engine_class, 'tables_for'):
+                try:
+                    engine_class.tables_for(blueprint)
+                except Exception as e:
+                    print(f"  ⚠️ Could not compile mutation tables for {blueprint.blueprint_id}: {e}")
+
+    def _load_mutation_file(self, py_file: Path, reload: bool = False) -> Optional[type]:
+        """Import one mutation module and return its engine class"""
+        try:
+            # Import the module dynamically
+            module_name = f"mutations.{py_file.stem}"
+            if reload and module_name in sys.modules:
+                importlib.invalidate_caches()
+                module = importlib.reload(sys.modules[module_name])
+            else:
                 module = importlib.import_module(module_name)
 
-                # Find the mutation class (should end with "Mutation")
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
+            category = py_file.stem.replace('_mutation', '')
 
-                    # Check if it's a class and ends with "Mutation"
-                    if (isinstance(attr, type) and
-                        attr_name.endswith("Mutation") and
-                        attr_name != "MutationEngine"):
+            # FAST PATH: class name already known from the registry snapshot
+            cached_name = self.registry.get_mutation_class_name(py_file) if self.registry else None
+            if cached_name and isinstance(getattr(module, cached_name, None), type):
+                print(f"  ✓ Loaded mutation: {cached_name} (category: {category})")
+                return getattr(module, cached_name)
 
-                        # FIXED: Extract category from filename instead of class name
-                        # Filename: cross_site_scripting_mutation.py -> cross_site_scripting
-                        category = py_file.stem.replace('_mutation', '')
+            # Find the mutation class (should end with "Mutation")
+            for attr_name in dir(module):
+                attr = getattr(module, attr_name)
 
-                        self.mutation_engines[category] = attr
-                        print(f"  ✓ Loaded mutation: {attr_name} (category: {category})")
-                        break
+                # Check if it's a class defined here (not an imported base) ending with "Mutation"
+                if (isinstance(attr, type) and
+                    attr_name.endswith("Mutation") and
+                    attr_name != "MutationEngine" and
+                    attr.__module__ == module.__name__):
+
+                    if self.registry:
+                        self.registry.set_mutation_class_name(py_file, attr_name)
+                    print(f"  ✓ Loaded mutation: {attr_name} (category: {category})")
+                    return attr
+
+            print(f"  ✗ No *Mutation class in {py_file.name}")
+
+        except Exception as e:
+            print(f"  ✗ Error loading {py_file.name}: {e}")
+            import traceback
+            traceback.print_exc()
+
+        return None
+
+    # ------------------------------------------------------------------
+    # Hot reload
+    # ------------------------------------------------------------------
+
+    def register_blueprint(self, yaml_path: str) -> Optional[VulnerabilityBlueprint]:
+        """
+        Load (or reload) a single blueprint plus its JSON config and mutation engine
+
+        Only the files for this blueprint's category are read. The live
+        registries are replaced copy-on-write, so requests that already hold
+        a reference to the old dicts keep a consistent view.
+        """
+
+        yaml_file = Path(yaml_path)
+        loaded = self._load_blueprint_file(yaml_file)
+        if not loaded:
+            return None
+
+        blueprint, config = loaded
+
+        mutation_file = self.mutations_dir / f"{blueprint.category}_mutation.py"
+        engine_class = None
+        if mutation_file.exists():
+            if str(self.mutations_dir.parent) not in sys.path:
+                sys.path.insert(0, str(self.mutations_dir.parent))
+            engine_class = self._load_mutation_file(mutation_file, reload=True)
+
+        self._compile_tables([blueprint], {blueprint.category: engine_class or self.mutation_engines.get(blueprint.category)})
+
+        with self._reload_lock:
+            # Drop stale blueprints of the same category (e.g. the ID was renamed)
+            blueprints = {
+                bp_id: bp for bp_id, bp in self.blueprints.items()
+                if bp.category != blueprint.category
+            }
+            blueprints[blueprint.blueprint_id] = blueprint
+
+            blueprint_configs = dict(self.blueprint_configs)
+            if config is not None:
+                blueprint_configs[blueprint.category] = config
+            else:
+                blueprint_configs.pop(blueprint.category, None)
 
-            except Exception as e:
-                print(f"  ✗ Error loading {py_file.name}: {e}")
-                import traceback
-                traceback.print_exc()
+            mutation_engines = dict(self.mutation_engines)
+            if engine_class:
+                mutation_engines[blueprint.category] = engine_class
+
+            self.blueprints = blueprints
+            self.blueprint_configs = blueprint_configs
+            self.mutation_engines = mutation_engines
+
+            if self.registry:
+                self.registry.save()
+
+        return blueprint
+
+    def reload_category(self, category: str) -> Optional[VulnerabilityBlueprint]:
+        """Reload the blueprint, config and mutation engine for one category"""
+        yaml_file = self.blueprints_dir / f"{category}_blueprint.yaml"
+
+        if yaml_file.exists():
+            return self.register_blueprint(str(yaml_file))
+
+        # Blueprint file stored under a different name - find it by category
+        for candidate in self.blueprints_dir.glob("*_blueprint.yaml"):
+            try:
+                if self.registry:
+                    data = self.registry.read_yaml(candidate)
+                else:
+                    with open(candidate, 'r') as f:
+                        data = yaml.safe_load(f)
+            except Exception:
+                continue
+            if isinstance(data, dict) and data.get('category') == category:
+                return self.register_blueprint(str(candidate))
+
+        print(f"✗ No blueprint file for category: {category}")
+        return None
+
+    def start_watcher(self, interval: float = 2.0) -> threading.Thread:
+        """
+        Poll blueprints/, configs/ and mutations/ and hot-reload changed categories
+
+        Category is derived from the filename convention used by vuln_generator:
+        <category>_blueprint.yaml, <category>.json and <category>_mutation.py.
+        """
+
+        if self._watcher and self._watcher.is_alive():
+            return self._watcher
+
+        def snapshot() -> Dict[str, int]:
+            stamps = {}
+            for pattern_dir, pattern in ((self.blueprints_dir, "*_blueprint.yaml"),
+                                         (self.configs_dir, "*.json"),
+                                         (self.mutations_dir, "*_mutation.py")):
+                if pattern_dir.exists():
+                    for path in pattern_dir.glob(pattern):
+                        try:
+                            stamps[str(path)] = path.stat().st_mtime_ns
+                        except OSError:
+                            pass
+            return stamps
+
+        def category_for(path: str) -> str:
+            name = Path(path).name
+            for suffix in ("_blueprint.yaml", "_mutation.py", ".json"):
+                if name.endswith(suffix):
+                    return name[:-len(suffix)]
+            return name
+
+        def watch():
+            previous = snapshot()
+            while not self._watcher_stop.wait(interval):
+                current = snapshot()
+                changed = {
+                    category_for(path) for path, stamp in current.items()
+                    if previous.get(path) != stamp
+                }
+                previous = current
+
+                for category in sorted(changed):
+                    print(f"🔄 Change detected, reloading category: {category}")
+                    try:
+                        self.reload_category(category)
+                    except Exception as e:
+                        print(f"  ✗ Reload failed for {category}: {e}")
+
+        self._watcher_stop.clear()
+        self._watcher = threading.Thread(target=watch, name="blueprint-watcher", daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watcher(self):
+        """Stop the filesystem watcher if running"""
+        self._watcher_stop.set()
+        if self._watcher:
+            self._watcher.join(timeout=5)
+            self._watcher = None
 
     def list_all_blueprints(self) -> List[Dict]:
         """List all available blueprints"""
@@ -206,11 +439,12 @@ class DynamicHackforgeGenerator:
         try:
             engine = engine_class(seed)
             config = engine.mutate(blueprint, difficulty)
+            config = self._ensure_unique_id(config, engine_class, blueprint, difficulty)
             
             # NEW: Attach full blueprint JSON config for AI
             if blueprint.category in self.blueprint_configs:
                 config.blueprint_config = self.blueprint_configs[blueprint.category]
-                print(f"  ✓ Attached full config ({len(json.dumps(config.blueprint_config))} bytes)")
+                print(f"  ✓ Attached full config ({blueprint.category})")
             
             return config
         except Exception as e:
@@ -219,6 +453,38 @@ class DynamicHackforgeGenerator:
             traceback.print_exc()
             return None
 
+    MAX_ID_RETRIES = 8
+
+    def _id_in_use(self, machine: MachineConfig) -> bool:
+        """True if another machine (different seed) was already exported under this ID"""
+        if machine.machine_id not in self.machine_index:
+            return False
+
+        # Regenerating from the same seed reproduces the same machine - not a collision
+        location = self.machine_index.locate(machine.machine_id)
+        try:
+            with open(location / "config.json") as f:
+                return json.load(f).get('seed') != machine.seed
+        except (TypeError, OSError, ValueError):
+            return True
+
+    def _ensure_unique_id(self, machine: MachineConfig, engine_class: type,
+                          blueprint: VulnerabilityBlueprint, difficulty: int,
+                          taken: set = None) -> MachineConfig:
+        """Re-derive a machine from a suffixed seed while its ID is already in use"""
+        attempt = 0
+        base_seed = machine.seed
+        while self._id_in_use(machine) or (taken is not None and machine.machine_id in taken):
+            attempt += 1
+            if attempt > self.MAX_ID_RETRIES:
+                raise RuntimeError(f"Could not derive a unique machine ID from seed {base_seed}")
+            print(f"  ⚠️ Machine ID collision: {machine.machine_id}, re-deriving (attempt {attempt})")
+            machine = _mutate_worker(engine_class, blueprint, f"{base_seed}#{attempt}", difficulty)
+
+        if taken is not None:
+            taken.add(machine.machine_id)
+        return machine
+
     def generate_single_machine(self, blueprint_id: str = None, difficulty: int = 2,
                                 user_id: str = "user") -> Optional[MachineConfig]:
         """Generate a single machine and export to generated_machines directory"""
@@ -268,40 +534,54 @@ class DynamicHackforgeGenerator:
             print("✗ Failed to generate machine")
             return None
 
-    def export_single_machine(self, machine: MachineConfig) -> str:
-        """Export a single machine to generated_machines directory"""
+    def export_single_machine(self, machine: MachineConfig, streaming: bool = False) -> str:
+        """
+        Export a single machine to generated_machines directory
+
+        With streaming=True the blueprint config goes to the shared
+        generated_machines/blueprints/ store instead of into config.json.
+        """
 
         # Create generated_machines directory structure
         output_dir = self.core_dir / "generated_machines" / machine.machine_id
-        output_dir.mkdir(parents=True, exist_ok=True)
+        self.machine_index.add(machine.machine_id, str(output_dir))
 
         print(f"\nExporting to: {output_dir}")
         print("-"*60)
 
-        # Export config (now includes blueprint_config!)
-        config_file = output_dir / "config.json"
-        with open(config_file, 'w') as f:
-            json.dump(machine.to_dict(), f, indent=2)
-        print(f"✓ Config: {config_file}")
-
-        # Export flag
-        flag_file = output_dir / "flag.txt"
-        with open(flag_file, 'w') as f:
-            f.write(machine.flag['content'])
-        print(f"✓ Flag: {flag_file}")
-
-        # Export hints
-        hints_file = output_dir / "hints.txt"
-        with open(hints_file, 'w') as f:
-            hints = machine.metadata.get('exploit_hints', [])
-            f.write(f"Machine: {machine.machine_id}\n")
-            f.write(f"Name: {machine.metadata.get('vuln_name', 'Unknown')}\n")
-            f.write(f"Variant: {machine.variant}\n")
-            f.write(f"Difficulty: {machine.difficulty}/5\n\n")
-            f.write("Hints:\n")
-            for hint in hints:
-                f.write(f"  • {hint}\n")
-        print(f"✓ Hints: {hints_file}")
+        if streaming:
+            with CampaignWriter(output_dir.parent, workers=1, manifest=False) as writer:
+                writer.add(machine)
+            print(f"✓ Config: {output_dir / 'config.json'}")
+            print(f"✓ Flag: {output_dir / 'flag.txt'}")
+            print(f"✓ Hints: {output_dir / 'hints.txt'}")
+        else:
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            # Export config (now includes blueprint_config!)
+            config_file = output_dir / "config.json"
+            with open(config_file, 'w') as f:
+                json.dump(machine.to_dict(), f, indent=2)
+            print(f"✓ Config: {config_file}")
+
+            # Export flag
+            flag_file = output_dir / "flag.txt"
+            with open(flag_file, 'w') as f:
+                f.write(machine.flag['content'])
+            print(f"✓ Flag: {flag_file}")
+
+            # Export hints
+            hints_file = output_dir / "hints.txt"
+            with open(hints_file, 'w') as f:
+                hints = machine.metadata.get('exploit_hints', [])
+                f.write(f"Machine: {machine.machine_id}\n")
+                f.write(f"Name: {machine.metadata.get('vuln_name', 'Unknown')}\n")
+                f.write(f"Variant: {machine.variant}\n")
+                f.write(f"Difficulty: {machine.difficulty}/5\n\n")
+                f.write("Hints:\n")
+                for hint in hints:
+                    f.write(f"  • {hint}\n")
+            print(f"✓ Hints: {hints_file}")
 
         # Export README
         readme_file = output_dir / "README.md"
@@ -322,15 +602,96 @@ class DynamicHackforgeGenerator:
 
         return str(output_dir)
 
-    def generate_campaign(self, user_id: str, difficulty: int = 2, count: int = None, blueprint_ids: List[str] = None) -> List[MachineConfig]:
+    def generate_batch(self, jobs: List[Tuple[str, str, int]], workers: int = 1,
+                       use_processes: bool = False) -> List[Dict]:
         """
-        Generate a campaign with multiple machines
+        Generate many machines, optionally fanned out over a worker pool
 
         Args:
-            user_id: User identifier
-            difficulty: Target difficulty level (1-5)
-            count: Number of machines to generate
-            blueprint_ids: Optional list of specific blueprint IDs to use
+            jobs: List of (blueprint_id, seed, difficulty) tuples
+            workers: Number of pool workers (1 = run inline)
+            use_processes: Use a process pool instead of a thread pool
+
+        Returns:
+            One result dict per job, in input order, with keys
+            'index', 'blueprint_id', 'seed', 'machine' and 'error'.
+            A failed job has machine=None and an error message; it never
+            aborts the rest of the batch.
+        """
+
+        results = []
+        pending = []
+
+        # Resolve blueprints and engines up front so workers only run mutate()
+        for index, (blueprint_id, seed, difficulty) in enumerate(jobs):
+            result = {
+                'index': index,
+                'blueprint_id': blueprint_id,
+                'seed': seed,
+                'machine': None,
+                'error': None,
+            }
+            results.append(result)
+
+            blueprint = self.blueprints.get(blueprint_id)
+            if not blueprint:
+                result['error'] = f"Blueprint not found: {blueprint_id}"
+                continue
+
+            engine_class = self.mutation_engines.get(blueprint.category)
+            if not engine_class:
+                result['error'] = f"No mutation engine for category: {blueprint.category}"
+                continue
+
+            pending.append((result, engine_class, blueprint, seed, difficulty))
+
+        # Machine IDs and flags for the whole batch in one hashing pass
+        derived = MutationEngine.derive_many([task[3] for task in pending])
+        tasks = [task[1:] + (d,) for task, d in zip(pending, derived)]
+
+        if workers <= 1 or len(pending) <= 1:
+            outcomes = _mutate_chunk(tasks)
+        else:
+            # Hand each worker a few contiguous chunks to keep per-task overhead low;
+            # chunks are collected in submission order so output order matches input
+            chunk_size = max(1, -(-len(tasks) // (workers * 4)))
+            chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+
+            executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+            outcomes = []
+            with executor_class(max_workers=workers) as executor:
+                for chunk_outcomes in executor.map(_mutate_chunk, chunks):
+                    outcomes.extend(chunk_outcomes)
+
+        taken = set()
+        for (result, engine_class, blueprint, seed, difficulty), (machine, error) in zip(pending, outcomes):
+            if machine is not None:
+                try:
+                    machine = self._ensure_unique_id(machine, engine_class, blueprint, difficulty, taken)
+                    result['seed'] = machine.seed
+                except Exception as e:
+                    machine, error = None, str(e)
+            result['machine'] = machine
+            result['error'] = error
+
+        # Attach blueprint configs in the parent so workers never ship them around
+        for result in results:
+            machine = result['machine']
+            if machine is None:
+                continue
+            category = self.blueprints[result['blueprint_id']].category
+            if category in self.blueprint_configs:
+                machine.blueprint_config = self.blueprint_configs[category]
+
+        return results
+
+    def plan_campaign(self, count: int = None,
+                      blueprint_ids: List[str] = None) -> Tuple[Dict[str, VulnerabilityBlueprint], List[str]]:
+        """
+        Decide which blueprint each campaign slot uses
+
+        Returns:
+            (available blueprints, one blueprint ID per machine)
         """
 
         # NEW: Filter blueprints if specific ones are selected
@@ -348,13 +709,36 @@ class DynamicHackforgeGenerator:
 
         if not available_blueprints:
             print("✗ No blueprints available!")
-            return []
+            return available_blueprints, []
 
         # Determine how many machines to generate
         if count is None:
             count = min(len(available_blueprints), 5)
 
-        machines = []
+        # If count > available blueprints, cycle through them
+        blueprint_ids = list(available_blueprints.keys())
+        return available_blueprints, [blueprint_ids[i % len(blueprint_ids)] for i in range(count)]
+
+    def generate_campaign(self, user_id: str, difficulty: int = 2, count: int = None,
+                          blueprint_ids: List[str] = None, workers: int = 1,
+                          use_processes: bool = False) -> List[MachineConfig]:
+        """
+        Generate a campaign with multiple machines
+
+        Args:
+            user_id: User identifier
+            difficulty: Target difficulty level (1-5)
+            count: Number of machines to generate
+            blueprint_ids: Optional list of specific blueprint IDs to use
+            workers: Number of parallel generation workers (1 = sequential)
+            use_processes: Use a process pool instead of a thread pool
+        """
+
+        available_blueprints, blueprint_list = self.plan_campaign(count, blueprint_ids)
+        if not blueprint_list:
+            return []
+        count = len(blueprint_list)
+
         timestamp = int(time.time())
 
         print(f"\n{'='*60}")
@@ -363,44 +747,46 @@ class DynamicHackforgeGenerator:
         print(f"User ID: {user_id}")
         print(f"Difficulty: {difficulty}/5")
         print(f"Machines: {count}")
+        print(f"Workers: {workers} ({'processes' if use_processes else 'threads'})")
         print()
 
-        # Select from available blueprints
-        import random
-        blueprint_list = list(available_blueprints.keys())
-
-        # If count > available blueprints, cycle through them
-        selected_ids = []
-        for i in range(count):
-            selected_ids.append(blueprint_list[i % len(blueprint_list)])
-
-        for i, blueprint_id in enumerate(selected_ids, 1):
-            seed = f"{user_id}_{blueprint_id}_{timestamp}_{i}"
+        jobs = []
+        for i, blueprint_id in enumerate(blueprint_list):
+            seed = f"{user_id}_{blueprint_id}_{timestamp}_{i + 1}"
+            jobs.append((blueprint_id, seed, difficulty))
 
-            blueprint = available_blueprints[blueprint_id]
-            print(f"[{i}/{count}] Generating: {blueprint.name}")
+        results = self.generate_batch(jobs, workers=workers, use_processes=use_processes)
 
-            machine = self.generate_machine(blueprint_id, seed, difficulty)
+        machines = []
+        for result in results:
+            blueprint = available_blueprints[result['blueprint_id']]
+            print(f"[{result['index'] + 1}/{count}] {blueprint.name}")
 
+            machine = result['machine']
             if machine:
                 machines.append(machine)
                 print(f"  ✓ Machine ID: {machine.machine_id}")
                 print(f"  ✓ Variant: {machine.variant}")
                 print(f"  ✓ Flag: {machine.flag['content'][:30]}...")
             else:
-                print(f"  ✗ Failed to generate")
-
-            print()
+                print(f"  ✗ Failed to generate: {result['error']}")
 
-        print(f"{'='*60}")
+        print(f"\n{'='*60}")
         print(f"✓ Generated {len(machines)}/{count} machines")
         print(f"{'='*60}\n")
 
         return machines
 
 
-    def export_campaign(self, machines: List[MachineConfig], output_dir: str = None) -> str:
-        """Export campaign to directory"""
+    def export_campaign(self, machines: List[MachineConfig], output_dir: str = None,
+                        streaming: bool = False, workers: int = 2) -> str:
+        """
+        Export campaign to directory
+
+        With streaming=True the campaign is written through a CampaignWriter:
+        compact config.json files that reference a single copy of each
+        blueprint config, and a manifest written as machines are exported.
+        """
 
         if not machines:
             print("✗ No machines to export!")
@@ -417,6 +803,16 @@ class DynamicHackforgeGenerator:
         print(f"\nExporting to: {output_path}")
         print("="*60)
 
+        if streaming:
+            with CampaignWriter(output_path, workers=workers) as writer:
+                for machine in machines:
+                    writer.add(machine)
+            self.machine_index.add_many((machine_id, str(path)) for machine_id, path in writer.machine_dirs.items())
+
+            print(f"\n✓ Manifest: {output_path / 'manifest.json'}")
+            print(f"✓ Exported {len(machines)} machines ({len(writer.blueprint_refs)} blueprint configs)")
+            return str(output_path)
+
         # Export each machine
         for machine in machines:
             machine_dir = output_path / machine.machine_id
@@ -445,6 +841,8 @@ class DynamicHackforgeGenerator:
 
             print(f"  ✓ {machine.machine_id}")
 
+        self.machine_index.add_many((m.machine_id, str(output_path / m.machine_id)) for m in machines)
+
         # Export manifest with campaign_id
         campaign_id = output_path.name  # Get campaign_id from directory name
         manifest = {
@@ -506,6 +904,12 @@ def main():
                        help='Number of machines for campaign')
     parser.add_argument('--user', type=str, default='demo_user',
                        help='User ID for generation')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Parallel generation workers for campaigns')
+    parser.add_argument('--processes', action='store_true',
+                       help='Use a process pool instead of threads for campaigns')
+    parser.add_argument('--streaming', action='store_true',
+                       help='Streaming export: compact configs, one copy of each blueprint config')
 
     args = parser.parse_args()
 
@@ -551,7 +955,7 @@ def main():
 
             if machine:
                 # Export this machine
-                output_path = generator.export_single_machine(machine)
+                output_path = generator.export_single_machine(machine, streaming=args.streaming)
                 generated_machines.append(machine)
 
                 print(f"✓ Machine ID: {machine.machine_id}")
@@ -587,12 +991,14 @@ def main():
         machines = generator.generate_campaign(
             user_id=args.user,
             difficulty=args.difficulty,
-            count=args.count
+            count=args.count,
+            workers=args.workers,
+            use_processes=args.processes
         )
 
         if machines:
             # Export campaign
-            output_path = generator.export_campaign(machines)
+            output_path = generator.export_campaign(machines, streaming=args.streaming)
 
             print("\n" + "="*60)
             print("NEXT STEPS")
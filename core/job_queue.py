@@ -0,0 +1,380 @@
+"""
+Job Queue
+Background jobs made of stages, run in a process pool
+
+A job is a named pipeline of stages. Each stage is a module-level function
+that takes the job context (a JSON-serialisable dict) and returns what it
+adds to it. Stages run one after another in worker processes, so long
+generation and docker steps never block the event loop that submitted them.
+
+Every state change is recorded per stage (status, start, end, seconds),
+persisted to jobs_dir and pushed to subscribers, which is what the API
+streams to clients. Failed, cancelled or interrupted jobs can be retried;
+a retry resumes at the first stage that didn't succeed.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import multiprocessing
+import traceback
+import concurrent.futures
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# (name, function(context) -> dict of additions)
+Stage = Tuple[str, Callable[[Dict], Optional[Dict]]]
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+# Was running when the process that owned it stopped
+INTERRUPTED = 'interrupted'
+
+FINISHED = (SUCCEEDED, FAILED, CANCELLED, INTERRUPTED)
+
+
+@dataclass
+class StageRecord:
+    name: str
+    status: str = 'pending'
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    context: Dict
+    stages: List[StageRecord]
+    status: str = QUEUED
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    attempts: int = 1
+    error: Optional[str] = None
+    result: Optional[Dict] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def current_stage(self) -> Optional[str]:
+        for stage in self.stages:
+            if stage.status == RUNNING:
+                return stage.name
+        return None
+
+    @property
+    def progress(self) -> float:
+        """Fraction of stages that succeeded"""
+        if not self.stages:
+            return 1.0
+        return sum(1 for stage in self.stages if stage.status == SUCCEEDED) / len(self.stages)
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['progress'] = round(self.progress, 3)
+        data['current_stage'] = self.current_stage
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Job':
+        data = dict(data)
+        data.pop('progress', None)
+        data.pop('current_stage', None)
+        data['stages'] = [StageRecord(**stage) for stage in data.get('stages', [])]
+        return cls(**data)
+
+
+@dataclass
+class _Pipeline:
+    stages: List[Stage]
+    # Runs in the queue's event loop once every stage succeeded: job -> result
+    # (a coroutine function is awaited)
+    finalize: Optional[Callable[[Job], Optional[Dict]]] = None
+
+
+class JobQueue:
+    """
+    Runs staged jobs in a process pool
+
+    submit/cancel/retry must be called from the event loop the queue runs in
+    (any async API handler). A stage that is already executing in a worker
+    can't be interrupted; cancelling marks the job cancelled right away and
+    the stage's result is discarded when it finishes.
+
+    Args:
+        jobs_dir: Where job records are persisted, or None to keep them in memory
+        max_workers: Worker processes, which is also how many jobs run at once
+        executor: Pre-built executor (e.g. a thread pool); overrides max_workers
+        keep: Finished jobs kept before the oldest are forgotten
+    """
+
+    def __init__(self, jobs_dir: Path = None, max_workers: int = 2,
+                 executor: concurrent.futures.Executor = None, keep: int = 200):
+        self.jobs_dir = Path(jobs_dir) if jobs_dir else None
+        self.max_workers = max(1, max_workers)
+        self.keep = keep
+
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._pipelines: Dict[str, _Pipeline] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._slots = asyncio.Semaphore(self.max_workers)
+
+        if self.jobs_dir:
+            self.jobs_dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    def register(self, kind: str, stages: List[Stage], finalize: Callable[[Job], Optional[Dict]] = None):
+        """Declare a kind of job and its stages"""
+        self._pipelines[kind] = _Pipeline(list(stages), finalize)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        for job_file in sorted(self.jobs_dir.glob("*.json")):
+            try:
+                with open(job_file, 'r') as f:
+                    job = Job.from_dict(json.load(f))
+            except (OSError, ValueError, TypeError):
+                continue
+
+            if not job.done:
+                job.status = INTERRUPTED
+                job.error = "API restarted while the job was running"
+                for stage in job.stages:
+                    if stage.status == RUNNING:
+                        stage.status = INTERRUPTED
+                self._save(job)
+            self._jobs[job.job_id] = job
+
+    def _save(self, job: Job):
+        if not self.jobs_dir:
+            return
+        job_file = self.jobs_dir / f"{job.job_id}.json"
+        tmp_file = job_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(job.to_dict(), f, indent=2, default=str)
+        os.replace(tmp_file, job_file)
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.created)
+        for job in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[job.job_id]
+            if self.jobs_dir:
+                (self.jobs_dir / f"{job.job_id}.json").unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    def _publish(self, job: Job):
+        self._save(job)
+        snapshot = job.to_dict()
+        for subscriber in self._subscribers.get(job.job_id, []):
+            subscriber.put_nowait(snapshot)
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict]:
+        """Snapshots of a job: the current one, then one per change until it finishes"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+
+        subscriber: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(subscriber)
+        try:
+            snapshot = job.to_dict()
+            yield snapshot
+            while snapshot['status'] not in FINISHED:
+                snapshot = await subscriber.get()
+                yield snapshot
+        finally:
+            subscribers = self._subscribers.get(job_id, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    async def wait(self, job_id: str) -> Job:
+        """Wait for a job to finish"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        async for _ in self.events(job_id):
+            pass
+        return job
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        if self._executor is None:
+            # Never fork the API process: it holds an event loop, threads and client sockets
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self._executor
+
+    def _start(self, job: Job):
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+
+    def submit(self, kind: str, context: Dict) -> Job:
+        """Queue a job and return it immediately"""
+        pipeline = self._pipelines.get(kind)
+        if pipeline is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job = Job(
+            job_id=uuid.uuid4().hex[:12],
+            kind=kind,
+            context=dict(context),
+            stages=[StageRecord(name) for name, _ in pipeline.stages],
+        )
+        self._jobs[job.job_id] = job
+        self._prune()
+        self._publish(job)
+        self._start(job)
+        return job
+
+    async def _run(self, job: Job):
+        pipeline = self._pipelines[job.kind]
+        functions = dict(pipeline.stages)
+        loop = asyncio.get_running_loop()
+        stage = None
+
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job.started = job.started or time.time()
+                self._publish(job)
+
+                for stage in job.stages:
+                    if stage.status == SUCCEEDED:
+                        continue
+
+                    stage.status = RUNNING
+                    stage.started = time.time()
+                    stage.finished = stage.seconds = stage.error = None
+                    self._publish(job)
+
+                    additions = await loop.run_in_executor(self.executor, functions[stage.name],
+                                                           dict(job.context))
+                    if additions:
+                        job.context.update(additions)
+
+                    stage.status = SUCCEEDED
+                    stage.finished = time.time()
+                    stage.seconds = round(stage.finished - stage.started, 3)
+                    self._publish(job)
+
+                stage = None
+                if pipeline.finalize:
+                    job.result = pipeline.finalize(job)
+                    if asyncio.iscoroutine(job.result):
+                        job.result = await job.result
+                job.status = SUCCEEDED
+
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            job.error = "Cancelled"
+            if stage is not None and stage.status == RUNNING:
+                stage.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = f"{type(e).__name__}: {e}"
+            if stage is not None and stage.status == RUNNING:
+                stage.status = FAILED
+                stage.error = job.error
+                stage.finished = time.time()
+                stage.seconds = round(stage.finished - stage.started, 3)
+            print(f"✗ Job {job.job_id} ({job.kind}) failed: {job.error}")
+            traceback.print_exc()
+        finally:
+            job.finished = time.time()
+            self._publish(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it already finished"""
+        job = self._jobs.get(job_id)
+        task = self._tasks.get(job_id)
+        if job is None or job.done or task is None:
+            return False
+        task.cancel()
+        return True
+
+    def retry(self, job_id: str) -> Job:
+        """Re-run a finished, unsuccessful job from its first incomplete stage"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.status not in (FAILED, CANCELLED, INTERRUPTED):
+            raise ValueError(f"Job {job_id} is {job.status}; only failed, cancelled or interrupted jobs can be retried")
+        if job.kind not in self._pipelines:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+
+        for stage in job.stages:
+            if stage.status != SUCCEEDED:
+                stage.status = 'pending'
+                stage.started = stage.finished = stage.seconds = stage.error = None
+        job.status = QUEUED
+        job.error = None
+        job.finished = None
+        job.attempts += 1
+        self._publish(job)
+        self._start(job)
+        return job
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self, kind: str = None, status: str = None, limit: int = 50) -> List[Job]:
+        """Most recent jobs first"""
+        jobs = [job for job in self._jobs.values()
+                if (kind is None or job.kind == kind) and (status is None or job.status == status)]
+        jobs.sort(key=lambda job: job.created, reverse=True)
+        return jobs[:limit]
+
+    def active(self) -> List[Job]:
+        """Jobs that haven't finished yet"""
+        return [job for job in self._jobs.values() if not job.done]
+
+    def stats(self) -> Dict:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            'workers': self.max_workers,
+            'running': sum(1 for job in self._jobs.values() if job.status == RUNNING),
+            'jobs': counts,
+        }
+
+    def shutdown(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._executor is not None and self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
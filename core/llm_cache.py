@@ -0,0 +1,265 @@
+"""
+LLM Response Cache
+Content-addressed cache for AI completions
+
+Responses are keyed by a hash of the endpoint, system prompt, user prompt
+and temperature. Machines that share a (category, variant, context, filters,
+difficulty) tuple build identical prompts, so they reuse one completion
+instead of each waiting on the LLM.
+
+Two tiers: a small in-memory LRU in front of a SQLite file. The SQLite tier
+is bounded by total size and entry age. With diversity=K the cache keeps up
+to K completions per key and rotates through them once it has collected K,
+so campaigns still see some variety in generated code.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from base import dumps_json
+
+DEFAULT_CACHE_FILE = Path(__file__).parent / ".cache" / "llm_responses.sqlite3"
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + SQLite) completion cache
+
+    Args:
+        path: SQLite file, or None for a memory-only cache
+        memory_entries: Keys kept in the in-memory LRU tier
+        max_bytes: Total response size kept on disk before the least
+                   recently used entries are evicted
+        max_age: Seconds after which entries expire
+        diversity: Completions kept (and rotated through) per key
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL,
+            PRIMARY KEY (key, slot)
+        );
+        CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+        CREATE INDEX IF NOT EXISTS responses_created ON responses (created);
+    """
+
+    # Run size/age eviction after this many writes
+    EVICT_EVERY = 64
+
+    def __init__(self, path: Optional[Path] = DEFAULT_CACHE_FILE, memory_entries: int = 256,
+                 max_bytes: int = 256 * 1024 * 1024, max_age: float = 30 * 24 * 3600,
+                 diversity: int = 1):
+        self.path = Path(path) if path else None
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.diversity = max(1, diversity)
+
+        # key -> [variants, next rotation index]
+        self._memory: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._db = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(self.SCHEMA)
+            self.evict()
+
+    @staticmethod
+    def key(system_prompt: str, user_prompt: str, temperature: float, endpoint: str = "") -> str:
+        """Cache key for a completion request"""
+        payload = dumps_json([endpoint, system_prompt, user_prompt, round(float(temperature), 4)])
+        return hashlib.sha256(payload).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, variants: List[str]):
+        # Caller holds the lock
+        entry = self._memory.get(key)
+        if entry is None:
+            self._memory[key] = [variants, 0]
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        else:
+            entry[0] = variants
+            self._memory.move_to_end(key)
+
+    def _load(self, key: str) -> List[str]:
+        # Caller holds the lock
+        if not self._db:
+            return []
+        rows = self._db.execute(
+            "SELECT value FROM responses WHERE key = ? AND created >= ? ORDER BY slot",
+            (key, time.time() - self.max_age)).fetchall()
+        return [row[0] for row in rows]
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Cached completion for a key
+
+        Returns None on a miss - including while fewer than `diversity`
+        completions have been collected for the key, so the caller fetches
+        (and puts) another one.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                variants = self._load(key)
+                if variants:
+                    self._remember(key, variants)
+                    entry = self._memory.get(key)
+            else:
+                self._memory.move_to_end(key)
+
+            if entry is None or len(entry[0]) < self.diversity:
+                self.misses += 1
+                return None
+
+            variants, index = entry
+            entry[1] = (index + 1) % len(variants)
+            self.hits += 1
+
+            if self._db:
+                self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            return variants[index % len(variants)]
+
+    def put(self, key: str, value: str):
+        """Store a completion (ignored once the key already holds `diversity` of them)"""
+        if not value:
+            return
+
+        with self._lock:
+            entry = self._memory.get(key)
+            variants = list(entry[0]) if entry else self._load(key)
+            if value in variants or len(variants) >= self.diversity:
+                return
+
+            slot = len(variants)
+            variants.append(value)
+            self._remember(key, variants)
+
+            if self._db:
+                now = time.time()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, slot, value, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, slot, value, len(value.encode()), now, now))
+
+            self._writes += 1
+            evict = self._writes % self.EVICT_EVERY == 0
+
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones over max_bytes"""
+        if not self._db:
+            return
+
+        with self._lock:
+            expired = self._db.execute("DELETE FROM responses WHERE created < ?",
+                                       (time.time() - self.max_age,)).rowcount
+            if expired:
+                self._memory.clear()
+
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                doomed = []
+                # Whole keys go at once so slots stay contiguous
+                for key, size in self._db.execute(
+                        "SELECT key, SUM(size) FROM responses GROUP BY key ORDER BY MAX(accessed)"):
+                    doomed.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+                for (key,) in doomed:
+                    self._memory.pop(key, None)
+
+    def clear(self):
+        """Remove every cached completion"""
+        with self._lock:
+            self._memory.clear()
+            if self._db:
+                self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            entries = size = 0
+            if self._db:
+                entries, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else None,
+                'memory_keys': len(self._memory),
+                'disk_entries': entries,
+                'disk_bytes': size,
+                'diversity': self.diversity,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache() -> Optional[ResponseCache]:
+    """
+    Process-wide cache shared by the AI generators, configured from the
+    environment:
+
+        HACKFORGE_LLM_CACHE             SQLite path, ':memory:' for no disk tier,
+                                        or '0' to disable caching
+        HACKFORGE_LLM_CACHE_DIVERSITY   Completions kept per prompt (default 1)
+        HACKFORGE_LLM_CACHE_MAX_MB      Disk tier size bound (default 256)
+        HACKFORGE_LLM_CACHE_MAX_DAYS    Entry lifetime (default 30)
+    """
+    global _default_cache
+
+    setting = os.getenv('HACKFORGE_LLM_CACHE', str(DEFAULT_CACHE_FILE))
+    if setting == '0':
+        return None
+
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResponseCache(
+                    path=None if setting == ':memory:' else Path(setting),
+                    max_bytes=int(float(os.getenv('HACKFORGE_LLM_CACHE_MAX_MB', '256')) * 1024 * 1024),
+                    max_age=float(os.getenv('HACKFORGE_LLM_CACHE_MAX_DAYS', '30')) * 24 * 3600,
+                    diversity=int(os.getenv('HACKFORGE_LLM_CACHE_DIVERSITY', '1')),
+                )
+    return _default_cache
@@ -0,0 +1,440 @@
+"""
+Async LLM Client
+Pooled, concurrency-bounded client for OpenAI-style chat completion endpoints
+
+One client keeps a pool of keep-alive connections and runs up to
+max_concurrency completions at a time, with a per-request timeout and
+retries with jittered exponential backoff. generate_many() renders a whole
+campaign's prompts concurrently instead of one blocking request at a time.
+
+With stream=True, requests that carry a validator are streamed as
+server-sent events. The validator checks the code as it arrives and the
+attempt is abandoned (and retried) as soon as the output is clearly invalid.
+Time to first usable code and wasted tokens are tracked in stream_metrics().
+
+httpx is used when it is installed; otherwise a small keep-alive pool of
+http.client connections runs on a dedicated thread pool.
+"""
+
+import asyncio
+import json
+import time
+import random
+import statistics
+import http.client
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from llm_cache import ResponseCache, default_cache
+from stream_validator import StreamRejected
+
+
+class CompletionError(Exception):
+    """A completion request failed; retryable errors are retried before this surfaces"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class CompletionRequest:
+    """One chat completion: a system and a user prompt"""
+    system_prompt: str
+    user_prompt: str
+    temperature: float = 0.7
+    # Applied to the raw completion before it is cached and returned
+    postprocess: Optional[Callable[[str], str]] = None
+    # Factory for a streaming validator (feed/finish/has_code), used in stream mode
+    validator: Optional[Callable[[], object]] = None
+    # Whether a (postprocessed) completion may be cached; rejected ones are still returned
+    accept: Optional[Callable[[str], bool]] = None
+
+
+@dataclass
+class StreamMetrics:
+    """What one streamed completion cost"""
+    attempts: int = 0
+    tokens: int = 0
+    wasted_tokens: int = 0
+    first_code_s: Optional[float] = None
+    total_s: float = 0.0
+    rejections: List[str] = field(default_factory=list)
+
+
+def _sse_delta(line: str) -> Optional[str]:
+    """Content delta from one server-sent event line; '' for non-content lines, None at [DONE]"""
+    if not line.startswith('data:'):
+        return ''
+    data = line[5:].strip()
+    if data == '[DONE]':
+        return None
+    try:
+        choice = json.loads(data)['choices'][0]
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise CompletionError(f"malformed stream event: {e}", retryable=False)
+    return (choice.get('delta') or {}).get('content') or ''
+
+
+class _HttpxTransport:
+    def __init__(self, api_url: str, pool_size: int, timeout: float):
+        self.api_url = api_url
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def post(self, payload: dict) -> dict:
+        try:
+            response = await self._client.post(self.api_url, json=payload)
+        except httpx.TimeoutException as e:
+            raise CompletionError(f"timeout: {e}")
+        except httpx.TransportError as e:
+            raise CompletionError(f"connection error: {e}")
+
+        if response.status_code != 200:
+            raise CompletionError(f"HTTP {response.status_code}", retryable=response.status_code in RETRY_STATUS)
+        return response.json()
+
+    async def stream(self, payload: dict) -> AsyncIterator[str]:
+        try:
+            async with self._client.stream('POST', self.api_url, json=payload) as response:
+                if response.status_code != 200:
+                    raise CompletionError(f"HTTP {response.status_code}",
+                                          retryable=response.status_code in RETRY_STATUS)
+                async for line in response.aiter_lines():
+                    delta = _sse_delta(line)
+                    if delta is None:
+                        return
+                    if delta:
+                        yield delta
+        except httpx.TimeoutException as e:
+            raise CompletionError(f"timeout: {e}")
+        except httpx.TransportError as e:
+            raise CompletionError(f"connection error: {e}")
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class _StdlibTransport:
+    """Keep-alive http.client connections, used from a dedicated thread pool"""
+
+    def __init__(self, api_url: str, pool_size: int, timeout: float):
+        parts = urlsplit(api_url)
+        self._connection_class = (http.client.HTTPSConnection if parts.scheme == 'https'
+                                  else http.client.HTTPConnection)
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = parts.path or '/'
+        if parts.query:
+            self._path += '?' + parts.query
+        self._timeout = timeout
+
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="llm")
+
+    def _open(self, body: bytes):
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._connection_class(self._host, self._port, timeout=self._timeout)
+
+        try:
+            connection.request('POST', self._path, body=body, headers={'Content-Type': 'application/json'})
+            return connection, connection.getresponse()
+        except TimeoutError as e:
+            connection.close()
+            raise CompletionError(f"timeout: {e}")
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise CompletionError(f"connection error: {e}")
+
+    def _release(self, connection, response):
+        if response.will_close:
+            connection.close()
+        else:
+            with self._lock:
+                self._idle.append(connection)
+
+    def _post_blocking(self, body: bytes) -> dict:
+        connection, response = self._open(body)
+        try:
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise CompletionError(f"connection error: {e}")
+        self._release(connection, response)
+
+        if response.status != 200:
+            raise CompletionError(f"HTTP {response.status}", retryable=response.status in RETRY_STATUS)
+        return json.loads(data)
+
+    def _stream_blocking(self, body: bytes, emit: Callable, cancelled: threading.Event):
+        connection, response = self._open(body)
+        if response.status != 200:
+            response.read()
+            self._release(connection, response)
+            raise CompletionError(f"HTTP {response.status}", retryable=response.status in RETRY_STATUS)
+
+        try:
+            while not cancelled.is_set():
+                raw = response.readline()
+                if not raw:
+                    break
+                delta = _sse_delta(raw.decode('utf-8', 'replace').rstrip('\r\n'))
+                if delta is None:
+                    break
+                if delta:
+                    emit(delta)
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise CompletionError(f"connection error: {e}")
+
+        if cancelled.is_set():
+            # The rest of the response is unread, so the connection can't be reused
+            connection.close()
+        else:
+            response.read()
+            self._release(connection, response)
+
+    async def stream(self, payload: dict) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        done = object()
+
+        def emit(item):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        def run():
+            try:
+                self._stream_blocking(json.dumps(payload).encode(), emit, cancelled)
+            except BaseException as e:
+                emit(e)
+            else:
+                emit(done)
+
+        loop.run_in_executor(self._executor, run)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    async def post(self, payload: dict) -> dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._post_blocking, json.dumps(payload).encode())
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            for connection in self._idle:
+                connection.close()
+            self._idle.clear()
+
+
+class AsyncLLMClient:
+    """
+    Concurrent chat completion client
+
+    Usage:
+        async with AsyncLLMClient(api_url, max_concurrency=8) as client:
+            results = await client.generate_many(requests)
+
+    Args:
+        api_url: Chat completions endpoint
+        max_concurrency: Completions in flight at once (also the pool size)
+        timeout: Per-request timeout in seconds
+        retries: Extra attempts after a retryable failure
+        backoff: Base delay for exponential backoff; each retry sleeps a
+                 random time in [0, backoff * 2**attempt] ("full jitter")
+        cache: ResponseCache consulted before and filled after each request;
+               defaults to the process-wide cache, False disables caching
+        stream: Stream requests that have a validator, aborting bad output early
+    """
+
+    def __init__(self, api_url: str = "http://localhost:8080/v1/chat/completions",
+                 max_concurrency: int = 8, timeout: float = 60.0, retries: int = 3,
+                 backoff: float = 0.5, cache: Optional[ResponseCache] = None, stream: bool = False):
+        self.api_url = api_url
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = default_cache() if cache is None else (cache or None)
+        self.stream = stream
+        self.metrics: List[StreamMetrics] = []
+
+        transport_class = _HttpxTransport if httpx is not None else _StdlibTransport
+        self._transport = transport_class(api_url, self.max_concurrency, timeout)
+        self._semaphore = None
+        # Identical prompts in flight share one request
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        await self._transport.close()
+
+    async def _post(self, payload: dict) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    data = await self._transport.post(payload)
+                return data['choices'][0]['message']['content']
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                raise CompletionError(f"malformed response: {e}", retryable=False)
+            except CompletionError as e:
+                if not e.retryable or attempt >= self.retries:
+                    raise
+            # Back off outside the semaphore so waiting retries don't hold a slot
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+            attempt += 1
+
+    async def _stream_validated(self, payload: dict, request: CompletionRequest) -> str:
+        """Stream a completion through its validator, retrying rejected output"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        metrics = StreamMetrics()
+        self.metrics.append(metrics)
+        started = time.perf_counter()
+        payload = dict(payload, stream=True)
+
+        try:
+            while True:
+                metrics.attempts += 1
+                validator = request.validator()
+                tokens = 0
+                try:
+                    async with self._semaphore:
+                        stream = self._transport.stream(payload)
+                        try:
+                            async for delta in stream:
+                                tokens += 1
+                                validator.feed(delta)
+                                if metrics.first_code_s is None and validator.has_code:
+                                    metrics.first_code_s = time.perf_counter() - started
+                        finally:
+                            await stream.aclose()
+                    metrics.tokens += tokens
+                    return validator.finish()
+                except StreamRejected as e:
+                    metrics.tokens += tokens
+                    metrics.wasted_tokens += tokens
+                    metrics.rejections.append(e.reason)
+                    metrics.first_code_s = None
+                    if metrics.attempts > self.retries:
+                        raise CompletionError(f"rejected output: {e.reason}", retryable=False)
+                except CompletionError as e:
+                    metrics.tokens += tokens
+                    metrics.wasted_tokens += tokens
+                    metrics.first_code_s = None
+                    if not e.retryable or metrics.attempts > self.retries:
+                        raise
+                    await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (metrics.attempts - 1)))
+        finally:
+            metrics.total_s = time.perf_counter() - started
+
+    def stream_metrics(self) -> Dict:
+        """Aggregate streaming metrics across this client's completions"""
+        first_code = [m.first_code_s for m in self.metrics if m.first_code_s is not None]
+        total_tokens = sum(m.tokens for m in self.metrics)
+        wasted = sum(m.wasted_tokens for m in self.metrics)
+        return {
+            'completions': len(self.metrics),
+            'attempts': sum(m.attempts for m in self.metrics),
+            'rejections': dict(Counter(r for m in self.metrics for r in m.rejections)),
+            'tokens': total_tokens,
+            'wasted_tokens': wasted,
+            'wasted_tokens_per_completion': wasted / len(self.metrics) if self.metrics else 0.0,
+            'time_to_first_code_p50_s': statistics.median(first_code) if first_code else None,
+            'total_p50_s': statistics.median(m.total_s for m in self.metrics) if self.metrics else None,
+        }
+
+    async def complete(self, request: CompletionRequest) -> str:
+        """Run one completion, raising CompletionError when it fails"""
+        key = ResponseCache.key(request.system_prompt, request.user_prompt, request.temperature, self.api_url)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        # With diversity > 1 concurrent duplicates are how the variants get collected
+        coalesce = not self.cache or self.cache.diversity == 1
+        if coalesce and key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        if coalesce:
+            self._inflight[key] = future
+        try:
+            payload = {
+                "messages": [
+                    {"role": "system", "content": request.system_prompt},
+                    {"role": "user", "content": request.user_prompt}
+                ],
+                "temperature": request.temperature
+            }
+            if self.stream and request.validator:
+                content = await self._stream_validated(payload, request)
+            else:
+                content = await self._post(payload)
+            if request.postprocess:
+                content = request.postprocess(content)
+            # An unusable completion would otherwise be replayed for the cache's whole TTL
+            if self.cache and (request.accept is None or request.accept(content)):
+                self.cache.put(key, content)
+            future.set_result(content)
+            return content
+        except BaseException as e:
+            future.set_exception(e)
+            # Only waiters see the exception; don't warn about an unretrieved one
+            future.exception()
+            raise
+        finally:
+            if coalesce:
+                self._inflight.pop(key, None)
+
+    async def generate_many(self, requests: Iterable[CompletionRequest]) -> List[Optional[str]]:
+        """
+        Run completions concurrently
+
+        Returns results in request order, with None for requests that failed.
+        """
+        async def run(request: CompletionRequest) -> Optional[str]:
+            try:
+                return await self.complete(request)
+            except CompletionError as e:
+                print(f"AI API Error: {e}")
+                return None
+
+        return await asyncio.gather(*(run(request) for request in requests))
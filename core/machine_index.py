@@ -0,0 +1,260 @@
+"""
+Machine Index
+Persistent machine_id -> location index for every generated machine
+
+Backed by an append-only log of "<machine_id>\t<location>" lines. In memory
+the IDs live in an open-addressing hash table built on two flat arrays
+(64-bit key, 64-bit log offset), so membership checks are O(1) and memory
+stays at a few dozen bytes per machine even with millions of entries.
+"""
+
+import os
+import re
+import threading
+from array import array
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+MACHINE_ID = re.compile(r'[0-9a-f]{16}')
+
+
+def is_machine_id(machine_id) -> bool:
+    """Whether machine_id has the shape generate_machine_id() produces (16 lowercase hex chars)"""
+    return isinstance(machine_id, str) and MACHINE_ID.fullmatch(machine_id) is not None
+
+
+class MachineIndex:
+    """
+    Append-only machine ID index
+
+    Machine IDs are the 16-hex-char (64-bit) prefixes produced by
+    MutationEngine.generate_machine_id(). Locations are stored relative to
+    base_dir when possible so the index survives moving the core directory.
+    """
+
+    INITIAL_CAPACITY = 1024
+    MAX_LOAD = 0.5
+
+    def __init__(self, log_file: Path, base_dir: Path = None):
+        self.log_file = Path(log_file)
+        self.base_dir = Path(base_dir) if base_dir else self.log_file.parent
+        self._base_prefix = os.path.abspath(self.base_dir) + os.sep
+
+        self._lock = threading.RLock()
+        self._loaded = False
+        # Log bytes already read into the table (other processes may append after it)
+        self._scanned = 0
+        self._count = 0
+        self._mask = self.INITIAL_CAPACITY - 1
+        self._keys = array('Q', bytes(8 * self.INITIAL_CAPACITY))
+        self._offsets = array('Q', bytes(8 * self.INITIAL_CAPACITY))
+        self._writer = None
+
+    # ------------------------------------------------------------------
+    # Hash table
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _key(machine_id: str) -> int:
+        # 0 marks an empty slot; the all-zero ID shares a slot with ...0001
+        return int(machine_id, 16) or 1
+
+    def _slot(self, key: int) -> int:
+        # IDs are SHA-256 prefixes, so the low bits are already uniform
+        keys = self._keys
+        mask = self._mask
+        slot = key & mask
+        while True:
+            current = keys[slot]
+            if current == key or current == 0:
+                return slot
+            slot = (slot + 1) & mask
+
+    def _insert(self, key: int, offset: int):
+        slot = self._slot(key)
+        if self._keys[slot] == 0:
+            self._count += 1
+            self._keys[slot] = key
+        self._offsets[slot] = offset
+
+        if self._count > (self._mask + 1) * self.MAX_LOAD:
+            self._grow()
+
+    def _grow(self):
+        old_keys, old_offsets = self._keys, self._offsets
+        capacity = (self._mask + 1) * 2
+
+        self._mask = capacity - 1
+        self._keys = array('Q', bytes(8 * capacity))
+        self._offsets = array('Q', bytes(8 * capacity))
+
+        for key, offset in zip(old_keys, old_offsets):
+            if key:
+                slot = self._slot(key)
+                self._keys[slot] = key
+                self._offsets[slot] = offset
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+
+        with self._lock:
+            if self._loaded:
+                return
+
+            self._scan()
+            self._loaded = True
+
+    def _scan(self):
+        # Caller holds the lock
+        if not self.log_file.exists():
+            return
+
+        offset = self._scanned
+        with open(self.log_file, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                # Stop at a torn trailing line; it's re-read once its writer finishes it
+                if not line.endswith(b'\n'):
+                    break
+                tab = line.find(b'\t')
+                machine_id = line[:16].decode(errors='replace')
+                if tab == 16 and is_machine_id(machine_id):
+                    self._insert(self._key(machine_id), offset)
+                offset += len(line)
+        self._scanned = offset
+
+    def _append(self, records: Iterable[Tuple[str, str]]) -> list:
+        if self._writer is None:
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = open(self.log_file, 'ab')
+            # Terminate a torn line left by an interrupted write
+            if self._writer.tell() > 0:
+                with open(self.log_file, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        self._writer.write(b'\n')
+
+        lines = [f"{machine_id}\t{location}\n".encode() for machine_id, location in records]
+        data = b''.join(lines)
+        self._writer.write(data)
+        self._writer.flush()
+
+        # Append mode: the write landed at the real end of the log, even if
+        # another process appended since, so count back from where it ended
+        offset = self._writer.tell() - len(data)
+        offsets = []
+        for line in lines:
+            offsets.append(offset)
+            offset += len(line)
+        return offsets
+
+    def _relative(self, location: str) -> str:
+        location = os.path.abspath(location)
+        if location.startswith(self._base_prefix):
+            return location[len(self._base_prefix):]
+        return location
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def __contains__(self, machine_id: str) -> bool:
+        if not is_machine_id(machine_id):
+            return False
+        self._ensure_loaded()
+        with self._lock:
+            return self._keys[self._slot(self._key(machine_id))] != 0
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return self._count
+
+    def add(self, machine_id: str, location: str):
+        """Record where a machine lives (a later add for the same ID wins)"""
+        self.add_many([(machine_id, location)])
+
+    def add_many(self, records: Iterable[Tuple[str, str]]):
+        """Record several machines with a single write"""
+        self._ensure_loaded()
+        records = [(machine_id, self._relative(location)) for machine_id, location in records]
+        if not records:
+            return
+        invalid = [machine_id for machine_id, _ in records if not is_machine_id(machine_id)]
+        if invalid:
+            raise ValueError(f"Not machine IDs (16 hex chars): {invalid[:5]}")
+
+        with self._lock:
+            offsets = self._append(records)
+            for (machine_id, _), offset in zip(records, offsets):
+                self._insert(self._key(machine_id), offset)
+
+    def refresh(self):
+        """Pick up entries other processes (job workers, pool builders) appended to the log"""
+        self._ensure_loaded()
+        with self._lock:
+            self._scan()
+
+    def locate(self, machine_id: str) -> Optional[Path]:
+        """Directory a machine was exported to, or None if unknown (or not a machine ID at all)"""
+        if not is_machine_id(machine_id):
+            return None
+        self._ensure_loaded()
+
+        with self._lock:
+            slot = self._slot(self._key(machine_id))
+            if self._keys[slot] == 0:
+                return None
+            offset = self._offsets[slot]
+
+        with open(self.log_file, 'rb') as f:
+            f.seek(offset)
+            line = f.readline().decode().rstrip('\n')
+
+        stored_id, _, location = line.partition('\t')
+        if stored_id != machine_id:
+            return None
+
+        path = Path(location)
+        return path if path.is_absolute() else self.base_dir / path
+
+    def compact(self):
+        """Rewrite the log keeping only the latest location of each machine"""
+        self._ensure_loaded()
+
+        with self._lock:
+            if self._writer:
+                self._writer.close()
+                self._writer = None
+
+            latest = {}
+            if self.log_file.exists():
+                with open(self.log_file, 'rb') as f:
+                    for line in f:
+                        if line.endswith(b'\n') and line.find(b'\t') == 16:
+                            latest[line[:16]] = line
+
+            tmp_file = self.log_file.with_suffix('.tmp')
+            with open(tmp_file, 'wb') as f:
+                f.writelines(latest.values())
+            os.replace(tmp_file, self.log_file)
+
+            self._loaded = False
+            self._scanned = 0
+            self._count = 0
+            self._mask = self.INITIAL_CAPACITY - 1
+            self._keys = array('Q', bytes(8 * self.INITIAL_CAPACITY))
+            self._offsets = array('Q', bytes(8 * self.INITIAL_CAPACITY))
+
+        self._ensure_loaded()
+
+    def close(self):
+        """Close the append handle"""
+        with self._lock:
+            if self._writer:
+                self._writer.close()
+                self._writer = None
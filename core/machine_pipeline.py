@@ -0,0 +1,321 @@
+"""
+Machine Pipeline
+The config -> running machine pipeline as job stages
+
+Stages (see job_queue.JobQueue), each a plain function of the job context:
+
+    blueprint   vuln_generator writes blueprint/mutation/template for the category
+    machine     the category is (re)loaded and one machine generated and exported
+    app         template_engine renders the app and Dockerfile
+    compose     docker-compose.yml (and init.sql) for the machine
+    container   containers started (Docker SDK control plane, else docker-compose up)
+
+Context keys read: category, core_dir, port, difficulty, user_id,
+start_container, compose_command, public_host. Stages run in worker
+processes, so everything they exchange goes through the context.
+"""
+
+import json
+import time
+import subprocess
+from pathlib import Path
+from typing import Dict
+
+from base import MachineConfig
+from campaign_writer import load_machine_config
+
+COMPOSE_UP = ["docker-compose", "up", "-d", "--build"]
+
+# Generators are expensive to build (every blueprint is loaded), so each
+# worker process keeps one per core_dir and reloads single categories
+_generators: Dict[str, object] = {}
+
+
+def _generator(core_dir: str):
+    generator = _generators.get(core_dir)
+    if generator is None:
+        from generator import DynamicHackforgeGenerator
+        generator = _generators[core_dir] = DynamicHackforgeGenerator(core_dir=core_dir)
+    return generator
+
+
+def _control_plane():
+    """The Docker SDK control plane when it's importable and enabled (docker/orchestrator on sys.path)"""
+    try:
+        from control_plane import default_control_plane, sdk_lifecycle_enabled
+    except ImportError:
+        return None
+    return default_control_plane() if sdk_lifecycle_enabled() else None
+
+
+def _machine_dir(context: Dict) -> Path:
+    return Path(context['core_dir']) / "generated_machines" / context['machine_id']
+
+
+def machine_flag(context: Dict) -> str:
+    """The generated machine's flag, read from its config.json
+
+    Kept out of the job context on purpose: contexts are persisted under
+    jobs/ and served by the job endpoints.
+    """
+    return load_machine_config(_machine_dir(context), inline_config=False)['flag']['content']
+
+
+def _config_path(context: Dict) -> Path:
+    config_path = Path(context['core_dir']) / "configs" / f"{context['category']}.json"
+    if not config_path.exists():
+        raise FileNotFoundError(f"Config not found: {context['category']}")
+    return config_path
+
+
+def generate_blueprint(context: Dict) -> Dict:
+    """Blueprint, mutation and template files for the category"""
+    from vuln_generator import VulnerabilityGenerator
+
+    VulnerabilityGenerator(str(_config_path(context))).generate_all(context['core_dir'])
+    return {}
+
+
+def generate_machine(context: Dict) -> Dict:
+    """Reload the category and generate + export one machine"""
+    generator = _generator(context['core_dir'])
+
+    blueprint = generator.reload_category(context['category'])
+    if not blueprint:
+        raise RuntimeError(f"Blueprint not found after generation. Category: {context['category']}. "
+                           f"Available: {list(generator.blueprints.keys())}")
+
+    machine = generator.generate_single_machine(
+        blueprint_id=blueprint.blueprint_id,
+        difficulty=context.get('difficulty', 2),
+        user_id=context.get('user_id', 'api_generated'),
+    )
+    if not machine:
+        raise RuntimeError("Failed to generate machine config")
+
+    return {
+        'blueprint_id': blueprint.blueprint_id,
+        'machine_id': machine.machine_id,
+        'variant': machine.variant,
+        'difficulty': machine.difficulty,
+        'flag_location': machine.flag.get('location', '/var/www/html/flag.txt'),
+    }
+
+
+def render_app(context: Dict) -> Dict:
+    """Application code and Dockerfile"""
+    from template_engine import TemplateEngine
+
+    machine_dir = _machine_dir(context)
+    machine = MachineConfig(**load_machine_config(machine_dir))
+
+    engine = TemplateEngine(machines_dir=str(machine_dir.parent))
+    if not engine.generate_machine_app(machine, machine_dir, context['port']):
+        raise RuntimeError(f"Template engine failed for {machine.machine_id}")
+    return {}
+
+
+def render_compose(machine_id: str, port: int, flag_location: str, infrastructure: Dict) -> str:
+    """docker-compose.yml for a single machine (plus its database when needed)"""
+    if infrastructure.get('needs_database', False):
+        database_type = infrastructure.get('database_type', 'mysql')
+        return f"""version: '3.8'
+
+services:
+  {machine_id}:
+    build: .
+    container_name: hackforge_{machine_id}
+    ports:
+      - "{port}:80"
+    volumes:
+      - ./app:/var/www/html
+      - ./flag.txt:{flag_location}:ro
+    environment:
+      - MACHINE_ID={machine_id}
+      - FLAG_LOCATION={flag_location}
+      - DB_HOST=db
+      - DB_USER=hackforge
+      - DB_PASSWORD=hackforge123
+      - DB_NAME=hackforge
+    depends_on:
+      - db
+    restart: unless-stopped
+
+  db:
+    image: {database_type}:latest
+    container_name: hackforge_{machine_id}_db
+    environment:
+      - MYSQL_ROOT_PASSWORD=root123
+      - MYSQL_DATABASE=hackforge
+      - MYSQL_USER=hackforge
+      - MYSQL_PASSWORD=hackforge123
+    volumes:
+      - db_data:/var/lib/mysql
+      - ./init.sql:/docker-entrypoint-initdb.d/init.sql:ro
+    restart: unless-stopped
+
+volumes:
+  db_data:
+"""
+
+    return f"""version: '3.8'
+
+services:
+  {machine_id}:
+    build: .
+    container_name: hackforge_{machine_id}
+    ports:
+      - "{port}:80"
+    volumes:
+      - ./app:/var/www/html
+      - ./flag.txt:{flag_location}:ro
+    environment:
+      - MACHINE_ID={machine_id}
+      - FLAG_LOCATION={flag_location}
+    restart: unless-stopped
+"""
+
+
+def render_init_sql(database_schema: Dict, flag: str) -> str:
+    """Schema and seed data, with {{FLAG}} replaced by the machine's flag"""
+    init_sql_content = "-- Auto-generated database initialization\n\n"
+
+    for table in database_schema.get('tables', []):
+        columns = ', '.join(table['columns'])
+        init_sql_content += f"CREATE TABLE IF NOT EXISTS {table['name']} ({columns});\n\n"
+
+    for table_name, rows in database_schema.get('seed_data', {}).items():
+        for row in rows:
+            columns = ', '.join(row.keys())
+            values = []
+            for value in row.values():
+                if value == 'NOW()':
+                    values.append('NOW()')
+                elif value == '{{FLAG}}':
+                    values.append(f"'{flag}'")
+                else:
+                    # Escape single quotes in values
+                    escaped_value = str(value).replace("'", "\\'")
+                    values.append(f"'{escaped_value}'")
+            init_sql_content += f"INSERT INTO {table_name} ({columns}) VALUES ({', '.join(values)});\n"
+
+    return init_sql_content
+
+
+def write_compose(context: Dict) -> Dict:
+    """docker-compose.yml and, for database-backed configs, init.sql"""
+    with open(_config_path(context), 'r') as f:
+        config_data = json.load(f)
+    infrastructure = config_data.get('infrastructure', {})
+    machine_dir = _machine_dir(context)
+
+    flag_location = context['flag_location'].replace(':', '_').replace('//', '/')
+    if not flag_location.startswith('/'):
+        flag_location = '/' + flag_location
+
+    (machine_dir / "docker-compose.yml").write_text(
+        render_compose(context['machine_id'], context['port'], flag_location, infrastructure))
+
+    needs_database = infrastructure.get('needs_database', False)
+    if needs_database and config_data.get('database_schema'):
+        (machine_dir / "init.sql").write_text(render_init_sql(config_data['database_schema'], machine_flag(context)))
+
+    return {
+        'infrastructure': infrastructure,
+        'has_database': needs_database,
+    }
+
+
+def start_container(context: Dict) -> Dict:
+    """Start the machine's containers; a failed start is reported, not raised"""
+    if not context.get('start_container', True):
+        return {'container_started': False, 'url': None}
+
+    machine_dir = _machine_dir(context)
+    container_started = False
+    container_error = None
+    use_compose = True
+
+    plane = None if context.get('compose_command') else _control_plane()
+    if plane is not None and plane.supports(machine_dir):
+        try:
+            plane.up(machine_dir, build=True)
+            container_started = True
+        except Exception as e:
+            container_error = str(e)
+        # Docker unreachable over the SDK - let the compose CLI try
+        use_compose = not plane.available
+
+    if use_compose:
+        container_error = None
+        try:
+            result = subprocess.run(
+                context.get('compose_command') or COMPOSE_UP,
+                cwd=str(machine_dir),
+                capture_output=True,
+                text=True,
+                timeout=300
+            )
+            if result.returncode == 0:
+                container_started = True
+                # Give the container a moment to come up
+                time.sleep(context.get('settle_seconds', 2))
+            else:
+                container_error = result.stderr.strip() or f"exit status {result.returncode}"
+        except Exception as e:
+            container_error = str(e)
+
+    return {
+        'container_started': container_started,
+        'container_error': container_error,
+        'url': f"http://{context.get('public_host', 'localhost')}:{context['port']}" if container_started else None,
+    }
+
+
+STAGES = [
+    ('blueprint', generate_blueprint),
+    ('machine', generate_machine),
+    ('app', render_app),
+    ('compose', write_compose),
+    ('container', start_container),
+]
+
+
+def pipeline_result(context: Dict) -> Dict:
+    """The generate-machine response for a finished pipeline"""
+    category = context['category']
+    machine_id = context['machine_id']
+    container_url = context.get('url')
+    has_database = context.get('has_database', False)
+
+    return {
+        "success": True,
+        "message": "Machine generated and ready!",
+        "category": category,
+        "machine_id": machine_id,
+        "variant": context.get('variant'),
+        "difficulty": context.get('difficulty'),
+        "directory": str(_machine_dir(context)),
+        "port": context['port'],
+        "infrastructure": context.get('infrastructure'),
+        "has_database": has_database,
+        "files_generated": {
+            "blueprint": f"blueprints/{category}_blueprint.yaml",
+            "mutation": f"mutations/{category}_mutation.py",
+            "template": f"templates/{category}_templates.py",
+            "machine_config": f"generated_machines/{machine_id}/config.json",
+            "docker_app": f"generated_machines/{machine_id}/app/index.php",
+            "dockerfile": f"generated_machines/{machine_id}/Dockerfile",
+            "compose": f"generated_machines/{machine_id}/docker-compose.yml",
+            "init_sql": f"generated_machines/{machine_id}/init.sql" if has_database else None
+        },
+        "container_started": context.get('container_started', False),
+        "container_error": context.get('container_error'),
+        "url": container_url,
+        "next_steps": [
+            f"Access machine at: {container_url}" if container_url
+            else f"Start container: cd generated_machines/{machine_id} && docker-compose up -d",
+            "Test the vulnerability",
+            "Submit flag via /machines page"
+        ]
+    }
@@ -0,0 +1,397 @@
+"""
+Machine Pool
+Warm pool of ready-made machines per (blueprint, difficulty)
+
+Pooled machines are generated, exported and prepared (apps rendered, images
+built - whatever the prepare hook does) ahead of time. Creating a campaign
+then claims machines in O(1), re-keys their flag for the user and moves the
+directory into the campaign. A background refiller keeps each pool sized to
+its recent consumption rate.
+"""
+
+import os
+import json
+import math
+import time
+import shutil
+import hashlib
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from base import MachineConfig
+from campaign_writer import CampaignWriter, load_machine_config
+
+PoolKey = Tuple[str, int]
+
+
+@dataclass
+class PooledMachine:
+    """A ready machine and what it took to prepare it"""
+    machine: MachineConfig
+    machine_dir: Path
+    info: Dict = field(default_factory=dict)
+    # Files (relative to machine_dir) that contain the flag
+    flag_files: Tuple[str, ...] = ()
+    # True when an image was built with the flag in its context, so a
+    # re-keyed machine must be rebuilt (only the flag layers, thanks to the cache)
+    needs_rebuild: bool = False
+
+
+@dataclass
+class _KeyStats:
+    hits: int = 0
+    misses: int = 0
+    filled: int = 0
+    failed: int = 0
+    claims: Deque[float] = field(default_factory=deque)
+
+
+class MachinePool:
+    """
+    Pre-generated machines keyed by (blueprint_id, difficulty)
+
+    Args:
+        generator: DynamicHackforgeGenerator used to create machines
+        pool_dir: Where pooled machines live until claimed
+        prepare: Optional hook(machine, machine_dir) -> info dict, run on
+                 every new machine (render app, build image...). Returning
+                 None or raising discards the machine. Set 'image_built' in
+                 the info when the hook builds an image from machine_dir.
+        min_size: Machines kept per key regardless of demand
+        max_size: Upper bound per key
+        lead_time: Seconds of demand (at the recent claim rate) to keep ready
+        rate_window: Seconds of claim history used to estimate the rate
+    """
+
+    def __init__(self, generator, pool_dir: Path, prepare: Callable = None,
+                 min_size: int = 2, max_size: int = 20, lead_time: float = 600.0,
+                 rate_window: float = 900.0, fill_batch: int = 4):
+        self.generator = generator
+        self.pool_dir = Path(pool_dir)
+        self.prepare = prepare
+        self.min_size = min_size
+        self.max_size = max_size
+        self.lead_time = lead_time
+        self.rate_window = rate_window
+        self.fill_batch = fill_batch
+
+        self._ready: Dict[PoolKey, Deque[PooledMachine]] = {}
+        self._filling: Dict[PoolKey, int] = {}
+        self._stats: Dict[PoolKey, _KeyStats] = {}
+        self._lock = threading.Lock()
+
+        self._refiller: Optional[threading.Thread] = None
+        self._refiller_stop = threading.Event()
+
+        self.pool_dir.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+
+    def _key_state(self, key: PoolKey) -> Tuple[Deque[PooledMachine], _KeyStats]:
+        # Caller holds the lock
+        if key not in self._ready:
+            self._ready[key] = deque()
+            self._stats[key] = _KeyStats()
+            self._filling[key] = 0
+        return self._ready[key], self._stats[key]
+
+    def _load(self):
+        """Re-adopt machines left in pool_dir by a previous run"""
+        for machine_dir in sorted(self.pool_dir.iterdir()):
+            pool_file = machine_dir / "pool.json"
+            if not pool_file.exists():
+                continue
+            try:
+                with open(pool_file, 'r') as f:
+                    state = json.load(f)
+                machine = MachineConfig(**load_machine_config(machine_dir, inline_config=False))
+                entry = PooledMachine(
+                    machine=machine,
+                    machine_dir=machine_dir,
+                    info=state.get('info', {}),
+                    flag_files=tuple(state.get('flag_files', ())),
+                    needs_rebuild=state.get('needs_rebuild', False),
+                )
+            except Exception as e:
+                print(f"⚠️ Discarding unreadable pooled machine {machine_dir.name}: {e}")
+                shutil.rmtree(machine_dir, ignore_errors=True)
+                continue
+
+            with self._lock:
+                ready, _ = self._key_state((machine.blueprint_id, machine.difficulty))
+                ready.append(entry)
+
+    def warm(self, keys: List[PoolKey]):
+        """Start tracking keys so the refiller keeps them stocked"""
+        with self._lock:
+            for key in keys:
+                self._key_state(key)
+
+    def entries(self) -> List[PooledMachine]:
+        """Every machine currently waiting in the pool"""
+        with self._lock:
+            return [entry for ready in self._ready.values() for entry in ready]
+
+    def target_size(self, key: PoolKey, now: float = None) -> int:
+        """Pool size wanted for a key given its recent claim rate"""
+        now = now or time.time()
+        with self._lock:
+            _, stats = self._key_state(key)
+            claims = stats.claims
+            while claims and claims[0] < now - self.rate_window:
+                claims.popleft()
+            rate = len(claims) / self.rate_window
+
+        return max(self.min_size, min(self.max_size, math.ceil(rate * self.lead_time)))
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and pool levels"""
+        with self._lock:
+            keys = list(self._ready)
+        targets = {key: self.target_size(key) for key in keys}
+
+        with self._lock:
+            per_key = []
+            for key in keys:
+                stats = self._stats[key]
+                per_key.append({
+                    'blueprint_id': key[0],
+                    'difficulty': key[1],
+                    'ready': len(self._ready[key]),
+                    'filling': self._filling[key],
+                    'target': targets[key],
+                    'hits': stats.hits,
+                    'misses': stats.misses,
+                    'filled': stats.filled,
+                    'failed': stats.failed,
+                })
+
+        hits = sum(k['hits'] for k in per_key)
+        misses = sum(k['misses'] for k in per_key)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else None,
+            'ready': sum(k['ready'] for k in per_key),
+            'refiller_running': bool(self._refiller and self._refiller.is_alive()),
+            'pools': per_key,
+        }
+
+    # ------------------------------------------------------------------
+    # Filling
+    # ------------------------------------------------------------------
+
+    def _build(self, blueprint_id: str, difficulty: int, count: int, target_dir: Path) -> List[PooledMachine]:
+        """Generate, export and prepare machines into target_dir"""
+        stamp = time.time_ns()
+        jobs = [(blueprint_id, f"pool_{blueprint_id}_{difficulty}_{stamp}_{i}", difficulty)
+                for i in range(count)]
+        machines = [r['machine'] for r in self.generator.generate_batch(jobs) if r['machine']]
+        if not machines:
+            return []
+
+        with CampaignWriter(target_dir, workers=1, manifest=False) as writer:
+            for machine in machines:
+                writer.add(machine)
+
+        built = []
+        for machine in machines:
+            machine_dir = writer.machine_dirs[machine.machine_id]
+            try:
+                info = self.prepare(machine, machine_dir) if self.prepare else {}
+            except Exception as e:
+                print(f"⚠️ Preparing pooled machine {machine.machine_id} failed: {e}")
+                info = None
+
+            if info is None:
+                shutil.rmtree(machine_dir, ignore_errors=True)
+                continue
+
+            flag_files = self._find_flag_files(machine_dir, machine.flag['content'])
+            entry = PooledMachine(
+                machine=machine,
+                machine_dir=machine_dir,
+                info=info,
+                flag_files=flag_files,
+                needs_rebuild=bool(info.get('image_built')) and bool(flag_files),
+            )
+            built.append(entry)
+
+        self.generator.machine_index.add_many((e.machine.machine_id, str(e.machine_dir)) for e in built)
+        return built
+
+    @staticmethod
+    def _find_flag_files(machine_dir: Path, flag: str) -> Tuple[str, ...]:
+        needle = flag.encode()
+        found = []
+        for root, _, files in os.walk(machine_dir):
+            for name in files:
+                path = Path(root) / name
+                try:
+                    if needle in path.read_bytes():
+                        found.append(path.relative_to(machine_dir).as_posix())
+                except OSError:
+                    continue
+        return tuple(sorted(found))
+
+    def fill(self, key: PoolKey, count: int) -> int:
+        """Add up to count machines to a key's pool; returns how many were added"""
+        with self._lock:
+            self._key_state(key)
+            self._filling[key] += count
+
+        try:
+            entries = self._build(key[0], key[1], count, self.pool_dir)
+            for entry in entries:
+                with open(entry.machine_dir / "pool.json", 'w') as f:
+                    json.dump({
+                        'info': entry.info,
+                        'flag_files': list(entry.flag_files),
+                        'needs_rebuild': entry.needs_rebuild,
+                    }, f)
+        except Exception as e:
+            print(f"⚠️ Filling pool {key} failed: {e}")
+            entries = []
+        finally:
+            with self._lock:
+                self._filling[key] -= count
+
+        with self._lock:
+            ready, stats = self._key_state(key)
+            ready.extend(entries)
+            stats.filled += len(entries)
+            stats.failed += count - len(entries)
+        return len(entries)
+
+    def refill_once(self) -> int:
+        """Top up every tracked key towards its target; returns machines added"""
+        with self._lock:
+            keys = list(self._ready)
+
+        added = 0
+        for key in keys:
+            if self._refiller_stop.is_set():
+                break
+            if key[0] not in self.generator.blueprints:
+                continue
+            target = self.target_size(key)
+            with self._lock:
+                missing = target - len(self._ready[key]) - self._filling[key]
+            if missing > 0:
+                added += self.fill(key, min(missing, self.fill_batch))
+        return added
+
+    def start_refiller(self, interval: float = 5.0):
+        """Keep pools topped up from a background thread"""
+        if self._refiller and self._refiller.is_alive():
+            return
+
+        self._refiller_stop.clear()
+
+        def run():
+            while not self._refiller_stop.is_set():
+                try:
+                    added = self.refill_once()
+                except Exception as e:
+                    print(f"⚠️ Pool refill failed: {e}")
+                    added = 0
+                # Keep going straight away while there is work to catch up on
+                if not added:
+                    self._refiller_stop.wait(interval)
+
+        self._refiller = threading.Thread(target=run, name="pool-refiller", daemon=True)
+        self._refiller.start()
+
+    def stop_refiller(self):
+        """Stop the background refiller"""
+        self._refiller_stop.set()
+        if self._refiller:
+            self._refiller.join()
+            self._refiller = None
+
+    # ------------------------------------------------------------------
+    # Claiming
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def rekey_flag(machine: MachineConfig, user_id: str) -> str:
+        """Per-user flag for a pooled machine, in the machine's flag format"""
+        old_flag = machine.flag['content']
+        prefix = old_flag.split('{', 1)[0] or "HACKFORGE"
+        digest = hashlib.sha256(f"{machine.seed}_{user_id}_flag".encode()).hexdigest()
+        return f"{prefix}{{{digest[:32]}}}"
+
+    def _hand_over(self, entry: PooledMachine, user_id: str, dest_dir: Path) -> PooledMachine:
+        """Re-key the flag and move a machine into dest_dir"""
+        machine = entry.machine
+        old_flag = machine.flag['content']
+        new_flag = self.rekey_flag(machine, user_id)
+
+        for rel in entry.flag_files:
+            path = entry.machine_dir / rel
+            # Replace rather than rewrite in place: the file may be a hard link to a shared artefact
+            tmp_file = path.with_name(path.name + '.rekey')
+            tmp_file.write_bytes(path.read_bytes().replace(old_flag.encode(), new_flag.encode()))
+            os.replace(tmp_file, path)
+        machine.flag = dict(machine.flag, content=new_flag)
+
+        pool_file = entry.machine_dir / "pool.json"
+        if pool_file.exists():
+            pool_file.unlink()
+
+        # Bring the referenced blueprint config along
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        ref = machine.blueprint_config_ref
+        if ref:
+            source = entry.machine_dir.parent / "blueprints" / f"{ref}.json"
+            target = dest_dir / "blueprints" / f"{ref}.json"
+            if source.exists() and not target.exists():
+                target.parent.mkdir(exist_ok=True)
+                shutil.copyfile(source, target)
+
+        machine_dir = dest_dir / machine.machine_id
+        if entry.machine_dir != machine_dir:
+            shutil.move(str(entry.machine_dir), str(machine_dir))
+        self.generator.machine_index.add(machine.machine_id, str(machine_dir))
+
+        entry.machine_dir = machine_dir
+        return entry
+
+    def claim(self, user_id: str, blueprint_id: str, difficulty: int,
+              dest_dir: Path) -> Optional[PooledMachine]:
+        """Take a ready machine for a user, or None on a pool miss"""
+        key = (blueprint_id, difficulty)
+        with self._lock:
+            ready, stats = self._key_state(key)
+            stats.claims.append(time.time())
+            entry = ready.popleft() if ready else None
+            if entry is None:
+                stats.misses += 1
+                return None
+            stats.hits += 1
+
+        return self._hand_over(entry, user_id, Path(dest_dir))
+
+    def acquire(self, user_id: str, blueprint_id: str, difficulty: int,
+                dest_dir: Path) -> Tuple[Optional[PooledMachine], bool]:
+        """
+        Claim a machine, building one synchronously on a miss
+
+        Returns:
+            (machine or None if it couldn't be built, whether it was a pool hit)
+        """
+        entry = self.claim(user_id, blueprint_id, difficulty, dest_dir)
+        if entry is not None:
+            return entry, True
+
+        dest_dir = Path(dest_dir)
+        built = self._build(blueprint_id, difficulty, 1, dest_dir)
+        if not built:
+            return None, False
+        return self._hand_over(built[0], user_id, dest_dir), False
@@ -0,0 +1,199 @@
+"""
+Mutation Tables
+Precompiled per-blueprint sampling tables and a table-driven mutation engine
+
+Everything a mutation engine needs that doesn't depend on the seed - variant
+pools by difficulty, filter sets by difficulty, context pools, hints - is
+compiled once per blueprint. Mutating a machine is then a few RNG choices
+over prebuilt tuples plus the dicts that make up the MachineConfig.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from base import MutationEngine, VulnerabilityBlueprint, MachineConfig
+
+
+DIFFICULTIES = (1, 2, 3, 4, 5)
+
+
+def default_hints(filters: List[Dict], context: str, difficulty: int) -> List[str]:
+    """Context-specific hints shared by the generated mutation engines"""
+    hints = [
+        f"Context: {context}",
+        f"Difficulty: {difficulty}/5",
+    ]
+
+    if not filters:
+        hints.append("✓ No input filtering - direct attack possible")
+    else:
+        hints.append(f"⚠️ Filters active: {', '.join([f['type'] for f in filters])}")
+
+    if difficulty <= 2:
+        hints.append("💡 Try basic payloads first")
+
+    return hints
+
+
+def _names(items: List[Any]) -> Tuple[str, ...]:
+    """Axis entries are either plain strings or {'name': ...} dicts"""
+    return tuple(item['name'] if isinstance(item, dict) else item for item in items or [])
+
+
+def filter_tiers(filter_axis: Dict[str, List[Any]]) -> Dict[int, Tuple[str, ...]]:
+    """
+    Filter names active at each difficulty
+
+    1: none, 2: basic, 3: basic + the first half of medium,
+    4 and up: basic + medium. Advanced filters are only used when a
+    blueprint has nothing else to offer.
+    """
+    basic = _names(filter_axis.get('basic', []))
+    medium = _names(filter_axis.get('medium', []))
+    if not basic and not medium:
+        basic = _names(filter_axis.get('advanced', []))
+
+    return {
+        1: (),
+        2: basic,
+        3: basic + medium[:(len(medium) + 1) // 2],
+        4: basic + medium,
+        5: basic + medium,
+    }
+
+
+@dataclass(slots=True, frozen=True)
+class MutationTables:
+    """Seed-independent sampling tables for one blueprint"""
+    easy_variants: Tuple[str, ...]
+    all_variants: Tuple[str, ...]
+    contexts: Tuple[str, ...]
+    entry_points: Tuple[str, ...]
+    filters: Dict[int, Tuple[Dict, ...]]
+    max_filters: Tuple[Dict, ...]
+    hints: Dict[Tuple[str, int], Tuple[str, ...]]
+
+    def variants_for(self, difficulty: int) -> Tuple[str, ...]:
+        return self.easy_variants if difficulty <= 2 else self.all_variants
+
+    def filters_for(self, difficulty: int) -> Tuple[Dict, ...]:
+        return self.filters.get(difficulty, self.max_filters)
+
+
+def compile_tables(blueprint: VulnerabilityBlueprint, filter_codes: Dict[str, Dict],
+                   hint_builder: Callable = default_hints) -> MutationTables:
+    """Build the sampling tables for a blueprint"""
+    variants = tuple(blueprint.variants)
+    easy_variants = variants[:len(variants) // 2] if len(variants) > 2 else variants
+
+    axes = blueprint.mutation_axes or {}
+    contexts = _names(axes.get('contexts', [])) or ('default_context',)
+
+    filters = {
+        difficulty: tuple(filter_codes[name] for name in names if name in filter_codes)
+        for difficulty, names in filter_tiers(axes.get('filters', {}) or {}).items()
+    }
+
+    hints = {
+        (context, difficulty): tuple(hint_builder(list(filters[difficulty]), context, difficulty))
+        for context in contexts
+        for difficulty in DIFFICULTIES
+    }
+
+    return MutationTables(
+        easy_variants=easy_variants,
+        all_variants=variants,
+        contexts=contexts,
+        entry_points=tuple(blueprint.entry_points),
+        filters=filters,
+        max_filters=filters[5],
+        hints=hints,
+    )
+
+
+_tables: Dict[Tuple[type, bytes], MutationTables] = {}
+_tables_lock = threading.Lock()
+
+
+class TableDrivenMutation(MutationEngine):
+    """
+    Generic mutation engine driven by MutationTables
+
+    Subclasses only declare data: FILTER_CODES (filter name -> code dict),
+    VARIANT_DESCRIPTIONS (variant -> description) and optionally VULN_NAME,
+    CATEGORY, FLAG_LOCATION and OUTPUT. Unknown variants are generated as
+    the first described variant. Tables are compiled once per engine class
+    and blueprint content, so hot-reloaded blueprints get fresh tables and
+    process-pool workers compile them once per process.
+    """
+
+    VULN_NAME: str = None
+    CATEGORY: str = None
+    FILTER_CODES: Dict[str, Dict] = {}
+    VARIANT_DESCRIPTIONS: Dict[str, str] = {}
+    FLAG_LOCATION = '/var/www/html/flag.txt'
+    OUTPUT = 'direct_echo'
+
+    @classmethod
+    def build_hints(cls, filters: List[Dict], context: str, difficulty: int) -> List[str]:
+        return default_hints(filters, context, difficulty)
+
+    @classmethod
+    def tables_for(cls, blueprint: VulnerabilityBlueprint) -> MutationTables:
+        """Compiled tables for a blueprint, built on first use"""
+        key = (cls, blueprint.to_json())
+        tables = _tables.get(key)
+        if tables is None:
+            with _tables_lock:
+                tables = _tables.get(key)
+                if tables is None:
+                    tables = _tables[key] = compile_tables(blueprint, cls.FILTER_CODES, cls.build_hints)
+        return tables
+
+    def mutate(self, blueprint: VulnerabilityBlueprint, difficulty: int) -> MachineConfig:
+        """Generate a machine configuration from the blueprint's tables"""
+        tables = self.tables_for(blueprint)
+        rng = self.rng
+
+        # Draw order (variant, context, entry point) is part of the seed contract
+        variant = rng.choice(tables.variants_for(difficulty))
+        machine_id = self.generate_machine_id()
+        context = rng.choice(tables.contexts)
+        entry_point = rng.choice(tables.entry_points)
+
+        kind = variant if variant in self.VARIANT_DESCRIPTIONS else next(iter(self.VARIANT_DESCRIPTIONS), variant)
+        filters = tables.filters_for(difficulty)
+        hints = tables.hints.get((context, difficulty))
+        hints = list(hints) if hints is not None else self.build_hints(list(filters), context, difficulty)
+
+        return MachineConfig(
+            machine_id=machine_id,
+            blueprint_id=blueprint.blueprint_id,
+            variant=variant,
+            difficulty=difficulty,
+            seed=self.seed,
+            application={
+                'context': context,
+                'variant': kind,
+                'entry_point': entry_point,
+            },
+            constraints={
+                'filters': list(filters),
+            },
+            flag={
+                'content': self.generate_flag(),
+                'location': self.FLAG_LOCATION,
+            },
+            behavior={
+                'output': self.OUTPUT,
+            },
+            metadata={
+                'exploit_hints': hints,
+                'vulnerability_type': kind,
+                'estimated_solve_time': f"{difficulty * 10}-{difficulty * 15} minutes",
+                'vuln_name': self.VULN_NAME or blueprint.name,
+                'category': self.CATEGORY or blueprint.category,
+                'description': self.VARIANT_DESCRIPTIONS.get(kind, blueprint.description),
+            }
+        )
@@ -0,0 +1,139 @@
+"""
+Stream Validator
+Incremental checks for streamed LLM code completions
+
+The validator is fed completion deltas as they arrive. It strips markdown
+fences line by line and tracks PHP lexical state (strings, comments) so it
+can keep brace/paren balance as it goes. It rejects the output as soon as it
+is clearly unusable, so a bad generation costs a few tokens instead of the
+whole completion.
+"""
+
+import re
+from typing import List, Optional
+
+FENCE = re.compile(r'^\s*```[\w-]*\s*$')
+
+# Raw markup at statement level - the prompt asks for PHP logic only
+HTML_LINE = re.compile(r'^\s*<(?!\?php|\?=)(!DOCTYPE|/?[a-zA-Z][\w-]*)(\s|>|/|$)', re.IGNORECASE)
+
+# Chatty preambles instead of code
+PROSE_LINE = re.compile(r"^\s*(here(?:'s| is| are)|sure\b|certainly\b|below\b|this code\b|explanation\b)",
+                        re.IGNORECASE)
+
+
+class StreamRejected(Exception):
+    """The streamed output is invalid; reason says why"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class PhpStreamValidator:
+    """
+    Validates a streamed "PHP logic only" completion
+
+    Args:
+        max_lines: Most non-blank code lines allowed (the prompt's limit)
+    """
+
+    def __init__(self, max_lines: int = 30):
+        self.max_lines = max_lines
+        self.lines: List[str] = []
+        self.code_lines = 0
+
+        self._pending = ""
+        self._depth = {'{': 0, '(': 0}
+        self._quote: Optional[str] = None
+        self._escaped = False
+        self._block_comment = False
+
+    @property
+    def has_code(self) -> bool:
+        """True once at least one code line has been accepted"""
+        return self.code_lines > 0
+
+    @property
+    def code(self) -> str:
+        """Accepted code so far, fences removed"""
+        return "\n".join(self.lines).strip()
+
+    def feed(self, delta: str):
+        """Consume a completion delta; raises StreamRejected when the output is unusable"""
+        self._pending += delta
+        while "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+            self._line(line)
+
+    def finish(self) -> str:
+        """Flush the last line and run the end-of-stream checks; returns the code"""
+        if self._pending:
+            line, self._pending = self._pending, ""
+            self._line(line)
+
+        if self._quote:
+            raise StreamRejected("unterminated string")
+        if self._depth['{']:
+            raise StreamRejected(f"unbalanced braces ({self._depth['{']} open)")
+        if self._depth['(']:
+            raise StreamRejected(f"unbalanced parentheses ({self._depth['(']} open)")
+        if not self.has_code:
+            raise StreamRejected("no code")
+        return self.code
+
+    def _line(self, line: str):
+        if FENCE.match(line):
+            return
+
+        # Statement-level checks only make sense outside strings and comments
+        if not self._quote and not self._block_comment:
+            if HTML_LINE.match(line):
+                raise StreamRejected("HTML markup in PHP logic")
+            if not self.has_code and PROSE_LINE.match(line):
+                raise StreamRejected("prose instead of code")
+
+        self._scan(line)
+        self.lines.append(line)
+
+        if line.strip() and line.strip() not in ('<?php', '?>'):
+            self.code_lines += 1
+            if self.code_lines > self.max_lines:
+                raise StreamRejected(f"more than {self.max_lines} lines")
+
+    def _scan(self, line: str):
+        """Update string/comment state and bracket depth for one line"""
+        i = 0
+        n = len(line)
+        while i < n:
+            ch = line[i]
+
+            if self._block_comment:
+                if line.startswith('*/', i):
+                    self._block_comment = False
+                    i += 1
+            elif self._quote:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == self._quote:
+                    self._quote = None
+            elif ch in '"\'':
+                self._quote = ch
+            elif ch == '#' or line.startswith('//', i):
+                break
+            elif line.startswith('/*', i):
+                self._block_comment = True
+                i += 1
+            elif ch in '{(':
+                self._depth[ch] += 1
+            elif ch in '})':
+                opener = '{' if ch == '}' else '('
+                self._depth[opener] -= 1
+                if self._depth[opener] < 0:
+                    raise StreamRejected(f"unmatched '{ch}'")
+            i += 1
+
+        # A backslash at the end of a line doesn't escape the newline
+        self._escaped = False
@@ -7,18 +7,22 @@ Each machine gets its own docker-compose.yml for independent management
 
 import os
 import sys
-import json
 import re
+import asyncio
 from pathlib import Path
 from typing import Dict, List, Optional
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from base import MachineConfig
+from campaign_writer import load_machine_config
+from dockerfile_cache import default_dockerfile_cache
+from base_images import default_base_image_builder, machine_dockerfile, render_base_dockerfile
 
 try:
     from ai_code_generator import AICodeGenerator
     from ai_docker_generator import AIDockerGenerator
+    from llm_client import AsyncLLMClient
     AI_AVAILABLE = True
 except ImportError:
     print("⚠️ AI generators not available")
@@ -46,14 +50,8 @@ class AIEnhancedTemplate:
             self.ai_code_gen = None
             self.ai_docker_gen = None
 
-    def generate_code(self) -> str:
-        """Generate vulnerable application code using AI"""
-
-        if not self.use_ai or not self.ai_code_gen or not self.blueprint_config:
-            return self._fallback_code()
-
-        print(f"  🤖 Generating with AI...")
-
+    def _function_inputs(self) -> Dict:
+        """generate_vulnerable_function arguments for this machine"""
         # Get variant config from blueprint
         variants = self.blueprint_config.get('variants', [])
         variant_config = None
@@ -75,17 +73,37 @@ class AIEnhancedTemplate:
                 context_config = ctx
                 break
 
-        # Get filters
-        filters = self.config.constraints.get('filters', [])
+        return {
+            'blueprint_config': self.blueprint_config,
+            'variant': variant_config,
+            'difficulty': self.difficulty,
+            'context': context_config,
+            'filters': self.config.constraints.get('filters', []),
+        }
+
+    def code_request(self):
+        """The vulnerable-code completion request, or None when AI is off"""
+        if not self.use_ai or not self.ai_code_gen or not self.blueprint_config:
+            return None
+        return self.ai_code_gen.function_request(**self._function_inputs())
+
+    def generate_code(self, vuln_function: Optional[str] = None) -> str:
+        """
+        Generate vulnerable application code using AI
+
+        vuln_function is the completion when it was already fetched
+        (TemplateEngine.prefetch_code); otherwise it is requested here.
+        """
+
+        if not self.use_ai or not self.ai_code_gen or not self.blueprint_config:
+            return self._fallback_code()
 
-        # Generate vulnerable code with FULL CONFIG
-        vuln_function = self.ai_code_gen.generate_vulnerable_function(
-            blueprint_config=self.blueprint_config,
-            variant=variant_config,
-            difficulty=self.difficulty,
-            context=context_config,
-            filters=filters
-        )
+        inputs = self._function_inputs()
+        if vuln_function is None:
+            print(f"  🤖 Generating with AI...")
+            # Generate vulnerable code with FULL CONFIG
+            vuln_function = self.ai_code_gen.generate_vulnerable_function(**inputs)
+        context_config = inputs['context']
 
         if not vuln_function:
             print("  ⚠️  AI failed, using fallback")
@@ -382,41 +400,43 @@ if (isset($_GET['input'])) {{
             return self.ai_docker_gen.generate_dockerfile_from_config(self.blueprint_config)
         return self._fallback_dockerfile()
 
-    def _fallback_dockerfile(self) -> str:
-        """Fallback Dockerfile"""
-        if not self.blueprint_config:
-            return self._basic_dockerfile()
-
-        infrastructure = self.blueprint_config.get('infrastructure', {})
-        docker_reqs = infrastructure.get('docker_requirements', {})
-
-        base_image = docker_reqs.get('base_image', 'php:8.0-apache')
-        extensions = docker_reqs.get('extensions', [])
-        packages = docker_reqs.get('packages', [])
-
-        dockerfile = f'''FROM {base_image}
+    def write_dockerfile(self, dockerfile_path: Path):
+        """
+        Write the machine's Dockerfile
 
-RUN apt-get update && apt-get install -y \\
-    iputils-ping whois dnsutils net-tools curl wget \\
-'''
+        Preferably FROM the shared hackforge-base image for the blueprint's
+        docker_requirements. Without base images, AI Dockerfiles come from
+        the per-infrastructure cache and are shared (hard-linked) between
+        machines; the static fallback is written as is.
+        """
+        if dockerfile_path.exists():
+            dockerfile_path.unlink()
 
-        if packages:
-            for pkg in packages:
-                dockerfile += f'    {pkg} \\\n'
+        builder = default_base_image_builder()
+        if builder and self.blueprint_config:
+            docker_reqs = self.blueprint_config.get('infrastructure', {}).get('docker_requirements', {})
+            tag = builder.ensure(docker_reqs)
+            if tag:
+                dockerfile_path.write_text(machine_dockerfile(tag))
+                return
 
-        dockerfile += '    && rm -rf /var/lib/apt/lists/*\n\n'
+        cache = default_dockerfile_cache()
+        if cache and self.use_ai and self.ai_docker_gen and self.blueprint_config:
+            def build():
+                return self.ai_docker_gen.generate_dockerfile_from_config(self.blueprint_config, fallback=False)
 
-        if extensions:
-            ext_list = ' '.join(extensions)
-            dockerfile += f'RUN docker-php-ext-install {ext_list}\n\n'
+            if cache.install(self.blueprint_config, build, dockerfile_path):
+                return
 
-        dockerfile += '''RUN a2enmod rewrite
+        dockerfile_path.write_text(self.generate_dockerfile())
 
-EXPOSE 80
+    def _fallback_dockerfile(self) -> str:
+        """Fallback Dockerfile"""
+        if not self.blueprint_config:
+            return self._basic_dockerfile()
 
-CMD ["apache2-foreground"]
-'''
-        return dockerfile
+        infrastructure = self.blueprint_config.get('infrastructure', {})
+        return render_base_dockerfile(infrastructure.get('docker_requirements', {}))
 
     def _basic_dockerfile(self) -> str:
         """Most basic Dockerfile"""
@@ -577,7 +597,59 @@ class TemplateEngine:
             print("📝 Using static templates")
             self.ai_docker_gen = None
 
-    def generate_machine_app(self, config: MachineConfig, machine_dir: Path, port: int) -> dict:
+        # Streaming metrics from the last prefetch_code run
+        self.last_llm_metrics = None
+
+    async def prefetch_code_async(self, configs: List[MachineConfig], max_concurrency: int = 8,
+                                  stream: bool = None, batch_size: int = None) -> Dict[str, Optional[str]]:
+        """
+        Fetch every machine's vulnerable code concurrently: machine_id -> code
+
+        With stream (default: HACKFORGE_LLM_STREAM=1) completions are
+        validated as they arrive and bad ones are retried early; the
+        resulting metrics are kept in last_llm_metrics. With batch_size > 1
+        (default: HACKFORGE_LLM_BATCH) machines are packed into batched
+        requests instead, one system prompt per batch.
+        """
+        if not self.use_ai:
+            return {}
+        if stream is None:
+            stream = os.getenv('HACKFORGE_LLM_STREAM', '0') == '1'
+        if batch_size is None:
+            batch_size = int(os.getenv('HACKFORGE_LLM_BATCH', '0'))
+
+        templates = {}
+        for config in configs:
+            template = AIEnhancedTemplate(config, use_ai=True)
+            if template.code_request():
+                templates[config.machine_id] = template
+
+        async with AsyncLLMClient(max_concurrency=max_concurrency, stream=stream) as client:
+            if batch_size > 1 and templates:
+                specs = [template._function_inputs() for template in templates.values()]
+                code_gen = next(iter(templates.values())).ai_code_gen
+                results = await code_gen.generate_functions_batched(client, specs, batch_size=batch_size)
+            else:
+                results = await client.generate_many(t.code_request() for t in templates.values())
+            if stream:
+                self.last_llm_metrics = client.stream_metrics()
+        return dict(zip(templates, results))
+
+    def prefetch_code(self, configs: List[MachineConfig], max_concurrency: int = 8,
+                      stream: bool = None, batch_size: int = None) -> Dict[str, Optional[str]]:
+        """Blocking prefetch_code_async, for callers without an event loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            # asyncio.run would fail anyway; say what to do instead
+            raise RuntimeError("prefetch_code() called from a running event loop: await prefetch_code_async(), "
+                               "or run the caller (e.g. process_all_machines) with asyncio.to_thread")
+        return asyncio.run(self.prefetch_code_async(configs, max_concurrency, stream, batch_size))
+
+    def generate_machine_app(self, config: MachineConfig, machine_dir: Path, port: int,
+                             vuln_function: Optional[str] = None) -> dict:
         """Generate complete application with INDIVIDUAL docker-compose"""
 
         print(f"\n🔨 Generating: {config.machine_id}")
@@ -586,7 +658,7 @@ class TemplateEngine:
         print(f"   Port: {port}")
 
         if config.blueprint_config:
-            print(f"   ✓ Blueprint config loaded ({len(json.dumps(config.blueprint_config))} bytes)")
+            print(f"   ✓ Blueprint config loaded ({config.blueprint_config_ref})")
         else:
             print(f"   ⚠️  No blueprint config - using fallback")
 
@@ -599,7 +671,7 @@ class TemplateEngine:
             # 1. Generate vulnerable code
             template = AIEnhancedTemplate(config, use_ai=self.use_ai)
 
-            app_code = template.generate_code()
+            app_code = template.generate_code(vuln_function)
             if not app_code:
                 print("   ✗ Code generation failed")
                 return None
@@ -609,9 +681,8 @@ class TemplateEngine:
             print(f"   ✓ Code: {app_file}")
 
             # 2. Generate Dockerfile
-            dockerfile = template.generate_dockerfile()
             dockerfile_path = machine_dir / "Dockerfile"
-            dockerfile_path.write_text(dockerfile)
+            template.write_dockerfile(dockerfile_path)
             print(f"   ✓ Dockerfile: {dockerfile_path}")
 
             # 3. Generate INDIVIDUAL docker-compose.yml
@@ -703,32 +774,42 @@ echo "✓ Machine stopped"
         content += f"\n## Flag\n\n`{config.flag['content']}`\n"
         return content
 
-    def process_all_machines(self, start_port: int = 8081) -> list:
-        """Process all machines with INDIVIDUAL docker-compose files"""
+    def process_all_machines(self, start_port: int = 8081, machines_dir: Path = None) -> list:
+        """
+        Process all machines (in machines_dir, default self.machines_dir) with INDIVIDUAL docker-compose files
+
+        Blocking (LLM prefetch, base-image builds): from async code run it
+        with asyncio.to_thread. Called on an event loop it raises RuntimeError.
+        """
+        machines_dir = Path(machines_dir) if machines_dir else self.machines_dir
 
         print(f"\n{'='*60}")
-        print(f"Processing Machines: {self.machines_dir}")
+        print(f"Processing Machines: {machines_dir}")
         print(f"{'='*60}")
 
         machines_generated = []
         port = start_port
 
         machine_dirs = [
-            d for d in self.machines_dir.iterdir()
+            d for d in machines_dir.iterdir()
             if d.is_dir() and not d.name.startswith('.') and (d / "config.json").exists()
         ]
 
         print(f"\nFound {len(machine_dirs)} machine(s)\n")
 
+        configs = []
         for machine_dir in machine_dirs:
-            config_file = machine_dir / "config.json"
-
             try:
-                with open(config_file, 'r') as f:
-                    config_dict = json.load(f)
+                configs.append((MachineConfig(**load_machine_config(machine_dir, inline_config=False)), machine_dir))
+            except Exception as e:
+                print(f"   ✗ Error: {e}")
 
-                config = MachineConfig(**config_dict)
-                result = self.generate_machine_app(config, machine_dir, port)
+        # One concurrent round of completions instead of one blocking call per machine
+        code = self.prefetch_code([config for config, _ in configs]) if self.use_ai else {}
+
+        for config, machine_dir in configs:
+            try:
+                result = self.generate_machine_app(config, machine_dir, port, code.get(config.machine_id))
 
                 if result:
                     machines_generated.append(result)
@@ -739,7 +820,7 @@ echo "✓ Machine stopped"
 
         # Generate master management script
         if machines_generated:
-            self._generate_master_scripts(machines_generated)
+            self._generate_master_scripts(machines_generated, machines_dir)
 
         print(f"\n{'='*60}")
         print(f"✓ Generated {len(machines_generated)} application(s)")
@@ -747,8 +828,13 @@ echo "✓ Machine stopped"
 
         return machines_generated
 
-    def _generate_master_scripts(self, machines: list):
+    def generate_campaign_apps(self, campaign_path, start_port: int = 8081) -> list:
+        """Render every machine of an exported campaign (campaigns/<id>/<machine_id>/)"""
+        return self.process_all_machines(start_port=start_port, machines_dir=Path(campaign_path))
+
+    def _generate_master_scripts(self, machines: list, machines_dir: Path = None):
         """Generate master scripts to manage all machines"""
+        machines_dir = machines_dir or self.machines_dir
         
         # Start all script
         start_all = '''#!/bin/bash
@@ -776,7 +862,7 @@ echo "Active machines:"
             start_all += f'''echo "  • http://localhost:{m['port']} - {m['machine_id']}"
 '''
 
-        start_file = self.machines_dir / "start_all.sh"
+        start_file = machines_dir / "start_all.sh"
         start_file.write_text(start_all)
         start_file.chmod(0o755)
         print(f"✓ Master script: {start_file}")
@@ -801,7 +887,7 @@ echo ""
 echo "✓ All machines stopped!"
 '''
 
-        stop_file = self.machines_dir / "stop_all.sh"
+        stop_file = machines_dir / "stop_all.sh"
         stop_file.write_text(stop_all)
         stop_file.chmod(0o755)
         print(f"✓ Master script: {stop_file}")
@@ -825,7 +911,7 @@ echo ""
 
 '''
 
-        list_file = self.machines_dir / "list_machines.sh"
+        list_file = machines_dir / "list_machines.sh"
         list_file.write_text(list_script)
         list_file.chmod(0o755)
         print(f"✓ Master script: {list_file}")
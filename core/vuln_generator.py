@@ -94,14 +94,12 @@ mutation_axes:
 
         class_name = self._to_class_name(self.category) + "Mutation"
         variants = self.config.get('variants', [])
-        variant_names = [v['name'] if isinstance(v, dict) else v for v in variants]
 
-        # Generate variant methods
-        variant_methods = []
+        description_lines = []
         for variant in variants:
             variant_obj = variant if isinstance(variant, dict) else {'name': variant}
-            method_name = self._to_method_name(variant_obj['name'])
-            variant_methods.append(self._generate_variant_method(variant_obj, method_name))
+            description_lines.append(
+                f"        {variant_obj['name']!r}: {variant_obj.get('description', '')!r},")
 
         mutation_code = f'''"""
 {self.vuln_name} Mutation Engine
@@ -112,75 +110,24 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from base import MutationEngine, VulnerabilityBlueprint, MachineConfig
-from typing import Dict, List, Any
+from mutation_tables import TableDrivenMutation
 
 
-class {class_name}(MutationEngine):
+class {class_name}(TableDrivenMutation):
     """
     Mutation engine for {self.vuln_name} vulnerabilities
     """
 
-    def mutate(self, blueprint: VulnerabilityBlueprint, difficulty: int) -> MachineConfig:
-        """Generate unique {self.vuln_name.lower()} machine configuration"""
-
-        # Select variant based on difficulty
-        variant = self._select_variant(blueprint.variants, difficulty)
-
-        # Generate machine ID
-        machine_id = self.generate_machine_id()
-
-        # Generate configuration based on variant
-{self._generate_variant_dispatch(variant_names)}
-
-        # Create machine config
-        return MachineConfig(
-            machine_id=machine_id,
-            blueprint_id=blueprint.blueprint_id,
-            variant=variant,
-            difficulty=difficulty,
-            seed=self.seed,
-            application=config['application'],
-            constraints=config['constraints'],
-            flag=config['flag'],
-            behavior=config['behavior'],
-            metadata=config['metadata']
-        )
-
-    def _select_variant(self, variants: List[str], difficulty: int) -> str:
-        """Select variant based on difficulty level"""
-        if difficulty <= 2:
-            easy_variants = variants[:len(variants)//2] if len(variants) > 2 else variants
-            return self.select_random(easy_variants)
-        else:
-            return self.select_random(variants)
+    VULN_NAME = {self.vuln_name!r}
+    CATEGORY = {self.category!r}
 
-{chr(10).join(variant_methods)}
+    VARIANT_DESCRIPTIONS = {{
+{chr(10).join(description_lines)}
+    }}
 
-    def _get_filter_codes(self, filter_names: List[str]) -> List[Dict]:
-        """Convert filter names to filter code objects"""
-        filter_map = {{
+    FILTER_CODES = {{
 {self._generate_filter_map()}
-        }}
-
-        return [filter_map[f] for f in filter_names if f in filter_map]
-
-    def _generate_hints(self, filters: List[Dict], context: str, difficulty: int) -> List[str]:
-        """Generate context-specific hints"""
-        hints = [
-            f"Context: {{context}}",
-            f"Difficulty: {{difficulty}}/5",
-        ]
-
-        if not filters:
-            hints.append("✓ No input filtering - direct attack possible")
-        else:
-            hints.append(f"⚠️ Filters active: {{', '.join([f['type'] for f in filters])}}")
-
-        if difficulty <= 2:
-            hints.append("💡 Try basic payloads first")
-
-        return hints
+    }}
 '''
         return mutation_code
 
@@ -325,22 +272,6 @@ class {class_name}(BaseTemplate):
         """Convert name to method name"""
         return '_generate_' + name.lower().replace(' ', '_').replace('-', '_')
 
-    def _generate_variant_dispatch(self, variants: list) -> str:
-        """Generate if-elif chain for variant dispatch"""
-        lines = []
-        for i, variant in enumerate(variants):
-            variant_name = variant if isinstance(variant, str) else variant['name']
-            method_name = self._to_method_name(variant_name)
-            if i == 0:
-                lines.append(f'        if variant == "{variant_name}":')
-            else:
-                lines.append(f'        elif variant == "{variant_name}":')
-            lines.append(f'            config = self.{method_name}(blueprint, difficulty)')
-        lines.append('        else:')
-        first_variant = variants[0] if isinstance(variants[0], str) else variants[0]['name']
-        lines.append(f'            config = self.{self._to_method_name(first_variant)}(blueprint, difficulty)')
-        return '\n'.join(lines)
-
     def _generate_template_dispatch(self, variants: list) -> str:
         """Generate if-elif chain for template dispatch"""
         lines = []
@@ -357,67 +288,6 @@ class {class_name}(BaseTemplate):
         lines.append(f'            return self.{self._to_method_name(first_variant)}()')
         return '\n'.join(lines)
 
-    def _generate_variant_method(self, variant: dict, method_name: str) -> str:
-        """Generate a variant mutation method"""
-
-        variant_name = variant['name']
-        contexts = self.config.get('mutation_axes', {}).get('contexts', [])
-        
-        # Get contexts list
-        if contexts and isinstance(contexts[0], dict):
-            context_names = [c['name'] for c in contexts]
-        else:
-            context_names = contexts if contexts else ['default_context']
-
-        return f'''    def {method_name}(self, blueprint: VulnerabilityBlueprint, difficulty: int) -> Dict:
-        """Generate {variant_name} vulnerability configuration"""
-
-        contexts = {context_names}
-        context = self.select_random(contexts)
-        
-        entry_points = blueprint.entry_points
-        entry_point = self.select_random(entry_points)
-
-        # Select filters based on difficulty
-        if difficulty == 1:
-            filters = []
-        elif difficulty == 2:
-            filters = self._get_filter_codes(['single_quote', 'or_keyword'])
-        elif difficulty == 3:
-            filters = self._get_filter_codes(['single_quote', 'or_keyword', 'union_keyword'])
-        else:
-            filters = self._get_filter_codes(['single_quote', 'or_keyword', 'union_keyword', 'select_keyword'])
-
-        flag_content = self.generate_flag()
-        hints = self._generate_hints(filters, context, difficulty)
-
-        return {{
-            'application': {{
-                'context': context,
-                'variant': '{variant_name}',
-                'entry_point': entry_point,
-            }},
-            'constraints': {{
-                'filters': filters,
-            }},
-            'flag': {{
-                'content': flag_content,
-                'location': '/var/www/html/flag.txt',
-            }},
-            'behavior': {{
-                'output': 'direct_echo',
-            }},
-            'metadata': {{
-                'exploit_hints': hints,
-                'vulnerability_type': '{variant_name}',
-                'estimated_solve_time': f"{{difficulty * 10}}-{{difficulty * 15}} minutes",
-                'vuln_name': '{self.vuln_name}',
-                'category': '{self.category}',
-                'description': '{variant.get("description", "")}',
-            }}
-        }}
-'''
-
     def _generate_template_method(self, variant: dict, method_name: str, needs_db: bool) -> str:
         """Generate a variant template method WITH THEME SUPPORT"""
 
@@ -538,14 +408,14 @@ class {class_name}(BaseTemplate):
                             python_code = filter_obj.get('python_code', '').replace('"', '\\"').replace("'", "\\'")
                             description = filter_obj.get('description', '').replace("'", "\\'")
                             
-                            filter_entries.append(f"""            '{filter_name}': {{
-                'type': '{filter_obj.get('type', filter_name)}',
-                'description': '{description}',
-                'php_code': '''{php_code}''',
-                'python_code': '''{python_code}''',
-            }}""")
-
-        return ',\n'.join(filter_entries) if filter_entries else "            # No filters defined"
+                            filter_entries.append(f"""        '{filter_name}': {{
+            'type': '{filter_obj.get('type', filter_name)}',
+            'description': '{description}',
+            'php_code': '''{php_code}''',
+            'python_code': '''{python_code}''',
+        }}""")
+
+        return ',\n'.join(filter_entries) if filter_entries else "        # No filters defined"
 
     def _generate_dockerfile_method(self) -> str:
         """Generate Dockerfile method based on infrastructure requirements"""
@@ -0,0 +1,228 @@
+"""
+Campaign Lifecycle
+Start or stop every machine of a campaign in parallel
+
+Each machine is its own compose project, so machines are independent and a
+campaign starts in about the time of its slowest machine instead of the sum
+of all of them. Work goes through a ComposeRunner (control plane or compose
+CLI, serialised per machine) under a campaign-wide concurrency cap.
+
+Starts are ordered by dependency: a machine's dependency services (the ones
+other services depend_on - its database) are brought up first, and those
+steps take free slots ahead of image builds, so databases initialise while
+the web images are still building. The web services follow once their own
+machine's dependencies are up.
+"""
+
+import time
+import heapq
+import asyncio
+import itertools
+import contextlib
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import yaml
+
+from compose_runner import ComposeRunner
+
+# Slot priorities: lower goes first
+DEPENDENCIES = 0
+SERVICES = 1
+
+
+def dependency_services(machine_dir: Path) -> List[str]:
+    """Services of a machine's docker-compose.yml that other services depend on"""
+    try:
+        with open(Path(machine_dir) / "docker-compose.yml", 'r') as f:
+            compose = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return []
+
+    services = compose.get('services') or {}
+    dependencies = []
+    for service in services.values():
+        # depends_on is a list, or a mapping of service -> condition
+        for name in (service or {}).get('depends_on') or []:
+            if name in services and name not in dependencies:
+                dependencies.append(name)
+    return dependencies
+
+
+class _PrioritySlots:
+    """A semaphore that hands free slots to the lowest priority waiting"""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: List = []
+        self._order = itertools.count()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: int):
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Handed a slot just as we were cancelled - pass it on
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+
+@dataclass
+class MachineRun:
+    machine_id: str
+    machine_dir: str
+    success: bool = False
+    message: str = ""
+    seconds: float = 0.0
+    # step -> seconds (dependencies, services / down)
+    steps: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class CampaignRun:
+    action: str
+    machines: List[MachineRun]
+    # Wall time of the whole run, and what running the machines one by one would have taken
+    seconds: float = 0.0
+    serial_seconds: float = 0.0
+    max_parallel: int = 1
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for machine in self.machines if machine.success)
+
+    @property
+    def failed(self) -> int:
+        return len(self.machines) - self.succeeded
+
+    def to_dict(self) -> Dict:
+        return {
+            'action': self.action,
+            'total': len(self.machines),
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'seconds': round(self.seconds, 3),
+            'serial_seconds': round(self.serial_seconds, 3),
+            'max_parallel': self.max_parallel,
+            'results': [asdict(machine) for machine in self.machines],
+        }
+
+
+class CampaignLifecycle:
+    """
+    Parallel start/stop of a campaign's machines
+
+    Args:
+        runner: ComposeRunner the machine operations go through (its own
+                max_concurrency still bounds compose processes overall)
+        max_parallel: Machine operations in flight for one campaign
+        timeout: Seconds allowed per machine operation
+    """
+
+    def __init__(self, runner: ComposeRunner, max_parallel: int = 8, timeout: float = 300):
+        self.runner = runner
+        self.max_parallel = max(1, max_parallel)
+        self.timeout = timeout
+
+    @staticmethod
+    def _missing(machine_dir: Path) -> Optional[MachineRun]:
+        if (machine_dir / "docker-compose.yml").exists():
+            return None
+        return MachineRun(machine_dir.name, str(machine_dir), message="docker-compose.yml not found")
+
+    async def _start_machine(self, machine_dir: Path, build: bool, slots: _PrioritySlots) -> MachineRun:
+        run = self._missing(machine_dir)
+        if run:
+            return run
+        run = MachineRun(machine_dir.name, str(machine_dir))
+        started = time.perf_counter()
+        try:
+            dependencies = dependency_services(machine_dir)
+            if dependencies:
+                async with slots.slot(DEPENDENCIES):
+                    result = await self.runner.up(machine_dir, build=build, timeout=self.timeout,
+                                                  services=dependencies)
+                run.steps['dependencies'] = round(result.seconds, 3)
+                if not result.ok:
+                    run.message = result.stderr.strip() or f"exit status {result.returncode}"
+                    return run
+
+            async with slots.slot(SERVICES):
+                result = await self.runner.up(machine_dir, build=build, timeout=self.timeout)
+            run.steps['services'] = round(result.seconds, 3)
+            run.success = result.ok
+            run.message = "Started" if result.ok else (result.stderr.strip() or f"exit status {result.returncode}")
+        except Exception as e:
+            run.message = f"{type(e).__name__}: {e}"
+        finally:
+            run.seconds = round(time.perf_counter() - started, 3)
+        return run
+
+    async def _stop_machine(self, machine_dir: Path, slots: _PrioritySlots) -> MachineRun:
+        run = self._missing(machine_dir)
+        if run:
+            return run
+        run = MachineRun(machine_dir.name, str(machine_dir))
+        started = time.perf_counter()
+        try:
+            async with slots.slot(SERVICES):
+                result = await self.runner.down(machine_dir, timeout=self.timeout)
+            run.steps['down'] = round(result.seconds, 3)
+            run.success = result.ok
+            run.message = "Stopped" if result.ok else (result.stderr.strip() or f"exit status {result.returncode}")
+        except Exception as e:
+            run.message = f"{type(e).__name__}: {e}"
+        finally:
+            run.seconds = round(time.perf_counter() - started, 3)
+        return run
+
+    async def _run(self, action: str, coroutines) -> CampaignRun:
+        started = time.perf_counter()
+        machines = list(await asyncio.gather(*coroutines))
+        return CampaignRun(
+            action=action,
+            machines=machines,
+            seconds=time.perf_counter() - started,
+            serial_seconds=sum(sum(machine.steps.values()) for machine in machines),
+            max_parallel=self.max_parallel,
+        )
+
+    async def start(self, machine_dirs: Sequence[Path], build: Union[bool, Sequence[bool]] = True) -> CampaignRun:
+        """
+        docker-compose up every machine, dependencies first
+
+        build is one flag for all machines or one per machine (e.g. only
+        rebuild pooled machines whose image wasn't prebuilt).
+        """
+        machine_dirs = [Path(machine_dir) for machine_dir in machine_dirs]
+        builds = [build] * len(machine_dirs) if isinstance(build, bool) else list(build)
+        slots = _PrioritySlots(self.max_parallel)
+        return await self._run('start', [self._start_machine(machine_dir, needs_build, slots)
+                                         for machine_dir, needs_build in zip(machine_dirs, builds)])
+
+    async def stop(self, machine_dirs: Sequence[Path]) -> CampaignRun:
+        """docker-compose down every machine"""
+        slots = _PrioritySlots(self.max_parallel)
+        return await self._run('stop', [self._stop_machine(Path(machine_dir), slots) for machine_dir in machine_dirs])
@@ -0,0 +1,213 @@
+"""
+Compose Runner
+Non-blocking docker-compose execution for the async API
+
+Every compose call runs as an asyncio subprocess, so a build that takes
+minutes never holds up the event loop. Calls are bounded by a concurrency
+cap, and calls for the same machine directory are serialised: a start and a
+stop issued together run one after the other instead of racing.
+
+With a DockerControlPlane attached, machines whose compose file it can
+model are managed over the Docker SDK instead (in the runner's threads,
+under the same per-machine locks); everything else still forks compose.
+
+Blocking helpers that can't be made async (the bulk DockerOrchestrator
+operations) run in a small thread pool through run_blocking().
+"""
+
+import os
+import json
+import time
+import asyncio
+import subprocess
+import weakref
+import concurrent.futures
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class ComposeResult:
+    returncode: int
+    stdout: str
+    stderr: str
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class ComposeRunner:
+    """
+    Runs docker-compose for machine directories without blocking the loop
+
+    Args:
+        compose_command: The compose executable (and leading args), default
+                         HACKFORGE_COMPOSE_BIN or "docker-compose"
+        max_concurrency: Compose processes allowed at once
+        blocking_workers: Threads for run_blocking() and control plane calls
+        control_plane: Optional DockerControlPlane used instead of the CLI
+                       for machines it supports
+    """
+
+    def __init__(self, compose_command: List[str] = None, max_concurrency: int = 4,
+                 blocking_workers: int = 4, control_plane=None):
+        self.compose_command = list(compose_command or os.getenv('HACKFORGE_COMPOSE_BIN', 'docker-compose').split())
+        self.max_concurrency = max(1, max_concurrency)
+        self.blocking_workers = blocking_workers
+        self.control_plane = control_plane
+
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        # One lock per machine directory, dropped once nobody holds or waits on it
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._threads: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+        self.calls = 0
+        self.sdk_calls = 0
+        self.running = 0
+
+    def lock(self, machine_dir: Path) -> asyncio.Lock:
+        """The lock serialising compose calls for one machine directory"""
+        key = str(Path(machine_dir).resolve())
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def _exec(self, machine_dir: Path, args: List[str], timeout: float) -> ComposeResult:
+        command = self.compose_command + list(args)
+        async with self._slots:
+            self.calls += 1
+            self.running += 1
+            start = time.perf_counter()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *command,
+                    cwd=str(machine_dir),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                try:
+                    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+                    raise subprocess.TimeoutExpired(command, timeout)
+                except asyncio.CancelledError:
+                    process.kill()
+                    raise
+            finally:
+                self.running -= 1
+
+        return ComposeResult(
+            returncode=process.returncode,
+            stdout=stdout.decode(errors='replace'),
+            stderr=stderr.decode(errors='replace'),
+            seconds=time.perf_counter() - start,
+        )
+
+    async def _sdk(self, machine_dir: Path, operation: str, *args) -> Optional[ComposeResult]:
+        """
+        Run a control plane operation; None means "use the compose CLI"
+        (no control plane, unsupported compose file, or docker unreachable)
+        """
+        if self.control_plane is None or not self.control_plane.supports(machine_dir):
+            return None
+
+        start = time.perf_counter()
+        async with self._slots:
+            self.sdk_calls += 1
+            try:
+                output = await self.run_blocking(getattr(self.control_plane, operation), machine_dir, *args)
+            except Exception as e:
+                if not self.control_plane.available:
+                    return None
+                return ComposeResult(1, "", str(e), time.perf_counter() - start)
+
+        if not isinstance(output, str):
+            output = json.dumps(output)
+        return ComposeResult(0, output, "", time.perf_counter() - start)
+
+    async def run(self, machine_dir: Path, *args: str, timeout: float = 300) -> ComposeResult:
+        """
+        docker-compose <args> in machine_dir
+
+        Raises subprocess.TimeoutExpired (after killing the process) when
+        it runs longer than timeout, like subprocess.run does.
+        """
+        async with self.lock(machine_dir):
+            return await self._exec(machine_dir, list(args), timeout)
+
+    async def up(self, machine_dir: Path, build: bool = True, timeout: float = 300,
+                 services: List[str] = None) -> ComposeResult:
+        """docker-compose up -d [--build] [services...]"""
+        services = list(services or [])
+        async with self.lock(machine_dir):
+            result = await self._sdk(machine_dir, 'up', build, services)
+            if result is None:
+                result = await self._exec(machine_dir, ["up", "-d", *(["--build"] if build else []), *services],
+                                          timeout)
+            return result
+
+    async def down(self, machine_dir: Path, timeout: float = 60) -> ComposeResult:
+        async with self.lock(machine_dir):
+            result = await self._sdk(machine_dir, 'down')
+            if result is None:
+                result = await self._exec(machine_dir, ["down"], timeout)
+            return result
+
+    async def restart(self, machine_dir: Path, timeout: float = 300) -> ComposeResult:
+        """down then up --build, holding the machine's lock across both"""
+        async with self.lock(machine_dir):
+            result = await self._sdk(machine_dir, 'restart')
+            if result is None:
+                await self._exec(machine_dir, ["down"], 60)
+                result = await self._exec(machine_dir, ["up", "-d", "--build"], timeout)
+            return result
+
+    async def ps(self, machine_dir: Path, timeout: float = 30) -> List[Dict]:
+        """Containers of the machine's compose project (docker-compose ps --format json)"""
+        # Read-only: answered while a start/stop for the machine is in progress
+        result = await self._sdk(machine_dir, 'status')
+        if result is not None:
+            return json.loads(result.stdout) if result.ok else []
+
+        result = await self._exec(machine_dir, ["ps", "--format", "json"], timeout)
+        containers = []
+        if result.ok:
+            for line in result.stdout.strip().split('\n'):
+                if line:
+                    try:
+                        containers.append(json.loads(line))
+                    except ValueError:
+                        pass
+        return containers
+
+    async def logs(self, machine_dir: Path, tail: int = 100, timeout: float = 30) -> ComposeResult:
+        result = await self._sdk(machine_dir, 'logs', tail)
+        if result is not None:
+            return result
+        return await self._exec(machine_dir, ["logs", f"--tail={tail}"], timeout)
+
+    async def run_blocking(self, func: Callable, *args):
+        """Run a blocking call (e.g. a DockerOrchestrator bulk operation) in the runner's threads"""
+        if self._threads is None:
+            self._threads = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.blocking_workers, thread_name_prefix="hackforge-docker")
+        return await asyncio.get_running_loop().run_in_executor(self._threads, func, *args)
+
+    def stats(self) -> Dict:
+        return {
+            'calls': self.calls,
+            'sdk_calls': self.sdk_calls,
+            'running': self.running,
+            'max_concurrency': self.max_concurrency,
+            'locked_machines': sum(1 for lock in list(self._locks.values()) if lock.locked()),
+        }
+
+    def shutdown(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=False)
+            self._threads = None
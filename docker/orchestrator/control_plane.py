@@ -0,0 +1,465 @@
+"""
+Docker Control Plane
+One long-lived Docker SDK client for every container operation
+
+Forking docker-compose costs hundreds of milliseconds of process start-up
+per call; an SDK call over the daemon socket costs a few milliseconds. The
+control plane reads a machine's docker-compose.yml - the file the template
+engine and pipeline already write - into a MachineSpec and creates the
+network, volumes and containers for it directly, in dependency order.
+
+The compose file stays the import/export format: containers carry the
+compose project/service labels, so `docker-compose ps/down` still work on
+them, and compose files using anything the spec doesn't model raise
+UnsupportedCompose so callers fall back to the compose CLI.
+
+The client is injectable; anything implementing the low-level APIClient
+methods used here (client.api.*) works, so it can be tested without docker.
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+try:
+    import docker
+except ImportError:
+    docker = None
+
+PROJECT_LABEL = "com.docker.compose.project"
+SERVICE_LABEL = "com.docker.compose.service"
+MACHINE_LABEL = "hackforge.machine_id"
+
+# Service keys the spec models; anything else goes to the compose CLI
+SUPPORTED_KEYS = {'build', 'image', 'container_name', 'ports', 'volumes', 'environment',
+                  'depends_on', 'networks', 'restart', 'healthcheck'}
+
+DURATION = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+DURATION_NS = {'ms': 10 ** 6, 's': 10 ** 9, 'm': 60 * 10 ** 9, 'h': 3600 * 10 ** 9}
+
+
+class UnsupportedCompose(Exception):
+    """The compose file uses something the control plane doesn't model"""
+
+
+@dataclass
+class ServiceSpec:
+    name: str
+    container_name: str
+    image: str
+    build: Optional[Path] = None
+    # container port -> host port
+    ports: Dict[int, int] = field(default_factory=dict)
+    # host path or volume name -> {'bind': container path, 'mode': 'rw'/'ro'}
+    binds: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    environment: Dict[str, str] = field(default_factory=dict)
+    depends_on: List[str] = field(default_factory=list)
+    restart: Optional[str] = None
+    healthcheck: Optional[Dict] = None
+
+
+@dataclass
+class MachineSpec:
+    project: str
+    machine_dir: Path
+    network: str
+    # Ordered so every service comes after the ones it depends on
+    services: List[ServiceSpec]
+    volumes: List[str] = field(default_factory=list)
+
+
+def _duration_ns(value) -> int:
+    if isinstance(value, (int, float)):
+        return int(value * 10 ** 9)
+    return sum(int(float(amount) * DURATION_NS[unit]) for amount, unit in DURATION.findall(str(value)))
+
+
+def _environment(value) -> Dict[str, str]:
+    if isinstance(value, dict):
+        return {str(k): '' if v is None else str(v) for k, v in value.items()}
+    environment = {}
+    for item in value or []:
+        key, _, val = str(item).partition('=')
+        environment[key] = val
+    return environment
+
+
+def _dependency_order(services: Dict[str, ServiceSpec]) -> List[ServiceSpec]:
+    ordered: List[ServiceSpec] = []
+    visiting = set()
+
+    def visit(name: str):
+        if any(service.name == name for service in ordered):
+            return
+        if name in visiting:
+            raise UnsupportedCompose(f"dependency cycle at service {name}")
+        visiting.add(name)
+        for dependency in services[name].depends_on:
+            if dependency not in services:
+                raise UnsupportedCompose(f"{name} depends on unknown service {dependency}")
+            visit(dependency)
+        visiting.discard(name)
+        ordered.append(services[name])
+
+    for name in services:
+        visit(name)
+    return ordered
+
+
+def load_machine_spec(machine_dir: Path) -> MachineSpec:
+    """Read a machine's docker-compose.yml into a MachineSpec"""
+    machine_dir = Path(machine_dir).resolve()
+    with open(machine_dir / "docker-compose.yml", 'r') as f:
+        compose = yaml.safe_load(f) or {}
+
+    # Same project name docker-compose would use, so its labels match
+    project = re.sub(r'[^a-z0-9_-]', '', machine_dir.name.lower())
+    declared_networks = list((compose.get('networks') or {}).keys())
+    if len(declared_networks) > 1:
+        raise UnsupportedCompose("more than one network")
+    network = f"{project}_{declared_networks[0] if declared_networks else 'default'}"
+    volumes = [f"{project}_{name}" for name in (compose.get('volumes') or {})]
+
+    services: Dict[str, ServiceSpec] = {}
+    for name, definition in (compose.get('services') or {}).items():
+        definition = definition or {}
+        unsupported = set(definition) - SUPPORTED_KEYS
+        if unsupported:
+            raise UnsupportedCompose(f"service {name} uses {', '.join(sorted(unsupported))}")
+
+        build = definition.get('build')
+        if isinstance(build, dict):
+            if set(build) - {'context'}:
+                raise UnsupportedCompose(f"service {name} uses build options")
+            build = build.get('context', '.')
+
+        ports = {}
+        for mapping in definition.get('ports', []):
+            parts = str(mapping).split(':')
+            if len(parts) != 2:
+                raise UnsupportedCompose(f"port mapping {mapping}")
+            ports[int(parts[1].split('/')[0])] = int(parts[0])
+
+        binds = {}
+        for mapping in definition.get('volumes', []):
+            parts = str(mapping).split(':')
+            if len(parts) not in (2, 3):
+                raise UnsupportedCompose(f"volume {mapping}")
+            source = parts[0]
+            if source.startswith(('.', '/')):
+                source = str((machine_dir / source).resolve())
+            else:
+                source = f"{project}_{source}"
+            binds[source] = {'bind': parts[1], 'mode': parts[2] if len(parts) == 3 else 'rw'}
+
+        depends_on = definition.get('depends_on') or []
+        healthcheck = definition.get('healthcheck')
+        if healthcheck:
+            test = healthcheck.get('test')
+            healthcheck = {
+                'test': test if isinstance(test, list) else ['CMD-SHELL', str(test)],
+                'interval': _duration_ns(healthcheck.get('interval', '30s')),
+                'timeout': _duration_ns(healthcheck.get('timeout', '30s')),
+                'retries': int(healthcheck.get('retries', 3)),
+            }
+
+        services[name] = ServiceSpec(
+            name=name,
+            container_name=definition.get('container_name') or f"{project}_{name}_1",
+            image=definition.get('image') or f"{project}_{name}",
+            build=(machine_dir / build).resolve() if build else None,
+            ports=ports,
+            binds=binds,
+            environment=_environment(definition.get('environment')),
+            depends_on=list(depends_on.keys() if isinstance(depends_on, dict) else depends_on),
+            restart=definition.get('restart'),
+            healthcheck=healthcheck,
+        )
+
+    return MachineSpec(project, machine_dir, network, _dependency_order(services), volumes)
+
+
+def _is_not_found(error: Exception) -> bool:
+    if docker is not None and isinstance(error, docker.errors.NotFound):
+        return True
+    return type(error).__name__ in ('NotFound', 'ImageNotFound')
+
+
+class DockerControlPlane:
+    """
+    Container lifecycle for machines over a single pooled SDK client
+
+    Args:
+        client: docker.DockerClient (or a fake exposing .api); by default one
+                is created from the environment on first use
+        max_pool_size: HTTP connections kept to the daemon
+        stop_timeout: Seconds containers get to stop before they are killed
+    """
+
+    def __init__(self, client=None, max_pool_size: int = 32, stop_timeout: int = 10):
+        self._client = client
+        self.max_pool_size = max_pool_size
+        self.stop_timeout = stop_timeout
+        self._client_lock = threading.Lock()
+        self._specs: Dict[str, Tuple[float, MachineSpec]] = {}
+        # Images and networks known to exist, so repeat starts skip the lookups
+        self._images = set()
+        self._networks = set()
+        self.available = client is not None or docker is not None
+        self.calls = 0
+
+    @property
+    def client(self):
+        """The shared SDK client; raises when docker isn't reachable"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    if docker is None:
+                        raise RuntimeError("docker SDK not installed (pip install docker)")
+                    try:
+                        self._client = docker.DockerClient.from_env(max_pool_size=self.max_pool_size)
+                    except Exception:
+                        self.available = False
+                        raise
+        return self._client
+
+    @property
+    def api(self):
+        self.calls += 1
+        return self.client.api
+
+    def spec(self, machine_dir: Path) -> MachineSpec:
+        """The machine's spec, re-read only when its compose file changes"""
+        compose_file = Path(machine_dir) / "docker-compose.yml"
+        mtime = compose_file.stat().st_mtime
+        cached = self._specs.get(str(compose_file))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        spec = load_machine_spec(machine_dir)
+        self._specs[str(compose_file)] = (mtime, spec)
+        return spec
+
+    def supports(self, machine_dir: Path) -> bool:
+        """True when this machine can be managed without the compose CLI"""
+        if not self.available:
+            return False
+        try:
+            self.spec(machine_dir)
+            return True
+        except (UnsupportedCompose, OSError, ValueError, yaml.YAMLError):
+            return False
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def _labels(self, spec: MachineSpec, service: str = None) -> Dict[str, str]:
+        labels = {PROJECT_LABEL: spec.project, MACHINE_LABEL: spec.project}
+        if service:
+            labels[SERVICE_LABEL] = service
+        return labels
+
+    def _ensure_network(self, spec: MachineSpec):
+        if spec.network in self._networks:
+            return
+        if not self.api.networks(names=[spec.network]):
+            self.api.create_network(spec.network, driver='bridge', labels=self._labels(spec))
+        self._networks.add(spec.network)
+
+    def _image_exists(self, tag: str) -> bool:
+        if tag in self._images:
+            return True
+        try:
+            self.api.inspect_image(tag)
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            return False
+        self._images.add(tag)
+        return True
+
+    def _ensure_image(self, service: ServiceSpec, build: bool):
+        if service.build is None:
+            if not self._image_exists(service.image):
+                self.api.pull(service.image)
+                self._images.add(service.image)
+            return
+
+        if not build and self._image_exists(service.image):
+            return
+
+        for chunk in self.api.build(path=str(service.build), tag=service.image, rm=True, decode=True):
+            if 'error' in chunk:
+                raise RuntimeError(f"build of {service.image} failed: {chunk['error'].strip()}")
+        self._images.add(service.image)
+
+    def _existing(self, name: str) -> Optional[Dict]:
+        try:
+            return self.api.inspect_container(name)
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+
+    def _create(self, spec: MachineSpec, service: ServiceSpec) -> str:
+        api = self.api
+        host_config = api.create_host_config(
+            port_bindings=service.ports or None,
+            binds=service.binds or None,
+            restart_policy={'Name': service.restart} if service.restart else None,
+            network_mode=spec.network,
+        )
+        networking_config = api.create_networking_config({
+            spec.network: api.create_endpoint_config(aliases=[service.name]),
+        })
+        container = api.create_container(
+            service.image,
+            name=service.container_name,
+            environment=service.environment or None,
+            labels=self._labels(spec, service.name),
+            ports=list(service.ports) or None,
+            host_config=host_config,
+            networking_config=networking_config,
+            healthcheck=service.healthcheck,
+            detach=True,
+        )
+        return container['Id']
+
+    def up(self, machine_dir: Path, build: bool = True, services: List[str] = None) -> List[Dict]:
+        """
+        Create (or start) every service of a machine, dependencies first
+
+        Existing containers are started as they are; with build=True images
+        of services with a build context are rebuilt first and containers
+        recreated from them. services limits it to those services and what
+        they depend on. Returns one {service, container, action} per service.
+        """
+        spec = self.spec(machine_dir)
+        self._ensure_network(spec)
+        for volume in spec.volumes:
+            self.api.create_volume(volume, labels=self._labels(spec))
+
+        selected = spec.services
+        if services:
+            wanted = set(services)
+            # Dependants come after their dependencies, so one backwards pass is transitive
+            for service in reversed(spec.services):
+                if service.name in wanted:
+                    wanted.update(service.depends_on)
+            selected = [service for service in spec.services if service.name in wanted]
+
+        actions = []
+        for service in selected:
+            self._ensure_image(service, build)
+
+            existing = self._existing(service.container_name)
+            if existing and build and service.build is not None:
+                self.api.remove_container(existing['Id'], force=True)
+                existing = None
+
+            if existing is None:
+                try:
+                    container_id = self._create(spec, service)
+                except Exception as e:
+                    if not _is_not_found(e):
+                        raise
+                    # Image removed behind our back - forget it and try once more
+                    self._images.discard(service.image)
+                    self._ensure_image(service, build)
+                    container_id = self._create(spec, service)
+                action = 'created'
+            elif existing.get('State', {}).get('Running'):
+                actions.append({'service': service.name, 'container': service.container_name, 'action': 'running'})
+                continue
+            else:
+                container_id = existing['Id']
+                action = 'started'
+
+            self.api.start(container_id)
+            actions.append({'service': service.name, 'container': service.container_name, 'action': action})
+        return actions
+
+    def containers(self, project: str, all: bool = True) -> List[Dict]:
+        """Raw container records of a machine's project"""
+        return self.api.containers(all=all, filters={'label': [f"{PROJECT_LABEL}={project}"]})
+
+    def down(self, machine_dir: Path) -> List[str]:
+        """Stop and remove a machine's containers and network (named volumes are kept)"""
+        spec = self.spec(machine_dir)
+        removed = []
+        # Dependants first
+        by_service = {c.get('Labels', {}).get(SERVICE_LABEL): c for c in self.containers(spec.project)}
+        ordered = [by_service.pop(service.name) for service in reversed(spec.services) if service.name in by_service]
+        for container in ordered + list(by_service.values()):
+            if container.get('State') == 'running':
+                self.api.stop(container['Id'], timeout=self.stop_timeout)
+            self.api.remove_container(container['Id'], force=True)
+            removed.append(container['Names'][0].lstrip('/'))
+
+        for network in self.api.networks(names=[spec.network]):
+            self.api.remove_network(network['Id'])
+        self._networks.discard(spec.network)
+        return removed
+
+    def restart(self, machine_dir: Path) -> List[Dict]:
+        self.down(machine_dir)
+        return self.up(machine_dir, build=True)
+
+    def status(self, machine_dir: Path) -> List[Dict]:
+        """Containers in `docker-compose ps --format json` shape"""
+        spec = self.spec(machine_dir)
+        return [{
+            'ID': container['Id'][:12],
+            'Name': container['Names'][0].lstrip('/'),
+            'Service': container.get('Labels', {}).get(SERVICE_LABEL),
+            'Image': container.get('Image'),
+            'State': container.get('State'),
+            'Status': container.get('Status'),
+            'Publishers': [{'URL': port.get('IP', ''), 'TargetPort': port.get('PrivatePort'),
+                            'PublishedPort': port.get('PublicPort'), 'Protocol': port.get('Type')}
+                           for port in container.get('Ports', [])],
+        } for container in self.containers(spec.project)]
+
+    def logs(self, machine_dir: Path, tail: int = 100) -> str:
+        """Logs of every service, prefixed like docker-compose logs"""
+        spec = self.spec(machine_dir)
+        output = []
+        for container in self.containers(spec.project):
+            name = container['Names'][0].lstrip('/')
+            logs = self.api.logs(container['Id'], tail=tail)
+            for line in logs.decode('utf-8', errors='replace').splitlines():
+                output.append(f"{name}  | {line}")
+        return "\n".join(output)
+
+    def stats(self) -> Dict:
+        return {
+            'available': self.available,
+            'api_calls': self.calls,
+            'cached_specs': len(self._specs),
+        }
+
+
+_default_control_plane = None
+_default_control_plane_lock = threading.Lock()
+
+
+def default_control_plane() -> DockerControlPlane:
+    """Process-wide control plane (HACKFORGE_DOCKER_POOL_SIZE connections)"""
+    global _default_control_plane
+
+    if _default_control_plane is None:
+        with _default_control_plane_lock:
+            if _default_control_plane is None:
+                _default_control_plane = DockerControlPlane(
+                    max_pool_size=int(os.getenv('HACKFORGE_DOCKER_POOL_SIZE', '32')))
+    return _default_control_plane
+
+
+def sdk_lifecycle_enabled() -> bool:
+    """HACKFORGE_DOCKER_SDK=0 keeps machine start/stop on the compose CLI"""
+    return os.getenv('HACKFORGE_DOCKER_SDK', '1') != '0'
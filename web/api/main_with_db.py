@@ -5,6 +5,7 @@ FIXED VERSION - Correct paths for your project structure
 import docker
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import sys
@@ -12,6 +13,7 @@ import os
 from pathlib import Path
 import json
 import time
+import asyncio
 import uuid
 import logging
 import yaml
@@ -46,11 +48,19 @@ sys.path.insert(0, str(DATABASE_PATH))
 from generator import DynamicHackforgeGenerator
 from template_engine import TemplateEngine
 from orchestrator import DockerOrchestrator
-from base import MachineConfig
+from compose_runner import ComposeRunner
+from campaign_lifecycle import CampaignLifecycle
+from control_plane import default_control_plane, sdk_lifecycle_enabled
+from base import MachineConfig, blueprint_store
+from campaign_writer import load_machine_config, write_manifest
+from machine_pool import MachinePool
+from machine_index import is_machine_id
+from job_queue import JobQueue
+import machine_pipeline
 
 # Import database
 try:
-    from database import get_db
+    from async_database import get_async_db
 except ImportError as e:
     logger.error(f"Failed to import database: {e}")
     print("Warning: Database module not found. Install dependencies:")
@@ -76,20 +86,246 @@ app.add_middleware(
     ],
 )
 
-# Initialize with correct paths
-generator = DynamicHackforgeGenerator(core_dir=str(CORE_PATH))
-template_engine = TemplateEngine()
-
 # FIXED: Point orchestrator to correct machines directory
 # Campaigns are stored in: forge/core/campaigns/campaign_XXX/
 GENERATED_MACHINES_DIR = CORE_PATH / "generated_machines"
-orchestrator = DockerOrchestrator(machines_dir=str(GENERATED_MACHINES_DIR))
 
-logger.info(f"Orchestrator watching: {GENERATED_MACHINES_DIR}")
+# Parallel machine generation for campaigns (1 = sequential)
+GENERATION_WORKERS = int(os.getenv('HACKFORGE_GENERATION_WORKERS', '1'))
+
+# Optional warm pool of pre-built machines for instant campaign creation.
+# HACKFORGE_POOL_SIZE is the minimum kept per (blueprint, difficulty); 0 disables it.
+POOL_SIZE = int(os.getenv('HACKFORGE_POOL_SIZE', '0'))
+POOL_BUILD_IMAGES = os.getenv('HACKFORGE_POOL_BUILD_IMAGES', '0') == '1'
+
+# Background jobs (generate-machine pipeline) run in worker processes so
+# requests never wait on LLM calls or docker builds
+PUBLIC_HOST = os.getenv('HACKFORGE_PUBLIC_HOST', '4.231.90.52')
+
+# Components are created by init_components() at startup, not on import:
+# spawned job workers re-import this module (as __mp_main__ under
+# python3 -m web.api.main_with_db) and must not build a second API
+generator = None
+template_engine = None
+orchestrator = None
+control_plane = None
+compose = None
+campaign_lifecycle = None
+db = None
+machine_pool = None
+job_queue = None
+
+
+def prepare_pooled_machine(machine: MachineConfig, machine_dir: Path) -> Optional[Dict]:
+    """Render a pooled machine's app (and optionally build its image) ahead of time"""
+    with _pool_port_lock:
+        port = next(_pool_ports)
+
+    info = template_engine.generate_machine_app(machine, machine_dir, port)
+    if not info:
+        return None
+
+    if POOL_BUILD_IMAGES:
+        result = subprocess.run(
+            ["docker-compose", "build"],
+            cwd=str(machine_dir),
+            capture_output=True,
+            text=True,
+            timeout=600
+        )
+        if result.returncode != 0:
+            logger.warning(f"Pool image build failed for {machine.machine_id}: {result.stderr}")
+            return None
+        info['image_built'] = True
+
+    return info
+
+
+async def finish_generate_machine(job) -> Dict:
+    """Runs in the API process once the pipeline succeeded: make the machine visible here too"""
+    context = job.context
+
+    def reload():
+        generator.reload_category(context['category'])
+        # The worker already appended the machine to the index log; just read it in
+        generator.machine_index.refresh()
+
+    await asyncio.to_thread(reload)
+    try:
+        await db.register_machines([{**context, 'flag': machine_pipeline.machine_flag(context)}])
+    except Exception as e:
+        logger.warning(f"Could not register {context['machine_id']} for flag validation: {e}")
+    return machine_pipeline.pipeline_result(context)
+
+
+@app.on_event("startup")
+def init_components():
+    """Build the generator, docker control, database client, pool and job queue"""
+    global generator, template_engine, orchestrator, control_plane, compose
+    global campaign_lifecycle, db, machine_pool, job_queue, _pool_ports, _pool_port_lock
+
+    # Initialize with correct paths
+    generator = DynamicHackforgeGenerator(core_dir=str(CORE_PATH))
+
+    # Optional: pick up blueprint/config/mutation edits on disk without a restart
+    if os.getenv('HACKFORGE_WATCH_BLUEPRINTS', '0') == '1':
+        generator.start_watcher()
+    template_engine = TemplateEngine()
+
+    orchestrator = DockerOrchestrator(machines_dir=str(GENERATED_MACHINES_DIR))
+
+    # One pooled Docker SDK client for the whole API
+    control_plane = default_control_plane()
+
+    # Machine lifecycle calls from request handlers go through the control plane
+    # (or async compose subprocesses), serialised per machine, so builds never
+    # stall other requests
+    compose = ComposeRunner(
+        max_concurrency=int(os.getenv('HACKFORGE_COMPOSE_CONCURRENCY', '4')),
+        control_plane=control_plane if sdk_lifecycle_enabled() else None,
+    )
+
+    # Campaign start/stop runs its machines in parallel, up to this many at once
+    # (compose processes stay bounded by HACKFORGE_COMPOSE_CONCURRENCY too)
+    campaign_lifecycle = CampaignLifecycle(
+        compose,
+        max_parallel=int(os.getenv('HACKFORGE_CAMPAIGN_CONCURRENCY', '8')),
+    )
+
+    logger.info(f"Orchestrator watching: {GENERATED_MACHINES_DIR}")
+
+    # Motor: endpoints await their queries instead of blocking the event loop
+    db = get_async_db()
+
+    if POOL_SIZE > 0:
+        import itertools
+        import threading
+
+        machine_pool = MachinePool(
+            generator,
+            pool_dir=CORE_PATH / "pool",
+            prepare=prepare_pooled_machine,
+            min_size=POOL_SIZE,
+            max_size=int(os.getenv('HACKFORGE_POOL_MAX_SIZE', str(POOL_SIZE * 10))),
+            lead_time=float(os.getenv('HACKFORGE_POOL_LEAD_TIME', '600')),
+        )
+
+        # Pooled machines keep their port; continue above any already handed out
+        used_ports = [e.info.get('port') or 0 for e in machine_pool.entries()]
+        _pool_ports = itertools.count(max(used_ports + [int(os.getenv('HACKFORGE_POOL_BASE_PORT', '9000')) - 1]) + 1)
+        _pool_port_lock = threading.Lock()
+
+        # Other difficulties are tracked (and refilled) once they are first requested
+        pool_difficulties = [int(d) for d in os.getenv('HACKFORGE_POOL_DIFFICULTIES', '2').split(',') if d.strip()]
+        machine_pool.warm([(blueprint_id, difficulty)
+                           for blueprint_id in generator.blueprints
+                           for difficulty in pool_difficulties])
+        machine_pool.start_refiller()
+        logger.info(f"✓ Machine pool enabled ({len(machine_pool.entries())} ready, min {POOL_SIZE} per key)")
+
+    job_queue = JobQueue(
+        jobs_dir=CORE_PATH / "jobs",
+        max_workers=int(os.getenv('HACKFORGE_JOB_WORKERS', '2')),
+    )
+    job_queue.register('generate-machine', machine_pipeline.STAGES, finalize=finish_generate_machine)
+
+    logger.info("✓ All components initialized")
+
+
+# Host ports handed to campaigns that aren't saved to the database yet
+_reserved_ports = set()
+
+
+async def claimed_ports() -> set:
+    """Host ports taken by saved campaigns (running or not), unfinished jobs and pooled machines"""
+    claimed = {port for port in await db.campaigns.distinct('machines.port') if port}
+    claimed.update(job.context.get('port') for job in job_queue.active())
+    if machine_pool:
+        claimed.update(entry.info.get('port') for entry in machine_pool.entries())
+    return claimed
+
+
+def port_is_free(port: int) -> bool:
+    import socket
+
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(('', port))
+            return True
+    except OSError:
+        return False
+
+
+async def reserve_machine_port(start_port: int = 8080, max_attempts: int = 100) -> int:
+    """First free port that no campaign or unfinished job has claimed yet"""
+    claimed = await claimed_ports()
+    for port in range(start_port, start_port + max_attempts):
+        if port not in claimed and port not in _reserved_ports and port_is_free(port):
+            return port
+    return start_port
+
+
+async def reserve_port_block(count: int, start_port: int = 8081, max_attempts: int = 1000) -> int:
+    """
+    First port of `count` consecutive unclaimed ports, held in _reserved_ports
+
+    The caller releases the block with release_port_block() once the ports
+    are recorded in its campaign document (or the campaign failed).
+    """
+    claimed = await claimed_ports()
+    port = start_port
+    while port < start_port + max_attempts:
+        block = range(port, port + count)
+        busy = [p for p in block if p in claimed or p in _reserved_ports or not port_is_free(p)]
+        if not busy:
+            _reserved_ports.update(block)
+            return port
+        port = busy[-1] + 1
+    raise HTTPException(status_code=503, detail=f"No {count} free consecutive ports from {start_port}")
 
-db = get_db()
 
-logger.info("✓ All components initialized")
+def release_port_block(start_port: int, count: int):
+    _reserved_ports.difference_update(range(start_port, start_port + count))
+
+
+async def submit_generate_machine(category: str):
+    """Queue the config → running machine pipeline for a category"""
+    return job_queue.submit('generate-machine', {
+        'category': category,
+        'core_dir': str(CORE_PATH),
+        'port': await reserve_machine_port(),
+        'difficulty': 2,
+        'user_id': 'api_generated',
+        'public_host': PUBLIC_HOST,
+    })
+
+
+def list_containers() -> List:
+    """Every docker container (blocking SDK call - run it through compose.run_blocking)"""
+    return control_plane.client.containers.list(all=True)
+
+
+def get_container(container_id: str):
+    """One docker container by ID or name (blocking SDK call)"""
+    return control_plane.client.containers.get(container_id)
+
+
+def container_image(container) -> str:
+    """First image tag of a container (an SDK call of its own)"""
+    tags = container.image.tags
+    return tags[0] if tags else 'unknown'
+
+
+@app.on_event("startup")
+async def backfill_machine_lookup():
+    await db.backfill_machine_lookup()
+
+
+@app.on_event("shutdown")
+def shutdown_job_queue():
+    job_queue.shutdown()
+    compose.shutdown()
+    db.close()
 
 
 # ============================================================================
@@ -135,7 +371,7 @@ async def create_user(user: UserCreate):
     }
 
     try:
-        created_user = db.create_user(user_data)
+        created_user = await db.create_user(user_data)
         return created_user
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -143,13 +379,13 @@ async def create_user(user: UserCreate):
 @app.get("/api/users/{user_id}")
 async def get_user(user_id: str):
     """Get user details"""
-    user = db.get_user(user_id)
+    user = await db.get_user(user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Get user's rank
-    rank = db.get_user_rank(user_id)
+    rank = await db.get_user_rank(user_id, user=user)
     user['rank'] = rank
 
     return user
@@ -157,13 +393,14 @@ async def get_user(user_id: str):
 @app.get("/api/users/{user_id}/progress")
 async def get_user_progress(user_id: str):
     """Get user's overall progress"""
-    user = db.get_user(user_id)
+    user, campaigns, submissions = await asyncio.gather(
+        db.get_user(user_id),
+        db.get_user_campaigns(user_id),
+        db.get_user_submissions(user_id, limit=10),
+    )
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    campaigns = db.get_user_campaigns(user_id)
-    submissions = db.get_user_submissions(user_id, limit=10)
-
     return {
         'user': user,
         'campaigns': campaigns,
@@ -175,26 +412,9 @@ async def get_user_campaigns_list(user_id: str):
     """Get list of user's campaigns"""
     try:
         logger.info(f"Fetching campaigns for user: {user_id}")
-        campaigns = db.get_user_campaigns(user_id)
+        # Campaigns with machines_solved / progress_percentage summed in the same query
+        campaigns = await db.get_user_campaigns_with_progress(user_id)
         logger.info(f"Found {len(campaigns)} campaigns")
-
-        # Add progress info to each campaign
-        for campaign in campaigns:
-            try:
-                # Remove MongoDB _id field if present (not JSON serializable)
-                if '_id' in campaign:
-                    del campaign['_id']
-
-                progress_list = db.get_campaign_progress(user_id, campaign['campaign_id'])
-                solved = sum(1 for p in progress_list if p.get('solved', False))
-                campaign['machines_solved'] = solved
-                campaign['progress_percentage'] = (solved / campaign['machine_count'] * 100) if campaign['machine_count'] > 0 else 0
-            except Exception as e:
-                logger.error(f"Error processing campaign {campaign.get('campaign_id')}: {e}")
-                campaign['machines_solved'] = 0
-                campaign['progress_percentage'] = 0
-
-        logger.info(f"Successfully processed {len(campaigns)} campaigns")
         return campaigns
     except Exception as e:
         logger.error(f"Error in get_user_campaigns_list: {e}")
@@ -207,45 +427,109 @@ async def get_user_campaigns_list(user_id: str):
 # Campaign Endpoints with Database
 # ============================================================================
 
-def start_campaign_containers(campaign_path: Path):
-    """
-    Start Docker containers for a campaign
-    """
-    try:
-        import subprocess
+async def create_progress_records(user_id: str, campaign_id: str, machines: List[MachineConfig]):
+    """One progress record per machine, inserted concurrently"""
+    results = await asyncio.gather(*(
+        db.create_progress({
+            'user_id': user_id,
+            'machine_id': machine.machine_id,
+            'campaign_id': campaign_id
+        })
+        for machine in machines
+    ), return_exceptions=True)
+    for machine, result in zip(machines, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Progress record failed for {machine.machine_id}: {result}")
 
-        compose_file = campaign_path / "docker-compose.yml"
 
-        if not compose_file.exists():
-            logger.warning(f"No docker-compose.yml found in {campaign_path}")
-            return False
+async def create_campaign_from_pool(request: CampaignCreateRequest, background_tasks: BackgroundTasks) -> Dict:
+    """Assemble a campaign from the warm machine pool"""
+    started = time.perf_counter()
 
-        logger.info(f"Starting containers for {campaign_path.name}...")
+    _, blueprint_list = generator.plan_campaign(request.count, request.selected_blueprints)
+    if not blueprint_list:
+        raise HTTPException(status_code=500, detail="No machines were generated")
 
-        # Run docker-compose up -d --build
-        result = subprocess.run(
-            ["docker-compose", "up", "-d", "--build"],
-            cwd=str(campaign_path),
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
+    campaign_id = f"campaign_{int(time.time())}"
+    campaign_path = CORE_PATH / "campaigns" / campaign_id
 
-        if result.returncode == 0:
-            logger.info(f"✓ Containers started successfully")
-            return True
-        else:
-            logger.error(f"✗ Failed to start containers: {result.stderr}")
-            return False
+    entries = []
+    hits = 0
+    for blueprint_id in blueprint_list:
+        try:
+            # A miss generates and renders the machine inline - keep that off the event loop
+            entry, hit = await asyncio.to_thread(machine_pool.acquire, request.user_id, blueprint_id,
+                                                 request.difficulty, campaign_path)
+        except Exception as e:
+            logger.error(f"Pool acquire failed for {blueprint_id}: {e}")
+            entry, hit = None, False
+        if entry:
+            entries.append(entry)
+            hits += hit
+
+    if not entries:
+        raise HTTPException(status_code=500, detail="No machines were generated")
+
+    machines = [entry.machine for entry in entries]
+    await asyncio.to_thread(write_manifest, campaign_path, machines, campaign_id=campaign_id)
+    logger.info(f"✓ Claimed {len(entries)} machines ({hits} from pool) in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms")
+
+    campaign_data = {
+        'campaign_id': campaign_id,
+        'campaign_name': request.campaign_name,
+        'user_id': request.user_id,
+        'difficulty': request.difficulty,
+        'machine_count': len(machines),
+        'status': 'active',
+        'machines': [
+            {
+                'machine_id': entry.machine.machine_id,
+                'variant': entry.machine.variant,
+                'difficulty': entry.machine.difficulty,
+                'blueprint_id': entry.machine.blueprint_id,
+                'flag': entry.machine.flag['content'],
+                'port': entry.info.get('port')
+            }
+            for entry in entries
+        ]
+    }
 
+    try:
+        await db.create_campaign(campaign_data)
     except Exception as e:
-        logger.error(f"Error starting containers: {e}")
-        return False
+        logger.error(f"Database save failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    await create_progress_records(request.user_id, campaign_id, machines)
+
+    # Re-keyed flags only need a rebuild when they were baked into a prebuilt image
+    background_tasks.add_task(
+        campaign_lifecycle.start,
+        [entry.machine_dir for entry in entries],
+        [entry.needs_rebuild or not entry.info.get('image_built') for entry in entries],
+    )
+
+    return {
+        'campaign_id': campaign_id,
+        'campaign_name': request.campaign_name,
+        'user_id': request.user_id,
+        'difficulty': request.difficulty,
+        'machines': campaign_data['machines'],
+        'status': 'created',
+        'containers_started': False,
+        'pool_hits': hits,
+        'pool_misses': len(blueprint_list) - hits,
+    }
+
 
 @app.post("/api/campaigns")
 async def create_campaign(request: CampaignCreateRequest, background_tasks: BackgroundTasks):
     """Create a new campaign with database tracking"""
 
+    if machine_pool:
+        return await create_campaign_from_pool(request, background_tasks)
+
     logger.info("=" * 60)
     logger.info(f"CREATING CAMPAIGN: {request.campaign_name}")
     logger.info(f"User: {request.user_id}, Difficulty: {request.difficulty}, Count: {request.count}")
@@ -259,7 +543,8 @@ async def create_campaign(request: CampaignCreateRequest, background_tasks: Back
             user_id=request.user_id,
             difficulty=request.difficulty,
             count=request.count,
-            blueprint_ids=request.selected_blueprints  # Pass selected blueprints
+            blueprint_ids=request.selected_blueprints,  # Pass selected blueprints
+            workers=GENERATION_WORKERS
         )
         logger.info(f"✓ Generated {len(machines)} machines")
     except Exception as e:
@@ -280,7 +565,7 @@ async def create_campaign(request: CampaignCreateRequest, background_tasks: Back
 
     try:
         # Export with specific campaign directory
-        campaign_path = generator.export_campaign(machines, output_dir=campaign_output_dir)
+        campaign_path = generator.export_campaign(machines, output_dir=campaign_output_dir, streaming=True)
         logger.info(f"✓ Campaign exported to: {campaign_path}")
     except Exception as e:
         logger.error(f"Export failed: {e}")
@@ -288,16 +573,19 @@ async def create_campaign(request: CampaignCreateRequest, background_tasks: Back
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Failed to export campaign: {str(e)}")
 
-    # Generate applications
+    # Generate applications on host ports no other campaign uses
     logger.info("Generating Docker applications...")
+    start_port = await reserve_port_block(len(machines))
     try:
-        machine_infos = template_engine.generate_campaign_apps(campaign_path)
+        # Rendering (LLM prefetch via its own asyncio.run, base-image builds) stays off the event loop
+        machine_infos = await asyncio.to_thread(template_engine.generate_campaign_apps, campaign_path, start_port)
         logger.info(f"✓ Generated {len(machine_infos)} apps")
     except Exception as e:
         logger.warning(f"Failed to generate apps: {e}")
         import traceback
         logger.error(traceback.format_exc())
         machine_infos = []
+    ports = {info['machine_id']: info['port'] for info in machine_infos}
 
     # Prepare campaign data for database
     campaign_data = {
@@ -314,42 +602,38 @@ async def create_campaign(request: CampaignCreateRequest, background_tasks: Back
                 'difficulty': m.difficulty,
                 'blueprint_id': m.blueprint_id,
                 'flag': m.flag['content'],
-                'port': machine_infos[i]['port'] if i < len(machine_infos) else None
+                'port': ports.get(m.machine_id)
             }
-            for i, m in enumerate(machines)
+            for m in machines
         ]
     }
 
     # Save to database
     logger.info("Saving to MongoDB...")
     try:
-        db.create_campaign(campaign_data)
+        await db.create_campaign(campaign_data)
         logger.info("✓ Saved to database")
     except Exception as e:
         logger.error(f"Database save failed: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        # Saved campaigns claim their ports through claimed_ports()
+        release_port_block(start_port, len(machines))
 
     # Create progress records
     logger.info("Creating progress records...")
-    for machine in machines:
-        try:
-            progress_data = {
-                'user_id': request.user_id,
-                'machine_id': machine.machine_id,
-                'campaign_id': campaign_id
-            }
-            db.create_progress(progress_data)
-        except Exception as e:
-            logger.warning(f"Progress record failed for {machine.machine_id}: {e}")
+    await create_progress_records(request.user_id, campaign_id, machines)
 
-    # ✨ NEW: Start Docker containers automatically
+    # ✨ NEW: Start Docker containers automatically (every machine's own project, in parallel)
     logger.info("Starting Docker containers...")
+    containers = None
     try:
-        containers_started = start_campaign_containers(Path(campaign_path))
-        if containers_started:
-            logger.info("✓ Docker containers started successfully")
+        run = await campaign_lifecycle.start([Path(campaign_path) / m.machine_id for m in machines if m.machine_id in ports])
+        containers = run.to_dict()
+        if run.machines and not run.failed:
+            logger.info(f"✓ Docker containers started successfully ({run.seconds:.1f}s)")
         else:
-            logger.warning("⚠ Failed to start containers automatically")
+            logger.warning(f"⚠ Started {run.succeeded}/{len(run.machines)} machines automatically")
     except Exception as e:
         logger.warning(f"⚠ Could not start containers: {e}")
         # Don't fail the entire campaign creation if containers fail to start
@@ -364,45 +648,40 @@ async def create_campaign(request: CampaignCreateRequest, background_tasks: Back
         'difficulty': request.difficulty,
         'machines': campaign_data['machines'],
         'status': 'created',
-        'containers_started': containers_started if 'containers_started' in locals() else False
+        'containers_started': bool(containers and containers['total'] and not containers['failed']),
+        'containers': containers
     }
 
 
+@app.get("/api/pool/stats")
+async def get_pool_stats():
+    """Warm machine pool levels and hit/miss counters"""
+    if not machine_pool:
+        return {'enabled': False}
+    return {'enabled': True, **machine_pool.stats()}
+
+
 @app.get("/api/campaigns/{campaign_id}")
 async def get_campaign_details(campaign_id: str):
     """Get detailed information about a specific campaign"""
-    campaign = db.get_campaign(campaign_id)
+    # The campaign, its per-machine progress and the totals in one query
+    campaign = await db.get_campaign_with_progress(campaign_id)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
 
-    # Get progress for this campaign
-    progress_list = db.get_campaign_progress(campaign['user_id'], campaign_id)
-
     # Add progress info to each machine
+    progress_by_machine = {p['machine_id']: p for p in campaign.pop('progress')}
     for machine in campaign.get('machines', []):
-        machine_progress = next(
-            (p for p in progress_list if p['machine_id'] == machine['machine_id']),
-            None
-        )
-        if machine_progress:
-            machine['solved'] = machine_progress.get('solved', False)
-            machine['attempts'] = machine_progress.get('attempts', 0)
-            machine['points_earned'] = machine_progress.get('points_earned', 0)
-        else:
-            machine['solved'] = False
-            machine['attempts'] = 0
-            machine['points_earned'] = 0
-
-    # Calculate overall progress
-    total_machines = campaign['machine_count']
-    solved = sum(1 for p in progress_list if p.get('solved', False))
-    total_points = sum(p.get('points_earned', 0) for p in progress_list)
+        machine_progress = progress_by_machine.get(machine['machine_id'], {})
+        machine['solved'] = machine_progress.get('solved', False)
+        machine['attempts'] = machine_progress.get('attempts', 0)
+        machine['points_earned'] = machine_progress.get('points_earned', 0)
 
     campaign['progress'] = {
-        'solved': solved,
-        'total': total_machines,
-        'percentage': (solved / total_machines * 100) if total_machines > 0 else 0,
-        'total_points': total_points
+        'solved': campaign['machines_solved'],
+        'total': campaign['machine_count'],
+        'percentage': campaign['progress_percentage'],
+        'total_points': campaign['progress_points']
     }
 
     return campaign
@@ -410,7 +689,7 @@ async def get_campaign_details(campaign_id: str):
 @app.get("/api/campaigns/{campaign_id}/machines")
 async def get_campaign_machines(campaign_id: str):
     """Get all machines for a specific campaign"""
-    campaign = db.get_campaign(campaign_id)
+    campaign = await db.get_campaign(campaign_id)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
 
@@ -423,11 +702,13 @@ async def get_campaign_machines(campaign_id: str):
 @app.get("/api/campaigns/{campaign_id}/progress")
 async def get_campaign_progress(campaign_id: str, user_id: str):
     """Get progress for a specific campaign"""
-    campaign = db.get_campaign(campaign_id)
+    campaign, progress_list = await asyncio.gather(
+        db.get_campaign(campaign_id),
+        db.get_campaign_progress(user_id, campaign_id),
+    )
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
 
-    progress_list = db.get_campaign_progress(user_id, campaign_id)
 
     total_machines = campaign['machine_count']
     solved = sum(1 for p in progress_list if p.get('solved', False))
@@ -448,20 +729,18 @@ async def get_campaign_progress(campaign_id: str, user_id: str):
 async def delete_campaign(campaign_id: str):
     """Delete a campaign and all its associated data"""
     try:
-        import docker
         import shutil
 
         logger.info(f"Deleting campaign: {campaign_id}")
 
         # Get campaign from database
-        campaign = db.get_campaign(campaign_id)
+        campaign = await db.get_campaign(campaign_id)
         if not campaign:
             raise HTTPException(status_code=404, detail="Campaign not found")
 
         # Step 1: Stop and remove all Docker containers
-        try:
-            client = docker.from_env()
-            containers = client.containers.list(all=True)
+        def remove_containers():
+            containers = list_containers()
 
             for machine in campaign.get('machines', []):
                 machine_id = machine['machine_id']
@@ -475,6 +754,9 @@ async def delete_campaign(campaign_id: str):
                         except Exception as e:
                             logger.warning(f"Failed to remove container {container.name}: {e}")
                         break
+
+        try:
+            await compose.run_blocking(remove_containers)
         except Exception as e:
             logger.error(f"Error removing containers: {e}")
 
@@ -483,20 +765,19 @@ async def delete_campaign(campaign_id: str):
             campaign_path = CORE_PATH / "campaigns" / campaign_id
             if campaign_path.exists():
                 logger.info(f"Removing campaign directory: {campaign_path}")
-                shutil.rmtree(campaign_path)
+                await asyncio.to_thread(shutil.rmtree, campaign_path)
         except Exception as e:
             logger.error(f"Error removing campaign directory: {e}")
 
         # Step 3: Delete from database
         try:
-            # Delete progress records
-            db.progress.delete_many({'campaign_id': campaign_id})
-
-            # Delete submissions
-            db.submissions.delete_many({'campaign_id': campaign_id})
-
-            # Delete campaign
-            db.campaigns.delete_one({'campaign_id': campaign_id})
+            # Progress records, submissions, the campaign and its machine lookups are independent
+            await asyncio.gather(
+                db.progress.delete_many({'campaign_id': campaign_id}),
+                db.submissions.delete_many({'campaign_id': campaign_id}),
+                db.campaigns.delete_one({'campaign_id': campaign_id}),
+                db.unregister_campaign_machines(campaign_id),
+            )
 
             logger.info(f"✓ Campaign {campaign_id} deleted from database")
         except Exception as e:
@@ -520,36 +801,28 @@ async def delete_campaign(campaign_id: str):
 # Flag Validation with Database
 # ============================================================================
 
+async def register_standalone_machine(machine_id: str) -> Optional[Dict]:
+    """
+    Lookup record for a machine that isn't registered yet (generated outside
+    a campaign, or before the lookup existed), read from its config.json
+    """
+    machine_dir = find_machine_dir(machine_id)
+    if machine_dir is None or not (machine_dir / "config.json").exists():
+        return None
+
+    config = load_machine_config(machine_dir, inline_config=False)
+    await db.register_machines([{**config, 'flag': config['flag']['content']}])
+    return await db.get_machine_lookup(machine_id)
+
+
 @app.post("/api/flags/validate")
 async def validate_flag(request: FlagSubmitRequest, req: Request):
     """Validate flag with database tracking"""
 
-    # Try to find machine in orchestrator (running containers)
-    machines = orchestrator.list_machines()
-    target_machine = None
-
-    for machine in machines:
-        if machine['machine_id'] == request.machine_id:
-            target_machine = machine
-            break
-
-    # If not found in orchestrator, check database campaigns
+    # One indexed read (usually answered from the in-process cache)
+    target_machine = await db.get_machine_lookup(request.machine_id)
     if not target_machine:
-        all_campaigns = db.campaigns.find()
-
-        for campaign in all_campaigns:
-            for machine in campaign.get('machines', []):
-                if machine['machine_id'] == request.machine_id:
-                    target_machine = {
-                        'machine_id': machine['machine_id'],
-                        'variant': machine['variant'],
-                        'difficulty': machine['difficulty'],
-                        'blueprint_id': machine['blueprint_id'],
-                        'flag': machine['flag']
-                    }
-                    break
-            if target_machine:
-                break
+        target_machine = await register_standalone_machine(request.machine_id)
 
     if not target_machine:
         raise HTTPException(
@@ -557,69 +830,20 @@ async def validate_flag(request: FlagSubmitRequest, req: Request):
             detail=f"Machine not found: {request.machine_id}"
         )
 
-    # Get or create progress
-    progress = db.get_progress(request.user_id, request.machine_id)
-
-    if not progress:
-        progress_data = {
-            'user_id': request.user_id,
-            'machine_id': request.machine_id,
-            'campaign_id': 'unknown'
-        }
-        progress = db.create_progress(progress_data)
-
-    # Increment attempt
-    db.increment_attempts(request.user_id, request.machine_id)
-
-    # Validate flag
-    correct = request.flag.strip() == target_machine['flag'].strip()
-
-    # Record submission
-    submission_data = {
-        'submission_id': f"sub_{uuid.uuid4().hex[:16]}",
-        'user_id': request.user_id,
-        'machine_id': request.machine_id,
-        'campaign_id': progress.get('campaign_id', 'unknown'),
-        'submitted_flag': request.flag,
-        'correct': correct,
-        'ip_address': req.client.host,
-        'points_awarded': 0
-    }
-
-    if correct:
-        points = target_machine['difficulty'] * 100
-
-        if not progress.get('solved', False):
-            solve_time = int((time.time() - progress['started_at'].timestamp()))
-            db.mark_solved(request.user_id, request.machine_id, points, solve_time)
-            db.add_points(request.user_id, points)
-            db.increment_solved(request.user_id)
-
-            campaign_id = progress.get('campaign_id')
-            if campaign_id and campaign_id != 'unknown':
-                campaign_progress = db.get_campaign_progress(request.user_id, campaign_id)
-                solved_count = sum(1 for p in campaign_progress if p.get('solved', False))
-                total_points = sum(p.get('points_earned', 0) for p in campaign_progress)
-
-                db.update_campaign_progress(campaign_id, solved_count, total_points)
+    # Progress, attempt, solve, counters and submission record in a few atomic writes
+    outcome = await db.submit_flag(request.user_id, target_machine, request.flag, ip_address=req.client.host)
 
-                campaign = db.get_campaign(campaign_id)
-                if solved_count == campaign['machine_count']:
-                    db.complete_campaign(campaign_id)
-
-            submission_data['points_awarded'] = points
-            message = f"🎉 Correct! First solve! +{points} points"
-        else:
-            message = "✅ Flag already captured"
+    if outcome['first_solve']:
+        message = f"🎉 Correct! First solve! +{outcome['points']} points"
+    elif outcome['correct']:
+        message = "✅ Flag already captured"
     else:
         message = "❌ Incorrect flag. Try again!"
 
-    db.record_submission(submission_data)
-
     return {
-        'correct': correct,
+        'correct': outcome['correct'],
         'message': message,
-        'points': submission_data['points_awarded']
+        'points': outcome['points']
     }
 
 
@@ -740,7 +964,7 @@ async def get_blueprint(blueprint_id: str):
 @app.get("/api/leaderboard")
 async def get_leaderboard(limit: int = 100, timeframe: str = 'all_time'):
     """Get leaderboard"""
-    leaderboard = db.get_leaderboard(limit=limit, timeframe=timeframe)
+    leaderboard = await db.get_leaderboard(limit=limit, timeframe=timeframe)
     return {
         'timeframe': timeframe,
         'entries': leaderboard
@@ -760,26 +984,37 @@ from pathlib import Path
 # INDIVIDUAL MACHINE DOCKER CONTROL - NEW ENDPOINTS
 # ============================================================================
 
+def find_machine_dir(machine_id: str) -> Optional[Path]:
+    """Locate a machine's directory via the generator's machine index"""
+    # Anything else is unknown - and must not reach the path joins below
+    if not is_machine_id(machine_id):
+        return None
+
+    machine_dir = generator.machine_index.locate(machine_id)
+    if machine_dir and machine_dir.exists():
+        return machine_dir
+
+    # Fall back to scanning for machines exported before the index existed
+    machine_dir = CORE_PATH / "generated_machines" / machine_id
+    if machine_dir.exists():
+        return machine_dir
+
+    for campaign_dir in (CORE_PATH / "campaigns").glob("campaign_*"):
+        test_dir = campaign_dir / machine_id
+        if test_dir.exists():
+            generator.machine_index.add(machine_id, str(test_dir))
+            return test_dir
+
+    return None
+
+
 @app.post("/api/machines/{machine_id}/docker/start")
 async def start_machine_container(machine_id: str):
     """Start specific machine's docker-compose"""
     try:
-        # Find machine directory
-        machine_dir = CORE_PATH / "generated_machines" / machine_id
-
-        if not machine_dir.exists():
-            # Try campaigns directory
-            campaigns_dir = CORE_PATH / "campaigns"
-            found = False
-            for campaign_dir in campaigns_dir.glob("campaign_*"):
-                test_dir = campaign_dir / machine_id
-                if test_dir.exists():
-                    machine_dir = test_dir
-                    found = True
-                    break
-
-            if not found:
-                raise HTTPException(status_code=404, detail=f"Machine directory not found: {machine_id}")
+        machine_dir = find_machine_dir(machine_id)
+        if machine_dir is None:
+            raise HTTPException(status_code=404, detail=f"Machine directory not found: {machine_id}")
 
         compose_file = machine_dir / "docker-compose.yml"
         if not compose_file.exists():
@@ -787,16 +1022,9 @@ async def start_machine_container(machine_id: str):
 
         logger.info(f"Starting container for {machine_id} in {machine_dir}")
 
-        # Run docker-compose up
-        result = subprocess.run(
-            ["docker-compose", "up", "-d", "--build"],
-            cwd=str(machine_dir),
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
+        result = await compose.up(machine_dir)
 
-        if result.returncode == 0:
+        if result.ok:
             logger.info(f"✓ Container started: {machine_id}")
 
             # Get port from docker-compose.yml
@@ -824,6 +1052,8 @@ async def start_machine_container(machine_id: str):
                 "error": result.stderr
             }
 
+    except HTTPException:
+        raise
     except subprocess.TimeoutExpired:
         raise HTTPException(status_code=504, detail="Container start timeout")
     except Exception as e:
@@ -835,20 +1065,9 @@ async def start_machine_container(machine_id: str):
 async def stop_machine_container(machine_id: str):
     """Stop specific machine's docker-compose"""
     try:
-        machine_dir = CORE_PATH / "generated_machines" / machine_id
-
-        if not machine_dir.exists():
-            campaigns_dir = CORE_PATH / "campaigns"
-            found = False
-            for campaign_dir in campaigns_dir.glob("campaign_*"):
-                test_dir = campaign_dir / machine_id
-                if test_dir.exists():
-                    machine_dir = test_dir
-                    found = True
-                    break
-
-            if not found:
-                raise HTTPException(status_code=404, detail=f"Machine directory not found: {machine_id}")
+        machine_dir = find_machine_dir(machine_id)
+        if machine_dir is None:
+            raise HTTPException(status_code=404, detail=f"Machine directory not found: {machine_id}")
 
         compose_file = machine_dir / "docker-compose.yml"
         if not compose_file.exists():
@@ -856,15 +1075,9 @@ async def stop_machine_container(machine_id: str):
 
         logger.info(f"Stopping container for {machine_id}")
 
-        result = subprocess.run(
-            ["docker-compose", "down"],
-            cwd=str(machine_dir),
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
+        result = await compose.down(machine_dir)
 
-        if result.returncode == 0:
+        if result.ok:
             logger.info(f"✓ Container stopped: {machine_id}")
             return {
                 "success": True,
@@ -878,6 +1091,8 @@ async def stop_machine_container(machine_id: str):
                 "error": result.stderr
             }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error stopping {machine_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -887,41 +1102,15 @@ async def stop_machine_container(machine_id: str):
 async def restart_machine_container(machine_id: str):
     """Restart specific machine's docker-compose"""
     try:
-        machine_dir = CORE_PATH / "generated_machines" / machine_id
-
-        if not machine_dir.exists():
-            campaigns_dir = CORE_PATH / "campaigns"
-            found = False
-            for campaign_dir in campaigns_dir.glob("campaign_*"):
-                test_dir = campaign_dir / machine_id
-                if test_dir.exists():
-                    machine_dir = test_dir
-                    found = True
-                    break
-
-            if not found:
-                raise HTTPException(status_code=404, detail=f"Machine directory not found: {machine_id}")
+        machine_dir = find_machine_dir(machine_id)
+        if machine_dir is None:
+            raise HTTPException(status_code=404, detail=f"Machine directory not found: {machine_id}")
 
         logger.info(f"Restarting container for {machine_id}")
 
-        # Stop
-        subprocess.run(
-            ["docker-compose", "down"],
-            cwd=str(machine_dir),
-            capture_output=True,
-            timeout=60
-        )
+        result = await compose.restart(machine_dir)
 
-        # Start
-        result = subprocess.run(
-            ["docker-compose", "up", "-d", "--build"],
-            cwd=str(machine_dir),
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-
-        if result.returncode == 0:
+        if result.ok:
             return {
                 "success": True,
                 "message": "Container restarted successfully",
@@ -934,6 +1123,8 @@ async def restart_machine_container(machine_id: str):
                 "error": result.stderr
             }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error restarting {machine_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -943,50 +1134,20 @@ async def restart_machine_container(machine_id: str):
 async def get_machine_container_status(machine_id: str):
     """Get docker status for specific machine"""
     try:
-        machine_dir = CORE_PATH / "generated_machines" / machine_id
-
-        if not machine_dir.exists():
-            campaigns_dir = CORE_PATH / "campaigns"
-            found = False
-            for campaign_dir in campaigns_dir.glob("campaign_*"):
-                test_dir = campaign_dir / machine_id
-                if test_dir.exists():
-                    machine_dir = test_dir
-                    found = True
-                    break
-
-            if not found:
-                raise HTTPException(status_code=404, detail=f"Machine directory not found: {machine_id}")
-
-        result = subprocess.run(
-            ["docker-compose", "ps", "--format", "json"],
-            cwd=str(machine_dir),
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        machine_dir = find_machine_dir(machine_id)
+        if machine_dir is None:
+            raise HTTPException(status_code=404, detail=f"Machine directory not found: {machine_id}")
 
-        if result.returncode == 0 and result.stdout.strip():
-            containers = []
-            for line in result.stdout.strip().split('\n'):
-                if line:
-                    try:
-                        containers.append(json.loads(line))
-                    except:
-                        pass
+        containers = await compose.ps(machine_dir)
 
-            return {
-                "machine_id": machine_id,
-                "containers": containers,
-                "running": any(c.get('State') == 'running' for c in containers)
-            }
-        else:
-            return {
-                "machine_id": machine_id,
-                "containers": [],
-                "running": False
-            }
+        return {
+            "machine_id": machine_id,
+            "containers": containers,
+            "running": any(c.get('State') == 'running' for c in containers)
+        }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting status for {machine_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -996,34 +1157,19 @@ async def get_machine_container_status(machine_id: str):
 async def get_machine_container_logs(machine_id: str, tail: int = 100):
     """Get logs from specific machine's containers"""
     try:
-        machine_dir = CORE_PATH / "generated_machines" / machine_id
-
-        if not machine_dir.exists():
-            campaigns_dir = CORE_PATH / "campaigns"
-            found = False
-            for campaign_dir in campaigns_dir.glob("campaign_*"):
-                test_dir = campaign_dir / machine_id
-                if test_dir.exists():
-                    machine_dir = test_dir
-                    found = True
-                    break
+        machine_dir = find_machine_dir(machine_id)
+        if machine_dir is None:
+            raise HTTPException(status_code=404, detail=f"Machine directory not found: {machine_id}")
 
-            if not found:
-                raise HTTPException(status_code=404, detail=f"Machine directory not found: {machine_id}")
-
-        result = subprocess.run(
-            ["docker-compose", "logs", f"--tail={tail}"],
-            cwd=str(machine_dir),
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        result = await compose.logs(machine_dir, tail=tail)
 
         return {
             "machine_id": machine_id,
             "logs": result.stdout
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting logs for {machine_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1033,156 +1179,28 @@ async def get_machine_container_logs(machine_id: str, tail: int = 100):
 # CAMPAIGN-LEVEL DOCKER CONTROL
 # ============================================================================
 
-@app.post("/api/campaigns/{campaign_id}/docker/start")
-async def start_campaign_containers(campaign_id: str):
-    """Start all containers in a campaign"""
-    try:
-        campaign = db.get_campaign(campaign_id)
-        if not campaign:
-            raise HTTPException(status_code=404, detail="Campaign not found")
-
-        results = []
-        campaign_dir = CORE_PATH / "campaigns" / campaign_id
-
-        for machine in campaign.get('machines', []):
-            machine_id = machine['machine_id']
-            machine_dir = campaign_dir / machine_id
-
-            if machine_dir.exists():
-                try:
-                    result = subprocess.run(
-                        ["docker-compose", "up", "-d", "--build"],
-                        cwd=str(machine_dir),
-                        capture_output=True,
-                        text=True,
-                        timeout=300
-                    )
-
-                    results.append({
-                        "machine_id": machine_id,
-                        "success": result.returncode == 0,
-                        "message": "Started" if result.returncode == 0 else result.stderr
-                    })
-                except Exception as e:
-                    results.append({
-                        "machine_id": machine_id,
-                        "success": False,
-                        "message": str(e)
-                    })
-
-        success_count = sum(1 for r in results if r['success'])
-
-        return {
-            "campaign_id": campaign_id,
-            "total": len(results),
-            "started": success_count,
-            "results": results
-        }
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.post("/api/campaigns/{campaign_id}/docker/stop")
-async def stop_campaign_containers(campaign_id: str):
-    """Stop all containers in a campaign"""
-    try:
-        campaign = db.get_campaign(campaign_id)
-        if not campaign:
-            raise HTTPException(status_code=404, detail="Campaign not found")
-
-        results = []
-        campaign_dir = CORE_PATH / "campaigns" / campaign_id
-
-        for machine in campaign.get('machines', []):
-            machine_id = machine['machine_id']
-            machine_dir = campaign_dir / machine_id
-
-            if machine_dir.exists():
-                try:
-                    result = subprocess.run(
-                        ["docker-compose", "down"],
-                        cwd=str(machine_dir),
-                        capture_output=True,
-                        text=True,
-                        timeout=60
-                    )
-
-                    results.append({
-                        "machine_id": machine_id,
-                        "success": result.returncode == 0
-                    })
-                except Exception as e:
-                    results.append({
-                        "machine_id": machine_id,
-                        "success": False,
-                        "message": str(e)
-                    })
-
-        success_count = sum(1 for r in results if r['success'])
-
-        return {
-            "campaign_id": campaign_id,
-            "total": len(results),
-            "stopped": success_count,
-            "results": results
-        }
+async def campaign_machine_dirs(campaign_id: str) -> List[Path]:
+    """Machine directories of a campaign, in the order the campaign lists them"""
+    campaign = await db.get_campaign(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    campaign_dir = CORE_PATH / "campaigns" / campaign_id
+    return [campaign_dir / machine['machine_id'] for machine in campaign.get('machines', [])]
 
-# ============================================================================
-# CAMPAIGN-LEVEL DOCKER CONTROL
-# ============================================================================
 
 @app.post("/api/campaigns/{campaign_id}/docker/start")
-async def start_campaign_containers(campaign_id: str):
-    """Start all containers in a campaign"""
+async def start_campaign_containers(campaign_id: str, build: bool = True):
+    """Start all containers in a campaign (machines in parallel)"""
     try:
-        campaign = db.get_campaign(campaign_id)
-        if not campaign:
-            raise HTTPException(status_code=404, detail="Campaign not found")
-
-        results = []
-        campaign_dir = CORE_PATH / "campaigns" / campaign_id
-
-        for machine in campaign.get('machines', []):
-            machine_id = machine['machine_id']
-            machine_dir = campaign_dir / machine_id
-
-            if machine_dir.exists():
-                try:
-                    result = subprocess.run(
-                        ["docker-compose", "up", "-d", "--build"],
-                        cwd=str(machine_dir),
-                        capture_output=True,
-                        text=True,
-                        timeout=300
-                    )
-
-                    results.append({
-                        "machine_id": machine_id,
-                        "success": result.returncode == 0,
-                        "message": "Started" if result.returncode == 0 else result.stderr
-                    })
-                except Exception as e:
-                    results.append({
-                        "machine_id": machine_id,
-                        "success": False,
-                        "message": str(e)
-                    })
-
-        success_count = sum(1 for r in results if r['success'])
+        run = await campaign_lifecycle.start(await campaign_machine_dirs(campaign_id), build=build)
+        logger.info(f"Campaign {campaign_id}: started {run.succeeded}/{len(run.machines)} machines "
+                    f"in {run.seconds:.1f}s (serial {run.serial_seconds:.1f}s)")
 
         return {
             "campaign_id": campaign_id,
-            "total": len(results),
-            "started": success_count,
-            "results": results
+            "started": run.succeeded,
+            **run.to_dict()
         }
 
     except HTTPException:
@@ -1193,47 +1211,16 @@ async def start_campaign_containers(campaign_id: str):
 
 @app.post("/api/campaigns/{campaign_id}/docker/stop")
 async def stop_campaign_containers(campaign_id: str):
-    """Stop all containers in a campaign"""
+    """Stop all containers in a campaign (machines in parallel)"""
     try:
-        campaign = db.get_campaign(campaign_id)
-        if not campaign:
-            raise HTTPException(status_code=404, detail="Campaign not found")
-
-        results = []
-        campaign_dir = CORE_PATH / "campaigns" / campaign_id
-
-        for machine in campaign.get('machines', []):
-            machine_id = machine['machine_id']
-            machine_dir = campaign_dir / machine_id
-
-            if machine_dir.exists():
-                try:
-                    result = subprocess.run(
-                        ["docker-compose", "down"],
-                        cwd=str(machine_dir),
-                        capture_output=True,
-                        text=True,
-                        timeout=60
-                    )
-
-                    results.append({
-                        "machine_id": machine_id,
-                        "success": result.returncode == 0
-                    })
-                except Exception as e:
-                    results.append({
-                        "machine_id": machine_id,
-                        "success": False,
-                        "message": str(e)
-                    })
-
-        success_count = sum(1 for r in results if r['success'])
+        run = await campaign_lifecycle.stop(await campaign_machine_dirs(campaign_id))
+        logger.info(f"Campaign {campaign_id}: stopped {run.succeeded}/{len(run.machines)} machines "
+                    f"in {run.seconds:.1f}s")
 
         return {
             "campaign_id": campaign_id,
-            "total": len(results),
-            "stopped": success_count,
-            "results": results
+            "stopped": run.succeeded,
+            **run.to_dict()
         }
 
     except HTTPException:
@@ -1241,7 +1228,6 @@ async def stop_campaign_containers(campaign_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-
 # ============================================================================
 # Statistics
 # ============================================================================
@@ -1250,7 +1236,7 @@ async def stop_campaign_containers(campaign_id: str):
 @app.get("/api/stats")
 async def get_statistics():
     """Get platform statistics from database"""
-    platform_stats = db.get_platform_stats()
+    platform_stats = await db.get_platform_stats()
 
     # Get blueprints count with fallback
     try:
@@ -1268,7 +1254,7 @@ async def get_statistics():
 
     # Get machines count
     try:
-        machines = orchestrator.list_machines()
+        machines = await asyncio.to_thread(orchestrator.list_machines)
         platform_stats['total_machines'] = len(machines)
         logger.info(f"✓ Machines count: {len(machines)}")
     except Exception as e:
@@ -1291,47 +1277,33 @@ async def list_machines():
     """
     try:
         # Get machines from filesystem
-        machines = orchestrator.list_machines()
+        machines = await asyncio.to_thread(orchestrator.list_machines)
         
         logger.info(f"Found {len(machines)} machines from orchestrator")
 
-        # Import docker properly
         try:
-            import docker as docker_module
-            client = docker_module.from_env()
-            all_containers = client.containers.list(all=True)
+            all_containers = await compose.run_blocking(list_containers)
             logger.info(f"Found {len(all_containers)} Docker containers")
-        except AttributeError as e:
-            logger.error(f"Docker import error: {e}")
-            # Try alternative import
-            try:
-                from docker import DockerClient
-                client = DockerClient.from_env()
-                all_containers = client.containers.list(all=True)
-                logger.info(f"Found {len(all_containers)} Docker containers (alternative method)")
-            except Exception as e2:
-                logger.error(f"Alternative Docker import also failed: {e2}")
-                # Fallback: no container info
-                all_containers = []
-                logger.warning("Continuing without Docker container info")
-
-        # Enrich with database information
+        except Exception as e:
+            logger.error(f"Docker unavailable: {e}")
+            # Fallback: no container info
+            all_containers = []
+            logger.warning("Continuing without Docker container info")
+
+        # Enrich with database information: every machine's campaign and progress at once
+        lookups = await asyncio.gather(*(
+            asyncio.gather(
+                db.campaigns.find_one({'machines.machine_id': machine['machine_id']}),
+                db.progress.find_one({'machine_id': machine['machine_id']}),
+            )
+            for machine in machines
+        ))
         enriched_machines = []
 
-        for machine in machines:
+        for machine, (campaign, progress) in zip(machines, lookups):
             machine_id = machine['machine_id']
             logger.info(f"\nProcessing machine: {machine_id}")
 
-            # Try to find campaign this machine belongs to
-            campaign = db.campaigns.find_one({
-                'machines.machine_id': machine_id
-            })
-
-            # Get progress if exists
-            progress = db.progress.find_one({
-                'machine_id': machine_id
-            })
-
             # Find Docker container - IMPROVED MATCHING
             container_info = None
             
@@ -1428,49 +1400,47 @@ async def list_machines():
 
 
 @app.get("/api/machines/{machine_id}") 
-async def get_machine(machine_id: str):
-    """Get specific machine details with full context"""
+async def get_machine(machine_id: str, inline_config: bool = False):
+    """
+    Get specific machine details with full context
+
+    The blueprint config is returned as 'blueprint_config_ref' unless
+    inline_config is set; fetch it once from /api/blueprint-configs/{ref}.
+    """
     try:
         # Get from orchestrator
-        machines = orchestrator.list_machines()
+        machines = await asyncio.to_thread(orchestrator.list_machines)
         machine = next((m for m in machines if m['machine_id'] == machine_id), None)
 
         if not machine:
             raise HTTPException(status_code=404, detail="Machine not found")
 
         # Load full config
-        config_file = Path(machine['directory']) / "config.json"
-        with open(config_file, 'r') as f:
-            config = json.load(f)
+        config = await asyncio.to_thread(load_machine_config, Path(machine['directory']),
+                                         inline_config=inline_config)
 
-        # Get campaign info
-        campaign = db.campaigns.find_one({
-            'machines.machine_id': machine_id
-        })
-
-        # Get progress
-        progress = db.progress.find_one({
-            'machine_id': machine_id
-        })
+        # Get campaign info and progress
+        campaign, progress = await asyncio.gather(
+            db.campaigns.find_one({'machines.machine_id': machine_id}),
+            db.progress.find_one({'machine_id': machine_id}),
+        )
 
         # Get Docker status
-        try:
-            import docker
-            client = docker.from_env()
-            containers = client.containers.list(all=True)
-
-            container_info = None
-            for container in containers:
+        def find_container():
+            for container in list_containers():
                 if machine_id[:12] in container.name or machine_id in container.name:
-                    container_info = {
+                    return {
                         'container_id': container.id,
                         'container_name': container.name,
                         'status': container.status,
                         'ports': container.ports,
                         'created': container.attrs['Created'],
-                        'image': container.image.tags[0] if container.image.tags else 'unknown'
+                        'image': container_image(container)
                     }
-                    break
+            return None
+
+        try:
+            container_info = await compose.run_blocking(find_container)
         except Exception as e:
             logger.warning(f"Could not get Docker info: {e}")
             container_info = None
@@ -1489,11 +1459,33 @@ async def get_machine(machine_id: str):
         logger.error(f"Error getting machine: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/blueprint-configs/{digest}")
+async def get_blueprint_config(digest: str):
+    """Get a blueprint config by the content hash machines reference"""
+    if len(digest) != 16 or not all(c in "0123456789abcdef" for c in digest):
+        raise HTTPException(status_code=400, detail="Invalid blueprint config digest")
+
+    config = blueprint_store.get(digest)
+    if config is None:
+        # Not interned in this process yet - look for an exported copy
+        candidates = [CORE_PATH / "generated_machines" / "blueprints" / f"{digest}.json"]
+        candidates.extend((CORE_PATH / "campaigns").glob(f"*/blueprints/{digest}.json"))
+        for blueprint_file in candidates:
+            if blueprint_file.exists():
+                with open(blueprint_file, 'r') as f:
+                    blueprint_store.intern(json.load(f), digest=digest)
+                config = blueprint_store.get(digest)
+                break
+
+    if config is None:
+        raise HTTPException(status_code=404, detail=f"Blueprint config not found: {digest}")
+    return config
+
 @app.get("/api/machines/{machine_id}/stats")
 async def get_machine_statistics(machine_id: str):
     """Get statistics for a specific machine"""
     try:
-        stats = db.get_machine_stats(machine_id)
+        stats = await db.get_machine_stats(machine_id)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting machine stats: {str(e)}")
@@ -1523,404 +1515,97 @@ class VulnerabilityConfig(BaseModel):
 # ============================================================================
 
 @app.post("/api/configs/{category}/generate-machine")
-async def generate_machine_from_config(category: str, background_tasks: BackgroundTasks):
+async def generate_machine_from_config(category: str, wait: bool = False):
     """
     FULLY AUTOMATED SINGLE MACHINE: Config → Blueprint → ONE Machine → Docker App
-    FIXED: Proper port parameter handling for template engine
-    """
-    import sys
-    import importlib
-    import subprocess
-    import time
-
-    try:
-        logger.info("="*60)
-        logger.info(f"SINGLE MACHINE PIPELINE: {category}")
-        logger.info("="*60)
-
-        # STEP 1: Generate Blueprint Components (blueprint/mutation/template)
-        logger.info("STEP 1: Generating blueprint components...")
-        configs_dir = CORE_PATH / "configs"
-        config_path = configs_dir / f"{category}.json"
-
-        if not config_path.exists():
-            raise HTTPException(status_code=404, detail=f"Config not found: {category}")
-
-        # Load and validate config
-        with open(config_path, 'r') as f:
-            config_data = json.load(f)
-
-        logger.info(f"Config loaded: {config_data.get('name', 'Unknown')}")
-        logger.info(f"Infrastructure: {config_data.get('infrastructure', {})}")
-        logger.info(f"Database schema: {'Present' if config_data.get('database_schema') else 'Not required'}")
-
-        # Ensure CORE_PATH is in sys.path
-        if str(CORE_PATH) not in sys.path:
-            sys.path.insert(0, str(CORE_PATH))
-
-        from vuln_generator import VulnerabilityGenerator
-
-        generator_vuln = VulnerabilityGenerator(str(config_path))
-        generator_vuln.generate_all(str(CORE_PATH))
-
-        logger.info("✓ Generated blueprint, mutation, and template")
-
-        # STEP 2: Reload generator to pick up new blueprint
-        logger.info("\nSTEP 2: Reloading generator with new blueprint...")
-
-        # Remove cached modules to force reload
-        modules_to_reload = ['generator', 'base']
-        for mod in modules_to_reload:
-            if mod in sys.modules:
-                del sys.modules[mod]
-
-        # Reimport generator
-        from generator import DynamicHackforgeGenerator
-
-        # Create new generator instance (will auto-discover new blueprint)
-        gen = DynamicHackforgeGenerator(core_dir=str(CORE_PATH))
-
-        # Find the blueprint we just created
-        blueprint_id = None
-        for bp_id, bp in gen.blueprints.items():
-            if bp.category == category:
-                blueprint_id = bp_id
-                logger.info(f"Found blueprint: {bp.name} ({bp_id})")
-                break
-
-        if not blueprint_id:
-            logger.error(f"Available blueprints: {list(gen.blueprints.keys())}")
-            logger.error(f"Looking for category: {category}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Blueprint not found after generation. Category: {category}. Available: {list(gen.blueprints.keys())}"
-            )
-
-        # STEP 3: Generate ONLY ONE machine using generate_single_machine()
-        logger.info(f"\nSTEP 3: Generating single machine for {category}...")
-
-        machine = gen.generate_single_machine(
-            blueprint_id=blueprint_id,
-            difficulty=2,  # Default medium difficulty
-            user_id="api_generated"
-        )
-
-        if not machine:
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to generate machine config"
-            )
-
-        logger.info(f"✓ Generated and exported machine: {machine.machine_id}")
-
-        # STEP 4: Generate Docker application using template_engine
-        logger.info("\nSTEP 4: Generating Docker application...")
-
-        # Remove cached template_engine module
-        if 'template_engine' in sys.modules:
-            del sys.modules['template_engine']
-
-        from template_engine import TemplateEngine
-        import inspect
-
-        template_engine_instance = TemplateEngine(
-            machines_dir=str(CORE_PATH / "generated_machines")
-        )
-
-        machine_dir = CORE_PATH / "generated_machines" / machine.machine_id
-
-        # Find available port starting from 8080
-        import socket
-        
-        def find_available_port(start_port=8080, max_attempts=100):
-            """Find an available port starting from start_port"""
-            for port in range(start_port, start_port + max_attempts):
-                try:
-                    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                        s.bind(('', port))
-                        return port
-                except OSError:
-                    continue
-            return start_port
-        
-        port = find_available_port()
-        logger.info(f"Using port: {port}")
 
-        # Inspect the method signature to determine how to call it
-        try:
-            sig = inspect.signature(template_engine_instance.generate_machine_app)
-            params = list(sig.parameters.keys())
-            logger.info(f"Template engine signature: generate_machine_app({', '.join(params)})")
-        except Exception as e:
-            logger.warning(f"Could not inspect signature: {e}")
-            params = []
+    Queues the pipeline as a background job and returns its ID right away;
+    follow it with GET /api/jobs/{job_id}/events. With wait=true the request
+    waits for the job (without blocking other requests) and returns the
+    machine like before.
+    """
+    if not (CORE_PATH / "configs" / f"{category}.json").exists():
+        raise HTTPException(status_code=404, detail=f"Config not found: {category}")
 
-        # Try different calling conventions based on the signature
-        result = None
-        last_error = None
+    job = await submit_generate_machine(category)
+    logger.info(f"Queued machine pipeline for {category}: job {job.job_id}")
 
-        # Strategy 1: All positional arguments (most common)
-        if not result:
-            try:
-                logger.info("Attempting: generate_machine_app(machine, machine_dir, port) - all positional")
-                result = template_engine_instance.generate_machine_app(machine, machine_dir, port)
-                logger.info(f"✓ SUCCESS with all positional arguments")
-            except Exception as e:
-                last_error = e
-                logger.warning(f"Strategy 1 failed: {e}")
+    if not wait:
+        return job_response(job)
 
-        # Strategy 2: Machine positional, rest keyword
-        if not result:
-            try:
-                logger.info("Attempting: generate_machine_app(machine, machine_dir=..., port=...)")
-                result = template_engine_instance.generate_machine_app(machine, machine_dir=machine_dir, port=port)
-                logger.info(f"✓ SUCCESS with machine positional, rest keyword")
-            except Exception as e:
-                last_error = e
-                logger.warning(f"Strategy 2 failed: {e}")
+    job = await job_queue.wait(job.job_id)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=500, detail=f"Pipeline {job.status}: {job.error}")
+    # Only the submitter waiting on the job gets the flag; job snapshots never carry it
+    return {**job.result, "flag": machine_pipeline.machine_flag(job.context)}
 
-        # Strategy 3: All keyword arguments
-        if not result:
-            try:
-                logger.info("Attempting: generate_machine_app(machine=..., machine_dir=..., port=...)")
-                result = template_engine_instance.generate_machine_app(machine=machine, machine_dir=machine_dir, port=port)
-                logger.info(f"✓ SUCCESS with all keyword arguments")
-            except Exception as e:
-                last_error = e
-                logger.warning(f"Strategy 3 failed: {e}")
 
-        # Strategy 4: Only machine and machine_dir (no port) - OLD SIGNATURE
-        if not result:
-            try:
-                logger.info("Attempting: generate_machine_app(machine, machine_dir) - no port (old signature)")
-                result = template_engine_instance.generate_machine_app(machine, machine_dir)
-                logger.info(f"✓ SUCCESS with old signature (no port)")
-                logger.warning("Note: Template engine doesn't use port parameter - you may need to update it")
-            except Exception as e:
-                last_error = e
-                logger.warning(f"Strategy 4 failed: {e}")
+def job_response(job) -> Dict:
+    """Submit/retry response: the job plus where to follow it"""
+    return {
+        **job.to_dict(),
+        "status_url": f"/api/jobs/{job.job_id}",
+        "events_url": f"/api/jobs/{job.job_id}/events",
+    }
 
-        # Strategy 5: Try with dictionary unpacking
-        if not result:
-            try:
-                logger.info("Attempting: generate_machine_app(**kwargs)")
-                kwargs = {'machine': machine, 'machine_dir': machine_dir, 'port': port}
-                result = template_engine_instance.generate_machine_app(**kwargs)
-                logger.info(f"✓ SUCCESS with dictionary unpacking")
-            except Exception as e:
-                last_error = e
-                logger.warning(f"Strategy 5 failed: {e}")
 
-        # If all strategies failed, raise detailed error
-        if not result:
-            error_details = f"""
-Failed to call template_engine.generate_machine_app() with all strategies.
+@app.get("/api/jobs")
+async def list_jobs(kind: Optional[str] = None, status: Optional[str] = None, limit: int = 50):
+    """Recent background jobs, newest first"""
+    return {
+        "jobs": [job.to_dict() for job in job_queue.list(kind=kind, status=status, limit=limit)],
+        "stats": job_queue.stats(),
+    }
 
-Last error: {last_error}
 
-Attempted strategies:
-1. All positional: generate_machine_app(machine, machine_dir, port)
-2. Mixed: generate_machine_app(machine, machine_dir=..., port=...)
-3. All keyword: generate_machine_app(machine=..., machine_dir=..., port=...)
-4. Old signature: generate_machine_app(machine, machine_dir)
-5. Dictionary unpacking: generate_machine_app(**kwargs)
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status with per-stage progress and timings"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
 
-Please check your template_engine.py file and verify the generate_machine_app() method signature.
-Expected: def generate_machine_app(self, machine, machine_dir, port)
-"""
-            logger.error(error_details)
-            raise HTTPException(
-                status_code=500,
-                detail=f"Template engine compatibility error: {str(last_error)}"
-            )
 
-        logger.info(f"✓ Generated Docker app successfully")
-
-
-        # STEP 5: Generate docker-compose.yml for this single machine
-        logger.info("\nSTEP 5: Generating docker-compose.yml...")
-
-        # Get infrastructure requirements from config
-        needs_database = config_data.get('infrastructure', {}).get('needs_database', False)
-        database_type = config_data.get('infrastructure', {}).get('database_type', 'mysql')
-
-        # Get flag location from config
-        flag_location = machine.flag.get('location', '/var/www/html/flag.txt')
-        flag_location = flag_location.replace(':', '_').replace('//', '/')
-        if not flag_location.startswith('/'):
-            flag_location = '/' + flag_location
-
-        # Build docker-compose based on infrastructure needs
-        if needs_database:
-            compose_content = f"""version: '3.8'
-
-services:
-  {machine.machine_id}:
-    build: .
-    container_name: hackforge_{machine.machine_id}
-    ports:
-      - "{port}:80"
-    volumes:
-      - ./app:/var/www/html
-      - ./flag.txt:{flag_location}:ro
-    environment:
-      - MACHINE_ID={machine.machine_id}
-      - FLAG_LOCATION={flag_location}
-      - DB_HOST=db
-      - DB_USER=hackforge
-      - DB_PASSWORD=hackforge123
-      - DB_NAME=hackforge
-    depends_on:
-      - db
-    restart: unless-stopped
-
-  db:
-    image: {database_type}:latest
-    container_name: hackforge_{machine.machine_id}_db
-    environment:
-      - MYSQL_ROOT_PASSWORD=root123
-      - MYSQL_DATABASE=hackforge
-      - MYSQL_USER=hackforge
-      - MYSQL_PASSWORD=hackforge123
-    volumes:
-      - db_data:/var/lib/mysql
-      - ./init.sql:/docker-entrypoint-initdb.d/init.sql:ro
-    restart: unless-stopped
-
-volumes:
-  db_data:
-"""
-        else:
-            compose_content = f"""version: '3.8'
-
-services:
-  {machine.machine_id}:
-    build: .
-    container_name: hackforge_{machine.machine_id}
-    ports:
-      - "{port}:80"
-    volumes:
-      - ./app:/var/www/html
-      - ./flag.txt:{flag_location}:ro
-    environment:
-      - MACHINE_ID={machine.machine_id}
-      - FLAG_LOCATION={flag_location}
-    restart: unless-stopped
-"""
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events: one 'job' event per state change, until the job finishes"""
+    if not job_queue.get(job_id):
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
 
-        compose_file = machine_dir / "docker-compose.yml"
-        with open(compose_file, 'w') as f:
-            f.write(compose_content)
-
-        logger.info(f"✓ Generated: {compose_file}")
-
-        # STEP 5.5: Generate init.sql if database is needed
-        if needs_database and config_data.get('database_schema'):
-            logger.info("\nSTEP 5.5: Generating database initialization script...")
-
-            db_schema = config_data['database_schema']
-            init_sql_content = "-- Auto-generated database initialization\n\n"
-
-            # Create tables
-            for table in db_schema.get('tables', []):
-                table_name = table['name']
-                columns = ', '.join(table['columns'])
-                init_sql_content += f"CREATE TABLE IF NOT EXISTS {table_name} ({columns});\n\n"
-
-            # Insert seed data
-            seed_data = db_schema.get('seed_data', {})
-            for table_name, rows in seed_data.items():
-                for row in rows:
-                    columns = ', '.join(row.keys())
-                    values = []
-                    for value in row.values():
-                        if value == 'NOW()':
-                            values.append('NOW()')
-                        elif value == '{{FLAG}}':
-                            values.append(f"'{machine.flag['content']}'")
-                        else:
-                            # Escape single quotes in values
-                            escaped_value = str(value).replace("'", "\\'")
-                            values.append(f"'{escaped_value}'")
-                    values_str = ', '.join(values)
-                    init_sql_content += f"INSERT INTO {table_name} ({columns}) VALUES ({values_str});\n"
-
-            init_sql_file = machine_dir / "init.sql"
-            with open(init_sql_file, 'w') as f:
-                f.write(init_sql_content)
-
-            logger.info(f"✓ Generated: {init_sql_file}")
-
-        # STEP 6: Start Docker container automatically
-        logger.info("\nSTEP 6: Starting Docker container...")
-
-        container_started = False
-        container_url = None
-
-        try:
-            result = subprocess.run(
-                ["docker-compose", "up", "-d", "--build"],
-                cwd=str(machine_dir),
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
+    async def event_stream():
+        async for snapshot in job_queue.events(job_id):
+            yield f"event: job\ndata: {json.dumps(snapshot, default=str)}\n\n"
 
-            if result.returncode == 0:
-                logger.info("✓ Docker container started successfully")
-                container_started = True
-                container_url = f"http://4.231.90.52:{port}"
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-                # Wait a moment for container to fully start
-                time.sleep(2)
-            else:
-                logger.warning(f"Container start failed: {result.stderr}")
 
-        except Exception as e:
-            logger.warning(f"Could not start container: {e}")
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    if not job_queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} already {job.status}")
+    return {"job_id": job_id, "cancelled": True}
 
-        logger.info("\n" + "="*60)
-        logger.info("✓ PIPELINE COMPLETE!")
-        logger.info("="*60)
 
-        return {
-            "success": True,
-            "message": "Machine generated and ready!",
-            "category": category,
-            "machine_id": machine.machine_id,
-            "variant": machine.variant,
-            "difficulty": machine.difficulty,
-            "flag": machine.flag['content'],
-            "directory": str(machine_dir),
-            "port": port,
-            "infrastructure": config_data.get('infrastructure'),
-            "has_database": needs_database,
-            "files_generated": {
-                "blueprint": f"blueprints/{category}_blueprint.yaml",
-                "mutation": f"mutations/{category}_mutation.py",
-                "template": f"templates/{category}_templates.py",
-                "machine_config": f"generated_machines/{machine.machine_id}/config.json",
-                "docker_app": f"generated_machines/{machine.machine_id}/app/index.php",
-                "dockerfile": f"generated_machines/{machine.machine_id}/Dockerfile",
-                "compose": f"generated_machines/{machine.machine_id}/docker-compose.yml",
-                "init_sql": f"generated_machines/{machine.machine_id}/init.sql" if needs_database else None
-            },
-            "container_started": container_started,
-            "url": container_url,
-            "next_steps": [
-                f"Access machine at: {container_url}" if container_started else f"Start container: cd generated_machines/{machine.machine_id} && docker-compose up -d",
-                "Test the vulnerability",
-                "Submit flag via /machines page"
-            ]
-        }
+@app.post("/api/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Re-run a failed, cancelled or interrupted job from its first incomplete stage"""
+    try:
+        job = job_queue.retry(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job_response(job)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Pipeline failed: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Pipeline failed: {str(e)}")
 
 @app.get("/api/configs")
 async def list_configs():
@@ -2037,12 +1722,12 @@ async def create_config_and_generate(config: VulnerabilityConfig, auto_generate:
             logger.info("\n🚀 Auto-generating machine from config...")
 
             try:
-                # Run the full pipeline
-                pipeline_result = await generate_machine_from_config(config.category, BackgroundTasks())
+                # Queue the full pipeline; the client follows the job
+                job = await submit_generate_machine(config.category)
 
                 response["auto_generated"] = True
-                response["machine"] = pipeline_result
-                response["message"] = "Config created and machine generated successfully!"
+                response["job"] = job_response(job)
+                response["message"] = "Config created; machine generation queued"
 
             except Exception as e:
                 logger.error(f"Auto-generation failed: {e}")
@@ -2120,7 +1805,7 @@ async def start_containers(background_tasks: BackgroundTasks):
 @app.post("/api/docker/stop")
 async def stop_containers():
     """Stop all Docker containers"""
-    success = orchestrator.stop_machines()
+    success = await compose.run_blocking(orchestrator.stop_machines)
 
     if success:
         return {"message": "Containers stopped successfully"}
@@ -2130,7 +1815,7 @@ async def stop_containers():
 @app.post("/api/docker/restart")
 async def restart_containers():
     """Restart all Docker containers"""
-    success = orchestrator.restart_machines()
+    success = await compose.run_blocking(orchestrator.restart_machines)
 
     if success:
         return {"message": "Containers restarted successfully"}
@@ -2140,7 +1825,7 @@ async def restart_containers():
 @app.get("/api/docker/status")
 async def docker_status():
     """Get Docker container status"""
-    containers = orchestrator.status_machines()
+    containers = await compose.run_blocking(orchestrator.status_machines)
 
     return {
         "containers": containers,
@@ -2151,7 +1836,7 @@ async def docker_status():
 @app.delete("/api/docker/destroy")
 async def destroy_containers():
     """Destroy all Docker containers"""
-    success = orchestrator.destroy_machines(remove_volumes=True)
+    success = await compose.run_blocking(orchestrator.destroy_machines, True)
 
     if success:
         return {"message": "Containers destroyed successfully"}
@@ -2167,14 +1852,12 @@ async def destroy_containers():
 async def start_container(container_id: str):
     """Start a specific container"""
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(container_id)
+        container = await compose.run_blocking(get_container, container_id)
 
         if container.status == 'running':
             return {"message": "Container is already running", "status": "running"}
 
-        container.start()
+        await compose.run_blocking(container.start)
         return {"message": f"Container {container.name} started successfully", "status": "started"}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_id} not found")
@@ -2185,14 +1868,12 @@ async def start_container(container_id: str):
 async def stop_container(container_id: str):
     """Stop a specific container"""
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(container_id)
+        container = await compose.run_blocking(get_container, container_id)
 
         if container.status != 'running':
             return {"message": "Container is already stopped", "status": "stopped"}
 
-        container.stop(timeout=10)
+        await compose.run_blocking(lambda: container.stop(timeout=10))
         return {"message": f"Container {container.name} stopped successfully", "status": "stopped"}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_id} not found")
@@ -2203,10 +1884,8 @@ async def stop_container(container_id: str):
 async def restart_container(container_id: str):
     """Restart a specific container"""
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(container_id)
-        container.restart(timeout=10)
+        container = await compose.run_blocking(get_container, container_id)
+        await compose.run_blocking(lambda: container.restart(timeout=10))
         return {"message": f"Container {container.name} restarted successfully", "status": "restarted"}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_id} not found")
@@ -2217,10 +1896,8 @@ async def restart_container(container_id: str):
 async def remove_container(container_id: str):
     """Remove a specific container"""
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(container_id)
-        container.remove(force=True)
+        container = await compose.run_blocking(get_container, container_id)
+        await compose.run_blocking(lambda: container.remove(force=True))
         return {"message": f"Container removed successfully", "status": "removed"}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_id} not found")
@@ -2231,10 +1908,9 @@ async def remove_container(container_id: str):
 async def get_container_logs(container_id: str, tail: int = 100):
     """Get logs from a specific container"""
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(container_id)
-        logs = container.logs(tail=tail, timestamps=True).decode('utf-8')
+        container = await compose.run_blocking(get_container, container_id)
+        logs = await compose.run_blocking(lambda: container.logs(tail=tail, timestamps=True))
+        logs = logs.decode('utf-8')
         return {"logs": logs, "container_id": container_id}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_id} not found")
@@ -2245,30 +1921,30 @@ async def get_container_logs(container_id: str, tail: int = 100):
 async def get_campaign_containers(campaign_id: str):
     """Get all Docker containers for a specific campaign"""
     try:
-        import docker
-        client = docker.from_env()
-
-        campaign = db.get_campaign(campaign_id)
+        campaign = await db.get_campaign(campaign_id)
         if not campaign:
             raise HTTPException(status_code=404, detail="Campaign not found")
 
-        all_containers = client.containers.list(all=True)
         campaign_machine_ids = [m['machine_id'] for m in campaign.get('machines', [])]
 
-        campaign_containers = []
-        for container in all_containers:
-            container_name = container.name
-            for machine_id in campaign_machine_ids:
-                if machine_id[:12] in container_name or machine_id in container_name:
-                    campaign_containers.append({
-                        'Id': container.id,
-                        'Name': container.name,
-                        'State': container.status,
-                        'Status': container.status,
-                        'Image': container.image.tags[0] if container.image.tags else 'unknown',
-                        'machine_id': machine_id
-                    })
-                    break
+        def find_containers():
+            campaign_containers = []
+            for container in list_containers():
+                container_name = container.name
+                for machine_id in campaign_machine_ids:
+                    if machine_id[:12] in container_name or machine_id in container_name:
+                        campaign_containers.append({
+                            'Id': container.id,
+                            'Name': container.name,
+                            'State': container.status,
+                            'Status': container.status,
+                            'Image': container_image(container),
+                            'machine_id': machine_id
+                        })
+                        break
+            return campaign_containers
+
+        campaign_containers = await compose.run_blocking(find_containers)
 
         return {
             'campaign_id': campaign_id,
@@ -2283,6 +1959,16 @@ async def get_campaign_containers(campaign_id: str):
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+@app.get("/api/db/indexes")
+async def get_index_status(advise: bool = False):
+    """Declared index build state; with advise=true also the hot queries still doing a COLLSCAN"""
+    status = db.indexes.status()
+    if advise:
+        # explain() runs on the synchronous client; keep it off the event loop
+        status['collscans'] = await asyncio.to_thread(db.indexes.advise)
+    return status
+
+
 # ============================================================================
 # Health Check
 # ============================================================================
@@ -2291,7 +1977,7 @@ async def get_campaign_containers(campaign_id: str):
 async def health_check():
     """Health check with database status"""
     try:
-        db.users.find_one()
+        await db.ping()
         db_status = "connected"
     except Exception as e:
         db_status = f"error: {str(e)}"
@@ -1 +1,3 @@
-from database.database import get_db, DatabaseManager
+from database.database import get_db, DatabaseManager, flag_hash, flag_matches
+from database.async_database import get_async_db, AsyncDatabaseManager
+from database.indexes import IndexManager, IndexSpec, QueryPattern
@@ -0,0 +1,370 @@
+"""
+Async Database Operations
+Motor (asyncio) counterpart of DatabaseManager for the FastAPI app
+
+Same methods, same documents and the same machine lookup cache as
+DatabaseManager, but every round trip is awaited, so a request waiting on
+Mongo no longer holds up every other request on the event loop. Independent
+queries (the platform stats counts, machine stats) are issued together
+with asyncio.gather.
+
+Indexes are still declared and built by IndexManager, on the synchronous
+client Motor wraps (client.delegate), in its background thread.
+"""
+
+import os
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:
+    AsyncIOMotorClient = None
+
+try:
+    from .database import (Flow, MachineCache, campaign_progress_pipeline, campaign_statistics,
+                           machine_lookup_operations, submit_flag_flow, summarize_campaign_progress)
+    from .indexes import IndexManager, index_advisor_enabled
+except ImportError:
+    from database import (Flow, MachineCache, campaign_progress_pipeline, campaign_statistics,
+                          machine_lookup_operations, submit_flag_flow, summarize_campaign_progress)
+    from indexes import IndexManager, index_advisor_enabled
+
+
+def motor_client(connection_string: str = None) -> "AsyncIOMotorClient":
+    """
+    Motor client with the API's pool settings
+
+    HACKFORGE_MONGO_MAX_POOL: connections per server (default 200 - one per
+    concurrent request the API is sized for), HACKFORGE_MONGO_MIN_POOL:
+    connections kept open while idle (default 20), HACKFORGE_MONGO_WAIT_MS:
+    how long a request may wait for a free connection before failing.
+    """
+    if AsyncIOMotorClient is None:
+        raise ImportError("motor is required for AsyncDatabaseManager: pip3 install motor")
+    return AsyncIOMotorClient(
+        connection_string or os.getenv('MONGODB_URI', 'mongodb://0.0.0.0:27017/'),
+        maxPoolSize=int(os.getenv('HACKFORGE_MONGO_MAX_POOL', '200')),
+        minPoolSize=int(os.getenv('HACKFORGE_MONGO_MIN_POOL', '20')),
+        maxIdleTimeMS=int(os.getenv('HACKFORGE_MONGO_MAX_IDLE_MS', '300000')),
+        waitQueueTimeoutMS=int(os.getenv('HACKFORGE_MONGO_WAIT_MS', '5000')),
+    )
+
+
+async def run_flow_async(manager, flow: Flow):
+    """run_flow with awaited operations; a list of independent calls is issued together"""
+    result, error = None, None
+    while True:
+        try:
+            step = flow.throw(error) if error is not None else flow.send(result)
+        except StopIteration as stop:
+            return stop.value
+        result, error = None, None
+        try:
+            calls = step if isinstance(step, list) else [step]
+            results = await asyncio.gather(*(getattr(getattr(manager, call.collection), call.method)(
+                *call.args, **call.kwargs) for call in calls))
+            result = list(results) if isinstance(step, list) else results[0]
+        except Exception as e:
+            error = e
+
+
+class AsyncDatabaseManager:
+    """
+    Async database manager for MongoDB operations
+
+    Args:
+        connection_string: MongoDB URI (default MONGODB_URI)
+        client: Pre-built Motor client (or anything with the same async API
+                and a .delegate pymongo client for index builds)
+        build_indexes: Build the declared indexes on startup
+    """
+
+    def __init__(self, connection_string: str = None, client=None, build_indexes: bool = True):
+        self.client = client or motor_client(connection_string)
+        self.db = self.client['hackforge']
+
+        # Collections
+        self.users = self.db['users']
+        self.campaigns = self.db['campaigns']
+        self.progress = self.db['progress']
+        self.submissions = self.db['flag_submissions']
+        self.hints = self.db['hint_usage']
+        self.achievements = self.db['achievements']
+        self.user_achievements = self.db['user_achievements']
+        self.sessions = self.db['sessions']
+        self.machines = self.db['machines']
+
+        self.machine_cache = MachineCache()
+
+        self.indexes = IndexManager(self.client.delegate['hackforge'])
+        if build_indexes:
+            # Unique indexes are in place on return; the rest build in the background
+            self.indexes.ensure(background=True, advise=index_advisor_enabled())
+
+    # ------------------------------------------------------------------
+    # Users
+    # ------------------------------------------------------------------
+
+    async def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+        user_data['created_at'] = datetime.utcnow()
+        result = await self.users.insert_one(user_data)
+        user_data['_id'] = str(result.inserted_id)
+        return user_data
+
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user by ID, excluding MongoDB _id field"""
+        return await self.users.find_one({'user_id': user_id}, {'_id': 0})
+
+    async def add_points(self, user_id: str, points: int) -> bool:
+        result = await self.users.update_one({'user_id': user_id}, {'$inc': {'total_points': points}})
+        return result.modified_count > 0
+
+    async def increment_solved(self, user_id: str) -> bool:
+        result = await self.users.update_one({'user_id': user_id}, {'$inc': {'machines_solved': 1}})
+        return result.modified_count > 0
+
+    # ------------------------------------------------------------------
+    # Campaigns
+    # ------------------------------------------------------------------
+
+    async def create_campaign(self, campaign_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new campaign with name support"""
+        campaign_data['created_at'] = datetime.utcnow()
+        campaign_data.setdefault('campaign_name', f"Campaign {campaign_data.get('campaign_id', 'Unknown')}")
+        campaign_data.setdefault('status', 'active')
+
+        result = await self.campaigns.insert_one(campaign_data)
+        campaign_data['_id'] = str(result.inserted_id)
+
+        await self.register_machines(campaign_data.get('machines', []),
+                                     campaign_id=campaign_data.get('campaign_id'),
+                                     user_id=campaign_data.get('user_id'))
+        return campaign_data
+
+    async def get_campaign(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Get campaign by ID, excluding MongoDB _id field"""
+        return await self.campaigns.find_one({'campaign_id': campaign_id}, {'_id': 0})
+
+    async def get_user_campaigns(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get all campaigns for a user, sorted by creation date (newest first)"""
+        cursor = self.campaigns.find({'user_id': user_id}, {'_id': 0}).sort('created_at', -1)
+        return await cursor.to_list(length=None)
+
+    async def get_user_campaigns_with_progress(self, user_id: str) -> List[Dict[str, Any]]:
+        """get_user_campaigns with each campaign's progress summed (one aggregation, not one query per campaign)"""
+        campaigns = await self.campaigns.aggregate(campaign_progress_pipeline({'user_id': user_id})).to_list(length=None)
+        return [summarize_campaign_progress(campaign) for campaign in campaigns]
+
+    async def get_campaign_with_progress(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """get_campaign plus its owner's per-machine progress and totals, in one aggregation"""
+        campaigns = await self.campaigns.aggregate(
+            campaign_progress_pipeline({'campaign_id': campaign_id}, per_machine=True)).to_list(length=1)
+        return summarize_campaign_progress(campaigns[0]) if campaigns else None
+
+    async def update_campaign_name(self, campaign_id: str, new_name: str) -> bool:
+        """Update campaign name"""
+        result = await self.campaigns.update_one({'campaign_id': campaign_id},
+                                                 {'$set': {'campaign_name': new_name}})
+        return result.modified_count > 0
+
+    async def update_campaign_progress(self, campaign_id: str, solved_count: int, points: int) -> bool:
+        result = await self.campaigns.update_one(
+            {'campaign_id': campaign_id},
+            {'$set': {'machines_solved': solved_count, 'total_points': points}}
+        )
+        return result.modified_count > 0
+
+    async def complete_campaign(self, campaign_id: str) -> bool:
+        result = await self.campaigns.update_one(
+            {'campaign_id': campaign_id},
+            {'$set': {'status': 'completed', 'completed_at': datetime.utcnow()}}
+        )
+
+        # Also increment user's campaigns_completed counter
+        campaign = await self.get_campaign(campaign_id)
+        if campaign:
+            await self.users.update_one({'user_id': campaign['user_id']}, {'$inc': {'campaigns_completed': 1}})
+
+        return result.modified_count > 0
+
+    async def search_campaigns(self, user_id: str, search_term: str) -> List[Dict[str, Any]]:
+        """Search user's campaigns by name"""
+        query = {
+            'user_id': user_id,
+            'campaign_name': {'$regex': search_term, '$options': 'i'}  # Case-insensitive search
+        }
+        return await self.campaigns.find(query).sort('created_at', -1).to_list(length=None)
+
+    # ------------------------------------------------------------------
+    # Machine lookup (flag validation)
+    # ------------------------------------------------------------------
+
+    async def register_machines(self, machines: Iterable[Dict[str, Any]], campaign_id: str = None,
+                                user_id: str = None) -> int:
+        """Upsert machines (machine_id, plain flag, ...) into the lookup collection"""
+        machines = list(machines)
+        if not machines:
+            return 0
+        await self.machines.bulk_write(machine_lookup_operations(machines, campaign_id, user_id), ordered=False)
+        self.machine_cache.discard(machine['machine_id'] for machine in machines)
+        return len(machines)
+
+    async def get_machine_lookup(self, machine_id: str) -> Optional[Dict[str, Any]]:
+        """A machine's lookup record (flag_hash, difficulty, campaign_id, ...), or None"""
+        machine = self.machine_cache.get(machine_id)
+        if machine is not None:
+            return machine
+
+        machine = await self.machines.find_one({'machine_id': machine_id}, {'_id': 0})
+        # Misses aren't cached: the machine may be registered a moment later
+        if machine is not None:
+            self.machine_cache.put(machine_id, machine)
+        return machine
+
+    async def backfill_machine_lookup(self):
+        """Fill the lookup from campaigns created before it existed (runs once, while it is empty)"""
+        if await self.machines.estimated_document_count() > 0:
+            return
+        async for campaign in self.campaigns.find({}, {'_id': 0, 'campaign_id': 1, 'user_id': 1, 'machines': 1}):
+            await self.register_machines((m for m in campaign.get('machines', []) if m.get('flag')),
+                                         campaign_id=campaign.get('campaign_id'),
+                                         user_id=campaign.get('user_id'))
+
+    async def unregister_campaign_machines(self, campaign_id: str) -> int:
+        """Drop a deleted campaign's machines from the lookup"""
+        result = await self.machines.delete_many({'campaign_id': campaign_id})
+        self.machine_cache.discard_campaign(campaign_id)
+        return result.deleted_count
+
+    # ------------------------------------------------------------------
+    # Progress and submissions
+    # ------------------------------------------------------------------
+
+    async def create_progress(self, progress_data: Dict[str, Any]) -> Dict[str, Any]:
+        progress_data['started_at'] = datetime.utcnow()
+        progress_data['solved'] = False
+        progress_data['attempts'] = 0
+        result = await self.progress.insert_one(progress_data)
+        progress_data['_id'] = str(result.inserted_id)
+        return progress_data
+
+    async def get_progress(self, user_id: str, machine_id: str) -> Optional[Dict[str, Any]]:
+        return await self.progress.find_one({'user_id': user_id, 'machine_id': machine_id})
+
+    async def increment_attempts(self, user_id: str, machine_id: str) -> bool:
+        result = await self.progress.update_one({'user_id': user_id, 'machine_id': machine_id},
+                                                {'$inc': {'attempts': 1}})
+        return result.modified_count > 0
+
+    async def mark_solved(self, user_id: str, machine_id: str, points: int, solve_time: int) -> bool:
+        result = await self.progress.update_one(
+            {'user_id': user_id, 'machine_id': machine_id},
+            {'$set': {'solved': True, 'points_earned': points, 'solve_time': solve_time,
+                      'completed_at': datetime.utcnow()}}
+        )
+        return result.modified_count > 0
+
+    async def get_campaign_progress(self, user_id: str, campaign_id: str) -> List[Dict[str, Any]]:
+        return await self.progress.find({'user_id': user_id, 'campaign_id': campaign_id}).to_list(length=None)
+
+    async def submit_flag(self, user_id: str, machine: Dict[str, Any], submitted_flag: str,
+                          ip_address: str = None) -> Dict[str, Any]:
+        """
+        Check and record a flag submission (see submit_flag_flow)
+
+        Returns {'correct', 'first_solve', 'points', 'campaign_id', 'campaign_completed'}
+        """
+        return await run_flow_async(self, submit_flag_flow(user_id, machine, submitted_flag, ip_address))
+
+    async def record_submission(self, submission_data: Dict[str, Any]) -> Dict[str, Any]:
+        submission_data['submitted_at'] = datetime.utcnow()
+        result = await self.submissions.insert_one(submission_data)
+        submission_data['_id'] = str(result.inserted_id)
+        return submission_data
+
+    async def get_user_submissions(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        cursor = self.submissions.find({'user_id': user_id}).sort('submitted_at', -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    # ------------------------------------------------------------------
+    # Leaderboard and statistics
+    # ------------------------------------------------------------------
+
+    async def get_leaderboard(self, limit: int = 100, timeframe: str = 'all_time') -> List[Dict[str, Any]]:
+        """Get leaderboard with optional timeframe filtering"""
+        query = {}
+        if timeframe == 'weekly':
+            query = {'created_at': {'$gte': datetime.utcnow() - timedelta(days=7)}}
+        elif timeframe == 'monthly':
+            query = {'created_at': {'$gte': datetime.utcnow() - timedelta(days=30)}}
+
+        users = await self.users.find(query).sort('total_points', -1).limit(limit).to_list(length=limit)
+        for idx, user in enumerate(users, 1):
+            user['rank'] = idx
+        return users
+
+    async def get_user_rank(self, user_id: str, user: Dict[str, Any] = None) -> Optional[int]:
+        """Get user's rank based on total points (pass user when it's already loaded)"""
+        user = user or await self.get_user(user_id)
+        if not user:
+            return None
+        return await self.users.count_documents({'total_points': {'$gt': user.get('total_points', 0)}}) + 1
+
+    async def get_platform_stats(self) -> Dict[str, Any]:
+        """Get overall platform statistics"""
+        counts = await asyncio.gather(
+            self.users.count_documents({}),
+            self.campaigns.count_documents({}),
+            self.campaigns.count_documents({'status': 'active'}),
+            self.campaigns.count_documents({'status': 'completed'}),
+            self.progress.count_documents({'solved': True}),
+            self.submissions.count_documents({}),
+        )
+        return dict(zip(('total_users', 'total_campaigns', 'active_campaigns', 'completed_campaigns',
+                         'total_solves', 'total_flags_submitted'), counts))
+
+    async def get_machine_stats(self, machine_id: str) -> Dict[str, Any]:
+        """Get statistics for a specific machine"""
+        total_attempts, solved_progress = await asyncio.gather(
+            self.progress.count_documents({'machine_id': machine_id}),
+            self.progress.find({'machine_id': machine_id, 'solved': True},
+                               {'_id': 0, 'solve_time': 1}).to_list(length=None),
+        )
+
+        avg_solve_time = None
+        if solved_progress:
+            avg_solve_time = sum(p.get('solve_time', 0) for p in solved_progress) / len(solved_progress)
+
+        return {
+            'machine_id': machine_id,
+            'total_attempts': total_attempts,
+            'unique_solvers': len(solved_progress),
+            'average_solve_time': avg_solve_time
+        }
+
+    async def get_campaign_statistics(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Get detailed statistics for a campaign (progress summed in the same query)"""
+        campaigns = await self.campaigns.aggregate(
+            campaign_progress_pipeline({'campaign_id': campaign_id})).to_list(length=1)
+        if not campaigns:
+            return None
+        return campaign_statistics(summarize_campaign_progress(campaigns[0]))
+
+    async def ping(self) -> bool:
+        await self.db.command('ping')
+        return True
+
+    def close(self):
+        self.client.close()
+
+
+_async_db_manager = None
+
+def get_async_db() -> AsyncDatabaseManager:
+    """Get singleton async database manager instance"""
+    global _async_db_manager
+    if _async_db_manager is None:
+        _async_db_manager = AsyncDatabaseManager()
+    return _async_db_manager
@@ -4,20 +4,308 @@ MongoDB connection and CRUD operations
 Enhanced with campaign naming support
 """
 
-from pymongo import MongoClient
-from typing import List, Optional, Dict, Any
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from typing import List, Optional, Dict, Any, Iterable, Generator, Union
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from collections import OrderedDict
 import os
+import uuid
+import hmac
+import hashlib
+import threading
+
+try:
+    from .indexes import IndexManager, index_advisor_enabled
+except ImportError:
+    from indexes import IndexManager, index_advisor_enabled
+
+
+def flag_hash(flag: str) -> str:
+    """SHA-256 of a flag (surrounding whitespace ignored), as stored in the machines lookup"""
+    return hashlib.sha256(flag.strip().encode()).hexdigest()
+
+
+def flag_matches(flag: str, expected_hash: str) -> bool:
+    """Constant-time check of a submitted flag against a stored flag_hash"""
+    return hmac.compare_digest(flag_hash(flag), expected_hash or '')
+
+
+class MachineCache:
+    """In-process LRU of machine lookup records, in front of the machines collection"""
+
+    def __init__(self, max_size: int = None):
+        self.max_size = max_size or int(os.getenv('HACKFORGE_MACHINE_CACHE_SIZE', '100000'))
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, machine_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            machine = self._entries.get(machine_id)
+            if machine is not None:
+                self._entries.move_to_end(machine_id)
+            return machine
+
+    def put(self, machine_id: str, machine: Dict[str, Any]):
+        with self._lock:
+            self._entries[machine_id] = machine
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, machine_ids: Iterable[str]):
+        with self._lock:
+            for machine_id in machine_ids:
+                self._entries.pop(machine_id, None)
+
+    def discard_campaign(self, campaign_id: str):
+        with self._lock:
+            for machine_id in [k for k, v in self._entries.items() if v.get('campaign_id') == campaign_id]:
+                del self._entries[machine_id]
+
+
+def machine_lookup_operations(machines: Iterable[Dict[str, Any]], campaign_id: str = None,
+                              user_id: str = None) -> List[UpdateOne]:
+    """Upserts of machines (machine_id, plain flag, ...) into the machines lookup"""
+    operations = []
+    for machine in machines:
+        lookup = {
+            'machine_id': machine['machine_id'],
+            'flag_hash': flag_hash(machine['flag']),
+            'difficulty': machine.get('difficulty', 1),
+            'campaign_id': campaign_id,
+            'user_id': user_id,
+            'blueprint_id': machine.get('blueprint_id'),
+            'variant': machine.get('variant'),
+        }
+        operations.append(UpdateOne({'machine_id': lookup['machine_id']}, {'$set': lookup}, upsert=True))
+    return operations
+
+
+def submission_campaign_id(machine: Dict[str, Any], user_id: str) -> str:
+    """The campaign a submission counts towards: the machine's, for its owner only"""
+    if machine.get('campaign_id') and machine.get('user_id') == user_id:
+        return machine['campaign_id']
+    return 'unknown'
+
+
+def submission_update(machine: Dict[str, Any], user_id: str, correct: bool, points: int,
+                      now: datetime) -> List[Dict[str, Any]]:
+    """
+    Pipeline update of a progress record for one submission: create it if
+    needed, count the attempt and, for a correct flag, claim the solve
+    """
+    update = [{'$set': {
+        'campaign_id': {'$ifNull': ['$campaign_id', submission_campaign_id(machine, user_id)]},
+        'started_at': {'$ifNull': ['$started_at', now]},
+        'solved': {'$ifNull': ['$solved', False]},
+        'attempts': {'$add': [{'$ifNull': ['$attempts', 0]}, 1]},
+    }}]
+    if correct:
+        # Expressions see the record before this stage, i.e. whether it was already solved
+        solved = {'$eq': ['$solved', True]}
+        update.append({'$set': {
+            'points_earned': {'$cond': [solved, '$points_earned', points]},
+            'solve_time': {'$cond': [solved, '$solve_time',
+                                     {'$toInt': {'$divide': [{'$subtract': [now, '$started_at']}, 1000]}}]},
+            'completed_at': {'$cond': [solved, '$completed_at', now]},
+            'solved': True,
+        }})
+    return update
+
+
+def campaign_is_complete(campaign: Optional[Dict[str, Any]]) -> bool:
+    """Whether a campaign's counters (after a solve) cover every machine"""
+    return bool(campaign and campaign.get('machine_count')
+                and campaign.get('machines_solved', 0) >= campaign['machine_count'])
+
+
+@dataclass
+class DbCall:
+    """One collection operation (manager attribute, method, arguments) yielded by a flow"""
+    collection: str
+    method: str
+    args: tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+# A flow is a generator shared by DatabaseManager and AsyncDatabaseManager: it
+# yields a DbCall (or a list of independent DbCalls) and is sent the result(s);
+# an operation's exception is raised at the yield. run_flow drives it with
+# pymongo, AsyncDatabaseManager's run_flow_async with Motor.
+Flow = Generator[Union[DbCall, List[DbCall]], Any, Any]
+
+
+def run_flow(manager, flow: Flow):
+    """Run a flow against a manager's synchronous collections"""
+    result, error = None, None
+    while True:
+        try:
+            step = flow.throw(error) if error is not None else flow.send(result)
+        except StopIteration as stop:
+            return stop.value
+        result, error = None, None
+        try:
+            calls = step if isinstance(step, list) else [step]
+            results = [getattr(getattr(manager, call.collection), call.method)(*call.args, **call.kwargs)
+                       for call in calls]
+            result = results if isinstance(step, list) else results[0]
+        except Exception as e:
+            error = e
+
+
+def submit_flag_flow(user_id: str, machine: Dict[str, Any], submitted_flag: str,
+                     ip_address: str = None) -> Flow:
+    """
+    Check and record a flag submission
+
+    Progress is created, the attempt counted and - for a correct flag - the
+    solve claimed in one atomic update, which returns the record as it was
+    before: of any number of concurrent correct submissions exactly one sees
+    it unsolved and awards points. The user's and (for the campaign's owner)
+    the campaign's counters are then $inc'ed, so a wrong flag costs two round
+    trips and a first solve four - three with run_flow_async, which issues
+    both counters together - plus two when it completes the campaign.
+    """
+    machine_id = machine['machine_id']
+    correct = flag_matches(submitted_flag, machine['flag_hash'])
+    points = machine.get('difficulty', 1) * 100
+    now = datetime.utcnow()
+    update = submission_update(machine, user_id, correct, points, now)
+
+    for retry in (False, True):
+        try:
+            before = yield DbCall('progress', 'find_one_and_update',
+                                  ({'user_id': user_id, 'machine_id': machine_id}, update),
+                                  {'projection': {'_id': 0, 'solved': 1, 'campaign_id': 1}, 'upsert': True,
+                                   'return_document': ReturnDocument.BEFORE})
+            break
+        except DuplicateKeyError:
+            # Lost the race to create the progress record; it exists now
+            if retry:
+                raise
+
+    before = before or {}
+    first_solve = correct and not before.get('solved', False)
+    campaign_id = before.get('campaign_id') or submission_campaign_id(machine, user_id)
+    campaign_completed = False
+
+    if first_solve:
+        # User and campaign counters are independent documents
+        counters = [DbCall('users', 'update_one',
+                           ({'user_id': user_id}, {'$inc': {'total_points': points, 'machines_solved': 1}}))]
+        if campaign_id != 'unknown':
+            counters.append(DbCall('campaigns', 'find_one_and_update', (
+                # Other players' solves never count towards someone else's campaign
+                {'campaign_id': campaign_id, 'user_id': user_id},
+                {'$inc': {'machines_solved': 1, 'total_points': points}},
+            ), {'projection': {'_id': 0, 'user_id': 1, 'machine_count': 1, 'machines_solved': 1},
+                'return_document': ReturnDocument.AFTER}))
+        results = yield counters
+        if len(results) > 1:
+            campaign_completed = yield from _campaign_completion_flow(campaign_id, results[1])
+
+    yield DbCall('submissions', 'insert_one', ({
+        'submission_id': f"sub_{uuid.uuid4().hex[:16]}",
+        'user_id': user_id,
+        'machine_id': machine_id,
+        'campaign_id': campaign_id,
+        'submitted_flag': submitted_flag,
+        'correct': correct,
+        'ip_address': ip_address,
+        'points_awarded': points if first_solve else 0,
+        'submitted_at': now,
+    },))
+
+    return {
+        'correct': correct,
+        'first_solve': first_solve,
+        'points': points if first_solve else 0,
+        'campaign_id': campaign_id,
+        'campaign_completed': campaign_completed,
+    }
+
+
+def _campaign_completion_flow(campaign_id: str, campaign: Optional[Dict[str, Any]]) -> Flow:
+    """Complete a campaign whose counters (after a solve) cover every machine; True if this solve did"""
+    if not campaign_is_complete(campaign):
+        return False
+
+    # Only the update that flips the status counts the completion
+    result = yield DbCall('campaigns', 'update_one', (
+        {'campaign_id': campaign_id, 'status': {'$ne': 'completed'}},
+        {'$set': {'status': 'completed', 'completed_at': datetime.utcnow()}},
+    ))
+    if not result.modified_count:
+        return False
+    yield DbCall('users', 'update_one', ({'user_id': campaign['user_id']}, {'$inc': {'campaigns_completed': 1}}))
+    return True
+
+
+def campaign_progress_pipeline(match: Dict[str, Any], per_machine: bool = False) -> List[Dict[str, Any]]:
+    """
+    Aggregation: campaigns matching `match` (newest first), each joined with
+    its owner's progress and summed in the same query
+
+    Every campaign gets progress_summary (solved, points, attempts); with
+    per_machine it also keeps each machine's record as progress.
+    """
+    owned = {'$filter': {'input': '$progress', 'as': 'p', 'cond': {'$eq': ['$$p.user_id', '$user_id']}}}
+    return [
+        {'$match': match},
+        {'$sort': {'created_at': -1}},
+        {'$lookup': {'from': 'progress', 'localField': 'campaign_id', 'foreignField': 'campaign_id',
+                     'as': 'progress'}},
+        {'$addFields': {'progress': {'$map': {'input': owned, 'as': 'p', 'in': {
+            'machine_id': '$$p.machine_id',
+            'solved': {'$ifNull': ['$$p.solved', False]},
+            'attempts': {'$ifNull': ['$$p.attempts', 0]},
+            'points_earned': {'$ifNull': ['$$p.points_earned', 0]},
+        }}}}},
+        {'$addFields': {'progress_summary': {
+            'solved': {'$size': {'$filter': {'input': '$progress', 'as': 'p', 'cond': {'$eq': ['$$p.solved', True]}}}},
+            'points': {'$sum': '$progress.points_earned'},
+            'attempts': {'$sum': '$progress.attempts'},
+        }}},
+        {'$project': {'_id': 0} if per_machine else {'_id': 0, 'progress': 0}},
+    ]
+
+
+def summarize_campaign_progress(campaign: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a joined progress_summary into machines_solved, progress_points, progress_attempts and progress_percentage"""
+    summary = campaign.pop('progress_summary', None) or {}
+    solved = summary.get('solved', 0)
+    total = campaign.get('machine_count', 0)
+    campaign['machines_solved'] = solved
+    campaign['progress_points'] = summary.get('points', 0)
+    campaign['progress_attempts'] = summary.get('attempts', 0)
+    campaign['progress_percentage'] = (solved / total * 100) if total > 0 else 0
+    return campaign
+
+
+def campaign_statistics(campaign: Dict[str, Any]) -> Dict[str, Any]:
+    """get_campaign_statistics' result for a summarized campaign"""
+    return {
+        'campaign_id': campaign['campaign_id'],
+        'campaign_name': campaign.get('campaign_name', 'Unknown'),
+        'total_machines': campaign['machine_count'],
+        'solved_machines': campaign['machines_solved'],
+        'total_attempts': campaign['progress_attempts'],
+        'total_points': campaign['progress_points'],
+        'completion_percentage': campaign['progress_percentage'],
+        'status': campaign.get('status', 'active'),
+        'created_at': campaign.get('created_at')
+    }
 
 
 class DatabaseManager:
     """Database manager for MongoDB operations"""
     
-    def __init__(self, connection_string: str = None):
+    def __init__(self, connection_string: str = None, client: MongoClient = None):
         if connection_string is None:
             connection_string = os.getenv('MONGODB_URI', 'mongodb://0.0.0.0:27017/')
         
-        self.client = MongoClient(connection_string)
+        self.client = client or MongoClient(connection_string)
         self.db = self.client['hackforge']
         
         # Collections
@@ -29,16 +317,19 @@ class DatabaseManager:
         self.achievements = self.db['achievements']
         self.user_achievements = self.db['user_achievements']
         self.sessions = self.db['sessions']
+        # machine_id -> flag hash, difficulty, campaign: one indexed read per flag check
+        self.machines = self.db['machines']
+
+        self.machine_cache = MachineCache()
         
         self._create_indexes()
+        self._backfill_machine_lookup()
     
     def _create_indexes(self):
-        """Create database indexes"""
-        self.users.create_index('user_id', unique=True)
-        self.users.create_index('email', unique=True)
-        self.campaigns.create_index('campaign_id', unique=True)
-        self.campaigns.create_index([('user_id', 1), ('created_at', -1)])  # For listing user's campaigns
-        self.progress.create_index([('user_id', 1), ('machine_id', 1)], unique=True)
+        """Create database indexes (declared per query pattern in indexes.py)"""
+        # Unique indexes are in place on return; the rest build in the background
+        self.indexes = IndexManager(self.db)
+        self.indexes.ensure(background=True, advise=index_advisor_enabled())
     
     def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         user_data['created_at'] = datetime.utcnow()
@@ -81,7 +372,57 @@ class DatabaseManager:
         
         result = self.campaigns.insert_one(campaign_data)
         campaign_data['_id'] = str(result.inserted_id)
+
+        self.register_machines(campaign_data.get('machines', []),
+                               campaign_id=campaign_data.get('campaign_id'),
+                               user_id=campaign_data.get('user_id'))
         return campaign_data
+
+    # ------------------------------------------------------------------
+    # Machine lookup (flag validation)
+    # ------------------------------------------------------------------
+
+    def register_machines(self, machines: Iterable[Dict[str, Any]], campaign_id: str = None,
+                          user_id: str = None) -> int:
+        """
+        Upsert machines into the lookup collection
+
+        Each machine dict needs machine_id and flag (the plain flag; only its
+        hash is stored) and may carry difficulty, blueprint_id and variant.
+        """
+        machines = list(machines)
+        if not machines:
+            return 0
+        self.machines.bulk_write(machine_lookup_operations(machines, campaign_id, user_id), ordered=False)
+        self.machine_cache.discard(machine['machine_id'] for machine in machines)
+        return len(machines)
+
+    def get_machine_lookup(self, machine_id: str) -> Optional[Dict[str, Any]]:
+        """A machine's lookup record (flag_hash, difficulty, campaign_id, ...), or None"""
+        machine = self.machine_cache.get(machine_id)
+        if machine is not None:
+            return machine
+
+        machine = self.machines.find_one({'machine_id': machine_id}, {'_id': 0})
+        # Misses aren't cached: the machine may be registered a moment later
+        if machine is not None:
+            self.machine_cache.put(machine_id, machine)
+        return machine
+
+    def unregister_campaign_machines(self, campaign_id: str) -> int:
+        """Drop a deleted campaign's machines from the lookup"""
+        result = self.machines.delete_many({'campaign_id': campaign_id})
+        self.machine_cache.discard_campaign(campaign_id)
+        return result.deleted_count
+
+    def _backfill_machine_lookup(self):
+        """Fill the lookup from campaigns created before it existed (runs once, while it is empty)"""
+        if self.machines.estimated_document_count() > 0:
+            return
+        for campaign in self.campaigns.find({}, {'_id': 0, 'campaign_id': 1, 'user_id': 1, 'machines': 1}):
+            self.register_machines((m for m in campaign.get('machines', []) if m.get('flag')),
+                                   campaign_id=campaign.get('campaign_id'),
+                                   user_id=campaign.get('user_id'))
     
     def get_campaign(self, campaign_id: str) -> Optional[Dict[str, Any]]:
         """Get campaign by ID, excluding MongoDB _id field"""
@@ -101,6 +442,17 @@ class DatabaseManager:
         )
         return campaigns
     
+    def get_user_campaigns_with_progress(self, user_id: str) -> List[Dict[str, Any]]:
+        """get_user_campaigns with each campaign's progress summed (one aggregation, not one query per campaign)"""
+        return [summarize_campaign_progress(campaign)
+                for campaign in self.campaigns.aggregate(campaign_progress_pipeline({'user_id': user_id}))]
+    
+    def get_campaign_with_progress(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """get_campaign plus its owner's per-machine progress and totals, in one aggregation"""
+        campaigns = list(self.campaigns.aggregate(campaign_progress_pipeline({'campaign_id': campaign_id},
+                                                                             per_machine=True)))
+        return summarize_campaign_progress(campaigns[0]) if campaigns else None
+    
     def update_campaign_name(self, campaign_id: str, new_name: str) -> bool:
         """Update campaign name"""
         result = self.campaigns.update_one(
@@ -160,6 +512,16 @@ class DatabaseManager:
         
         return result.modified_count > 0
     
+    def submit_flag(self, user_id: str, machine: Dict[str, Any], submitted_flag: str,
+                    ip_address: str = None) -> Dict[str, Any]:
+        """
+        Check and record a flag submission (see submit_flag_flow)
+
+        machine is the machine's lookup record (get_machine_lookup).
+        Returns {'correct', 'first_solve', 'points', 'campaign_id', 'campaign_completed'}
+        """
+        return run_flow(self, submit_flag_flow(user_id, machine, submitted_flag, ip_address))
+    
     def record_submission(self, submission_data: Dict[str, Any]) -> Dict[str, Any]:
         submission_data['submitted_at'] = datetime.utcnow()
         result = self.submissions.insert_one(submission_data)
@@ -237,28 +599,11 @@ class DatabaseManager:
         return list(self.campaigns.find(query).sort('created_at', -1))
     
     def get_campaign_statistics(self, campaign_id: str) -> Dict[str, Any]:
-        """Get detailed statistics for a campaign"""
-        campaign = self.get_campaign(campaign_id)
-        if not campaign:
+        """Get detailed statistics for a campaign (progress summed in the same query)"""
+        campaigns = list(self.campaigns.aggregate(campaign_progress_pipeline({'campaign_id': campaign_id})))
+        if not campaigns:
             return None
-        
-        progress_list = self.get_campaign_progress(campaign['user_id'], campaign_id)
-        
-        total_attempts = sum(p.get('attempts', 0) for p in progress_list)
-        solved_count = sum(1 for p in progress_list if p.get('solved', False))
-        total_points = sum(p.get('points_earned', 0) for p in progress_list)
-        
-        return {
-            'campaign_id': campaign_id,
-            'campaign_name': campaign.get('campaign_name', 'Unknown'),
-            'total_machines': campaign['machine_count'],
-            'solved_machines': solved_count,
-            'total_attempts': total_attempts,
-            'total_points': total_points,
-            'completion_percentage': (solved_count / campaign['machine_count'] * 100) if campaign['machine_count'] > 0 else 0,
-            'status': campaign.get('status', 'active'),
-            'created_at': campaign.get('created_at')
-        }
+        return campaign_statistics(summarize_campaign_progress(campaigns[0]))
 
 
 _db_manager = None
@@ -0,0 +1,255 @@
+"""
+Database Indexes
+Index declarations per query pattern, background builds and a COLLSCAN advisor
+
+Every index is declared next to the queries it serves (IndexSpec.serves), and
+every hot query the API runs is listed as a QueryPattern. IndexManager builds
+the declared indexes - unique ones (constraints the code relies on, e.g. the
+progress upsert in submit_flag) right away, the rest in a background thread
+so startup doesn't wait on index builds over large collections - and
+advise() runs explain() on each hot query and reports the ones whose winning
+plan still contains a COLLSCAN.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ASCENDING = 1
+DESCENDING = -1
+
+
+@dataclass
+class IndexSpec:
+    collection: str
+    keys: List[Tuple[str, int]]
+    unique: bool = False
+    # The QueryPattern names this index is for
+    serves: List[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        # Same name MongoDB derives from the keys, so existing indexes are recognised
+        return '_'.join(f"{key}_{direction}" for key, direction in self.keys)
+
+
+@dataclass
+class QueryPattern:
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+    # Where the API runs it
+    used_by: str = ""
+
+
+INDEXES: List[IndexSpec] = [
+    IndexSpec('users', [('user_id', ASCENDING)], unique=True, serves=['user by id']),
+    IndexSpec('users', [('email', ASCENDING)], unique=True),
+    IndexSpec('users', [('total_points', DESCENDING)], serves=['leaderboard', 'user rank']),
+
+    IndexSpec('campaigns', [('campaign_id', ASCENDING)], unique=True, serves=['campaign by id']),
+    IndexSpec('campaigns', [('user_id', ASCENDING), ('created_at', DESCENDING)], serves=['user campaigns']),
+    IndexSpec('campaigns', [('machines.machine_id', ASCENDING)], serves=['campaign of machine']),
+    IndexSpec('campaigns', [('status', ASCENDING)], serves=['campaigns by status']),
+
+    IndexSpec('progress', [('user_id', ASCENDING), ('machine_id', ASCENDING)], unique=True,
+              serves=['progress of user on machine']),
+    IndexSpec('progress', [('user_id', ASCENDING), ('campaign_id', ASCENDING)], serves=['campaign progress']),
+    IndexSpec('progress', [('campaign_id', ASCENDING)], serves=['progress of campaign']),
+    IndexSpec('progress', [('machine_id', ASCENDING), ('solved', ASCENDING)],
+              serves=['progress of machine', 'solvers of machine']),
+
+    IndexSpec('flag_submissions', [('user_id', ASCENDING), ('submitted_at', DESCENDING)],
+              serves=['recent submissions']),
+    IndexSpec('flag_submissions', [('campaign_id', ASCENDING)], serves=['submissions of campaign']),
+
+    IndexSpec('machines', [('machine_id', ASCENDING)], unique=True, serves=['machine lookup']),
+    IndexSpec('machines', [('campaign_id', ASCENDING)], serves=['machines of campaign']),
+]
+
+# Sample values only shape the plan; explain() doesn't need matching documents
+HOT_QUERIES: List[QueryPattern] = [
+    QueryPattern('user by id', 'users', {'user_id': 'user_x'}, used_by='get_user'),
+    QueryPattern('leaderboard', 'users', {}, sort=[('total_points', DESCENDING)], used_by='get_leaderboard'),
+    QueryPattern('user rank', 'users', {'total_points': {'$gt': 0}}, used_by='get_user_rank'),
+    QueryPattern('campaign by id', 'campaigns', {'campaign_id': 'campaign_x'},
+                 used_by='get_campaign, get_campaign_with_progress'),
+    QueryPattern('user campaigns', 'campaigns', {'user_id': 'user_x'}, sort=[('created_at', DESCENDING)],
+                 used_by='get_user_campaigns, get_user_campaigns_with_progress'),
+    QueryPattern('campaign of machine', 'campaigns', {'machines.machine_id': 'machine_x'},
+                 used_by='/api/machines, /api/machines/{machine_id}'),
+    QueryPattern('campaigns by status', 'campaigns', {'status': 'active'}, used_by='get_platform_stats'),
+    QueryPattern('progress of user on machine', 'progress', {'user_id': 'user_x', 'machine_id': 'machine_x'},
+                 used_by='submit_flag'),
+    QueryPattern('campaign progress', 'progress', {'user_id': 'user_x', 'campaign_id': 'campaign_x'},
+                 used_by='get_campaign_progress'),
+    QueryPattern('progress of campaign', 'progress', {'campaign_id': 'campaign_x'},
+                 used_by='campaign_progress_pipeline $lookup, delete_campaign'),
+    QueryPattern('progress of machine', 'progress', {'machine_id': 'machine_x'},
+                 used_by='get_machine_stats, /api/machines'),
+    QueryPattern('solvers of machine', 'progress', {'machine_id': 'machine_x', 'solved': True},
+                 used_by='get_machine_stats'),
+    QueryPattern('recent submissions', 'flag_submissions', {'user_id': 'user_x'},
+                 sort=[('submitted_at', DESCENDING)], used_by='get_user_submissions'),
+    QueryPattern('submissions of campaign', 'flag_submissions', {'campaign_id': 'campaign_x'},
+                 used_by='delete_campaign'),
+    QueryPattern('machine lookup', 'machines', {'machine_id': 'machine_x'}, used_by='get_machine_lookup'),
+    QueryPattern('machines of campaign', 'machines', {'campaign_id': 'campaign_x'},
+                 used_by='unregister_campaign_machines'),
+]
+
+
+def _plan_stages(plan: Any) -> Iterator[str]:
+    """Every stage name in an explain() plan tree (classic and slot-based engine layouts)"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+class IndexManager:
+    """
+    Builds the declared indexes and checks hot queries against them
+
+    Args:
+        db: pymongo Database
+        indexes: Index declarations (default INDEXES)
+        queries: Hot query patterns for advise() (default HOT_QUERIES)
+    """
+
+    def __init__(self, db, indexes: List[IndexSpec] = None, queries: List[QueryPattern] = None):
+        self.db = db
+        self.indexes = list(INDEXES if indexes is None else indexes)
+        self.queries = list(HOT_QUERIES if queries is None else queries)
+
+        # index name -> 'pending' / 'building' / 'ready' / error message
+        self.state: Dict[str, str] = {f"{spec.collection}.{spec.name}": 'pending' for spec in self.indexes}
+        self.build_seconds: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _build(self, spec: IndexSpec):
+        key = f"{spec.collection}.{spec.name}"
+        self.state[key] = 'building'
+        try:
+            self.db[spec.collection].create_index(spec.keys, name=spec.name, unique=spec.unique, background=True)
+            self.state[key] = 'ready'
+        except Exception as e:
+            self.state[key] = f"{type(e).__name__}: {e}"
+            print(f"⚠️  Index {key} not built: {e}")
+
+    def _build_all(self, specs: List[IndexSpec], advise: bool):
+        start = time.perf_counter()
+        for spec in specs:
+            self._build(spec)
+        self.build_seconds = time.perf_counter() - start
+        if advise:
+            self.report()
+
+    def ensure(self, background: bool = True, advise: bool = False):
+        """
+        Build every declared index
+
+        Unique indexes are built before returning; with background=True the
+        others are built in a daemon thread (then advised on, if asked).
+        """
+        for spec in self.indexes:
+            if spec.unique:
+                self._build(spec)
+
+        rest = [spec for spec in self.indexes if not spec.unique]
+        if not background:
+            self._build_all(rest, advise)
+            return
+        self._thread = threading.Thread(target=self._build_all, args=(rest, advise),
+                                        name="hackforge-indexes", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait for a background build; True once every index has been attempted"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def explain(self, query: QueryPattern) -> Dict[str, Any]:
+        cursor = self.db[query.collection].find(query.filter)
+        if query.sort:
+            cursor = cursor.sort(query.sort)
+        return cursor.explain()
+
+    def advise(self) -> List[Dict[str, Any]]:
+        """Hot queries whose winning plan scans a whole collection"""
+        findings = []
+        for query in self.queries:
+            try:
+                planner = self.explain(query).get('queryPlanner', {})
+            except Exception as e:
+                findings.append({'query': query.name, 'collection': query.collection, 'error': str(e)})
+                continue
+
+            stages = list(_plan_stages(planner.get('winningPlan', {})))
+            if 'COLLSCAN' in stages:
+                findings.append({
+                    'query': query.name,
+                    'collection': query.collection,
+                    'filter': query.filter,
+                    'sort': query.sort,
+                    'used_by': query.used_by,
+                    'stages': stages,
+                    'declared_indexes': [spec.name for spec in self.indexes if query.name in spec.serves],
+                })
+        return findings
+
+    def report(self) -> List[Dict[str, Any]]:
+        """advise(), printed"""
+        findings = self.advise()
+        for finding in findings:
+            if 'error' in finding:
+                print(f"⚠️  explain() failed for '{finding['query']}': {finding['error']}")
+            else:
+                print(f"⚠️  COLLSCAN: '{finding['query']}' on {finding['collection']} "
+                      f"({finding['used_by']}) - declared indexes: {finding['declared_indexes'] or 'none'}")
+        if not findings:
+            print(f"✓ All {len(self.queries)} hot queries use an index")
+        return findings
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'indexes': dict(self.state),
+            'ready': sum(1 for state in self.state.values() if state == 'ready'),
+            'total': len(self.state),
+            'build_seconds': round(self.build_seconds, 3) if self.build_seconds is not None else None,
+        }
+
+
+def index_advisor_enabled() -> bool:
+    """HACKFORGE_INDEX_ADVISOR=1 runs advise() once the background build finishes"""
+    return os.getenv('HACKFORGE_INDEX_ADVISOR', '0') == '1'
+
+
+def main():
+    import argparse
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description='Hackforge index builder and COLLSCAN advisor')
+    parser.add_argument('--uri', default=os.getenv('MONGODB_URI', 'mongodb://0.0.0.0:27017/'))
+    parser.add_argument('--no-build', action='store_true', help='Only explain the hot queries')
+    args = parser.parse_args()
+
+    manager = IndexManager(MongoClient(args.uri)['hackforge'])
+    if not args.no_build:
+        manager.ensure(background=False)
+        print(f"✓ {manager.status()['ready']}/{len(manager.indexes)} indexes ready "
+              f"({manager.build_seconds:.2f}s)")
+    raise SystemExit(1 if manager.report() else 0)
+
+
+if __name__ == "__main__":
+    main()
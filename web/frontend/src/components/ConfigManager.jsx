@@ -155,9 +155,15 @@ const ConfigManager = () => {
       // Add auto_generate query parameter
       const result = await api.createConfigWithMachine(cleanConfig, autoGenerate);
 
-      if (result.auto_generated && result.machine) {
+      if (result.auto_generated && result.job) {
+        showMessage('✓ Config created - generating machine...', 'info');
+        const machine = await api.waitForJob(result.job.job_id, (job) => {
+          if (job.current_stage) {
+            showMessage(`🚀 Generating machine: ${job.current_stage}...`, 'info');
+          }
+        });
         showMessage(
-          `🎉 Config + Machine ready! ${result.machine.machine_id} at ${result.machine.url || 'Building...'}`,
+          `🎉 Config + Machine ready! ${machine.machine_id} at ${machine.url || 'Building...'}`,
           'success'
         );
       } else {
@@ -222,7 +228,11 @@ const ConfigManager = () => {
       setGeneratingMachine(category);
       showMessage(`🚀 Generating machine from ${category}...`, 'info');
 
-      const result = await api.generateMachineFromConfig(category);
+      const result = await api.generateMachineFromConfig(category, (job) => {
+        if (job.current_stage) {
+          showMessage(`🚀 Generating machine from ${category}: ${job.current_stage}...`, 'info');
+        }
+      });
 
       showMessage(
         `🎉 Machine ready! ${result.machine_id} at ${result.url || 'http://4.231.90.52:8080'}`,
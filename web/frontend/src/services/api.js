@@ -305,11 +305,56 @@ class APIService {
     });
   }
 
-  // NEW: Generate complete machine from existing config (full pipeline)
-  async generateMachineFromConfig(category) {
-    return this.request(`/api/configs/${category}/generate-machine`, {
+  // NEW: Generate complete machine from existing config (full pipeline).
+  // The pipeline runs as a background job; this resolves with the machine
+  // once the job finishes. onProgress receives every job snapshot.
+  async generateMachineFromConfig(category, onProgress) {
+    const job = await this.request(`/api/configs/${category}/generate-machine`, {
       method: 'POST',
     });
+    return this.waitForJob(job.job_id, onProgress);
+  }
+
+  // Background jobs
+  async getJob(jobId) {
+    return this.request(`/api/jobs/${jobId}`);
+  }
+
+  async cancelJob(jobId) {
+    return this.request(`/api/jobs/${jobId}/cancel`, {
+      method: 'POST',
+    });
+  }
+
+  async retryJob(jobId) {
+    return this.request(`/api/jobs/${jobId}/retry`, {
+      method: 'POST',
+    });
+  }
+
+  // Follow a job's progress events until it finishes; resolves with its result
+  waitForJob(jobId, onProgress) {
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(`${API_BASE_URL}/api/jobs/${jobId}/events`);
+
+      source.addEventListener('job', (event) => {
+        const job = JSON.parse(event.data);
+        if (onProgress) onProgress(job);
+
+        if (job.status === 'succeeded') {
+          source.close();
+          resolve(job.result);
+        } else if (['failed', 'cancelled', 'interrupted'].includes(job.status)) {
+          source.close();
+          reject(new Error(job.error || `Job ${job.status}`));
+        }
+      });
+
+      source.onerror = () => {
+        source.close();
+        reject(new Error('Lost connection to job progress stream'));
+      };
+    });
   }
 
   // Health Check